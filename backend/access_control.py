@@ -0,0 +1,174 @@
+"""
+Access Control
+Shared permission checks for folders and the files, forms, quotes and
+e-signature documents inside them.
+
+Customers reach content through folders: a folder is accessible if the user is
+assigned to it (folder_assignments). The assigned folder set is resolved once
+per user and cached for ACCESS_CACHE_TTL_SECONDS; the folder assign/unassign
+paths call invalidate_user_access() so a change applies on the next request.
+Per-object checks then reduce to set lookups, plus at most one query for
+objects that can sit in several folders (form/file/quote folder assignments).
+
+The role comes from get_current_user (already read from user_roles), so checks
+never re-query it. Lookup failures deny access and are not cached.
+"""
+import os
+import logging
+import threading
+from typing import Any, Dict, FrozenSet, Optional
+
+from database import supabase_storage
+from cache_utils import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+ACCESS_CACHE_TTL_SECONDS = int(os.getenv("ACCESS_CACHE_TTL_SECONDS", "60"))
+ACCESS_CACHE_MAX_USERS = int(os.getenv("ACCESS_CACHE_MAX_USERS", "5000"))
+
+
+def is_admin(user: Optional[Dict[str, Any]]) -> bool:
+    return bool(user) and user.get("role") == "admin"
+
+
+class AccessControl:
+    """Per-user cache of accessible folder sets and the checks built on them"""
+
+    def __init__(self, maxsize: int = ACCESS_CACHE_MAX_USERS, ttl_seconds: float = ACCESS_CACHE_TTL_SECONDS):
+        # Two entries per user at most: assigned folders and client-owned folders
+        self._cache = TTLCache(maxsize=maxsize * 2, ttl_seconds=ttl_seconds)
+        # Version counters are part of the cache keys; bumping one invalidates its entries
+        self._versions_lock = threading.Lock()
+        self._all_users_version = 0
+        self._user_versions: Dict[str, int] = {}
+
+    def invalidate_user(self, *user_ids: Optional[str]):
+        """Drop cached access for the given users (call after folder assign/unassign)"""
+        with self._versions_lock:
+            for user_id in user_ids:
+                if user_id:
+                    self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+
+    def invalidate_all(self):
+        """Drop cached access for every user (e.g. a folder and its assignments were deleted)"""
+        with self._versions_lock:
+            self._all_users_version += 1
+            self._user_versions.clear()
+
+    def _key(self, kind: str, user_id: str) -> tuple:
+        with self._versions_lock:
+            return (kind, user_id, self._all_users_version, self._user_versions.get(user_id, 0))
+
+    def _cached_ids(self, kind: str, user_id: str, loader) -> FrozenSet[str]:
+        key = self._key(kind, user_id)
+        ids = self._cache.get(key)
+        if ids is MISSING:
+            try:
+                ids = frozenset(loader(user_id))
+            except Exception as e:
+                logger.warning(f"Error resolving {kind} access for user {user_id}: {str(e)}")
+                return frozenset()
+            self._cache.set(key, ids)
+        return ids
+
+    @staticmethod
+    def _load_folder_ids(user_id: str):
+        rows = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", user_id).execute().data or []
+        return [row["folder_id"] for row in rows if row.get("folder_id")]
+
+    @staticmethod
+    def _load_client_folder_ids(user_id: str):
+        clients = supabase_storage.table("clients").select("id").eq("user_id", user_id).execute().data or []
+        client_ids = [client["id"] for client in clients if client.get("id")]
+        if not client_ids:
+            return []
+        rows = supabase_storage.table("folders").select("id").in_("client_id", client_ids).execute().data or []
+        return [row["id"] for row in rows if row.get("id")]
+
+    def folder_ids(self, user_id: str) -> FrozenSet[str]:
+        """Folders the user is assigned to"""
+        return self._cached_ids("folders", user_id, self._load_folder_ids)
+
+    def client_folder_ids(self, user_id: str) -> FrozenSet[str]:
+        """Folders of the clients linked to the user's account"""
+        return self._cached_ids("client_folders", user_id, self._load_client_folder_ids)
+
+    def _in_assigned_folders(self, table: str, column: str, object_id: str, folder_ids: FrozenSet[str]) -> bool:
+        """Whether a many-to-many folder assignment row links object_id to one of folder_ids"""
+        if not folder_ids:
+            return False
+        try:
+            rows = supabase_storage.table(table).select("folder_id").eq(column, object_id).execute().data or []
+        except Exception as e:
+            logger.warning(f"Error checking {table} for {object_id}: {str(e)}")
+            return False
+        return any(row.get("folder_id") in folder_ids for row in rows)
+
+    def can_access_folder(self, user: Dict[str, Any], folder: Dict[str, Any]) -> bool:
+        """Admins, assigned users and the folder's creator"""
+        if is_admin(user):
+            return True
+        return folder.get("created_by") == user["id"] or folder.get("id") in self.folder_ids(user["id"])
+
+    def can_access_file(self, user: Dict[str, Any], file_data: Dict[str, Any]) -> bool:
+        """Admins, the uploader, and users assigned to the file's folder (or a folder it was added to)"""
+        if is_admin(user) or file_data.get("uploaded_by") == user["id"]:
+            return True
+        folder_id = file_data.get("folder_id")
+        if not folder_id:
+            # Files outside folders (reusable/templates) are not folder-scoped
+            return True
+        folder_ids = self.folder_ids(user["id"])
+        if folder_id in folder_ids:
+            return True
+        return self._in_assigned_folders("file_folder_assignments", "file_id", file_data["id"], folder_ids)
+
+    def can_access_form(self, user: Dict[str, Any], form_id: str) -> bool:
+        """Admins and users assigned to a folder the form is assigned to"""
+        if is_admin(user):
+            return True
+        return self._in_assigned_folders("form_folder_assignments", "form_id", form_id, self.folder_ids(user["id"]))
+
+    def can_access_quote(self, user: Dict[str, Any], quote: Dict[str, Any]) -> bool:
+        """Admins and users assigned to the quote's folder (or a folder it was assigned to)"""
+        if is_admin(user):
+            return True
+        folder_ids = self.folder_ids(user["id"])
+        if quote.get("folder_id") in folder_ids:
+            return True
+        return self._in_assigned_folders("quote_folder_assignments", "quote_id", quote["id"], folder_ids)
+
+    def can_sign_document(self, user: Dict[str, Any], document: Dict[str, Any]) -> bool:
+        """Admins, the document's creator, and assigned users or the linked client of its folder"""
+        if is_admin(user) or document.get("created_by") == user["id"]:
+            return True
+        folder_id = document.get("folder_id")
+        if not folder_id:
+            return False
+        return folder_id in self.folder_ids(user["id"]) or folder_id in self.client_folder_ids(user["id"])
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for metrics endpoints"""
+        return self._cache.stats()
+
+
+# Singleton instance
+_access_control: Optional[AccessControl] = None
+
+
+def get_access_control() -> AccessControl:
+    """Get singleton access control"""
+    global _access_control
+    if _access_control is None:
+        _access_control = AccessControl()
+    return _access_control
+
+
+def invalidate_user_access(*user_ids: Optional[str]):
+    """Call after adding or removing folder assignments for these users"""
+    get_access_control().invalidate_user(*user_ids)
+
+
+def invalidate_all_access():
+    """Call after bulk assignment changes whose users are unknown"""
+    get_access_control().invalidate_all()
@@ -3,7 +3,7 @@ AI Action Executor Service
 Handles execution of function calls from the AI chatbot
 """
 import logging
-from typing import Dict, Any, Optional, Optional, List
+from typing import Dict, Any, Optional, Optional
 from decimal import Decimal
 import uuid
 from datetime import datetime
@@ -17,7 +17,12 @@ sys.path.insert(0, repo_root)
 sys.path.insert(0, backend_dir)
 
 from database import supabase_storage
-from folder_tasks import build_customer_tasks, compute_stage_and_next_step
+from folder_snapshots import get_folder_snapshot, invalidate_folder_snapshot
+from access_control import invalidate_user_access
+from rag_service import invalidate_client_context, invalidate_form_context
+from pdf_cache import invalidate_quote_pdf
+from template_provisioning_service import provision_folder
+from pricing_engine import calculate_line_total, quote_totals, to_decimal
 
 logger = logging.getLogger(__name__)
 
@@ -263,8 +268,7 @@ class AIActionExecutor:
                 logger.debug(f"Normalized line item {idx}: {normalized_item}")
             
             # Calculate totals
-            from routers.quotes import calculate_quote_totals
-            totals = calculate_quote_totals(normalized_line_items, Decimal(str(tax_rate)), "after_discount")
+            totals = quote_totals(normalized_line_items, Decimal(str(tax_rate)), "after_discount")
             
             # Create quote data
             quote_data = {
@@ -286,6 +290,7 @@ class AIActionExecutor:
             quote_response = supabase_storage.table("quotes").insert(quote_data).execute()
             created_quote = quote_response.data[0]
             quote_id = created_quote["id"]
+            invalidate_client_context(created_quote.get("client_id"))
             
             # Create line items
             if line_items_data:
@@ -296,22 +301,13 @@ class AIActionExecutor:
                         logger.error(f"Line item {idx} is not a dict: {type(item).__name__}, value: {item}")
                         continue  # Skip invalid items
                     
-                    from routers.quotes import calculate_line_item_total
-                    from models import LineItemCreate
-                    from decimal import Decimal as D
-                    
-                    # Create LineItemCreate object
-                    line_item = LineItemCreate(
-                        description=item.get("description", ""),
-                        quantity=D(str(item.get("quantity", 1))),
-                        unit_price=D(str(item.get("unit_price", "0.00"))),
-                        discount_percent=D(str(item.get("discount", "0.00")))
-                    )
-                    
-                    line_total = calculate_line_item_total(
-                        line_item,
-                        use_line_tax=True,
-                        quote_tax_rate=Decimal(tax_rate)
+                    line_total = calculate_line_total(
+                        {
+                            "quantity": item.get("quantity", 1),
+                            "unit_price": item.get("unit_price", "0.00"),
+                            "discount_percent": item.get("discount", "0.00")
+                        },
+                        quote_tax_rate=to_decimal(tax_rate)
                     )
                     line_items_to_insert.append({
                         "id": str(uuid.uuid4()),
@@ -403,30 +399,27 @@ class AIActionExecutor:
                 supabase_storage.table("line_items").delete().eq("quote_id", quote_id).execute()
                 
                 # Insert new line items
-                from routers.quotes import calculate_line_item_total, calculate_quote_totals
-                from models import LineItemCreate
-                
                 # Normalize line items data
                 if isinstance(line_items_data, str):
                     import json
                     line_items_data = json.loads(line_items_data)
                 
+                tax_rate = Decimal(str(update_data.get("tax_rate", current_quote.get("tax_rate", "8.25"))))
                 line_items_to_insert = []
                 for idx, item in enumerate(line_items_data):
                     if not isinstance(item, dict):
                         logger.error(f"Line item {idx} is not a dict: {type(item).__name__}, value: {item}")
                         continue
                     
-                    line_item = LineItemCreate(
-                        description=item.get("description", ""),
-                        quantity=Decimal(str(item.get("quantity", 1))),
-                        unit_price=Decimal(str(item.get("unit_price", "0.00"))),
-                        discount_percent=Decimal(str(item.get("discount", item.get("discount_percent", "0.00"))))
+                    line_total = calculate_line_total(
+                        {
+                            "quantity": item.get("quantity", 1),
+                            "unit_price": item.get("unit_price", "0.00"),
+                            "discount_percent": item.get("discount", item.get("discount_percent", "0.00"))
+                        },
+                        quote_tax_rate=tax_rate
                     )
                     
-                    tax_rate = Decimal(str(update_data.get("tax_rate", current_quote.get("tax_rate", "8.25"))))
-                    line_total = calculate_line_item_total(line_item, use_line_tax=True, quote_tax_rate=tax_rate)
-                    
                     line_items_to_insert.append({
                         "id": str(uuid.uuid4()),
                         "quote_id": quote_id,
@@ -441,22 +434,15 @@ class AIActionExecutor:
                 if line_items_to_insert:
                     supabase_storage.table("line_items").insert(line_items_to_insert).execute()
                     
-                    # Recalculate totals - convert line_items_to_insert to format expected by calculate_quote_totals
-                    tax_rate = Decimal(str(update_data.get("tax_rate", current_quote.get("tax_rate", "8.25"))))
-                    line_items_for_totals = [
-                        {
-                            "quantity": item["quantity"],
-                            "unit_price": item["unit_price"],
-                            "discount_percent": item.get("discount_percent", "0.00")
-                        }
-                        for item in line_items_to_insert
-                    ]
-                    totals = calculate_quote_totals(line_items_for_totals, tax_rate, "after_discount")
+                    # Recalculate totals from the rows being inserted
+                    totals = quote_totals(line_items_to_insert, tax_rate, "after_discount")
                     update_data.update(totals)
             
             # Update quote
             if update_data:
                 supabase_storage.table("quotes").update(update_data).eq("id", quote_id).execute()
+                invalidate_client_context(current_quote.get("client_id"))
+                invalidate_quote_pdf(quote_id)
             
             # Fetch updated quote
             updated_response = supabase_storage.table("quotes").select("*, clients(*), line_items(*)").eq("id", quote_id).execute()
@@ -517,11 +503,11 @@ class AIActionExecutor:
             created_folder = folder_response.data[0]
             folder_id = created_folder["id"]
             
-            # Auto-assign "Reel48 Purchase Agreement" e-signature template to the folder
+            # Default artifacts ("Reel48 Purchase Agreement" e-signature copy, default forms)
             try:
-                self._auto_assign_purchase_agreement(folder_id)
+                provision_folder(folder_id, self.admin_user_id)
             except Exception as e:
-                logger.warning(f"Could not auto-assign Purchase Agreement e-signature: {str(e)}")
+                logger.warning(f"Could not provision default templates for folder {folder_id}: {str(e)}")
             
             # Create folder assignment for the client
             try:
@@ -538,6 +524,7 @@ class AIActionExecutor:
                         "assigned_at": datetime.now().isoformat()
                     }
                     supabase_storage.table("folder_assignments").insert(assignment_data).execute()
+                    invalidate_user_access(user_id)
             except Exception as e:
                 logger.warning(f"Could not create folder assignment: {str(e)}")
             
@@ -555,77 +542,6 @@ class AIActionExecutor:
                 "error": f"Failed to create folder: {str(e)}"
             }
     
-    def _auto_assign_purchase_agreement(self, folder_id: str):
-        """Helper function to auto-assign 'Reel48 Purchase Agreement' e-signature template to a folder"""
-        try:
-            # Find the "Reel48 Purchase Agreement" template by name
-            template_response = supabase_storage.table("esignature_documents").select("*").eq("name", "Reel48 Purchase Agreement").eq("is_template", True).single().execute()
-            
-            if not template_response.data:
-                logger.warning("Reel48 Purchase Agreement e-signature template not found")
-                return
-            
-            template_doc = template_response.data
-            template_id = template_doc["id"]
-            template_name = template_doc.get("name", "Reel48 Purchase Agreement")
-            
-            # Get folder name
-            folder_response = supabase_storage.table("folders").select("name").eq("id", folder_id).single().execute()
-            folder_name = folder_response.data.get("name", "Folder") if folder_response.data else "Folder"
-            
-            # Generate the copy name: "Folder Name - E-Signature Name"
-            copy_name = f"{folder_name} - {template_name}"
-            
-            # Check if a copy already exists for this template in this folder
-            existing_copy = supabase_storage.table("esignature_documents").select("id").eq("folder_id", folder_id).eq("is_template", False).eq("name", copy_name).execute()
-            if existing_copy.data:
-                # Copy already exists, skip
-                return
-            
-            # Create a copy of the template document for this folder
-            copy_id = str(uuid.uuid4())
-            now = datetime.now().isoformat()
-            
-            copy_data = {
-                "id": copy_id,
-                "name": copy_name,
-                "description": template_doc.get("description"),
-                "file_id": template_doc.get("file_id"),
-                "document_type": template_doc.get("document_type", "agreement"),
-                "signature_mode": template_doc.get("signature_mode", "simple"),
-                "require_signature": template_doc.get("require_signature", True),
-                "signature_fields": template_doc.get("signature_fields"),
-                "is_template": False,
-                "folder_id": folder_id,
-                "quote_id": template_doc.get("quote_id"),
-                "expires_at": template_doc.get("expires_at"),
-                "created_by": self.admin_user_id,
-                "status": "pending",
-                "created_at": now,
-                "updated_at": now
-            }
-            
-            # Create the copy
-            copy_response = supabase_storage.table("esignature_documents").insert(copy_data).execute()
-            
-            # Also create an assignment record linking the template to the folder
-            assignment_data = {
-                "document_id": template_id,
-                "folder_id": folder_id,
-                "assigned_by": self.admin_user_id,
-                "status": "pending"
-            }
-            
-            try:
-                supabase_storage.table("esignature_document_folder_assignments").insert(assignment_data).execute()
-            except Exception as e:
-                logger.warning(f"Could not create assignment record: {str(e)}")
-            
-            logger.info(f"Auto-assigned Reel48 Purchase Agreement to folder {folder_id}")
-        except Exception as e:
-            logger.error(f"Error auto-assigning Purchase Agreement: {str(e)}", exc_info=True)
-            # Don't raise - this is a non-critical operation
-    
     def _assign_form_to_folder(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Assign a form to a folder"""
         try:
@@ -683,6 +599,8 @@ class AIActionExecutor:
             }
             
             assignment_response = supabase_storage.table("form_folder_assignments").insert(assignment_data).execute()
+            invalidate_form_context()
+            invalidate_folder_snapshot(folder_id)
             
             return {
                 "success": True,
@@ -730,6 +648,7 @@ class AIActionExecutor:
             }
             
             assignment_response = supabase_storage.table("file_folder_assignments").insert(assignment_data).execute()
+            invalidate_folder_snapshot(folder_id)
             
             return {
                 "success": True,
@@ -777,6 +696,7 @@ class AIActionExecutor:
             }
             
             assignment_response = supabase_storage.table("esignature_document_folder_assignments").insert(assignment_data).execute()
+            invalidate_folder_snapshot(folder_id)
             
             return {
                 "success": True,
@@ -988,158 +908,22 @@ class AIActionExecutor:
             if not folder:
                 return {"success": False, "error": "Folder not found"}
 
-            quote = None
-            if folder.get("quote_id"):
-                try:
-                    quote = (
-                        supabase_storage.table("quotes")
-                        .select("id, quote_number, status, payment_status, total")
-                        .eq("id", folder.get("quote_id"))
-                        .single()
-                        .execute()
-                    ).data
-                except Exception:
-                    quote = None
-
-            # Shipping summary
-            shipments = (
-                supabase_storage.table("shipments")
-                .select("*")
-                .eq("folder_id", folder_id)
-                .order("created_at", desc=True)
-                .limit(1)
-                .execute()
-            ).data or []
-            shipment = shipments[0] if shipments else None
-
-            shipping = {"has_shipment": bool(shipment)}
-            if shipment:
-                shipping.update({
-                    "status": shipment.get("status"),
-                    "carrier_name": shipment.get("carrier_name") or shipment.get("carrier"),
-                    "tracking_number": shipment.get("tracking_number"),
-                    "estimated_delivery_date": shipment.get("estimated_delivery_date"),
-                    "actual_delivery_date": shipment.get("actual_delivery_date"),
-                })
-
             client = None
             try:
                 client = supabase_storage.table("clients").select("email, user_id").eq("id", client_id).single().execute().data
             except Exception:
                 client = None
-            client_email = (client or {}).get("email")
             client_user_id = (client or {}).get("user_id")
-            client_email_norm = client_email.lower().strip() if isinstance(client_email, str) and client_email.strip() else None
-
-            # Build task list (best-effort) so next-step messaging matches folder summary
-            # Forms: per-form completion for this customer's email
-            forms_for_tasks: List[Dict[str, Any]] = []
-            try:
-                assigned = supabase_storage.table("form_folder_assignments").select("form_id").eq("folder_id", folder_id).execute().data or []
-                form_ids = [a.get("form_id") for a in assigned if a.get("form_id")]
-                name_map: Dict[str, str] = {}
-                if form_ids:
-                    try:
-                        metas = supabase_storage.table("forms").select("id,name").in_("id", form_ids).execute().data or []
-                        name_map = {m.get("id"): (m.get("name") or "Form") for m in metas if m.get("id")}
-                    except Exception:
-                        name_map = {}
-                for fid in form_ids:
-                    if not fid:
-                        continue
-                    completed = False
-                    if client_email_norm:
-                        try:
-                            chk = (
-                                supabase_storage.table("form_submissions")
-                                .select("id")
-                                .eq("form_id", fid)
-                                .eq("submitter_email", client_email_norm)
-                                .limit(1)
-                                .execute()
-                            )
-                            completed = bool(chk.data)
-                        except Exception:
-                            completed = False
-                    forms_for_tasks.append({"id": fid, "name": name_map.get(fid) or "Form", "is_completed": completed})
-            except Exception:
-                forms_for_tasks = []
-
-            # E-signatures: per-doc completion for this customer's user_id
-            esigs_for_tasks: List[Dict[str, Any]] = []
-            try:
-                docs = (
-                    supabase_storage.table("esignature_documents")
-                    .select("id,name")
-                    .eq("folder_id", folder_id)
-                    .eq("is_template", False)
-                    .execute()
-                ).data or []
-                for d in docs:
-                    did = d.get("id")
-                    if not did:
-                        continue
-                    completed = False
-                    try:
-                        qsig = supabase_storage.table("esignature_signatures").select("id").eq("document_id", did)
-                        if client_user_id:
-                            qsig = qsig.eq("user_id", client_user_id)
-                        qsig = qsig.limit(1).execute()
-                        completed = bool(qsig.data)
-                    except Exception:
-                        completed = False
-                    esigs_for_tasks.append({"id": did, "name": d.get("name"), "is_completed": completed})
-            except Exception:
-                esigs_for_tasks = []
 
-            # Files: viewed count for this customer
-            files_total = 0
-            files_viewed = 0
-            try:
-                file_rows = (
-                    supabase_storage.table("files")
-                    .select("id")
-                    .eq("folder_id", folder_id)
-                    .eq("is_reusable", False)
-                    .execute()
-                ).data or []
-                file_ids = [f.get("id") for f in file_rows if f.get("id")]
-                files_total = len(file_ids)
-                if client_user_id and file_ids:
-                    views = (
-                        supabase_storage.table("file_views")
-                        .select("file_id")
-                        .eq("user_id", client_user_id)
-                        .in_("file_id", file_ids)
-                        .execute()
-                    ).data or []
-                    files_viewed = len({v.get("file_id") for v in views if v.get("file_id")})
-            except Exception:
-                files_total = 0
-                files_viewed = 0
-
-            tasks = build_customer_tasks(
-                folder_id=folder_id,
-                quote=quote,
-                forms=forms_for_tasks,
-                esignatures=esigs_for_tasks,
-                files_total=files_total,
-                files_viewed=files_viewed,
-            )
-
-            stage_info = compute_stage_and_next_step(folder=folder, quote=quote, shipping=shipping, tasks=tasks)
-            tasks_progress = stage_info.get("tasks_progress") or {}
-
-            progress = {
-                "tasks_total": tasks_progress.get("tasks_total", 0),
-                "tasks_completed": tasks_progress.get("tasks_completed", 0),
-                "forms_total": len(forms_for_tasks),
-                "forms_completed": len([f for f in forms_for_tasks if f.get("is_completed")]),
-                "esignatures_total": len(esigs_for_tasks),
-                "esignatures_completed": len([e for e in esigs_for_tasks if e.get("is_completed")]),
-                "files_total": files_total,
-                "files_viewed": files_viewed,
-            }
+            # Read the folder snapshot as the customer sees it, so next-step messaging
+            # matches the folder page (customers without a portal account: admin view)
+            if client_user_id:
+                viewer = {"id": client_user_id, "email": (client or {}).get("email"), "role": "customer"}
+            else:
+                viewer = {"role": "admin"}
+            snapshot = get_folder_snapshot(folder, viewer)
+            quote = snapshot.get("quote")
+            summary = snapshot.get("summary") or {}
 
             return {
                 "success": True,
@@ -1147,14 +931,14 @@ class AIActionExecutor:
                     "client_id": client_id,
                     "folder_id": folder_id,
                     "quote_number": (quote or {}).get("quote_number") or None,
-                    "stage": stage_info.get("stage"),
-                    "next_step": stage_info.get("next_step"),
-                    "next_step_owner": stage_info.get("next_step_owner"),
-                    "computed_stage": stage_info.get("computed_stage"),
-                    "computed_next_step": stage_info.get("computed_next_step"),
-                    "computed_next_step_owner": stage_info.get("computed_next_step_owner"),
-                    "progress": progress,
-                    "shipping": shipping,
+                    "stage": summary.get("stage"),
+                    "next_step": summary.get("next_step"),
+                    "next_step_owner": summary.get("next_step_owner"),
+                    "computed_stage": summary.get("computed_stage"),
+                    "computed_next_step": summary.get("computed_next_step"),
+                    "computed_next_step_owner": summary.get("computed_next_step_owner"),
+                    "progress": summary.get("progress") or {},
+                    "shipping": summary.get("shipping") or {"has_shipment": False},
                     "deep_link": f"/folders/{folder_id}",
                 },
                 "message": "Here’s the latest status for your order."
@@ -0,0 +1,228 @@
+"""
+Quote Auto-Save Buffer
+Coalesces the editor's frequent auto-save calls into occasional database writes.
+
+The latest draft per (quote, user) is kept in memory and written to
+quotes.draft_auto_save by a periodic sweep once the editor has been idle for
+AUTOSAVE_IDLE_SECONDS, or at the latest AUTOSAVE_MAX_DELAY_SECONDS after the
+first unsaved change. Drafts whose content hash matches what was last written
+are never written again. Explicit saves and shutdown flush synchronously, and
+reads are served from memory before falling back to the database.
+
+The buffer is per process: run the API as a single worker (as deployed) or
+pin editing sessions to one worker, otherwise another worker may read an older
+draft from the database until the next flush.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AUTOSAVE_IDLE_SECONDS = float(os.getenv("AUTOSAVE_IDLE_SECONDS", "90"))
+AUTOSAVE_MAX_DELAY_SECONDS = float(os.getenv("AUTOSAVE_MAX_DELAY_SECONDS", "300"))
+AUTOSAVE_SWEEP_SECONDS = int(os.getenv("AUTOSAVE_SWEEP_SECONDS", "5"))
+# Flushed drafts stay in memory this long for reads
+AUTOSAVE_RETAIN_SECONDS = float(os.getenv("AUTOSAVE_RETAIN_SECONDS", "600"))
+
+
+def draft_hash(draft: Dict[str, Any]) -> str:
+    """Stable content hash of a draft (key order does not matter)"""
+    canonical = json.dumps(draft, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class DraftEntry:
+    draft: Dict[str, Any]
+    content_hash: str
+    saved_at: str
+    updated_at: float
+    dirty_since: Optional[float] = None
+    version: int = 0
+
+
+class AutoSaveBuffer:
+    """In-memory write-behind buffer for quote auto-save drafts"""
+
+    def __init__(
+        self,
+        idle_seconds: float = AUTOSAVE_IDLE_SECONDS,
+        max_delay_seconds: float = AUTOSAVE_MAX_DELAY_SECONDS,
+        retain_seconds: float = AUTOSAVE_RETAIN_SECONDS
+    ):
+        self.idle_seconds = idle_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.retain_seconds = retain_seconds
+        self._entries: Dict[Tuple[str, str], DraftEntry] = {}
+        # Hash of the draft last written per quote (the column holds one draft per quote)
+        self._persisted: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        # Serializes flushes so a sweep and an explicit save never interleave writes
+        self._flush_lock = threading.Lock()
+        self.received = 0
+        self.unchanged = 0
+        self.writes = 0
+        self.failures = 0
+
+    def put(self, quote_id: str, user_id: str, draft: Dict[str, Any]) -> str:
+        """Buffer the latest draft; returns its saved-at timestamp"""
+        content_hash = draft_hash(draft)
+        now = time.monotonic()
+        key = (quote_id, user_id)
+        with self._lock:
+            self.received += 1
+            entry = self._entries.get(key)
+            if entry is not None and entry.content_hash == content_hash:
+                self.unchanged += 1
+                entry.updated_at = now
+                return entry.saved_at
+
+            saved_at = datetime.now().isoformat()
+            if entry is None:
+                entry = DraftEntry(draft=draft, content_hash=content_hash, saved_at=saved_at, updated_at=now)
+                self._entries[key] = entry
+            else:
+                entry.draft, entry.content_hash, entry.saved_at, entry.updated_at = draft, content_hash, saved_at, now
+            entry.version += 1
+            if content_hash == self._persisted.get(quote_id):
+                entry.dirty_since = None
+            elif entry.dirty_since is None:
+                entry.dirty_since = now
+            return saved_at
+
+    def get(self, quote_id: str) -> Optional[Dict[str, Any]]:
+        """Most recent buffered draft for a quote (any editor), or None"""
+        with self._lock:
+            entries = [entry for (qid, _), entry in self._entries.items() if qid == quote_id]
+            if not entries:
+                return None
+            latest = max(entries, key=lambda entry: entry.updated_at)
+            return {"draft_data": latest.draft, "last_auto_saved_at": latest.saved_at}
+
+    def discard(self, quote_id: str):
+        """Drop buffered drafts without writing them (quote deleted)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == quote_id]:
+                del self._entries[key]
+            self._persisted.pop(quote_id, None)
+
+    def _due(self, entry: DraftEntry, now: float) -> bool:
+        return entry.dirty_since is not None and (
+            now - entry.updated_at >= self.idle_seconds
+            or now - entry.dirty_since >= self.max_delay_seconds
+        )
+
+    def flush(self, quote_id: Optional[str] = None, force: bool = False) -> int:
+        """
+        Write buffered drafts to the database
+
+        Args:
+            quote_id: Only this quote (default: all quotes)
+            force: Write every dirty draft now instead of only idle/overdue ones
+
+        Returns:
+            Number of quotes written
+        """
+        from database import supabase_storage
+
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                pending: List[Tuple[Tuple[str, str], DraftEntry, int]] = [
+                    (key, entry, entry.version)
+                    for key, entry in self._entries.items()
+                    if (quote_id is None or key[0] == quote_id)
+                    and entry.dirty_since is not None
+                    and (force or self._due(entry, now))
+                ]
+                # One write per quote: the column holds a single draft, latest editor wins
+                latest: Dict[str, Tuple[Tuple[str, str], DraftEntry, int]] = {}
+                for item in pending:
+                    current = latest.get(item[0][0])
+                    if current is None or item[1].updated_at > current[1].updated_at:
+                        latest[item[0][0]] = item
+                writes = [(key, entry.draft, entry.content_hash, entry.saved_at, version)
+                          for key, entry, version in latest.values()]
+                superseded = [(key, version) for key, entry, version in pending if latest[key[0]][0] != key]
+
+            written = 0
+            for key, draft, content_hash, saved_at, version in writes:
+                try:
+                    supabase_storage.table("quotes").update({
+                        "draft_auto_save": draft,
+                        "last_auto_saved_at": saved_at
+                    }).eq("id", key[0]).execute()
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"Auto-save flush failed for quote {key[0]}: {str(e)}")
+                    continue
+                written += 1
+                with self._lock:
+                    self.writes += 1
+                    self._persisted[key[0]] = content_hash
+                    entry = self._entries.get(key)
+                    # A newer draft that arrived during the write stays dirty
+                    if entry is not None and entry.version == version:
+                        entry.dirty_since = None
+
+            with self._lock:
+                for key, version in superseded:
+                    entry = self._entries.get(key)
+                    if entry is not None and entry.version == version:
+                        entry.dirty_since = None
+            return written
+
+    def sweep(self) -> int:
+        """Scheduler job: flush idle/overdue drafts and forget old clean ones"""
+        written = self.flush()
+        now = time.monotonic()
+        with self._lock:
+            for key in [
+                key for key, entry in self._entries.items()
+                if entry.dirty_since is None and now - entry.updated_at >= self.retain_seconds
+            ]:
+                del self._entries[key]
+            live_quotes = {quote_id for quote_id, _ in self._entries}
+            for quote_id in [quote_id for quote_id in self._persisted if quote_id not in live_quotes]:
+                del self._persisted[quote_id]
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer size and write coalescing counters"""
+        with self._lock:
+            dirty = sum(1 for entry in self._entries.values() if entry.dirty_since is not None)
+            return {
+                "entries": len(self._entries),
+                "dirty": dirty,
+                "received": self.received,
+                "unchanged": self.unchanged,
+                "writes": self.writes,
+                "failures": self.failures,
+                "writes_per_request": round(self.writes / self.received, 4) if self.received else 0.0
+            }
+
+
+# Singleton instance
+_autosave_buffer: Optional[AutoSaveBuffer] = None
+
+
+def get_autosave_buffer() -> AutoSaveBuffer:
+    """Get or create the auto-save buffer singleton"""
+    global _autosave_buffer
+    if _autosave_buffer is None:
+        _autosave_buffer = AutoSaveBuffer()
+    return _autosave_buffer
+
+
+def flush_all_autosaves():
+    """Write every buffered draft now (shutdown)"""
+    if _autosave_buffer is not None:
+        written = _autosave_buffer.flush(force=True)
+        logger.info(f"Flushed {written} buffered auto-save draft(s)")
@@ -5,7 +5,7 @@ Creates larger, more meaningful chunks with better context preservation
 """
 import logging
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Iterator, TextIO, Union
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
@@ -13,6 +13,9 @@ logger = logging.getLogger(__name__)
 DEFAULT_CHUNK_SIZE = 3000  # Target chunk size in characters
 DEFAULT_OVERLAP_SIZE = 200  # Overlap between chunks (deprecated - no longer used)
 MIN_CHUNK_SIZE = 500  # Minimum chunk size before merging
+STREAM_READ_SIZE = 64 * 1024  # Characters read per step when chunking a file object
+
+PARAGRAPH_SEPARATOR = re.compile(r'\n\s*\n')
 
 
 @dataclass
@@ -56,92 +59,152 @@ class ChunkingService:
         
         metadata = metadata or {}
         
-        # Step 1: Split by paragraphs (double newlines)
-        paragraphs = self._split_by_paragraphs(text)
-        
-        # Step 2: Process paragraphs - prefer keeping them together
-        processed_chunks = []
-        for para in paragraphs:
-            if len(para) <= self.chunk_size:
-                # Paragraph fits in one chunk - keep it whole
-                processed_chunks.append(para)
-            else:
-                # Paragraph is too large - split by sentences but try to keep groups together
-                sentences = self._split_by_sentences(para)
-                # Group sentences into chunks that approach but don't exceed chunk_size
-                current_group = []
-                current_size = 0
-                
-                for sent in sentences:
-                    sent_size = len(sent)
-                    # If adding this sentence would exceed chunk_size, finalize current group
-                    if current_size + sent_size > self.chunk_size and current_group:
-                        processed_chunks.append(' '.join(current_group))
-                        current_group = [sent]
-                        current_size = sent_size
-                    else:
-                        current_group.append(sent)
-                        current_size += sent_size + 1  # +1 for space
-                
-                # Add remaining group
-                if current_group:
-                    processed_chunks.append(' '.join(current_group))
-        
-        # Step 3: Merge small chunks with adjacent chunks (more aggressive merging)
-        merged = self._merge_small_chunks(processed_chunks)
-        
-        # Step 4: Final pass - split any chunks that are still too large
-        final_chunks = []
-        for chunk_text in merged:
-            if len(chunk_text) <= self.chunk_size:
-                final_chunks.append(chunk_text)
-            else:
-                # Chunk is still too large - split by sentences
-                sentences = self._split_by_sentences(chunk_text)
-                current_group = []
-                current_size = 0
-                
-                for sent in sentences:
-                    sent_size = len(sent)
-                    if current_size + sent_size > self.chunk_size and current_group:
-                        final_chunks.append(' '.join(current_group))
-                        current_group = [sent]
-                        current_size = sent_size
-                    else:
-                        current_group.append(sent)
-                        current_size += sent_size + 1
-                
-                if current_group:
-                    # Only split by words if a single sentence exceeds chunk_size
-                    if len(' '.join(current_group)) > self.chunk_size:
-                        final_chunks.extend(self._split_by_words(' '.join(current_group)))
-                    else:
-                        final_chunks.append(' '.join(current_group))
-        
-        # Step 5: Create Chunk objects (no overlap - store clean chunks)
         chunks = []
-        for idx, chunk_text in enumerate(final_chunks):
+        total_chunks = 0
+        for idx, chunk_text in enumerate(self._iter_final_texts(self._iter_pieces(text))):
+            total_chunks = idx + 1
             cleaned_text = chunk_text.strip()
             if cleaned_text:  # Only add non-empty chunks
-                chunk_metadata = {
-                    **metadata,
-                    "chunk_index": idx,
-                    "total_chunks": len(final_chunks)
-                }
                 chunks.append(Chunk(
                     text=cleaned_text,
                     chunk_index=idx,
-                    metadata=chunk_metadata
+                    metadata={**metadata, "chunk_index": idx}
                 ))
         
+        # total_chunks is only known once the stream is exhausted
+        for chunk in chunks:
+            chunk.metadata["total_chunks"] = total_chunks
+        
         avg_size = sum(len(c.text) for c in chunks) // len(chunks) if chunks else 0
         logger.info(f"Created {len(chunks)} chunks from document (avg size: {avg_size} chars, target: {self.chunk_size})")
         return chunks
     
+    def iter_chunks(
+        self,
+        source: Union[str, Iterable[str], TextIO],
+        metadata: Optional[Dict] = None
+    ) -> Iterator[Chunk]:
+        """
+        Stream chunks from a document without materializing the whole text
+        
+        Produces the same chunks as chunk_document, but emits them as soon as
+        they are final. Because the total is unknown while streaming, chunk
+        metadata does not include total_chunks.
+        
+        Args:
+            source: Document text, an iterable of text pieces, or a text file object
+            metadata: Optional metadata to include with each chunk
+            
+        Yields:
+            Chunk objects in document order
+        """
+        metadata = metadata or {}
+        
+        for idx, chunk_text in enumerate(self._iter_final_texts(self._iter_pieces(source))):
+            cleaned_text = chunk_text.strip()
+            if cleaned_text:
+                yield Chunk(
+                    text=cleaned_text,
+                    chunk_index=idx,
+                    metadata={**metadata, "chunk_index": idx}
+                )
+    
+    def _iter_pieces(self, source: Union[str, Iterable[str], TextIO]) -> Iterator[str]:
+        """Normalize a chunking source into an iterator of text pieces"""
+        if isinstance(source, str):
+            yield source
+        elif hasattr(source, "read"):
+            for piece in iter(lambda: source.read(STREAM_READ_SIZE), ""):
+                yield piece
+        else:
+            yield from source
+    
+    def _iter_final_texts(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Single pass over the document: paragraphs -> sentence groups -> merge -> final split
+        
+        Each stage is a generator, so at most one paragraph plus one pending
+        merge group is held in memory at a time.
+        """
+        for chunk_text in self._merge_small_chunks(self._iter_paragraph_groups(pieces)):
+            if len(chunk_text) <= self.chunk_size:
+                yield chunk_text
+                continue
+            
+            # Chunk is still too large - split by sentences
+            groups = list(self._group_sentences(self._split_by_sentences(chunk_text)))
+            for group in groups[:-1]:
+                yield ' '.join(group)
+            if groups:
+                last_group = groups[-1]
+                # Only split by words if a single sentence exceeds chunk_size
+                joined_size = sum(len(sent) for sent in last_group) + len(last_group) - 1
+                if joined_size > self.chunk_size:
+                    yield from self._split_by_words(' '.join(last_group))
+                else:
+                    yield ' '.join(last_group)
+    
+    def _iter_paragraph_groups(self, pieces: Iterable[str]) -> Iterator[str]:
+        """Yield paragraphs, splitting paragraphs larger than chunk_size into sentence groups"""
+        for para in self._iter_paragraphs(pieces):
+            if len(para) <= self.chunk_size:
+                # Paragraph fits in one chunk - keep it whole
+                yield para
+            else:
+                # Paragraph is too large - split by sentences but try to keep groups together
+                for group in self._group_sentences(self._split_by_sentences(para)):
+                    yield ' '.join(group)
+    
+    def _group_sentences(self, sentences: List[str]) -> Iterator[List[str]]:
+        """Group sentences into lists that approach but don't exceed chunk_size"""
+        current_group = []
+        current_size = 0
+        
+        for sent in sentences:
+            sent_size = len(sent)
+            # If adding this sentence would exceed chunk_size, finalize current group
+            if current_size + sent_size > self.chunk_size and current_group:
+                yield current_group
+                current_group = [sent]
+                current_size = sent_size
+            else:
+                current_group.append(sent)
+                current_size += sent_size + 1  # +1 for space
+        
+        # Add remaining group
+        if current_group:
+            yield current_group
+    
+    def _iter_paragraphs(self, pieces: Iterable[str]) -> Iterator[str]:
+        """Split a stream of text pieces into paragraphs (double newlines)"""
+        buffer = ""
+        for piece in pieces:
+            if not piece:
+                continue
+            # A separator may straddle the previous piece boundary, so rescan
+            # from the start of the buffer's trailing whitespace
+            scan_from = _content_end(buffer)
+            buffer += piece
+            
+            # A separator is only final once non-whitespace text follows it
+            tail = _content_end(buffer)
+            cut = 0
+            for match in PARAGRAPH_SEPARATOR.finditer(buffer, scan_from, tail):
+                para = buffer[cut:match.start()].strip()
+                if para:
+                    yield para
+                cut = match.end()
+            if cut:
+                buffer = buffer[cut:]
+        
+        para = buffer.strip()
+        if para:
+            yield para
+    
     def _split_by_paragraphs(self, text: str) -> List[str]:
         """Split text by paragraphs (double newlines)"""
         # Split by double newlines (paragraphs)
-        paragraphs = re.split(r'\n\s*\n', text)
+        paragraphs = PARAGRAPH_SEPARATOR.split(text)
         return [p.strip() for p in paragraphs if p.strip()]
     
     def _split_by_sentences(self, text: str) -> List[str]:
@@ -200,41 +263,41 @@ class ChunkingService:
         
         return chunks
     
-    def _merge_small_chunks(self, chunks: List[str]) -> List[str]:
+    def _merge_small_chunks(self, chunks: Iterable[str]) -> Iterator[str]:
         """Merge chunks smaller than min_chunk_size with adjacent chunks (aggressive merging)"""
-        if not chunks:
-            return []
+        # Parts of the chunk currently being merged, and the length it would have once joined
+        merged_parts: Optional[List[str]] = None
+        merged_size = 0
         
-        merged = []
-        i = 0
-        
-        while i < len(chunks):
-            current = chunks[i]
+        for current in chunks:
+            if merged_parts is not None:
+                # Try to merge with as many following chunks as possible
+                potential_size = merged_size + 2 + len(current)  # +2 for "\n\n"
+                # If merged chunk would still be reasonable, add it
+                if merged_size < self.chunk_size and potential_size <= self.chunk_size * 1.2:
+                    merged_parts.append(current)
+                    merged_size = potential_size
+                    continue
+                yield "\n\n".join(merged_parts)
+                merged_parts = None
             
-            # If chunk is too small, try to merge with next chunks
+            # If chunk is too small, start merging following chunks into it
             if len(current) < self.min_chunk_size:
-                # Try to merge with as many following chunks as possible
-                merged_chunk = current
-                j = i + 1
-                
-                while j < len(chunks) and len(merged_chunk) < self.chunk_size:
-                    next_chunk = chunks[j]
-                    potential_merge = merged_chunk + "\n\n" + next_chunk
-                    
-                    # If merged chunk would still be reasonable, add it
-                    if len(potential_merge) <= self.chunk_size * 1.2:
-                        merged_chunk = potential_merge
-                        j += 1
-                    else:
-                        break
-                
-                merged.append(merged_chunk)
-                i = j
+                merged_parts = [current]
+                merged_size = len(current)
             else:
-                merged.append(current)
-                i += 1
+                yield current
         
-        return merged
+        if merged_parts is not None:
+            yield "\n\n".join(merged_parts)
+
+
+def _content_end(text: str) -> int:
+    """Index just past the last non-whitespace character (len(text.rstrip()) without copying)"""
+    end = len(text)
+    while end and text[end - 1].isspace():
+        end -= 1
+    return end
 
 
 # Singleton instance
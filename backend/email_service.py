@@ -3,7 +3,7 @@ Email service for sending notifications and password reset emails
 Uses AWS SES (Simple Email Service) for all email sending
 """
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 import logging
 from template_service import template_service
@@ -364,9 +364,91 @@ Quote number: {quote_number}
 
 View quote: {quote_link}"""
         text_content = _wrap_branded_text(title="New quote assigned — Reel48", body=text_body)
-        
+
         return self._send_email(to_email, subject, html_content, text_content)
-    
+
+    def send_quote_assignment_digest(
+        self,
+        to_email: str,
+        quotes: List[Dict[str, Any]],
+        user_name: Optional[str] = None,
+        assigned_by: Optional[str] = None
+    ) -> bool:
+        """
+        Send one email listing several quotes assigned to a customer
+
+        Args:
+            to_email: Customer's email address
+            quotes: Assigned quotes (dicts with id, title and quote_number)
+            user_name: Customer's name (optional)
+            assigned_by: Name of admin who assigned the quotes (optional)
+
+        Returns:
+            True if email sent successfully, False otherwise
+        """
+        if len(quotes) == 1:
+            quote = quotes[0]
+            return self.send_quote_assignment_notification(
+                to_email=to_email,
+                quote_title=quote.get("title") or "Quote",
+                quote_number=quote.get("quote_number") or "",
+                quote_id=quote["id"],
+                user_name=user_name,
+                assigned_by=assigned_by
+            )
+
+        quotes_link = f"{FRONTEND_URL}/quotes"
+        subject = f"Reel48 — {len(quotes)} new quotes assigned"
+
+        hello = f"Hello{(' ' + user_name) if user_name else ''},"
+        assigned_by_line = (
+            f"<p style=\"margin: 0 0 14px 0; color:#6b7280; font-size: 13px;\">Assigned by: <b style=\"color:#374151;\">{assigned_by}</b></p>"
+            if assigned_by
+            else ""
+        )
+        quote_rows = "".join(
+            f"""
+          <div style="padding: 10px 0; border-top: 1px solid #e5e7eb;">
+            <a href="{FRONTEND_URL}/quotes/{quote['id']}" style="font-weight: 700; color: {BRAND_PRIMARY}; text-decoration: none;">{quote.get('title') or 'Quote'}</a>
+            <div style="color:#6b7280; font-size: 13px; margin-top: 4px;">Quote number: <b style="color:#374151;">{quote.get('quote_number') or ''}</b></div>
+          </div>"""
+            for quote in quotes
+        )
+        inner_html = f"""
+        <h2 style="margin: 0 0 12px 0; color: {BRAND_PRIMARY};">New quotes assigned</h2>
+        <p style="margin: 0 0 14px 0; color: #374151;">{hello}</p>
+        {assigned_by_line}
+        <div style="padding: 4px 14px; border: 1px solid #e5e7eb; border-radius: 10px; background: #ffffff;">{quote_rows}
+        </div>
+        <div style="text-align:center; margin: 22px 0;">
+          <a href="{quotes_link}" style="background-color: {BRAND_ACCENT}; color: #ffffff; padding: 12px 18px; text-decoration: none; border-radius: 10px; display: inline-block; font-weight: 700;">
+            View quotes
+          </a>
+        </div>
+        <p style="margin: 0; color:#6b7280; font-size: 13px;">Please review these quotes and let us know if you have any questions.</p>
+        """
+        html_content = _wrap_branded_html(
+            title="New quotes assigned — Reel48",
+            inner_html=inner_html,
+            preheader=f"{len(quotes)} new quotes were assigned to you",
+        )
+
+        quote_lines = "\n".join(
+            f"- {quote.get('title') or 'Quote'} ({quote.get('quote_number') or ''}): {FRONTEND_URL}/quotes/{quote['id']}"
+            for quote in quotes
+        )
+        text_body = f"""{hello}
+
+{len(quotes)} new quotes have been assigned to you:
+
+{quote_lines}
+{f'Assigned by: {assigned_by}' if assigned_by else ''}
+
+View quotes: {quotes_link}"""
+        text_content = _wrap_branded_text(title="New quotes assigned — Reel48", body=text_body)
+
+        return self._send_email(to_email, subject, html_content, text_content)
+
     def send_form_submission_admin_notification(
         self,
         to_email: str,
@@ -1,10 +1,15 @@
 """
 Utility functions for email notifications
 """
-from typing import List, Dict
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Dict
 from database import supabase_storage, supabase_url, supabase_service_role_key
 import requests
 
+# Concurrent sends when delivering a batch of notification emails
+EMAIL_SEND_WORKERS = int(os.getenv("EMAIL_SEND_WORKERS", "4"))
+
 
 def get_admin_emails() -> List[Dict[str, str]]:
     """
@@ -63,3 +68,74 @@ def get_admin_emails() -> List[Dict[str, str]]:
     
     return admin_emails
 
+
+
+def get_user_contacts(user_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Get email addresses and names for many users in one call
+    
+    Returns:
+        Dict of user_id -> {'email', 'name'} for users that have an email
+    """
+    user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id]
+    if not user_ids:
+        return {}
+    
+    try:
+        response = supabase_storage.rpc("get_user_contacts", {"target_user_ids": user_ids}).execute()
+        return {
+            row["user_id"]: {"email": row["email"], "name": row.get("name")}
+            for row in (response.data or [])
+            if row.get("email")
+        }
+    except Exception as e:
+        print(f"Warning: get_user_contacts RPC failed, falling back to auth API: {str(e)}")
+    
+    if not supabase_service_role_key:
+        return {}
+    
+    # Fallback: one listing request instead of one request per user
+    contacts = {}
+    wanted = set(user_ids)
+    try:
+        response = requests.get(
+            f"{supabase_url}/auth/v1/admin/users",
+            headers={
+                "apikey": supabase_service_role_key,
+                "Authorization": f"Bearer {supabase_service_role_key}",
+                "Content-Type": "application/json"
+            },
+            params={"per_page": 1000},
+            timeout=10
+        )
+        if response.status_code == 200:
+            for auth_user in response.json().get("users", []):
+                if auth_user.get("id") in wanted and auth_user.get("email"):
+                    contacts[auth_user["id"]] = {
+                        "email": auth_user["email"],
+                        "name": (auth_user.get("user_metadata") or {}).get("name")
+                    }
+    except Exception as e:
+        print(f"Warning: Could not fetch users from auth API: {e}")
+    return contacts
+
+
+def send_emails_bounded(sends: List[Callable[[], bool]], max_workers: int = EMAIL_SEND_WORKERS) -> int:
+    """
+    Run email send callables on a bounded thread pool
+    
+    Returns:
+        Number of sends that reported success
+    """
+    if not sends:
+        return 0
+    
+    def run(send: Callable[[], bool]) -> bool:
+        try:
+            return bool(send())
+        except Exception as e:
+            print(f"Warning: Failed to send notification email: {str(e)}")
+            return False
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sends))), thread_name_prefix="email-send") as pool:
+        return sum(pool.map(run, sends))
@@ -6,6 +6,8 @@ Uses Google's text-embedding-004 model for generating embeddings
 import os
 import logging
 import sys
+import base64
+import struct
 import requests
 from typing import List, Dict, Optional
 
@@ -16,6 +18,33 @@ from database import supabase_storage
 
 logger = logging.getLogger(__name__)
 
+# Default ANN tuning passed to the rag_search_* RPCs (see database/vector_index_management.sql).
+# Empty means "use the database default" (ivfflat.probes=1, hnsw.ef_search=40).
+DEFAULT_IVFFLAT_PROBES = int(os.getenv("RAG_IVFFLAT_PROBES", "0")) or None
+DEFAULT_HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "0")) or None
+
+# How query vectors are sent to the rag_search_* RPCs (see database/vector_binary_transport.sql):
+# "base64" packs float32 values (4KB per 768-dim vector), "text" sends a pgvector literal
+VECTOR_TRANSPORT = os.getenv("RAG_VECTOR_TRANSPORT", "base64").lower()
+
+
+def encode_embedding_b64(embedding: List[float]) -> str:
+    """Pack an embedding as base64 little-endian float32 (decoded by rag_decode_vector_b64)"""
+    return base64.b64encode(struct.pack(f"<{len(embedding)}f", *embedding)).decode("ascii")
+
+
+def format_embedding_text(embedding: List[float]) -> str:
+    """
+    Format an embedding as a pgvector text literal for inserts/updates
+    
+    Values are rounded to float4 (what pgvector stores) first; 9 significant digits
+    then round-trip them exactly. Formatting the float8 values directly would round
+    twice and be off by one float4 step in ~1% of components.
+    """
+    values = struct.unpack(f"<{len(embedding)}f", struct.pack(f"<{len(embedding)}f", *embedding))
+    return '[' + ','.join(['%.9g' % x for x in values]) + ']'
+
+
 # Try to import google.generativeai for embeddings
 try:
     import google.generativeai as genai
@@ -25,6 +54,13 @@ except ImportError:
     GENAI_AVAILABLE = False
     logger.warning("google-generativeai package not installed - embedding features will not be available")
 
+# Optional in-process knowledge index (requires numpy)
+try:
+    from knowledge_index import get_knowledge_index
+except ImportError as e:
+    get_knowledge_index = None
+    logger.warning(f"knowledge_index not available - knowledge search will always use pgvector: {e}")
+
 class EmbeddingsService:
     """Service for generating and managing embeddings"""
     
@@ -117,7 +153,10 @@ class EmbeddingsService:
         query_embedding: List[float],
         table: str,
         limit: int = 5,
-        customer_id: Optional[str] = None
+        customer_id: Optional[str] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        exact: bool = False
     ) -> List[Dict]:
         """
         Search for similar content using vector similarity with pgvector
@@ -127,6 +166,9 @@ class EmbeddingsService:
             table: Table to search ('quote_embeddings', 'form_embeddings', 'knowledge_embeddings')
             limit: Maximum number of results
             customer_id: Optional customer ID to filter results (for quote_embeddings)
+            probes: ivfflat.probes for this query (defaults to RAG_IVFFLAT_PROBES)
+            ef_search: hnsw.ef_search for this query (defaults to RAG_HNSW_EF_SEARCH)
+            exact: Bypass the ANN index and run an exact scan
         
         Returns:
             List of similar content with metadata
@@ -139,14 +181,32 @@ class EmbeddingsService:
             logger.warning(f"Query embedding has wrong dimension: {len(query_embedding)}, expected 768")
             return []
         
+        rpc_names = {
+            'quote_embeddings': "rag_search_quote_embeddings",
+            'form_embeddings': "rag_search_form_embeddings",
+            'knowledge_embeddings': "rag_search_knowledge_embeddings_vector"
+        }
+        if table not in rpc_names:
+            logger.warning(f"Unknown table for vector search: {table}")
+            return []
+        
+        # Knowledge base: answer from the in-process index when it is loaded
+        # (tuned/exact searches always go to pgvector)
+        if table == 'knowledge_embeddings' and probes is None and ef_search is None and not exact:
+            local_results = self._search_local_knowledge(query_embedding, limit)
+            if local_results is not None:
+                return local_results
+        
         try:
-            # Convert embedding to string format for pgvector
-            # PostgreSQL vector type expects format: [1.0,2.0,3.0]
-            embedding_str = '[' + ','.join([str(float(x)) for x in query_embedding]) + ']'
+            params = {
+                **self._query_vector_params(query_embedding),
+                "match_limit": limit,
+                **self._vector_search_tuning_params(probes, ef_search, exact)
+            }
             
-            # Build query based on table type
-            if table == 'quote_embeddings':
-                # For quotes, we need to filter by customer if provided
+            # Quotes and forms are scoped to the customer's client record
+            if table in ('quote_embeddings', 'form_embeddings'):
+                client_id = None
                 if customer_id:
                     # Get client_id from customer_id (user_id)
                     try:
@@ -154,168 +214,16 @@ class EmbeddingsService:
                         if not client_response.data:
                             return []
                         client_id = client_response.data["id"]
-                        
-                        # Search with customer filter
-                        query = f"""
-                        SELECT 
-                            qe.id,
-                            qe.quote_id,
-                            qe.content_type,
-                            qe.content,
-                            qe.metadata,
-                            1 - (qe.embedding <=> '{embedding_str}'::vector) as similarity
-                        FROM quote_embeddings qe
-                        JOIN quotes q ON q.id = qe.quote_id
-                        WHERE q.client_id = '{client_id}'
-                        AND qe.embedding IS NOT NULL
-                        ORDER BY qe.embedding <=> '{embedding_str}'::vector
-                        LIMIT {limit}
-                        """
                     except Exception as e:
                         logger.warning(f"Error getting client_id for customer: {str(e)}")
                         return []
-                else:
-                    # Search all quotes (admin view)
-                    query = f"""
-                    SELECT 
-                        id,
-                        quote_id,
-                        content_type,
-                        content,
-                        metadata,
-                        1 - (embedding <=> '{embedding_str}'::vector) as similarity
-                    FROM quote_embeddings
-                    WHERE embedding IS NOT NULL
-                    ORDER BY embedding <=> '{embedding_str}'::vector
-                    LIMIT {limit}
-                    """
-            
-            elif table == 'form_embeddings':
-                # For forms, filter by customer if provided
-                if customer_id:
-                    try:
-                        client_response = supabase_storage.table("clients").select("id").eq("user_id", customer_id).single().execute()
-                        if not client_response.data:
-                            return []
-                        client_id = client_response.data["id"]
-                        
-                        # Get forms assigned to this customer via folders
-                        query = f"""
-                        SELECT DISTINCT
-                            fe.id,
-                            fe.form_id,
-                            fe.content_type,
-                            fe.content,
-                            fe.metadata,
-                            1 - (fe.embedding <=> '{embedding_str}'::vector) as similarity
-                        FROM form_embeddings fe
-                        JOIN form_folder_assignments ffa ON ffa.form_id = fe.form_id
-                        JOIN folders f ON f.id = ffa.folder_id
-                        WHERE f.client_id = '{client_id}'
-                        AND fe.embedding IS NOT NULL
-                        ORDER BY fe.embedding <=> '{embedding_str}'::vector
-                        LIMIT {limit}
-                        """
-                    except Exception as e:
-                        logger.warning(f"Error getting customer forms: {str(e)}")
-                        return []
-                else:
-                    # Search all forms (admin view)
-                    query = f"""
-                    SELECT 
-                        id,
-                        form_id,
-                        content_type,
-                        content,
-                        metadata,
-                        1 - (embedding <=> '{embedding_str}'::vector) as similarity
-                    FROM form_embeddings
-                    WHERE embedding IS NOT NULL
-                    ORDER BY embedding <=> '{embedding_str}'::vector
-                    LIMIT {limit}
-                    """
-            
-            elif table == 'knowledge_embeddings':
-                # Knowledge base is public, no customer filtering needed
-                query = f"""
-                SELECT 
-                    id,
-                    category,
-                    title,
-                    content,
-                    metadata,
-                    1 - (embedding <=> '{embedding_str}'::vector) as similarity
-                FROM knowledge_embeddings
-                WHERE embedding IS NOT NULL
-                ORDER BY embedding <=> '{embedding_str}'::vector
-                LIMIT {limit}
-                """
-            else:
-                logger.warning(f"Unknown table for vector search: {table}")
-                return []
+                params["client_id_filter"] = client_id
             
             # Execute query using Supabase RPC functions
             # We use stored PostgreSQL functions that accept the embedding vector
             try:
-                results = []
-                
-                if table == 'quote_embeddings':
-                    client_id = None
-                    if customer_id:
-                        # Get client_id from customer_id (user_id)
-                        try:
-                            client_response = supabase_storage.table("clients").select("id").eq("user_id", customer_id).single().execute()
-                            if client_response.data:
-                                client_id = client_response.data["id"]
-                        except Exception:
-                            pass
-                    
-                    # Call RPC function for vector search
-                    rpc_response = supabase_storage.rpc(
-                        "rag_search_quote_embeddings",
-                        {
-                            "query_embedding_text": embedding_str,
-                            "match_limit": limit,
-                            "client_id_filter": client_id
-                        }
-                    ).execute()
-                    
-                    if rpc_response.data:
-                        results = rpc_response.data
-                
-                elif table == 'form_embeddings':
-                    client_id = None
-                    if customer_id:
-                        try:
-                            client_response = supabase_storage.table("clients").select("id").eq("user_id", customer_id).single().execute()
-                            if client_response.data:
-                                client_id = client_response.data["id"]
-                        except Exception:
-                            pass
-                    
-                    rpc_response = supabase_storage.rpc(
-                        "rag_search_form_embeddings",
-                        {
-                            "query_embedding_text": embedding_str,
-                            "match_limit": limit,
-                            "client_id_filter": client_id
-                        }
-                    ).execute()
-                    
-                    if rpc_response.data:
-                        results = rpc_response.data
-                
-                elif table == 'knowledge_embeddings':
-                    rpc_response = supabase_storage.rpc(
-                        "rag_search_knowledge_embeddings_vector",
-                        {
-                            "query_embedding_text": embedding_str,
-                            "match_limit": limit
-                        }
-                    ).execute()
-                    
-                    if rpc_response.data:
-                        results = rpc_response.data
+                rpc_response = supabase_storage.rpc(rpc_names[table], params).execute()
+                results = rpc_response.data or []
                 
                 # Format results
                 formatted_results = []
@@ -339,6 +247,36 @@ class EmbeddingsService:
             logger.error(f"Error searching similar content: {str(e)}", exc_info=True)
             return []
     
+    def _search_local_knowledge(self, query_embedding: List[float], limit: int) -> Optional[List[Dict]]:
+        """Search the in-process knowledge index; None means fall back to the RPC"""
+        index = get_knowledge_index() if get_knowledge_index else None
+        if index is None or not index.loaded:
+            return None
+        try:
+            return index.search(query_embedding, limit)
+        except Exception as e:
+            logger.warning(f"Local knowledge index search failed, using pgvector: {str(e)}")
+            return None
+    
+    def _query_vector_params(self, query_embedding: List[float]) -> Dict:
+        """Query-vector argument for the rag_search_* RPCs in the configured transport"""
+        if VECTOR_TRANSPORT == "text":
+            return {"query_embedding_text": format_embedding_text(query_embedding)}
+        return {"query_embedding_b64": encode_embedding_b64(query_embedding)}
+    
+    def _vector_search_tuning_params(
+        self,
+        probes: Optional[int],
+        ef_search: Optional[int],
+        exact: bool
+    ) -> Dict:
+        """Build the ANN tuning arguments shared by all rag_search_* RPCs"""
+        return {
+            "ivfflat_probes": probes if probes is not None else DEFAULT_IVFFLAT_PROBES,
+            "hnsw_ef_search": ef_search if ef_search is not None else DEFAULT_HNSW_EF_SEARCH,
+            "exact_search": exact
+        }
+    
     def format_context_from_results(self, results: List[Dict]) -> str:
         """
         Format search results into context string for AI
@@ -0,0 +1,128 @@
+"""
+File Blobs
+Content-addressed storage for project files (see database/file_blobs_migration.sql).
+
+Uploaded content is keyed by its full SHA-256 (computed while the upload is
+streamed in, see upload_utils). The first upload of some content stores it at
+blobs/{sha[:2]}/{sha}-{token}.{ext} and registers a file_blobs row; later uploads
+of the same bytes skip the storage upload and only add a reference, so repeated
+assets (logos, agreements, re-uploaded ZIPs) are stored once.
+
+files rows keep storage_path (the blob's path) and record content_sha256. Deleting
+a file releases its reference; the object is removed with the last one. Rows
+without content_sha256 predate blobs (or were not backfilled yet) and own their
+object outright.
+
+The random token gives every registration of some content its own object, so a
+path is never reused: when the last reference is released while the same bytes
+are uploaded again, the release removes the old object and the upload writes a
+new one, instead of both working on one path.
+"""
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from database import supabase_storage
+from upload_utils import SpooledUpload
+
+STORAGE_BUCKET = "project-files"
+
+
+def blob_storage_path(sha256: str, filename: str = "") -> str:
+    """New object path for content; keeps the first upload's extension for download names"""
+    file_extension = filename.split('.')[-1].lower() if '.' in filename else ''
+    base = f"blobs/{sha256[:2]}/{sha256}-{uuid.uuid4().hex[:12]}"
+    return f"{base}.{file_extension}" if file_extension else base
+
+
+def acquire_blob(sha256: str, storage_path: Optional[str] = None, size: Optional[int] = None, content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Add a reference to a blob and return its storage path
+
+    With storage_path, a new blob is registered at that path; without it only an
+    existing blob is referenced and None is returned if the content is not stored.
+    """
+    response = supabase_storage.rpc("acquire_file_blob", {
+        "p_sha256": sha256,
+        "p_storage_path": storage_path,
+        "p_size_bytes": size,
+        "p_content_type": content_type,
+    }).execute()
+    return response.data or storage_path
+
+
+def store_blob(upload: SpooledUpload, filename: str, content_type: Optional[str]) -> Tuple[str, str, bool]:
+    """
+    Store uploaded content once per SHA-256 and take a reference to it
+
+    Args:
+        upload: Streamed upload, hashed with sha256
+        filename: Original filename (extension of a new blob's path)
+        content_type: MIME type for a new object
+
+    Returns:
+        (sha256, storage_path, uploaded) - uploaded is False when the content
+        was already stored and only a reference was added
+
+    Raises:
+        Exception: Storage upload or blob registration failed (nothing is referenced)
+    """
+    sha256 = upload.hexdigest("sha256")
+    existing_path = acquire_blob(sha256)
+    if existing_path:
+        return sha256, existing_path, False
+
+    storage_path = blob_storage_path(sha256, filename)
+    with upload.storage_body() as body:
+        supabase_storage.storage.from_(STORAGE_BUCKET).upload(
+            storage_path,
+            body,
+            file_options={"content-type": content_type or "application/octet-stream", "upsert": "false"}
+        )
+    try:
+        blob_path = acquire_blob(sha256, storage_path, upload.size, content_type)
+    except Exception:
+        _remove_object(storage_path)
+        raise
+    if blob_path != storage_path:
+        # A concurrent upload of the same content registered first; use its object
+        _remove_object(storage_path)
+        return sha256, blob_path, False
+    return sha256, blob_path, True
+
+
+def _remove_object(storage_path: str):
+    """Best-effort removal of an object no blob points at"""
+    try:
+        supabase_storage.storage.from_(STORAGE_BUCKET).remove([storage_path])
+    except Exception as e:
+        print(f"Warning: Could not remove unused blob object {storage_path}: {str(e)}")
+
+
+def release_blob(sha256: str) -> bool:
+    """
+    Drop a reference; removes the object when it was the last one (returns True then)
+
+    The blob row is already gone when the object is removed, so a concurrent upload
+    of the same content registers a new blob at a new path and is not affected.
+    """
+    response = supabase_storage.rpc("release_file_blob", {"p_sha256": sha256}).execute()
+    released_path = response.data
+    if released_path:
+        supabase_storage.storage.from_(STORAGE_BUCKET).remove([released_path])
+        return True
+    return False
+
+
+def release_file_storage(file_data: Dict[str, Any]) -> bool:
+    """
+    Release the storage behind a deleted files row (blob reference or legacy object)
+
+    Returns:
+        True if the content's object was deleted (no other file uses it)
+    """
+    if file_data.get("content_sha256"):
+        return release_blob(file_data["content_sha256"])
+    if file_data.get("storage_path"):
+        supabase_storage.storage.from_(STORAGE_BUCKET).remove([file_data["storage_path"]])
+        return True
+    return False
@@ -0,0 +1,329 @@
+"""
+Folder Content Loader
+Batched read model for a folder's content page (GET /api/folders/{id}/content).
+
+Children (quote, files, forms, e-signatures, shipment) are fetched with one query
+per kind and their completion state with one request per kind, then completion is
+computed for the whole folder in one pass:
+- file views and signatures come from RPCs returning at most one row per
+  file/document (database/folder_content_functions.sql), so many viewers or
+  signers cannot push the result past PostgREST's max-rows cap
+- form submissions are paged (FOLDER_CONTENT_PAGE_SIZE) until exhausted, since
+  admin counts need every completed row
+The number of requests is constant regardless of folder size (until a folder's
+submissions exceed one page).
+"""
+import os
+import logging
+from typing import Any, Dict, List, Optional
+
+from database import supabase_storage
+from folder_tasks import build_customer_tasks, compute_stage_and_next_step
+
+logger = logging.getLogger(__name__)
+
+# Rows per request when paging (keep at or below PostgREST's max-rows, 1000 on Supabase)
+FOLDER_CONTENT_PAGE_SIZE = int(os.getenv("FOLDER_CONTENT_PAGE_SIZE", "1000"))
+
+
+def _fetch_all(query, page_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Execute an ordered query page by page until a short page (not silently capped)"""
+    page_size = page_size or FOLDER_CONTENT_PAGE_SIZE
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        page = query.range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+def compute_progress(files: List[Dict[str, Any]], forms: List[Dict[str, Any]], esignatures: List[Dict[str, Any]]) -> Dict[str, Any]:
+    forms_total = len(forms or [])
+    esigs_total = len(esignatures or [])
+    forms_completed = len([f for f in (forms or []) if f.get("is_completed")])
+    esigs_completed = len([e for e in (esignatures or []) if e.get("is_completed")])
+    files_total = len(files or [])
+    files_viewed = len([f for f in (files or []) if f.get("is_completed")])
+    return {
+        # NOTE: tasks_total/tasks_completed are now derived from summary.tasks
+        # so the progress bar and task list always match.
+        "forms_total": forms_total,
+        "forms_completed": forms_completed,
+        "esignatures_total": esigs_total,
+        "esignatures_completed": esigs_completed,
+        "files_total": files_total,
+        "files_viewed": files_viewed,
+    }
+
+
+def compute_shipping_summary(folder_id: str) -> Dict[str, Any]:
+    """Compute shipping summary from shipments + latest tracking event."""
+    try:
+        shipments = (
+            supabase_storage
+            .table("shipments")
+            .select("*")
+            .eq("folder_id", folder_id)
+            .order("created_at", desc=True)
+            .limit(1)
+            .execute()
+        ).data or []
+        shipment = shipments[0] if shipments else None
+    except Exception:
+        shipment = None
+
+    latest_event = None
+    if shipment and shipment.get("id"):
+        try:
+            ev = (
+                supabase_storage
+                .table("shipment_tracking_events")
+                .select("*")
+                .eq("shipment_id", shipment.get("id"))
+                .order("timestamp", desc=True)
+                .limit(1)
+                .execute()
+            )
+            if ev.data:
+                latest_event = ev.data[0]
+        except Exception:
+            latest_event = None
+
+    if not shipment:
+        return {"has_shipment": False}
+
+    status = shipment.get("status") or (latest_event or {}).get("status")
+    return {
+        "has_shipment": True,
+        "status": status,
+        "carrier_name": shipment.get("carrier_name") or shipment.get("carrier"),
+        "tracking_number": shipment.get("tracking_number"),
+        "estimated_delivery_date": shipment.get("estimated_delivery_date"),
+        "actual_delivery_date": shipment.get("actual_delivery_date"),
+        "latest_event": latest_event,
+    }
+
+
+def _load_files(folder_id: str, user: Dict[str, Any], is_admin: bool) -> List[Dict[str, Any]]:
+    """Folder-specific files (not reusable templates), newest first, with is_completed = viewed"""
+    try:
+        files = (
+            supabase_storage
+            .table("files")
+            .select("*")
+            .eq("folder_id", folder_id)
+            .eq("is_reusable", False)
+            .order("created_at", desc=True)
+            .execute()
+        ).data or []
+    except Exception as e:
+        logger.warning(f"Error fetching files: {str(e)}")
+        return []
+
+    # Admins: viewed by any user; customers: viewed by the current user
+    viewed_ids = set()
+    file_ids = [f["id"] for f in files if f.get("id")]
+    if file_ids:
+        try:
+            response = supabase_storage.rpc("viewed_file_ids", {
+                "target_file_ids": file_ids,
+                "viewer_id": None if is_admin else user["id"]
+            }).execute()
+            viewed_ids = {v.get("file_id") for v in (response.data or [])}
+        except Exception as e:
+            logger.warning(f"Error fetching file views: {str(e)}")
+
+    for file in files:
+        file["item_type"] = "file"
+        file["is_completed"] = file.get("id") in viewed_ids
+    return files
+
+
+def _load_forms(folder_id: str, user: Dict[str, Any], is_admin: bool) -> List[Dict[str, Any]]:
+    """
+    Form templates assigned to the folder with is_completed / submissions_count
+
+    ALL assigned forms are returned, completed or not. Admins see completed
+    submissions from anyone; customers see their own, matched by user_id and,
+    for forms with no user_id match, by submitter_email (legacy/unauthenticated
+    submissions).
+    """
+    try:
+        form_assignments = supabase_storage.table("form_folder_assignments").select("form_id").eq("folder_id", folder_id).execute()
+        template_form_ids = [fa["form_id"] for fa in (form_assignments.data or [])]
+        if not template_form_ids:
+            return []
+        forms = (
+            supabase_storage
+            .table("forms")
+            .select("*, form_fields(*)")
+            .in_("id", template_form_ids)
+            .eq("is_template", True)
+            .execute()
+        ).data or []
+    except Exception as e:
+        logger.warning(f"Error fetching forms: {str(e)}")
+        return []
+
+    form_ids = [form["id"] for form in forms if form.get("id")]
+    submissions_by_form: Dict[str, List[Dict[str, Any]]] = {form_id: [] for form_id in form_ids}
+    submissions_loaded = True
+    if form_ids:
+        try:
+            query = (
+                supabase_storage
+                .table("form_submissions")
+                .select("form_id, status, user_id, submitter_email")
+                .in_("form_id", form_ids)
+                .eq("folder_id", folder_id)
+            )
+            if is_admin:
+                query = query.eq("status", "completed")
+            for submission in _fetch_all(query.order("id")):
+                submissions_by_form.setdefault(submission.get("form_id"), []).append(submission)
+        except Exception as e:
+            logger.error(f"Error fetching form submissions for folder {folder_id}: {str(e)}", exc_info=True)
+            submissions_loaded = False
+
+    user_id = user.get("id")
+    user_email = (user.get("email") or "").lower().strip()
+    for form in forms:
+        form["item_type"] = "form"
+        submissions = submissions_by_form.get(form.get("id"), []) if submissions_loaded else []
+        if is_admin:
+            completed_count = len(submissions)
+        else:
+            matched = [s for s in submissions if user_id and s.get("user_id") == user_id]
+            if not matched and user_email:
+                matched = [
+                    s for s in submissions
+                    if (s.get("submitter_email") or "").lower().strip() == user_email
+                ]
+            completed_count = len([s for s in matched if str(s.get("status") or "").lower() == "completed"])
+        form["is_completed"] = completed_count > 0
+        form["submissions_count"] = completed_count
+    return forms
+
+
+def _load_esignatures(folder_id: str, user: Dict[str, Any], is_admin: bool) -> List[Dict[str, Any]]:
+    """E-signature instances (copies, not templates) in the folder with is_completed = signed"""
+    try:
+        instances = (
+            supabase_storage
+            .table("esignature_documents")
+            .select("*")
+            .eq("folder_id", folder_id)
+            .eq("is_template", False)
+            .execute()
+        ).data or []
+    except Exception as e:
+        logger.warning(f"Error fetching e-signatures: {str(e)}")
+        return []
+
+    # Admins: signed by any user; customers: signed by the current user
+    signature_by_document: Dict[str, Dict[str, Any]] = {}
+    document_ids = [esig["id"] for esig in instances if esig.get("id")]
+    if document_ids:
+        try:
+            response = supabase_storage.rpc("first_document_signatures", {
+                "target_document_ids": document_ids,
+                "signer_id": None if is_admin else user["id"]
+            }).execute()
+            for signature in (response.data or []):
+                signature_by_document.setdefault(signature.get("document_id"), signature)
+        except Exception as e:
+            logger.warning(f"Error fetching e-signature signatures: {str(e)}")
+
+    for esig in instances:
+        esig["item_type"] = "esignature"
+        signature = signature_by_document.get(esig.get("id"))
+        esig["is_completed"] = signature is not None
+        if signature is not None:
+            esig["signed_file_id"] = signature.get("signed_file_id")
+            esig["signed_file_url"] = signature.get("signed_file_url")
+    return instances
+
+
+def build_folder_summary(
+    folder: Dict[str, Any],
+    quote: Optional[Dict[str, Any]],
+    files: List[Dict[str, Any]],
+    forms: List[Dict[str, Any]],
+    esignatures: List[Dict[str, Any]],
+    shipping_summary: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Customer-facing status summary (stage, next step, progress, tasks) for a folder"""
+    progress = compute_progress(files, forms, esignatures)
+    tasks = build_customer_tasks(
+        folder_id=folder["id"],
+        quote=quote,
+        forms=forms,
+        esignatures=esignatures,
+        files_total=int(progress.get("files_total") or 0),
+        files_viewed=int(progress.get("files_viewed") or 0),
+    )
+    stage_info = compute_stage_and_next_step(
+        folder=folder,
+        quote=quote,
+        shipping=shipping_summary,
+        tasks=tasks,
+    )
+    tasks_progress = (stage_info.get("tasks_progress") or {})
+    # Ensure progress reflects the tasks list (single source of truth for progress bar)
+    progress["tasks_total"] = tasks_progress.get("tasks_total", 0)
+    progress["tasks_completed"] = tasks_progress.get("tasks_completed", 0)
+
+    return {
+        "stage": stage_info.get("stage"),
+        "stage_label": stage_info.get("stage_label"),
+        "next_step": stage_info.get("next_step"),
+        "next_step_owner": stage_info.get("next_step_owner"),
+        "computed_stage": stage_info.get("computed_stage"),
+        "computed_stage_label": stage_info.get("computed_stage_label"),
+        "computed_next_step": stage_info.get("computed_next_step"),
+        "computed_next_step_owner": stage_info.get("computed_next_step_owner"),
+        "progress": progress,
+        "tasks": tasks,
+        "shipping": shipping_summary,
+        "stepper_steps": stage_info.get("stepper_steps", []),
+        "updated_at": folder.get("updated_at"),
+    }
+
+
+def load_folder_content(folder: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Load everything shown on a folder's content page
+
+    Args:
+        folder: Folder row (access already checked)
+        user: Current user; admins see completion by anyone, customers their own
+
+    Returns:
+        {folder, quote, files, forms, esignatures, summary}
+    """
+    folder_id = folder["id"]
+    is_admin = user.get("role") == "admin"
+
+    quote = None
+    if folder.get("quote_id"):
+        try:
+            quote_response = supabase_storage.table("quotes").select("*, clients(*), line_items(*)").eq("id", folder["quote_id"]).single().execute()
+            quote = quote_response.data if quote_response.data else None
+        except Exception as e:
+            logger.warning(f"Error fetching quote: {str(e)}")
+
+    files = _load_files(folder_id, user, is_admin)
+    forms = _load_forms(folder_id, user, is_admin)
+    esignatures = _load_esignatures(folder_id, user, is_admin)
+    shipping_summary = compute_shipping_summary(folder_id)
+
+    return {
+        "folder": folder,
+        "quote": quote,
+        "files": files,
+        "forms": forms,
+        "esignatures": esignatures,
+        "summary": build_folder_summary(folder, quote, files, forms, esignatures, shipping_summary)
+    }
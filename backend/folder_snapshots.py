@@ -0,0 +1,105 @@
+"""
+Folder Snapshots
+Cached read model for a folder's computed status (tasks, stage, progress, shipping).
+
+A snapshot is the output of folder_content.load_folder_content for one folder and
+one viewer (admins share one snapshot; each customer gets their own, since
+completion is per user). Folder views, folder lists and the AI status tool read
+snapshots instead of recomputing from the raw tables on every request.
+
+Snapshots are keyed by a per-folder version counter and the folder's updated_at:
+- changes to the folder row itself (status, stage override, ...) bump updated_at
+  through the folders trigger, so they miss the cache on their own
+- changes to the folder's children (form submissions, signatures, file uploads
+  and views, shipment updates, quote changes and payments) call
+  invalidate_folder_snapshot(folder_id), which bumps the version
+
+A snapshot built while an invalidation lands is stored under the old version and
+never read. Entries also expire after FOLDER_SNAPSHOT_TTL_SECONDS as a backstop
+for writes that bypass the API.
+"""
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from cache_utils import TTLCache, MISSING
+from folder_content import load_folder_content
+
+FOLDER_SNAPSHOT_TTL_SECONDS = int(os.getenv("FOLDER_SNAPSHOT_TTL_SECONDS", "300"))
+FOLDER_SNAPSHOT_MAX_ENTRIES = int(os.getenv("FOLDER_SNAPSHOT_MAX_ENTRIES", "2000"))
+
+
+class FolderSnapshotStore:
+    """Per-folder, per-viewer cache of computed folder content and summary"""
+
+    def __init__(self, maxsize: int = FOLDER_SNAPSHOT_MAX_ENTRIES, ttl_seconds: float = FOLDER_SNAPSHOT_TTL_SECONDS):
+        self._cache = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        # Version counters are part of the cache keys; bumping one invalidates the folder's snapshots
+        self._versions_lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self.builds = 0
+        self.invalidations = 0
+
+    def invalidate(self, *folder_ids: Optional[str]):
+        """Drop the snapshots of the given folders (None ids are ignored)"""
+        with self._versions_lock:
+            for folder_id in folder_ids:
+                if folder_id:
+                    self._versions[folder_id] = self._versions.get(folder_id, 0) + 1
+                    self.invalidations += 1
+
+    def _key(self, folder: Dict[str, Any], user: Dict[str, Any]) -> tuple:
+        viewer = "admin" if user.get("role") == "admin" else user.get("id")
+        with self._versions_lock:
+            version = self._versions.get(folder["id"], 0)
+        return (folder["id"], viewer, version, str(folder.get("updated_at") or ""))
+
+    def get(self, folder: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Folder content as seen by user, from the cache or freshly loaded
+
+        Args:
+            folder: Folder row (access already checked)
+            user: Viewer; admins see completion by anyone, customers their own
+
+        Returns:
+            {folder, quote, files, forms, esignatures, summary}. The nested values
+            are shared with the cache and must not be mutated.
+        """
+        key = self._key(folder, user)
+        snapshot = self._cache.get(key)
+        if snapshot is MISSING:
+            content = load_folder_content(folder, user)
+            snapshot = {name: value for name, value in content.items() if name != "folder"}
+            self._cache.set(key, snapshot)
+            with self._versions_lock:
+                self.builds += 1
+        return {"folder": folder, **snapshot}
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for metrics endpoints"""
+        stats = self._cache.stats()
+        stats.update({"builds": self.builds, "invalidations": self.invalidations})
+        return stats
+
+
+# Singleton instance
+_folder_snapshot_store: Optional[FolderSnapshotStore] = None
+
+
+def get_folder_snapshot_store() -> FolderSnapshotStore:
+    """Get singleton folder snapshot store"""
+    global _folder_snapshot_store
+    if _folder_snapshot_store is None:
+        _folder_snapshot_store = FolderSnapshotStore()
+    return _folder_snapshot_store
+
+
+def get_folder_snapshot(folder: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
+    """Cached {folder, quote, files, forms, esignatures, summary} for folder as seen by user"""
+    return get_folder_snapshot_store().get(folder, user)
+
+
+def invalidate_folder_snapshot(*folder_ids: Optional[str]):
+    """Call after writes that change a folder's tasks, stage or shipping"""
+    get_folder_snapshot_store().invalidate(*folder_ids)
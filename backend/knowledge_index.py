@@ -0,0 +1,233 @@
+"""
+In-Process Knowledge Vector Index
+Keeps knowledge_embeddings in memory as a normalized NumPy matrix so knowledge
+base search is a single matrix-vector product instead of an RPC round trip.
+The knowledge base is small, public (no per-customer filtering) and changes
+rarely, so a full copy per process is cheap. pgvector remains the fallback
+whenever the index is disabled, not loaded yet, or fails.
+"""
+import os
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import supabase_storage
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: RAG_KNOWLEDGE_LOCAL_INDEX=true
+LOCAL_INDEX_ENABLED = str(os.getenv("RAG_KNOWLEDGE_LOCAL_INDEX", "false")).lower() in ("1", "true", "yes")
+# Store vectors as int8 instead of float32: 4x less memory, slightly slower queries
+# (codes are widened per search) and ~1% score error
+LOCAL_INDEX_INT8 = str(os.getenv("RAG_KNOWLEDGE_INDEX_INT8", "false")).lower() in ("1", "true", "yes")
+# Full reload interval - catches writes made outside this process (e.g. populate_embeddings.py)
+LOCAL_INDEX_REFRESH_MINUTES = int(os.getenv("RAG_KNOWLEDGE_INDEX_REFRESH_MINUTES", "60"))
+
+EMBEDDING_DIM = 768
+LOAD_PAGE_SIZE = 500
+ROW_COLUMNS = "id, category, title, content, metadata, document_id, embedding"
+
+
+def _parse_embedding(value) -> Optional[np.ndarray]:
+    """PostgREST returns vector columns as '[x,y,...]' strings"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    vector = np.asarray(value, dtype=np.float32)
+    if vector.shape != (EMBEDDING_DIM,):
+        return None
+    return vector
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class KnowledgeVectorIndex:
+    """Cosine-similarity top-k over knowledge_embeddings, held in process memory"""
+
+    def __init__(self, quantize: bool = False):
+        self.quantize = quantize
+        self._lock = threading.RLock()
+        self._rows: List[Dict] = []
+        self._positions: Dict[str, int] = {}
+        # float32 unit vectors, or int8 codes + per-row scales when quantized
+        self._matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.int8 if quantize else np.float32)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _encode(self, unit_vectors: np.ndarray):
+        """Quantize unit vectors to int8 with a per-row scale (symmetric, max-abs)"""
+        if not self.quantize:
+            return unit_vectors.astype(np.float32), np.ones(len(unit_vectors), dtype=np.float32)
+        max_abs = np.abs(unit_vectors).max(axis=1)
+        max_abs[max_abs == 0] = 1.0
+        scales = (max_abs / 127.0).astype(np.float32)
+        codes = np.round(unit_vectors / scales[:, None]).astype(np.int8)
+        return codes, scales
+
+    def _build(self, rows: List[Dict], vectors: List[np.ndarray]):
+        matrix = _normalize(np.vstack(vectors)) if vectors else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        codes, scales = self._encode(matrix)
+        with self._lock:
+            self._rows = rows
+            self._positions = {row["id"]: i for i, row in enumerate(rows)}
+            self._matrix = codes
+            self._scales = scales
+            self.loaded = True
+
+    def load(self):
+        """(Re)load every knowledge entry that has an embedding"""
+        rows: List[Dict] = []
+        vectors: List[np.ndarray] = []
+        offset = 0
+        while True:
+            response = supabase_storage.table("knowledge_embeddings").select(ROW_COLUMNS).not_.is_(
+                "embedding", "null"
+            ).order("id").range(offset, offset + LOAD_PAGE_SIZE - 1).execute()
+            page = response.data or []
+            for row in page:
+                vector = _parse_embedding(row.pop("embedding", None))
+                if vector is not None:
+                    rows.append(row)
+                    vectors.append(vector)
+            if len(page) < LOAD_PAGE_SIZE:
+                break
+            offset += LOAD_PAGE_SIZE
+
+        self._build(rows, vectors)
+        logger.info(f"Knowledge vector index loaded: {len(rows)} entries ({'int8' if self.quantize else 'float32'})")
+
+    def _upsert_rows(self, rows: List[Dict]):
+        for row in rows:
+            vector = _parse_embedding(row.pop("embedding", None))
+            if vector is None:
+                self._remove(row["id"])
+                continue
+            code, scale = self._encode(_normalize(vector[None, :]))
+            position = self._positions.get(row["id"])
+            if position is None:
+                self._positions[row["id"]] = len(self._rows)
+                self._rows.append(row)
+                self._matrix = np.vstack([self._matrix, code])
+                self._scales = np.append(self._scales, scale)
+            else:
+                self._rows[position] = row
+                self._matrix[position] = code[0]
+                self._scales[position] = scale[0]
+
+    def _remove(self, entry_id: str):
+        """Remove an entry by moving the last row into its slot"""
+        position = self._positions.pop(entry_id, None)
+        if position is None:
+            return
+        last = len(self._rows) - 1
+        if position != last:
+            self._rows[position] = self._rows[last]
+            self._matrix[position] = self._matrix[last]
+            self._scales[position] = self._scales[last]
+            self._positions[self._rows[position]["id"]] = position
+        self._rows.pop()
+        self._matrix = self._matrix[:last]
+        self._scales = self._scales[:last]
+
+    def refresh_entry(self, entry_id: str):
+        """Re-read one entry after it was created, edited or deleted"""
+        if not self.loaded:
+            return
+        response = supabase_storage.table("knowledge_embeddings").select(ROW_COLUMNS).eq("id", entry_id).execute()
+        with self._lock:
+            if response.data:
+                self._upsert_rows(response.data)
+            else:
+                self._remove(entry_id)
+
+    def refresh_document(self, document_id: str):
+        """Re-read all chunks of a document after it was processed, reprocessed or deleted"""
+        if not self.loaded:
+            return
+        response = supabase_storage.table("knowledge_embeddings").select(ROW_COLUMNS).eq("document_id", document_id).execute()
+        with self._lock:
+            stale_ids = [row["id"] for row in self._rows if row.get("document_id") == document_id]
+            for entry_id in stale_ids:
+                self._remove(entry_id)
+            self._upsert_rows(response.data or [])
+
+    def search(self, query_embedding: List[float], limit: int = 5) -> List[Dict]:
+        """
+        Top-k entries by cosine similarity
+
+        Returns results in the same shape as EmbeddingsService.search_similar_content
+        """
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        with self._lock:
+            if not len(self._rows):
+                return []
+            scores = (self._matrix @ query) * self._scales if self.quantize else self._matrix @ query
+            k = min(max(limit, 1), len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            rows = [self._rows[i] for i in top]
+            similarities = [float(scores[i]) for i in top]
+
+        return [
+            {
+                "id": row.get("id"),
+                "content_type": row.get("category") or "information",
+                "title": row.get("title"),
+                "content": row.get("content", ""),
+                "metadata": row.get("metadata") or {},
+                "similarity": similarity
+            }
+            for row, similarity in zip(rows, similarities)
+        ]
+
+
+# Singleton instance
+_knowledge_index: Optional[KnowledgeVectorIndex] = None
+
+
+def get_knowledge_index() -> Optional[KnowledgeVectorIndex]:
+    """Get the index if enabled (None when RAG_KNOWLEDGE_LOCAL_INDEX is off)"""
+    global _knowledge_index
+    if not LOCAL_INDEX_ENABLED:
+        return None
+    if _knowledge_index is None:
+        _knowledge_index = KnowledgeVectorIndex(quantize=LOCAL_INDEX_INT8)
+    return _knowledge_index
+
+
+def reload_knowledge_index():
+    """Scheduler entry point: full reload (best-effort)"""
+    index = get_knowledge_index()
+    if index is None:
+        return
+    try:
+        index.load()
+    except Exception as e:
+        logger.warning(f"Failed to load knowledge vector index (pgvector fallback stays active): {str(e)}")
+
+
+def refresh_knowledge_index(entry_id: Optional[str] = None, document_id: Optional[str] = None):
+    """Incrementally refresh the index after knowledge edits (best-effort)"""
+    index = get_knowledge_index()
+    if index is None or not index.loaded:
+        return
+    try:
+        if entry_id:
+            index.refresh_entry(entry_id)
+        elif document_id:
+            index.refresh_document(document_id)
+        else:
+            index.load()
+    except Exception as e:
+        logger.warning(f"Failed to refresh knowledge vector index: {str(e)}")
@@ -13,6 +13,8 @@ import logging
 import traceback
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime
 from chat_cleanup import cleanup_old_chat_history, cleanup_expired_sessions
 from auth import get_current_admin
 from database import supabase_storage
@@ -297,10 +299,49 @@ def setup_schedulers():
             replace_existing=True
         )
     
+    # Optional in-process knowledge vector index (RAG_KNOWLEDGE_LOCAL_INDEX=true).
+    # First run is immediate so the index loads at startup without blocking it;
+    # periodic reloads pick up knowledge written outside this process.
+    from knowledge_index import LOCAL_INDEX_ENABLED, LOCAL_INDEX_REFRESH_MINUTES, reload_knowledge_index
+    if LOCAL_INDEX_ENABLED:
+        scheduler.add_job(
+            reload_knowledge_index,
+            trigger=IntervalTrigger(minutes=LOCAL_INDEX_REFRESH_MINUTES),
+            next_run_time=datetime.now(),
+            id='knowledge_index_reload',
+            name='Reload in-process knowledge vector index',
+            replace_existing=True
+        )
+    
+    # Write idle/overdue quote auto-save drafts (see autosave_buffer.py)
+    from autosave_buffer import AUTOSAVE_SWEEP_SECONDS, get_autosave_buffer
+    scheduler.add_job(
+        get_autosave_buffer().sweep,
+        trigger=IntervalTrigger(seconds=AUTOSAVE_SWEEP_SECONDS),
+        id='autosave_flush',
+        name='Flush buffered quote auto-save drafts',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    
+    # Re-queue stored Stripe webhook events that never finished (e.g. after a restart)
+    scheduler.add_job(
+        stripe.requeue_unfinished_webhook_events,
+        trigger=IntervalTrigger(minutes=5),
+        next_run_time=datetime.now(),
+        id='webhook_recovery',
+        name='Re-queue unfinished Stripe webhook events',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    
     scheduler.start()
     logger.info(
-        "Schedulers started (chat cleanup + security maintenance%s)",
-        " + session cleanup" if enable_session_cleanup else ""
+        "Schedulers started (chat cleanup + security maintenance + auto-save flush + webhook recovery%s%s)",
+        " + session cleanup" if enable_session_cleanup else "",
+        " + knowledge index reload" if LOCAL_INDEX_ENABLED else ""
     )
     return scheduler
 
@@ -312,6 +353,15 @@ except Exception as e:
     logger.error(f"Failed to start chat cleanup scheduler: {str(e)}", exc_info=True)
     # Don't fail app startup if scheduler fails - cleanup can be done manually
 
+@app.on_event("shutdown")
+def flush_buffers_on_shutdown():
+    """Write buffered quote auto-save drafts before the process exits"""
+    from autosave_buffer import flush_all_autosaves
+    try:
+        flush_all_autosaves()
+    except Exception as e:
+        logger.error(f"Failed to flush auto-save drafts on shutdown: {str(e)}", exc_info=True)
+
 # Wrap app with websocket logging middleware (outermost)
 app = WebSocketLoggingMiddleware(app)
 
@@ -214,6 +214,31 @@ class Quote(QuoteBase):
             Decimal: lambda v: str(v)
         }
 
+class QuoteSummary(BaseModel):
+    """Projected quote for list views (view=summary or fields=...); only selected fields are returned"""
+    id: str
+    title: Optional[str] = None
+    quote_number: Optional[str] = None
+    client_id: Optional[str] = None
+    notes: Optional[str] = None
+    terms: Optional[str] = None
+    expiration_date: Optional[datetime] = None
+    tax_rate: Optional[Decimal] = None
+    currency: Optional[str] = None
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    subtotal: Optional[Decimal] = None
+    tax_amount: Optional[Decimal] = None
+    total: Optional[Decimal] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    line_items: Optional[List[LineItem]] = None
+    clients: Optional[Dict[str, Any]] = None  # Only the selected client columns
+    folder_id: Optional[str] = None
+    stripe_invoice_id: Optional[str] = None
+    stripe_payment_intent_id: Optional[str] = None
+    payment_status: Optional[str] = None
+
 # Company Settings Models
 class CompanySettingsBase(BaseModel):
     company_name: Optional[str] = None
@@ -470,6 +495,7 @@ class FileBase(BaseModel):
     file_size: int  # Size in bytes
     storage_path: str
     storage_url: Optional[str] = None
+    content_sha256: Optional[str] = None  # file_blobs key (shared storage object)
     folder_id: Optional[str] = None
     quote_id: Optional[str] = None
     form_id: Optional[str] = None
@@ -778,6 +804,9 @@ class Folder(FolderBase):
     class Config:
         from_attributes = True
 
+class FolderListItem(Folder):
+    summary: Optional[Dict[str, Any]] = None  # Status summary (list_folders?include_summary=true)
+
 class FolderAssignmentBase(BaseModel):
     folder_id: str
     user_id: str
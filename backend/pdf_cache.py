@@ -0,0 +1,182 @@
+"""
+Quote PDF Render Cache
+Rendered quote PDFs are keyed by a SHA-256 fingerprint of everything that affects
+the output: the quote row (with its client and line items), the company settings
+row, the render options, the shared render assets and a render version. Identical inputs always produce the
+same key, so a cached PDF can never be stale - edits simply produce a new key.
+
+Tiers:
+    memory  - per-process LRU (QUOTE_PDF_CACHE_MAX_ENTRIES / QUOTE_PDF_CACHE_TTL_SECONDS)
+    storage - optional Supabase Storage bucket shared by all workers
+              (QUOTE_PDF_CACHE_BUCKET; empty disables it)
+
+invalidate_quote_pdf() only reclaims space for quotes that changed or were deleted.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Set
+
+from database import supabase_storage
+from cache_utils import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever render_quote_pdf changes its output for the same inputs
+QUOTE_PDF_RENDER_VERSION = "2"
+
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_PDF_CACHE_MAX_ENTRIES", "256"))
+PDF_CACHE_TTL_SECONDS = int(os.getenv("QUOTE_PDF_CACHE_TTL_SECONDS", "86400"))
+PDF_CACHE_BUCKET = os.getenv("QUOTE_PDF_CACHE_BUCKET", "")
+COMPANY_SETTINGS_TTL_SECONDS = int(os.getenv("COMPANY_SETTINGS_CACHE_TTL_SECONDS", "60"))
+
+
+def quote_pdf_fingerprint(quote: Dict, company_settings: Dict, options: Dict, assets: Optional[Dict] = None) -> str:
+    """
+    SHA-256 over the canonical JSON of every render input
+
+    assets identifies shared render assets whose content can change without the
+    rows changing (e.g. the logo digest behind an unchanged logo_url, brand fonts).
+    """
+    payload = {
+        "version": QUOTE_PDF_RENDER_VERSION,
+        "quote": quote,
+        "company_settings": company_settings,
+        "options": options,
+        "assets": assets or {}
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value matches the ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class QuotePdfCache:
+    """Two-tier cache of rendered quote PDFs keyed by (quote_id, fingerprint)"""
+
+    def __init__(self, bucket: str = PDF_CACHE_BUCKET):
+        self.bucket = bucket
+        self._memory = TTLCache(maxsize=PDF_CACHE_MAX_ENTRIES, ttl_seconds=PDF_CACHE_TTL_SECONDS)
+        # quote_id -> fingerprints held in memory, so a quote can be invalidated without scanning
+        self._fingerprints: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.storage_hits = 0
+
+    @staticmethod
+    def _object_path(quote_id: str, fingerprint: str) -> str:
+        return f"quotes/{quote_id}/{fingerprint}.pdf"
+
+    def get(self, quote_id: str, fingerprint: str) -> Optional[bytes]:
+        """Return cached PDF bytes from memory, then storage; None on a miss"""
+        pdf_bytes = self._memory.get((quote_id, fingerprint))
+        if pdf_bytes is not MISSING:
+            return pdf_bytes
+
+        if not self.bucket:
+            return None
+        try:
+            pdf_bytes = supabase_storage.storage.from_(self.bucket).download(self._object_path(quote_id, fingerprint))
+        except Exception:
+            # Missing object (or storage unavailable) - render instead
+            return None
+        if not pdf_bytes:
+            return None
+
+        self.storage_hits += 1
+        self.put(quote_id, fingerprint, pdf_bytes)
+        return pdf_bytes
+
+    def put(self, quote_id: str, fingerprint: str, pdf_bytes: bytes):
+        """Store PDF bytes in the memory tier"""
+        self._memory.set((quote_id, fingerprint), pdf_bytes)
+        with self._lock:
+            self._fingerprints.setdefault(quote_id, set()).add(fingerprint)
+
+    def store(self, quote_id: str, fingerprint: str, pdf_bytes: bytes):
+        """Upload PDF bytes to the storage tier (best-effort; run as a background task)"""
+        if not self.bucket:
+            return
+        try:
+            supabase_storage.storage.from_(self.bucket).upload(
+                self._object_path(quote_id, fingerprint),
+                pdf_bytes,
+                file_options={"content-type": "application/pdf", "upsert": "true"}
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store cached PDF for quote {quote_id}: {str(e)}")
+
+    def invalidate(self, quote_id: str):
+        """Drop every cached render of a quote from both tiers"""
+        with self._lock:
+            fingerprints = self._fingerprints.pop(quote_id, set())
+        for fingerprint in fingerprints:
+            self._memory.pop((quote_id, fingerprint))
+
+        if not self.bucket:
+            return
+        try:
+            folder = f"quotes/{quote_id}"
+            objects = supabase_storage.storage.from_(self.bucket).list(folder) or []
+            paths = [f"{folder}/{obj['name']}" for obj in objects if obj.get("name")]
+            if paths:
+                supabase_storage.storage.from_(self.bucket).remove(paths)
+        except Exception as e:
+            logger.warning(f"Failed to remove cached PDFs for quote {quote_id}: {str(e)}")
+
+    def stats(self) -> Dict:
+        stats = self._memory.stats()
+        stats["storage_enabled"] = bool(self.bucket)
+        stats["storage_hits"] = self.storage_hits
+        return stats
+
+
+# Singleton instance
+quote_pdf_cache = QuotePdfCache()
+
+_company_settings_cache = TTLCache(maxsize=1, ttl_seconds=COMPANY_SETTINGS_TTL_SECONDS)
+
+
+def get_company_settings() -> Dict:
+    """company_settings row (or {}), cached briefly since every PDF render needs it"""
+    settings = _company_settings_cache.get("settings")
+    if settings is not MISSING:
+        return settings
+
+    settings = {}
+    try:
+        response = supabase_storage.table("company_settings").select("*").limit(1).execute()
+        if response.data:
+            settings = response.data[0]
+    except Exception as e:
+        logger.warning(f"Failed to load company settings: {str(e)}")
+        return settings
+
+    _company_settings_cache.set("settings", settings)
+    return settings
+
+
+def invalidate_company_settings():
+    """Call after company settings are updated"""
+    _company_settings_cache.clear()
+
+
+def invalidate_quote_pdf(*quote_ids: str):
+    """Reclaim cached renders of changed or deleted quotes (best-effort)"""
+    for quote_id in quote_ids:
+        if quote_id:
+            quote_pdf_cache.invalidate(quote_id)
@@ -0,0 +1,184 @@
+"""
+PDF Render Service
+Runs the CPU-heavy ReportLab/pypdf work in pdf_renderers on a process pool so
+PDF generation never blocks the event loop.
+
+- Bounded: at most workers + PDF_RENDER_MAX_QUEUE jobs are in flight. Beyond that
+  callers get 429 (with Retry-After) instead of an ever-growing queue.
+- Per-job timeout (504). A timed-out job keeps its slot until the worker actually
+  finishes it, so backpressure still reflects real pool load.
+- Metrics: queue wait and render time per job, plus rejected/timed-out/failed counts.
+
+Jobs must be module-level functions taking plain data (dicts, lists, bytes) so
+arguments pickle cheaply. PDF_RENDER_WORKERS=0 runs jobs on a single background
+thread instead (development, single-core hosts).
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+PDF_RENDER_MAX_QUEUE = int(os.getenv("PDF_RENDER_MAX_QUEUE", "8"))
+PDF_RENDER_TIMEOUT_SECONDS = float(os.getenv("PDF_RENDER_TIMEOUT_SECONDS", "30"))
+RETRY_AFTER_SECONDS = 2
+# Jobs kept for the latency percentiles in stats()
+METRICS_WINDOW = 500
+
+
+def _warm_worker():
+    """Process initializer: register fonts and build the shared styles once per worker"""
+    from render_assets import get_fonts, get_sample_styles
+    get_fonts()
+    get_sample_styles()
+
+
+def _run_job(func: Callable, args: tuple, kwargs: dict, submitted_at: float):
+    """Executes in the worker; returns the result with its queue wait and render time"""
+    started_at = time.time()
+    result = func(*args, **kwargs)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class PdfRenderService:
+    """Process pool with bounded admission for PDF render jobs"""
+
+    def __init__(
+        self,
+        workers: int = PDF_RENDER_WORKERS,
+        max_queue: int = PDF_RENDER_MAX_QUEUE,
+        timeout_seconds: float = PDF_RENDER_TIMEOUT_SECONDS
+    ):
+        self.workers = workers
+        self.capacity = max(workers, 1) + max_queue
+        self.timeout_seconds = timeout_seconds
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue_waits = deque(maxlen=METRICS_WINDOW)
+        self._render_times = deque(maxlen=METRICS_WINDOW)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.workers > 0:
+                    # spawn: workers must not inherit the app's threads (scheduler, HTTP clients)
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_warm_worker
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-render")
+            return self._executor
+
+    def _reset_executor(self, broken: Executor):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.failed += 1
+            return
+        _, queue_wait, render_time = future.result()
+        self.completed += 1
+        self._queue_waits.append(queue_wait)
+        self._render_times.append(render_time)
+
+    async def render(self, func: Callable[..., bytes], *args: Any, **kwargs: Any) -> bytes:
+        """
+        Run a render job off the event loop
+
+        Raises:
+            HTTPException 429 when the pool is saturated, 504 on timeout,
+            503 if the worker pool crashed. Errors raised by the job propagate unchanged.
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="PDF renderer is busy. Please try again shortly.",
+                    headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+                )
+            self._in_flight += 1
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_job, func, args, kwargs, time.time())
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            result, _, _ = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_seconds)
+            return result
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.warning(f"PDF render {getattr(func, '__name__', func)} timed out after {self.timeout_seconds}s")
+            raise HTTPException(status_code=504, detail="PDF rendering timed out")
+        except BrokenProcessPool:
+            logger.error("PDF render pool crashed; restarting it")
+            self._reset_executor(executor)
+            raise HTTPException(status_code=503, detail="PDF renderer restarted. Please try again.")
+
+    def stats(self) -> Dict:
+        """Pool load and latency metrics (seconds)"""
+        queue_waits = list(self._queue_waits)
+        render_times = list(self._render_times)
+        return {
+            "mode": "process" if self.workers > 0 else "thread",
+            "workers": max(self.workers, 1),
+            "capacity": self.capacity,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_wait_p50": round(_percentile(queue_waits, 0.5), 4),
+            "queue_wait_p95": round(_percentile(queue_waits, 0.95), 4),
+            "render_time_p50": round(_percentile(render_times, 0.5), 4),
+            "render_time_p95": round(_percentile(render_times, 0.95), 4)
+        }
+
+
+# Singleton instance
+_pdf_render_service: Optional[PdfRenderService] = None
+
+
+def get_pdf_render_service() -> PdfRenderService:
+    """Get or create the PDF render service singleton"""
+    global _pdf_render_service
+    if _pdf_render_service is None:
+        _pdf_render_service = PdfRenderService()
+    return _pdf_render_service
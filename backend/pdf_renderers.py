@@ -0,0 +1,601 @@
+"""
+PDF Renderers
+Pure rendering functions for every generated PDF. They take plain data (dicts,
+lists, bytes) and return PDF bytes, never touching the database or the network,
+so they can run in pdf_render_service's worker processes with cheap pickling.
+"""
+import io
+import os
+import re
+import html
+import base64
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+
+from cache_utils import TTLCache, MISSING
+from render_assets import LogoAsset, get_fonts, get_quote_styles, get_quote_palette, get_submission_export_styles
+
+# Signature embedding imports
+try:
+    from pypdf import PdfReader, PdfWriter
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
+    from PIL import Image as PILImage
+    PDF_LIBRARIES_AVAILABLE = True
+except ImportError as e:
+    print(f"Warning: PDF libraries not available: {e}")
+    PDF_LIBRARIES_AVAILABLE = False
+
+# Parsed PDFs reused by embed_signature_in_pdf (per worker process)
+SIGNATURE_TEMPLATE_CACHE_ENTRIES = int(os.getenv("SIGNATURE_TEMPLATE_CACHE_ENTRIES", "16"))
+SIGNATURE_TEMPLATE_CACHE_TTL_SECONDS = int(os.getenv("SIGNATURE_TEMPLATE_CACHE_TTL_SECONDS", "3600"))
+_signature_templates = TTLCache(maxsize=SIGNATURE_TEMPLATE_CACHE_ENTRIES, ttl_seconds=SIGNATURE_TEMPLATE_CACHE_TTL_SECONDS)
+
+
+def convert_links_to_pdf_format(text: str) -> str:
+    if not text: return ""
+    
+    placeholders = {}
+    placeholder_counter = 0
+    markdown_link_pattern = r'\[([^\]]+)\]\(([^)]+)\)'
+    
+    def replace_markdown(match):
+        nonlocal placeholder_counter
+        link_text, url = match.groups()
+        if not url.startswith(('http://', 'https://')): url = f'https://{url}'
+        placeholder = f'__MK_LINK_{placeholder_counter}__'
+        placeholders[placeholder] = {'text': link_text, 'url': url}
+        placeholder_counter += 1
+        return placeholder
+    
+    text = re.sub(markdown_link_pattern, replace_markdown, text)
+    
+    url_pattern = r'(https?://[^\s<>"]+|www\.[^\s<>"]+)'
+    def replace_url(match):
+        nonlocal placeholder_counter
+        url = match.group(0)
+        full_url = url if url.startswith(('http://', 'https://')) else f'https://{url}'
+        placeholder = f'__PL_LINK_{placeholder_counter}__'
+        placeholders[placeholder] = {'text': url, 'url': full_url}
+        placeholder_counter += 1
+        return placeholder
+
+    text = re.sub(url_pattern, replace_url, text)
+    text = html.escape(text)
+    
+    for ph, data in placeholders.items():
+        link_tag = f'<link href="{html.escape(data["url"])}" color="blue"><u>{html.escape(data["text"])}</u></link>'
+        text = text.replace(ph, link_tag)
+    
+    return text
+
+def render_quote_pdf(quote: dict, company_settings: dict, options: dict, logo: Optional[LogoAsset] = None) -> bytes:
+    """
+    Render a quote PDF from already-loaded data
+    
+    Args:
+        quote: Quote row with embedded clients and line_items
+        company_settings: company_settings row (may be empty)
+        options: Normalized render options (see quote_pdf_options)
+        logo: Pre-scaled logo (resolved by the caller, so renders never fetch URLs)
+    
+    Returns:
+        PDF bytes
+    """
+    show_logo = options["show_logo"]
+    show_company_info = options["show_company_info"]
+    show_client_info = options["show_client_info"]
+    show_notes = options["show_notes"]
+    show_terms = options["show_terms"]
+    page_size = options["page_size"]
+    font_size = options["font_size"]
+    color_scheme = options["color_scheme"]
+    
+    # --- 1. PAGE SETUP ---
+    pagesize = A4 if page_size.lower() == "a4" else letter
+    page_width, page_height = pagesize
+    left_margin = 0.6 * inch
+    right_margin = 0.6 * inch
+    top_margin = 0.6 * inch
+    bottom_margin = 0.5 * inch
+    content_width = page_width - (left_margin + right_margin)
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, 
+        pagesize=pagesize, 
+        topMargin=top_margin, 
+        bottomMargin=bottom_margin,
+        leftMargin=left_margin,
+        rightMargin=right_margin,
+        title=quote.get('title', quote['quote_number'])
+    )
+
+    elements = []
+
+    # --- 2. STYLES ---
+    # Shared per (font_size, color_scheme) - see render_assets
+    styles = get_quote_styles(font_size, color_scheme)
+    palette = get_quote_palette(color_scheme)
+    normal_style = styles["normal"]
+    table_right_style = styles["table_right"]  # Right aligned (numbers)
+    heading_style = styles["heading"]
+    bold_para_left = styles["bold_left"]
+    bold_para_right = styles["bold_right"]
+    right_info_style = styles["right_info"]
+    right_bold_style = styles["right_bold"]
+    status_style = styles["status"]
+
+    # --- 3. HEADER (Logo & Info) ---
+    header_left = []
+    if show_logo and logo:
+        h = 0.45 * inch
+        w = h * logo.aspect
+        header_left.append(Image(logo.open(), width=w, height=h))
+
+    header_right = []
+    q_date = datetime.fromisoformat(quote['created_at']).strftime('%B %d, %Y')
+    header_right.append(Paragraph("<b>QUOTE</b>", right_info_style))
+    header_right.append(Paragraph(f"<b>{quote['quote_number']}</b>", right_bold_style))
+    header_right.append(Paragraph(q_date, right_info_style))
+    if quote.get('status', '').lower() == 'draft':
+        header_right.append(Paragraph("Draft Quote - Approval Required", status_style))
+
+    header_table = Table([[header_left, header_right]], colWidths=[content_width * 0.6, content_width * 0.4])
+    header_table.setStyle(TableStyle([
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('LEFTPADDING', (0,0), (-1,-1), 0),
+        ('RIGHTPADDING', (0,0), (-1,-1), 0),
+        ('TOPPADDING', (0,0), (-1,-1), 0),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 0),
+    ]))
+    elements.append(header_table)
+    elements.append(Spacer(1, 0.35 * inch))
+
+    # --- 4. ADDRESS BLOCK ---
+    col_from = []
+    if show_company_info:
+        col_from.append(Paragraph("FROM", heading_style))
+        if company_settings.get('company_name'):
+            col_from.append(Paragraph(f"<b>{company_settings['company_name']}</b>", normal_style))
+
+        contact_lines = []
+        if company_settings.get('address'): contact_lines.append(company_settings['address'])
+        parts = []
+        if company_settings.get('email'): parts.append(company_settings['email'])
+        if company_settings.get('phone'): parts.append(company_settings['phone'])
+        if parts: contact_lines.append(" | ".join(parts))
+        if company_settings.get('website'): contact_lines.append(company_settings['website'])
+        for line in contact_lines: col_from.append(Paragraph(line, normal_style))
+
+    col_to = []
+    if show_client_info and quote.get('clients'):
+        client = quote['clients']
+        col_to.append(Paragraph("BILL TO", heading_style))
+        if client.get('name'):
+            col_to.append(Paragraph(f"<b>{client['name']}</b>", normal_style))
+        if client.get('company'):
+            col_to.append(Paragraph(client['company'], normal_style))
+        if client.get('address'):
+            col_to.append(Paragraph(client['address'], normal_style))
+        c_parts = []
+        if client.get('email'): c_parts.append(client['email'])
+        if client.get('phone'): c_parts.append(client['phone'])
+        if c_parts: col_to.append(Paragraph(", ".join(c_parts), normal_style))
+
+    address_table = Table([[col_from, col_to]], colWidths=[content_width * 0.5, content_width * 0.5])
+    address_table.setStyle(TableStyle([
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('LEFTPADDING', (0,0), (-1,-1), 0),
+        ('RIGHTPADDING', (0,0), (-1,-1), 0),
+        ('TOPPADDING', (0,0), (-1,-1), 0),
+    ]))
+    elements.append(address_table)
+    elements.append(Spacer(1, 0.3 * inch))
+
+    # --- 5. ITEMS TABLE ---
+    elements.append(Paragraph("Items", heading_style))
+    elements.append(Spacer(1, 0.05 * inch))
+
+    w_qty = 0.6 * inch
+    w_price = 1.0 * inch
+    w_total = 1.0 * inch
+    w_desc = content_width - (w_qty + w_price + w_total)
+
+    # Header: Description (Left), others (Right)
+    table_data = [[
+        Paragraph("Description", bold_para_left),
+        Paragraph("Qty", bold_para_right),       # Right Aligned Header
+        Paragraph("Unit Price", bold_para_right),# Right Aligned Header
+        Paragraph("Total", bold_para_right)      # Right Aligned Header
+    ]]
+
+    for item in quote.get('line_items', []):
+        qty = Decimal(item['quantity'])
+        price = Decimal(item['unit_price'])
+        row_total = qty * price 
+
+        table_data.append([
+            Paragraph(item['description'], normal_style),
+            Paragraph(f"{qty:g}", table_right_style),        # Right Aligned Data
+            Paragraph(f"${price:,.2f}", table_right_style),    # Right Aligned Data
+            Paragraph(f"${row_total:,.2f}", table_right_style),# Right Aligned Data
+        ])
+
+    items_table = Table(table_data, colWidths=[w_desc, w_qty, w_price, w_total])
+    items_table.setStyle(TableStyle([
+        ('LINEBELOW', (0,0), (-1,0), 0.5, colors.HexColor(palette["rule"])),
+        ('LINEBELOW', (0,1), (-1,-1), 0.5, colors.HexColor(palette["rule_light"])),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('TOPPADDING', (0,0), (-1,-1), 5),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 5),
+        ('LEFTPADDING', (0,0), (0,-1), 0),       # No Left Padding on Col 1
+        ('RIGHTPADDING', (-1,0), (-1,-1), 0),    # No Right Padding on Last Col
+    ]))
+    elements.append(items_table)
+
+    # --- 6. TOTALS ---
+    subtotal = Decimal(quote['subtotal'])
+    tax = Decimal(quote['tax_amount'])
+    grand_total = Decimal(quote['total'])
+
+    summary_data = []
+    # Use table_right_style for the monetary values
+    summary_data.append([Paragraph("Subtotal", normal_style), Paragraph(f"${subtotal:,.2f}", table_right_style)])
+    if tax > 0:
+        summary_data.append([Paragraph(f"Tax ({quote.get('tax_rate',0)}%)", normal_style), Paragraph(f"${tax:,.2f}", table_right_style)])
+
+    summary_data.append([Paragraph("Total", normal_style), Paragraph(f"${grand_total:,.2f}", table_right_style)])
+
+    w_sum_label = 1.5 * inch
+    w_sum_val = 1.0 * inch
+
+    summary_table = Table(summary_data, colWidths=[w_sum_label, w_sum_val])
+    summary_table.setStyle(TableStyle([
+        ('ALIGN', (0,0), (-1,-1), 'RIGHT'), # Cell alignment
+        ('LEFTPADDING', (0,0), (-1,-1), 0),
+        ('RIGHTPADDING', (0,0), (-1,-1), 0),
+        ('TOPPADDING', (0,0), (-1,-1), 3),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 3),
+        ('LINEABOVE', (0,-1), (-1,-1), 0.5, colors.black),
+    ]))
+
+    wrapper_table = Table([[ "", summary_table ]], colWidths=[content_width - (w_sum_label + w_sum_val), (w_sum_label + w_sum_val)])
+    wrapper_table.setStyle(TableStyle([
+        ('LEFTPADDING', (0,0), (-1,-1), 0),
+        ('RIGHTPADDING', (0,0), (-1,-1), 0),
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ]))
+    elements.append(wrapper_table)
+
+    # --- 7. FOOTER ---
+    elements.append(Spacer(1, 0.4 * inch))
+    if show_notes and quote.get('notes'):
+        elements.append(Paragraph("Notes", heading_style))
+        elements.append(Paragraph(convert_links_to_pdf_format(quote['notes']), normal_style))
+        elements.append(Spacer(1, 0.1 * inch))
+
+    if show_terms and quote.get('terms'):
+        elements.append(Paragraph("Terms", heading_style))
+        elements.append(Paragraph(convert_links_to_pdf_format(quote['terms']), normal_style))
+        elements.append(Spacer(1, 0.1 * inch))
+
+    validity_text = "This quote is valid for 30 days from the date of issue."
+    if quote.get('expiration_date'):
+        exp_date = datetime.fromisoformat(quote['expiration_date']).strftime('%B %d, %Y')
+        validity_text = f"This quote is valid until {exp_date}."
+
+    elements.append(Spacer(1, 0.2 * inch))
+    elements.append(Paragraph(validity_text, styles["footer"]))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def quote_pdf_options(
+    show_logo: bool,
+    show_company_info: bool,
+    show_client_info: bool,
+    show_notes: bool,
+    show_terms: bool,
+    page_size: str,
+    font_size: int,
+    color_scheme: str
+) -> dict:
+    """Normalize query options so equivalent requests share a cache fingerprint"""
+    return {
+        "show_logo": show_logo,
+        "show_company_info": show_company_info,
+        "show_client_info": show_client_info,
+        "show_notes": show_notes,
+        "show_terms": show_terms,
+        "page_size": (page_size or "letter").lower(),
+        "font_size": font_size,
+        "color_scheme": color_scheme
+    }
+
+
+def render_submissions_pdf(form: dict, submissions: List[dict], fields: Dict[str, dict]) -> bytes:
+    """
+    Render the form submissions export
+    
+    Args:
+        form: forms row
+        submissions: form_submissions rows with embedded form_submission_answers
+        fields: form_fields rows keyed by id (answer labels)
+    
+    Returns:
+        PDF bytes
+    """
+    # Create PDF buffer
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        topMargin=0.75*inch,
+        bottomMargin=0.75*inch,
+        title=f"{form.get('name', 'Form')} - Submissions"
+    )
+
+    elements = []
+    styles = get_submission_export_styles()
+
+    # Title
+    elements.append(Paragraph(form.get('name', 'Form Submissions'), styles['title']))
+    elements.append(Paragraph(f"Total Submissions: {len(submissions)}", styles['normal']))
+    elements.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['normal']))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Process each submission
+    for idx, submission in enumerate(submissions):
+        if idx > 0:
+            elements.append(PageBreak())
+
+        # Submission header
+        elements.append(Paragraph(f"Submission #{idx + 1}", styles['submission_header']))
+
+        # Submission metadata
+        metadata_data = [
+            ['Field', 'Value'],
+            ['Submission ID', submission.get('id', 'N/A')],
+            ['Submitted At', submission.get('submitted_at', 'N/A')],
+            ['Started At', submission.get('started_at', 'N/A') or 'N/A'],
+            ['Submitter Name', submission.get('submitter_name', 'N/A') or 'N/A'],
+            ['Submitter Email', submission.get('submitter_email', 'N/A') or 'N/A'],
+            ['Time Spent', f"{submission.get('time_spent_seconds', 0) or 0} seconds"],
+            ['Status', submission.get('status', 'N/A')],
+            ['Review Status', submission.get('review_status', 'new') or 'new'],
+        ]
+
+        metadata_table = Table(metadata_data, colWidths=[2*inch, 4*inch])
+        metadata_table.setStyle(styles['metadata_table'])
+        elements.append(metadata_table)
+        elements.append(Spacer(1, 0.2*inch))
+
+        # Answers
+        answers = submission.get('form_submission_answers', [])
+        if answers:
+            elements.append(Paragraph("Responses:", styles['section']))
+
+            answers_data = [['Field', 'Answer']]
+            for answer in answers:
+                field_id = answer.get('field_id')
+                field = fields.get(field_id, {})
+                field_label = field.get('label', f"Field {field_id[:8]}...") if field_id else 'Unknown Field'
+
+                answer_text = answer.get('answer_text', '')
+                if not answer_text and answer.get('answer_value'):
+                    answer_value = answer.get('answer_value', {})
+                    if isinstance(answer_value, dict) and answer_value.get('value'):
+                        answer_text = str(answer_value['value'])
+                    else:
+                        answer_text = str(answer_value)
+
+                if not answer_text:
+                    answer_text = 'N/A'
+
+                # Truncate long answers for table display
+                if len(answer_text) > 100:
+                    answer_text = answer_text[:100] + '...'
+
+                answers_data.append([field_label, answer_text])
+
+            answers_table = Table(answers_data, colWidths=[2.5*inch, 3.5*inch])
+            answers_table.setStyle(styles['answers_table'])
+            elements.append(answers_table)
+
+    # Build PDF
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def render_signature_overlay(page_width: float, page_height: float, signature_image_bytes: bytes, signature_type: str = "draw") -> bytes:
+    """
+    Single-page PDF holding just the signature block (bottom center of the page).
+    
+    Args:
+        page_width, page_height: Size of the page the overlay is merged onto (points)
+        signature_image_bytes: Signature image bytes (PNG/JPEG) or text for typed signatures
+        signature_type: "draw", "type", or "upload"
+    
+    Returns:
+        bytes: Overlay PDF
+    """
+    fonts = get_fonts()
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=(page_width, page_height))
+    
+    # Signature dimensions
+    sig_width = min(200, page_width * 0.4)
+    sig_height = 60
+    
+    # Position at bottom center
+    x = (page_width - sig_width) / 2
+    y = 50  # 50 points from bottom
+    
+    if signature_type == "draw" or signature_type == "upload":
+        # Embed image signature
+        try:
+            # Decode base64 if needed
+            if isinstance(signature_image_bytes, str):
+                signature_image_bytes = base64.b64decode(signature_image_bytes)
+            
+            # Load image
+            img = PILImage.open(io.BytesIO(signature_image_bytes))
+            # Resize to fit while maintaining aspect ratio
+            img.thumbnail((int(sig_width), int(sig_height)), PILImage.Resampling.LANCZOS)
+            
+            # Hand ReportLab an in-memory PNG (no temp file)
+            image_buffer = io.BytesIO()
+            img.save(image_buffer, format='PNG')
+            image_buffer.seek(0)
+            can.drawImage(ImageReader(image_buffer), x, y, width=sig_width, height=sig_height, preserveAspectRatio=True, mask='auto')
+        except Exception as img_error:
+            print(f"Error embedding image signature: {str(img_error)}")
+            import traceback
+            traceback.print_exc()
+            # Fallback: draw text
+            can.setFont(fonts.bold, 12)
+            can.drawString(x, y + 20, "Signature")
+    elif signature_type == "type":
+        # Draw text signature
+        can.setFont(fonts.bold, 14)
+        # Decode signature text - handle both base64 encoded and plain text
+        if isinstance(signature_image_bytes, bytes):
+            try:
+                # Try to decode as UTF-8 first
+                signature_text = signature_image_bytes.decode('utf-8')
+                # If it looks like base64, try decoding it
+                if len(signature_text) > 0 and not signature_text.isprintable():
+                    try:
+                        signature_text = base64.b64decode(signature_text).decode('utf-8')
+                    except:
+                        pass  # Use original if base64 decode fails
+            except:
+                signature_text = str(signature_image_bytes)
+        else:
+            # String input
+            signature_text = str(signature_image_bytes)
+            # Check if it's base64 encoded (common pattern: alphanumeric with = padding)
+            if len(signature_text) > 10 and (signature_text.endswith('=') or not signature_text.isprintable()):
+                try:
+                    signature_text = base64.b64decode(signature_text).decode('utf-8')
+                except:
+                    pass  # Use original if base64 decode fails
+        
+        # Wrap text if needed
+        text_width = can.stringWidth(signature_text, fonts.bold, 14)
+        if text_width > sig_width:
+            # Simple text wrapping (split by spaces)
+            words = signature_text.split()
+            lines = []
+            current_line = []
+            current_width = 0
+            for word in words:
+                word_width = can.stringWidth(word + " ", fonts.bold, 14)
+                if current_width + word_width > sig_width and current_line:
+                    lines.append(" ".join(current_line))
+                    current_line = [word]
+                    current_width = word_width
+                else:
+                    current_line.append(word)
+                    current_width += word_width
+            if current_line:
+                lines.append(" ".join(current_line))
+            
+            # Draw lines
+            line_height = 18
+            for i, line in enumerate(lines):
+                can.drawString(x, y + sig_height - (i + 1) * line_height, line)
+        else:
+            can.drawString(x, y + 20, signature_text)
+    
+    # Add signature label
+    can.setFont(fonts.regular, 10)
+    can.drawString(x, y - 15, "Signed Electronically")
+    
+    can.save()
+    return packet.getvalue()
+
+
+def _load_signature_template(pdf_bytes: bytes, template_key: Optional[str]) -> Dict:
+    """
+    Parsed PDF with its page count and last-page size, cached per template_key
+    
+    Signing the same document repeatedly reuses the parsed cross-reference table
+    and page tree. Entries are only read (signed copies are written by separate
+    incremental writers), and render jobs run one at a time per worker process.
+    """
+    cache_key = (template_key, len(pdf_bytes)) if template_key else None
+    if cache_key is not None:
+        template = _signature_templates.get(cache_key)
+        if template is not MISSING:
+            return template
+    
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    last_page = reader.pages[-1]
+    template = {
+        "reader": reader,
+        "page_count": len(reader.pages),
+        "last_page_size": (float(last_page.mediabox.width), float(last_page.mediabox.height)),
+    }
+    if cache_key is not None:
+        _signature_templates.set(cache_key, template)
+    return template
+
+
+def embed_signature_in_pdf(
+    pdf_bytes: bytes,
+    signature_image_bytes: bytes,
+    signature_type: str = "draw",
+    template_key: Optional[str] = None
+) -> bytes:
+    """
+    Embed signature into PDF (simple mode - bottom of last page).
+    
+    The signed PDF is the original bytes followed by an incremental update that
+    only holds the changed last page and the signature overlay, instead of a
+    rewrite of every page.
+    
+    Args:
+        pdf_bytes: Original PDF file bytes
+        signature_image_bytes: Signature image bytes (PNG/JPEG) or text for typed signatures
+        signature_type: "draw", "type", or "upload"
+        template_key: Stable identifier of pdf_bytes (e.g. its storage path) to reuse the parsed PDF
+    
+    Returns:
+        bytes: PDF with embedded signature
+    """
+    if not PDF_LIBRARIES_AVAILABLE:
+        raise RuntimeError("PDF libraries not available")
+    
+    try:
+        template = _load_signature_template(pdf_bytes, template_key)
+        page_width, page_height = template["last_page_size"]
+        overlay = PdfReader(io.BytesIO(
+            render_signature_overlay(page_width, page_height, signature_image_bytes, signature_type)
+        ))
+        
+        try:
+            pdf_writer = PdfWriter(template["reader"], incremental=True)
+        except TypeError:
+            # pypdf < 5 has no incremental mode: rewrite the whole document
+            pdf_writer = PdfWriter(clone_from=template["reader"])
+        
+        # Merge signature overlay with last page
+        pdf_writer.pages[template["page_count"] - 1].merge_page(overlay.pages[0])
+        
+        # Write final PDF
+        output = io.BytesIO()
+        pdf_writer.write(output)
+        return output.getvalue()
+    except Exception as e:
+        print(f"Error embedding signature in PDF: {str(e)}")
+        raise
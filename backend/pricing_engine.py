@@ -0,0 +1,207 @@
+"""
+Pricing Engine
+Single home for quote pricing math: line totals, subtotal, tax and total for one
+quote or many at once, plus a batched job that recalculates stored quote totals.
+
+All arithmetic is Decimal with the same operation order as the original
+routers/quotes.py helpers, so results (including their string form) are
+identical. Each line is parsed once and every tax_method is computed in a single
+pass over the line items.
+
+tax_method options:
+- "after_discount": quote tax_rate applied to the discounted subtotal (default)
+- "before_discount": quote tax_rate applied to the subtotal before discounts
+- "line_item": each line item's own tax_rate (quote tax_rate ignored)
+"""
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TAX_METHODS = ("after_discount", "before_discount", "line_item")
+RECALCULATE_BATCH_SIZE = 500
+
+_ZERO = Decimal("0")
+_ONE = Decimal("1")
+_HUNDRED = Decimal("100")
+_CENT = Decimal("0.01")
+
+
+def to_decimal(value: Any, default: Decimal = _ZERO) -> Decimal:
+    """Decimal from str/int/Decimal/float (floats via str, so 0.1 stays 0.1); None/"" -> default"""
+    if type(value) is str and value:
+        return Decimal(value)
+    if value is None or value == "":
+        return default
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return value if isinstance(value, Decimal) else Decimal(value)
+
+
+def _field(item: Any, name: str, default: Any = None) -> Any:
+    """Read a line item field from a dict or a model (LineItemCreate)"""
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def _parsed_lines(line_items: Iterable[Any], with_tax_rate: bool) -> List[Tuple[Decimal, Decimal, Decimal, Decimal]]:
+    """(quantity, unit_price, discount_percent, tax_rate) per line, parsed once"""
+    parsed = []
+    for item in line_items:
+        if type(item) is dict:
+            quantity, unit_price = item.get("quantity"), item.get("unit_price")
+            discount_percent, tax_rate = item.get("discount_percent"), item.get("tax_rate")
+        else:
+            quantity, unit_price = getattr(item, "quantity", None), getattr(item, "unit_price", None)
+            discount_percent, tax_rate = getattr(item, "discount_percent", None), getattr(item, "tax_rate", None)
+        parsed.append((
+            to_decimal(quantity, _ONE),
+            to_decimal(unit_price),
+            to_decimal(discount_percent),
+            to_decimal(tax_rate) if with_tax_rate else _ZERO
+        ))
+    return parsed
+
+
+def calculate_line_total(item: Any, quote_tax_rate: Decimal = _ZERO, use_line_tax: bool = True) -> Decimal:
+    """
+    Line total including tax. Uses the line's own tax_rate when set (and
+    use_line_tax), otherwise quote_tax_rate.
+    """
+    line_subtotal = to_decimal(_field(item, "quantity"), _ONE) * to_decimal(_field(item, "unit_price"))
+    # A zero discount/tax rate of any scale ("0.00") counts as unset
+    discount_percent = to_decimal(_field(item, "discount_percent")) or _ZERO
+    after_discount = line_subtotal - line_subtotal * discount_percent / _HUNDRED
+    line_tax_rate = to_decimal(_field(item, "tax_rate"))
+    rate = line_tax_rate if use_line_tax and line_tax_rate else to_decimal(quote_tax_rate)
+    return after_discount + after_discount * rate / _HUNDRED
+
+
+def calculate_totals(line_items: Iterable[Any], tax_rate: Any, tax_method: str = "after_discount") -> Dict[str, Decimal]:
+    """Subtotal, tax and total for one quote as Decimals (single pass)"""
+    hundred = _HUNDRED
+    subtotal = _ZERO
+
+    if tax_method == "line_item":
+        tax_amount = _ZERO
+        for quantity, unit_price, discount_percent, line_tax_rate in _parsed_lines(line_items, True):
+            line_subtotal = quantity * unit_price
+            after_discount = line_subtotal - line_subtotal * discount_percent / hundred
+            subtotal += after_discount
+            tax_amount += after_discount * line_tax_rate / hundred
+    elif tax_method == "before_discount":
+        subtotal_before_discount = _ZERO
+        for quantity, unit_price, discount_percent, _ in _parsed_lines(line_items, False):
+            line_subtotal = quantity * unit_price
+            subtotal += line_subtotal - line_subtotal * discount_percent / hundred
+            subtotal_before_discount += line_subtotal
+        tax_amount = subtotal_before_discount * to_decimal(tax_rate) / hundred
+    else:
+        for quantity, unit_price, discount_percent, _ in _parsed_lines(line_items, False):
+            line_subtotal = quantity * unit_price
+            subtotal += line_subtotal - line_subtotal * discount_percent / hundred
+        tax_amount = subtotal * to_decimal(tax_rate) / hundred
+
+    return {
+        "subtotal": subtotal,
+        "tax_amount": tax_amount,
+        "total": subtotal + tax_amount
+    }
+
+
+def quote_totals(line_items: Iterable[Any], tax_rate: Any, tax_method: str = "after_discount") -> Dict[str, str]:
+    """calculate_totals() as strings, ready to write to the quotes table"""
+    totals = calculate_totals(line_items, tax_rate, tax_method)
+    return {key: str(value) for key, value in totals.items()}
+
+
+def calculate_totals_bulk(
+    quotes: Iterable[Dict[str, Any]],
+    tax_method: str = "after_discount"
+) -> Dict[str, Dict[str, Decimal]]:
+    """
+    Totals for many quotes at once, keyed by quote id
+
+    Each quote is a dict with "id", "tax_rate" and "line_items" (the shape of a
+    quotes select with line_items(*)); a per-quote "tax_method" overrides the default.
+    """
+    results = {}
+    for quote in quotes:
+        results[quote["id"]] = calculate_totals(
+            quote.get("line_items") or [],
+            quote.get("tax_rate"),
+            quote.get("tax_method") or tax_method
+        )
+    return results
+
+
+def round_money(value: Decimal) -> Decimal:
+    """Round to cents the way the DECIMAL(10, 2) quote columns store it"""
+    return value.quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def stale_totals(quote: Dict[str, Any], totals: Dict[str, Decimal]) -> Optional[Dict[str, str]]:
+    """Update payload when the stored totals differ from freshly computed ones, else None"""
+    rounded = {key: round_money(value) for key, value in totals.items()}
+    for key, value in rounded.items():
+        if to_decimal(quote.get(key)) != value:
+            return {k: str(v) for k, v in rounded.items()}
+    return None
+
+
+def recalculate_all_quotes(
+    batch_size: int = RECALCULATE_BATCH_SIZE,
+    tax_method: str = "after_discount",
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Recompute subtotal/tax/total for every quote in batches and write back the
+    ones that changed. Pages by id, so quotes created meanwhile are still visited
+    once. Returns counts of scanned, changed, updated and failed quotes.
+    """
+    from database import supabase_storage
+    from pdf_cache import invalidate_quote_pdf
+
+    if tax_method not in TAX_METHODS:
+        raise ValueError(f"Invalid tax_method: {tax_method}")
+
+    stats = {"scanned": 0, "changed": 0, "updated": 0, "failed": 0}
+    last_id = None
+    while True:
+        query = supabase_storage.table("quotes").select(
+            "id, tax_rate, subtotal, tax_amount, total, line_items(quantity, unit_price, discount_percent, tax_rate)"
+        ).order("id").limit(batch_size)
+        if last_id:
+            query = query.gt("id", last_id)
+        batch = query.execute().data or []
+        if not batch:
+            break
+
+        computed = calculate_totals_bulk(batch, tax_method)
+        changed: List[str] = []
+        for quote in batch:
+            update = stale_totals(quote, computed[quote["id"]])
+            if update is None:
+                continue
+            stats["changed"] += 1
+            if dry_run:
+                continue
+            try:
+                supabase_storage.table("quotes").update(update).eq("id", quote["id"]).execute()
+                stats["updated"] += 1
+                changed.append(quote["id"])
+            except Exception as e:
+                stats["failed"] += 1
+                logger.error(f"Failed to update totals for quote {quote['id']}: {str(e)}")
+
+        if changed:
+            invalidate_quote_pdf(*changed)
+        stats["scanned"] += len(batch)
+        last_id = batch[-1]["id"]
+        logger.info(f"Recalculated {stats['scanned']} quotes ({stats['changed']} changed)")
+        if len(batch) < batch_size:
+            break
+
+    return stats
@@ -0,0 +1,102 @@
+"""
+Quote List Utilities
+Field projection and single-request loading for the quote list endpoints.
+
+Pages are loaded through the list_quotes RPC (see database/quote_list_migration.sql),
+which applies search, filters, customer folder access, sorting and pagination in
+the database and returns quote rows, so the column projection and the client /
+line item embeds ride on the same request. view=summary (or an explicit fields
+list) returns only what list views display; line items are loaded only for the
+full view and the quote detail endpoint.
+"""
+from typing import Any, Dict, List, Optional
+from fastapi.responses import JSONResponse
+from database import supabase_storage
+from models import QuoteSummary
+
+QUOTE_VIEWS = ("full", "summary")
+FULL_QUOTE_SELECT = "*, clients(*), line_items(*)"
+SUMMARY_QUOTE_FIELDS = (
+    "id", "quote_number", "title", "status", "payment_status", "total", "currency",
+    "client_id", "folder_id", "expiration_date", "priority", "created_at", "updated_at", "clients"
+)
+# Embeds requested by name in `fields`
+QUOTE_FIELD_EMBEDS = {
+    "clients": "clients(*)",
+    "line_items": "line_items(*)"
+}
+SUMMARY_CLIENT_SELECT = "clients(id, name, email, company)"
+QUOTE_FIELDS = frozenset(QuoteSummary.model_fields)
+
+
+def quote_select(view: Optional[str] = "full", fields: Optional[str] = None) -> Optional[str]:
+    """
+    PostgREST select for a quote list request
+
+    Args:
+        view: "full" (every column, client and line items) or "summary"
+        fields: Comma-separated quote fields; overrides view ("clients" and
+            "line_items" embed the related rows)
+
+    Returns:
+        Select string, or None for the full view
+
+    Raises:
+        ValueError: Unknown view or field
+    """
+    if fields:
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(requested) - QUOTE_FIELDS)
+        if unknown:
+            raise ValueError(f"Invalid fields: {', '.join(unknown)}. Must be among: {', '.join(sorted(QUOTE_FIELDS))}")
+        columns = ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+        return ", ".join(QUOTE_FIELD_EMBEDS.get(name, name) for name in columns)
+
+    if view not in QUOTE_VIEWS:
+        raise ValueError(f"Invalid view. Must be one of: {', '.join(QUOTE_VIEWS)}")
+    if view == "summary":
+        return ", ".join(SUMMARY_CLIENT_SELECT if name == "clients" else name for name in SUMMARY_QUOTE_FIELDS)
+    return None
+
+
+def list_quotes(
+    select: Optional[str] = None,
+    sort_by: str = "created_at",
+    sort_desc: bool = True,
+    **filters: Any
+) -> List[Dict[str, Any]]:
+    """
+    Load one page of quotes in a single request
+
+    Args:
+        select: Projection from quote_select() (None = full view)
+        sort_by: Sort column (validated by list_quotes in the database)
+        sort_desc: Sort descending
+        **filters: Remaining list_quotes RPC arguments (search_term, status_filter,
+            payment_status_filter, client_id_filter, accessible_to_user,
+            created_from, created_before, expiration_from, expiration_before,
+            page_limit, page_offset)
+
+    Returns:
+        Quote rows in page order
+    """
+    params = {"sort_by": sort_by, "sort_desc": sort_desc}
+    params.update({name: value for name, value in filters.items() if value is not None})
+    # The RPC returns the page unordered; order by the same key it paged on
+    response = (
+        supabase_storage.rpc("list_quotes", params)
+        .select(select or FULL_QUOTE_SELECT)
+        .order(sort_by, desc=sort_desc)
+        .order("id")
+        .execute()
+    )
+    return response.data or []
+
+
+def quote_list_response(quotes: List[Dict[str, Any]], select: Optional[str]):
+    """Return full rows as-is (validated by the Quote response model) or projected rows as JSON"""
+    if select is None:
+        return quotes
+    return JSONResponse(content=[
+        QuoteSummary.model_validate(quote).model_dump(mode="json", exclude_unset=True) for quote in quotes
+    ])
@@ -3,26 +3,43 @@ RAG (Retrieval-Augmented Generation) Service
 Retrieves relevant context from database for AI responses
 """
 import logging
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 import sys
 import os
+import threading
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import supabase_storage
 from embeddings_service import get_embeddings_service
+from cache_utils import TTLCache, MISSING
 
 logger = logging.getLogger(__name__)
 
 MAX_SECTION_CHARS = int(os.getenv("RAG_MAX_SECTION_CHARS", "3500"))
 MAX_TOTAL_CONTEXT_CHARS = int(os.getenv("RAG_MAX_TOTAL_CONTEXT_CHARS", "9000"))
 
+# Retrieval caches (chat turns often repeat the same pricing/FAQ questions).
+# Explicit invalidation covers edits made through the API; the TTL bounds
+# staleness for data changed elsewhere (e.g. pricing tables edited in SQL).
+RAG_CACHE_TTL_SECONDS = float(os.getenv("RAG_CACHE_TTL_SECONDS", "300"))
+RAG_EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("RAG_EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+RAG_CACHE_MAX_ENTRIES = int(os.getenv("RAG_CACHE_MAX_ENTRIES", "2048"))
+# Empty sections are cached briefly so a transient DB error is not pinned for the full TTL
+RAG_EMPTY_RESULT_TTL_SECONDS = 30.0
+
+CONTEXT_SOURCES = ["pricing", "quotes", "forms", "knowledge", "customer"]
+
 def _normalize_query(query: str) -> List[str]:
     # Basic normalization: lowercase tokens, drop very short tokens.
     tokens = [t.strip().lower() for t in (query or "").split()]
     return [t for t in tokens if len(t) >= 3]
 
+def _cache_key(query: str) -> str:
+    """Normalize a query for cache lookups (case and whitespace only, so sections compute the same result)"""
+    return " ".join((query or "").lower().split())
+
 def _truncate(text: str, max_chars: int) -> str:
     if not text:
         return ""
@@ -33,6 +50,85 @@ def _truncate(text: str, max_chars: int) -> str:
 class RAGService:
     """Service for retrieving relevant context for RAG"""
     
+    def __init__(self):
+        # Level 1: normalized query -> query embedding
+        self._embedding_cache = TTLCache(RAG_CACHE_MAX_ENTRIES, RAG_EMBEDDING_CACHE_TTL_SECONDS)
+        # Level 2: (source, query, scope, version) -> formatted section, one cache per source
+        self._section_caches = {
+            source: TTLCache(RAG_CACHE_MAX_ENTRIES, RAG_CACHE_TTL_SECONDS) for source in CONTEXT_SOURCES
+        }
+        # customer_id (user id) -> client_id, shared by the customer-scoped sections
+        self._client_ids = TTLCache(RAG_CACHE_MAX_ENTRIES, RAG_CACHE_TTL_SECONDS)
+        
+        # Version counters are part of the cache keys; bumping one invalidates its entries
+        self._versions_lock = threading.Lock()
+        self._knowledge_version = 0
+        self._forms_version = 0
+        self._all_clients_version = 0
+        self._client_versions: Dict[str, int] = {}
+    
+    def invalidate_knowledge(self):
+        """Invalidate knowledge base and pricing sections (knowledge/pricing edits)"""
+        with self._versions_lock:
+            self._knowledge_version += 1
+    
+    def invalidate_forms(self):
+        """Invalidate form sections for every customer (form edits or folder assignment changes)"""
+        with self._versions_lock:
+            self._forms_version += 1
+    
+    def invalidate_client(self, client_id: Optional[str] = None):
+        """Invalidate a client's quote/customer sections (all clients when client_id is None)"""
+        with self._versions_lock:
+            if client_id:
+                self._client_versions[client_id] = self._client_versions.get(client_id, 0) + 1
+            else:
+                self._all_clients_version += 1
+                self._client_versions.clear()
+                self._client_ids.clear()
+    
+    def cache_stats(self) -> Dict:
+        """Hit/miss metrics per retrieval source"""
+        return {
+            "embedding": self._embedding_cache.stats(),
+            **{source: cache.stats() for source, cache in self._section_caches.items()}
+        }
+    
+    def _client_version(self, client_id: Optional[str]) -> tuple:
+        return (self._all_clients_version, self._client_versions.get(client_id, 0) if client_id else 0)
+    
+    def _resolve_client_id(self, customer_id: str) -> Optional[str]:
+        """Map a customer (user id) to their client id, cached"""
+        client_id = self._client_ids.get(customer_id)
+        if client_id is MISSING:
+            try:
+                client_response = supabase_storage.table("clients").select("id").eq("user_id", customer_id).limit(1).execute()
+                client_id = client_response.data[0]["id"] if client_response.data else None
+            except Exception as e:
+                logger.warning(f"Error resolving client for customer: {str(e)}")
+                return None
+            self._client_ids.set(customer_id, client_id)
+        return client_id
+    
+    def _cached_section(self, source: str, key: tuple, compute: Callable[[], str]) -> str:
+        """Return a cached context section, computing and storing it on a miss"""
+        cache = self._section_caches[source]
+        section = cache.get(key)
+        if section is MISSING:
+            section = compute()
+            cache.set(key, section, None if section else RAG_EMPTY_RESULT_TTL_SECONDS)
+        return section
+    
+    def _get_query_embedding(self, query: str) -> List[float]:
+        """Generate (or reuse) the embedding for a query"""
+        key = _cache_key(query)
+        embedding = self._embedding_cache.get(key)
+        if embedding is MISSING:
+            embedding = get_embeddings_service().generate_embedding(query)
+            if embedding:
+                self._embedding_cache.set(key, embedding)
+        return embedding
+    
     def retrieve_context(
         self,
         user_query: str,
@@ -61,34 +157,52 @@ class RAGService:
                 logger.warning("Customer context requested without customer_id - denying access")
                 return ""
             
+            query_key = _cache_key(user_query)
+            knowledge_version = self._knowledge_version
+            client_id = self._resolve_client_id(customer_id) if customer_id else None
+            client_version = self._client_version(client_id)
+            
             # 1. Get pricing information (from pricing table, not quotes)
-            pricing_context = self._get_pricing_info(user_query, limit)
+            pricing_context = self._cached_section(
+                "pricing", (query_key, limit, knowledge_version),
+                lambda: self._get_pricing_info(user_query, limit)
+            )
             if pricing_context:
                 context_parts.append(_truncate(pricing_context, MAX_SECTION_CHARS))
             
             # 2. Search customer's own quotes (only if customer_id provided)
             if customer_id:
-                quote_context = self._search_customer_quotes(user_query, customer_id, limit)
+                quote_context = self._cached_section(
+                    "quotes", (query_key, limit, customer_id, client_version),
+                    lambda: self._search_customer_quotes(user_query, customer_id, limit)
+                )
                 if quote_context:
                     context_parts.append(_truncate(quote_context, MAX_SECTION_CHARS))
             
             # 3. Search customer's own forms (only if customer_id provided)
             if customer_id:
-                form_context = self._search_customer_forms(user_query, customer_id, limit)
+                form_context = self._cached_section(
+                    "forms", (query_key, limit, customer_id, client_version, self._forms_version),
+                    lambda: self._search_customer_forms(user_query, customer_id, limit)
+                )
                 if form_context:
                     context_parts.append(_truncate(form_context, MAX_SECTION_CHARS))
             
             # 4. Search knowledge base (FAQs, company info) - public info only
             # Try vector search first, fall back to keyword search
-            knowledge_context = self._search_knowledge_base_vector(user_query, limit)
-            if not knowledge_context:
-                knowledge_context = self._search_knowledge_base(user_query, limit)
+            knowledge_context = self._cached_section(
+                "knowledge", (query_key, limit, knowledge_version),
+                lambda: self._search_knowledge_base_vector(user_query, limit) or self._search_knowledge_base(user_query, limit)
+            )
             if knowledge_context:
                 context_parts.append(_truncate(knowledge_context, MAX_SECTION_CHARS))
             
             # 5. Get customer-specific information (only their own)
             if customer_id:
-                customer_context = self._get_customer_context(customer_id)
+                customer_context = self._cached_section(
+                    "customer", (customer_id, client_version),
+                    lambda: self._get_customer_context(customer_id)
+                )
                 if customer_context:
                     context_parts.append(_truncate(customer_context, MAX_SECTION_CHARS))
 
@@ -332,8 +446,8 @@ class RAGService:
         try:
             embeddings_service = get_embeddings_service()
             
-            # Generate embedding for query
-            query_embedding = embeddings_service.generate_embedding(query)
+            # Generate embedding for query (cached per normalized query)
+            query_embedding = self._get_query_embedding(query)
             if not query_embedding or len(query_embedding) == 0:
                 # Fall back to keyword search if embedding generation fails
                 return ""
@@ -491,3 +605,18 @@ def get_rag_service() -> RAGService:
         _rag_service = RAGService()
     return _rag_service
 
+
+def invalidate_knowledge_context():
+    """Call after knowledge base entries or pricing tables change"""
+    get_rag_service().invalidate_knowledge()
+
+
+def invalidate_form_context():
+    """Call after forms or form-folder assignments change"""
+    get_rag_service().invalidate_forms()
+
+
+def invalidate_client_context(client_id: Optional[str] = None):
+    """Call after a client's quotes change (client_id=None invalidates every client)"""
+    get_rag_service().invalidate_client(client_id)
+
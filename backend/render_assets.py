@@ -0,0 +1,300 @@
+"""
+Shared ReportLab Render Assets
+Process-wide registry for the pieces every PDF renderer used to rebuild per call:
+- fonts, registered with ReportLab once (optional TTFs via RENDER_FONT_REGULAR / RENDER_FONT_BOLD,
+  otherwise the built-in Helvetica faces)
+- ParagraphStyle / TableStyle sets, built once per (font_size, color_scheme)
+- logos, downloaded once, decoded and pre-scaled, then revalidated by ETag
+
+All cached objects are treated as read-only by the renderers, so they are safe to share
+between concurrent renders.
+"""
+import os
+import io
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+
+import requests
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import TableStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+try:
+    from PIL import Image as PILImage
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Optional brand fonts (TTF paths); unset keeps Helvetica
+RENDER_FONT_REGULAR = os.getenv("RENDER_FONT_REGULAR", "")
+RENDER_FONT_BOLD = os.getenv("RENDER_FONT_BOLD", "")
+# Logos are re-checked with If-None-Match at most this often
+LOGO_REVALIDATE_SECONDS = int(os.getenv("RENDER_LOGO_REVALIDATE_SECONDS", "300"))
+# Logos are drawn 0.45in tall; 150px keeps them sharp at ~330 DPI
+LOGO_MAX_HEIGHT_PX = int(os.getenv("RENDER_LOGO_MAX_HEIGHT_PX", "150"))
+LOGO_FETCH_TIMEOUT = 5
+LOGO_CACHE_MAX_ENTRIES = 16
+
+# Palettes for the quote PDF color_scheme option; unknown schemes fall back to "default"
+COLOR_SCHEMES: Dict[str, Dict[str, str]] = {
+    "default": {
+        "text": "#1a1a1a",
+        "heading": "#333333",
+        "status": "#d32f2f",
+        "rule": "#cccccc",
+        "rule_light": "#eeeeee",
+    },
+}
+
+
+@dataclass(frozen=True)
+class FontSet:
+    regular: str
+    bold: str
+
+
+@dataclass(frozen=True)
+class LogoAsset:
+    """Pre-scaled logo image, ready to wrap in a platypus Image"""
+    image_bytes: bytes
+    aspect: float
+    digest: str
+
+    def open(self) -> io.BytesIO:
+        """Fresh file object per render (platypus Images hold their own file handle)"""
+        return io.BytesIO(self.image_bytes)
+
+
+_font_lock = threading.Lock()
+_fonts: Optional[FontSet] = None
+
+
+def get_fonts() -> FontSet:
+    """Register the configured fonts once and return their ReportLab names"""
+    global _fonts
+    if _fonts is not None:
+        return _fonts
+
+    with _font_lock:
+        if _fonts is None:
+            fonts = FontSet(regular="Helvetica", bold="Helvetica-Bold")
+            if RENDER_FONT_REGULAR and RENDER_FONT_BOLD:
+                try:
+                    pdfmetrics.registerFont(TTFont("Brand", RENDER_FONT_REGULAR))
+                    pdfmetrics.registerFont(TTFont("Brand-Bold", RENDER_FONT_BOLD))
+                    fonts = FontSet(regular="Brand", bold="Brand-Bold")
+                except Exception as e:
+                    logger.warning(f"Failed to register brand fonts, using Helvetica: {str(e)}")
+            _fonts = fonts
+    return _fonts
+
+
+@lru_cache(maxsize=1)
+def get_sample_styles():
+    """ReportLab's sample stylesheet (building it allocates ~40 styles, so do it once)"""
+    return getSampleStyleSheet()
+
+
+def resolve_color_scheme(color_scheme: Optional[str]) -> str:
+    return color_scheme if color_scheme in COLOR_SCHEMES else "default"
+
+
+@lru_cache(maxsize=64)
+def _build_quote_styles(font_size: int, color_scheme: str) -> Dict[str, ParagraphStyle]:
+    fonts = get_fonts()
+    palette = COLOR_SCHEMES[color_scheme]
+    styles = get_sample_styles()
+
+    # Base Text (Left Aligned)
+    normal = ParagraphStyle(
+        'CompactNormal',
+        parent=styles['Normal'],
+        fontSize=font_size,
+        fontName=fonts.regular,
+        textColor=colors.HexColor(palette["text"]),
+        leading=font_size + 2,
+        alignment=0  # TA_LEFT
+    )
+    # Right aligned text for numeric columns
+    right_info = ParagraphStyle('RightInfo', parent=normal, alignment=2)
+
+    return {
+        "normal": normal,
+        "table_right": ParagraphStyle('TableRight', parent=normal, alignment=2),
+        "heading": ParagraphStyle(
+            'SectionHeader',
+            parent=normal,
+            fontSize=font_size + 1,
+            fontName=fonts.bold,
+            spaceAfter=4,
+            textColor=colors.HexColor(palette["heading"]),
+        ),
+        "bold_left": ParagraphStyle('BoldLeft', parent=normal, fontName=fonts.bold, alignment=0),
+        "bold_right": ParagraphStyle('BoldRight', parent=normal, fontName=fonts.bold, alignment=2),
+        "right_info": right_info,
+        "right_bold": ParagraphStyle('RightBold', parent=right_info, fontName=fonts.bold),
+        "status": ParagraphStyle('Status', parent=right_info, textColor=colors.HexColor(palette["status"]), fontSize=font_size - 1),
+        "footer": ParagraphStyle('Footer', parent=normal, fontSize=8, textColor=colors.gray),
+    }
+
+
+def get_quote_styles(font_size: int, color_scheme: Optional[str] = "default") -> Dict[str, ParagraphStyle]:
+    """Paragraph styles for the quote PDF, shared by every render with the same options"""
+    return _build_quote_styles(int(font_size), resolve_color_scheme(color_scheme))
+
+
+def get_quote_palette(color_scheme: Optional[str] = "default") -> Dict[str, str]:
+    return COLOR_SCHEMES[resolve_color_scheme(color_scheme)]
+
+
+@lru_cache(maxsize=1)
+def get_submission_export_styles() -> Dict:
+    """Paragraph and table styles for the form submissions export"""
+    fonts = get_fonts()
+    styles = get_sample_styles()
+    header_row = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), fonts.bold),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ]
+    return {
+        "normal": styles['Normal'],
+        "section": styles['Heading3'],
+        "title": ParagraphStyle(
+            'Title',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=colors.HexColor('#1a1a1a'),
+            spaceAfter=12,
+        ),
+        "submission_header": ParagraphStyle(
+            'SubmissionHeader',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#333333'),
+            spaceAfter=8,
+        ),
+        "metadata_table": TableStyle(header_row + [
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ]),
+        "answers_table": TableStyle(header_row + [
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]),
+    }
+
+
+class LogoCache:
+    """Logos keyed by URL; revalidated with If-None-Match instead of re-downloaded"""
+
+    def __init__(self, max_entries: int = LOGO_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # url -> {"asset", "etag", "checked_at"}
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def _prescale(content: bytes) -> LogoAsset:
+        digest = hashlib.sha256(content).hexdigest()
+        if not PIL_AVAILABLE:
+            return LogoAsset(image_bytes=content, aspect=1.0, digest=digest)
+
+        img = PILImage.open(io.BytesIO(content))
+        width, height = img.size
+        aspect = width / height
+        if height > LOGO_MAX_HEIGHT_PX:
+            img = img.convert("RGBA") if img.mode not in ("RGB", "RGBA") else img
+            img = img.resize((max(int(LOGO_MAX_HEIGHT_PX * aspect), 1), LOGO_MAX_HEIGHT_PX), PILImage.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG", optimize=True)
+            content = buffer.getvalue()
+        return LogoAsset(image_bytes=content, aspect=aspect, digest=digest)
+
+    def get(self, url: str) -> Optional[LogoAsset]:
+        """Cached logo for a URL, or None if it cannot be fetched/decoded"""
+        if not url:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(url)
+        now = time.monotonic()
+        if entry and now - entry["checked_at"] < LOGO_REVALIDATE_SECONDS:
+            return entry["asset"]
+
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+
+        try:
+            self.fetches += 1
+            response = requests.get(url, headers=headers, timeout=LOGO_FETCH_TIMEOUT)
+            if response.status_code == 304 and entry:
+                self.not_modified += 1
+                asset, etag = entry["asset"], entry.get("etag")
+            elif response.status_code == 200:
+                asset, etag = self._prescale(response.content), response.headers.get("ETag")
+            else:
+                return entry["asset"] if entry else None
+        except Exception as e:
+            logger.warning(f"Failed to fetch logo {url}: {str(e)}")
+            # Keep serving the last good copy; retry after the next revalidation window
+            if entry:
+                with self._lock:
+                    entry["checked_at"] = now
+                return entry["asset"]
+            return None
+
+        with self._lock:
+            self._entries[url] = {"asset": asset, "etag": etag, "checked_at": now}
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+        return asset
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self._entries),
+            "fetches": self.fetches,
+            "not_modified": self.not_modified
+        }
+
+
+# Singleton instance
+logo_cache = LogoCache()
+
+
+def get_logo(url: Optional[str]) -> Optional[LogoAsset]:
+    """Decoded, pre-scaled logo for a URL (None if unavailable)"""
+    return logo_cache.get(url) if url else None
+
+
+def clear_render_assets():
+    """Drop every cached asset (benchmarks, or after replacing fonts)"""
+    global _fonts
+    logo_cache.clear()
+    _build_quote_styles.cache_clear()
+    get_submission_export_styles.cache_clear()
+    get_sample_styles.cache_clear()
+    with _font_lock:
+        _fonts = None
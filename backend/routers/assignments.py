@@ -2,12 +2,15 @@
 Assignment endpoints for quotes and forms
 Allows admins to assign quotes and forms to customers
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from pydantic import BaseModel
 from typing import List, Optional
 from database import supabase, supabase_storage, supabase_url, supabase_service_role_key
 from auth import get_current_admin, get_current_user
 from email_service import email_service
+from rag_service import invalidate_form_context
+from folder_snapshots import invalidate_folder_snapshot
+from quote_list_utils import list_quotes, quote_list_response, quote_select
 import uuid
 from datetime import datetime
 import requests
@@ -301,6 +304,8 @@ async def assign_form(
                     "assigned_at": datetime.now().isoformat()
                 }
                 result = supabase_storage.table("form_folder_assignments").insert(assignment_data).execute()
+                invalidate_form_context()
+                invalidate_folder_snapshot(folder_id)
                 if result.data:
                     assignments.append(result.data[0]["id"])
         
@@ -436,11 +441,15 @@ async def unassign_form(
     try:
         # Use service role client to bypass RLS for admin operations
         result = supabase_storage.table("form_folder_assignments").delete().eq("id", assignment_id).eq("form_id", form_id).execute()
+        invalidate_form_context()
         
         # Verify the assignment was deleted
         if not result.data:
             raise HTTPException(status_code=404, detail="Assignment not found")
         
+        for deleted in result.data:
+            invalidate_folder_snapshot(deleted.get("folder_id"))
+        
         return {"message": "Form removed from folder successfully"}
         
     except HTTPException:
@@ -454,35 +463,24 @@ async def unassign_form(
 
 # Customer endpoints to get their assigned items
 @router.get("/customer/quotes")
-async def get_customer_quotes(current_user: dict = Depends(get_current_user)):
+async def get_customer_quotes(
+    view: Optional[str] = Query("full", description="full (all fields, client and line items) or summary (list columns only)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (overrides view); clients and line_items embed related rows"),
+    current_user: dict = Depends(get_current_user)
+):
     """
     Get all quotes assigned to folders the current customer has access to.
+    view=summary or fields=... return only the selected fields.
     """
     try:
-        # Get folders assigned to user
-        folder_assignments_response = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", current_user["id"]).execute()
-        accessible_folder_ids = [fa["folder_id"] for fa in (folder_assignments_response.data or [])]
-        
-        if not accessible_folder_ids:
-            return []
-        
-        # Get quotes assigned to these folders
-        quote_assignments_response = supabase_storage.table("quote_folder_assignments").select("quote_id").in_("folder_id", accessible_folder_ids).execute()
-        quote_ids = [qa["quote_id"] for qa in (quote_assignments_response.data or [])]
-        
-        # Also get quotes with folder_id directly set (for backward compatibility)
-        quotes_with_folder = supabase_storage.table("quotes").select("id").in_("folder_id", accessible_folder_ids).execute()
-        direct_quote_ids = [q["id"] for q in (quotes_with_folder.data or [])]
-        
-        # Combine and deduplicate
-        all_quote_ids = list(set(quote_ids + direct_quote_ids))
-        
-        if not all_quote_ids:
-            return []
-        
-        # Get the quotes - use service role client to bypass RLS
-        quotes_response = supabase_storage.table("quotes").select("*, clients(*), line_items(*)").in_("id", all_quote_ids).order("created_at", desc=True).execute()
-        return quotes_response.data or []
+        select = quote_select(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    try:
+        # Folder access, ordering and projection resolve in one request (list_quotes RPC)
+        quotes = list_quotes(select, accessible_to_user=current_user["id"])
+        return quote_list_response(quotes, select)
         
     except Exception as e:
         raise HTTPException(
@@ -25,6 +25,8 @@ from ai_action_executor import AIActionExecutor
 from chat_cleanup import cleanup_old_chat_history
 from attachment_service import download_attachment, extract_text_from_attachment_bytes
 from calcom_service import CalComService
+from upload_utils import FileTooLargeError, spool_upload
+from signed_urls import get_signed_url
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
@@ -1326,16 +1328,15 @@ async def upload_file(
                 detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
             )
         
-        # Read file content
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        # Validate file size
-        if file_size > MAX_FILE_SIZE:
+        # Stream file content into a spooled temp file; the size limit is enforced while reading
+        try:
+            file_upload = await spool_upload(file, MAX_FILE_SIZE, hash_names=())
+        except FileTooLargeError:
             raise HTTPException(
                 status_code=400,
                 detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE / (1024 * 1024):.1f}MB"
             )
+        file_size = file_upload.size
         
         # Validate content type (if provided)
         if file.content_type and file.content_type not in ALLOWED_FILE_TYPES:
@@ -1348,24 +1349,21 @@ async def upload_file(
         
         # Upload to Supabase Storage
         try:
-            supabase_storage.storage.from_("project-files").upload(
-                unique_filename,
-                file_content,
-                file_options={
-                    "content-type": file.content_type or "application/octet-stream",
-                    "upsert": "false"
-                }
-            )
+            with file_upload, file_upload.storage_body() as body:
+                supabase_storage.storage.from_("project-files").upload(
+                    unique_filename,
+                    body,
+                    file_options={
+                        "content-type": file.content_type or "application/octet-stream",
+                        "upsert": "false"
+                    }
+                )
         except Exception as storage_error:
             raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(storage_error)}")
         
         # Get signed URL
         try:
-            signed_url_response = supabase_storage.storage.from_("project-files").create_signed_url(unique_filename, 3600 * 24 * 365)  # 1 year expiry
-            if isinstance(signed_url_response, dict):
-                signed_url = signed_url_response.get("signedURL") or signed_url_response.get("signed_url")
-            else:
-                signed_url = signed_url_response
+            signed_url = get_signed_url(unique_filename, expires_in=3600 * 24 * 365)  # 1 year expiry
         except Exception as url_error:
             print(f"Warning: Could not get signed URL: {str(url_error)}")
             signed_url = None
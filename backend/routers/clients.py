@@ -3,12 +3,12 @@ from typing import List, Dict, Any, Optional
 import sys
 import os
 import uuid
-import hashlib
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models import Client, ClientCreate, ProfileCompletionStatus
 from database import supabase, supabase_storage, supabase_url, supabase_service_role_key
 from stripe_service import StripeService
 from auth import get_current_user, get_current_admin
+from upload_utils import FileTooLargeError, spool_upload
 from audit_logger import log_audit_event
 import requests
 import logging
@@ -530,13 +530,14 @@ async def upload_profile_picture(
         if not file.content_type or not file.content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Validate file size
-        file_content = await file.read()
-        if len(file_content) > MAX_PROFILE_PICTURE_SIZE:
+        # Stream into a spooled temp file, validating size and hashing as it is read
+        try:
+            file_upload = await spool_upload(file, MAX_PROFILE_PICTURE_SIZE)
+        except FileTooLargeError:
             raise HTTPException(status_code=400, detail=f"File size exceeds {MAX_PROFILE_PICTURE_SIZE / (1024*1024)}MB limit")
         
         # Generate unique filename
-        file_hash = hashlib.md5(file_content).hexdigest()[:8]
+        file_hash = file_upload.hexdigest("md5")[:8]
         file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
         file_id = str(uuid.uuid4())
         unique_filename = f"profile-pictures/{user_id}/{file_id}_{file_hash}.{file_extension}"
@@ -560,14 +561,15 @@ async def upload_profile_picture(
         
         # Upload to Supabase Storage (bucket: profile-pictures)
         try:
-            upload_response = supabase_storage.storage.from_("profile-pictures").upload(
-                unique_filename,
-                file_content,
-                file_options={
-                    "content-type": file.content_type,
-                    "upsert": "false"
-                }
-            )
+            with file_upload, file_upload.storage_body() as body:
+                supabase_storage.storage.from_("profile-pictures").upload(
+                    unique_filename,
+                    body,
+                    file_options={
+                        "content-type": file.content_type,
+                        "upsert": "false"
+                    }
+                )
         except Exception as storage_error:
             error_msg = str(storage_error)
             logger.error("Storage upload error: %s", error_msg)
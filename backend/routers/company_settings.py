@@ -6,6 +6,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models import CompanySettings, CompanySettingsUpdate
 from database import supabase_storage
+from pdf_cache import invalidate_company_settings
 
 router = APIRouter(prefix="/api/company-settings", tags=["company-settings"])
 
@@ -48,6 +49,7 @@ async def update_company_settings(settings: CompanySettingsUpdate):
             response = supabase_storage.table("company_settings").update(update_data).eq("id", existing.data[0]["id"]).execute()
             if not response.data:
                 raise HTTPException(status_code=404, detail="Company settings not found")
+            invalidate_company_settings()
             return response.data[0]
         else:
             # Create new
@@ -57,6 +59,7 @@ async def update_company_settings(settings: CompanySettingsUpdate):
             response = supabase_storage.table("company_settings").insert(update_data).execute()
             if not response.data:
                 raise HTTPException(status_code=500, detail="Failed to create company settings")
+            invalidate_company_settings()
             return response.data[0]
     except HTTPException:
         raise
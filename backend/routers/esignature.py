@@ -5,7 +5,6 @@ import sys
 import os
 import uuid
 import base64
-import io
 import hashlib
 from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -16,19 +15,32 @@ from models import (
 )
 from database import supabase, supabase_storage, supabase_url, supabase_service_role_key
 from auth import get_current_user, get_current_admin
+from folder_snapshots import invalidate_folder_snapshot
+from access_control import get_access_control
+from signed_urls import get_signed_url
+from cache_utils import TTLCache, MISSING
+from template_provisioning_service import invalidate_provisioning_templates
 
 router = APIRouter(prefix="/api/esignature", tags=["esignature"])
 
-# PDF manipulation imports
-try:
-    from pypdf import PdfReader, PdfWriter
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter
-    from PIL import Image
-    PDF_LIBRARIES_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: PDF libraries not available: {e}")
-    PDF_LIBRARIES_AVAILABLE = False
+# PDF manipulation runs in the render pool (see pdf_renderers / pdf_render_service)
+from pdf_renderers import embed_signature_in_pdf
+from pdf_render_service import get_pdf_render_service
+
+# Source PDFs of documents being signed, by storage path (a path's bytes never
+# change: blob paths are content-addressed and never reused after deletion)
+SOURCE_PDF_CACHE_ENTRIES = int(os.getenv("ESIGNATURE_SOURCE_PDF_CACHE_ENTRIES", "16"))
+SOURCE_PDF_CACHE_TTL_SECONDS = int(os.getenv("ESIGNATURE_SOURCE_PDF_CACHE_TTL_SECONDS", "3600"))
+_source_pdf_cache = TTLCache(maxsize=SOURCE_PDF_CACHE_ENTRIES, ttl_seconds=SOURCE_PDF_CACHE_TTL_SECONDS)
+
+
+def _download_source_pdf(storage_path: str) -> bytes:
+    """Original PDF bytes; a document signed repeatedly is downloaded once"""
+    pdf_bytes = _source_pdf_cache.get(storage_path)
+    if pdf_bytes is MISSING:
+        pdf_bytes = supabase_storage.storage.from_("project-files").download(storage_path)
+        _source_pdf_cache.set(storage_path, pdf_bytes)
+    return pdf_bytes
 
 @router.get("/documents", response_model=List[ESignatureDocument])
 async def list_documents(
@@ -198,7 +210,11 @@ async def create_document(
             raise HTTPException(status_code=500, detail="Failed to create document: Insert returned no data")
         
         logger.info(f"Document created successfully with ID: {response.data[0].get('id')}")
-        return response.data[0]
+        created_document = response.data[0]
+        if created_document.get("folder_id") and not created_document.get("is_template"):
+            invalidate_folder_snapshot(created_document["folder_id"])
+        invalidate_provisioning_templates()
+        return created_document
     except HTTPException:
         raise
     except Exception as e:
@@ -241,7 +257,13 @@ async def update_document(
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to update document")
         
-        return response.data[0]
+        # Folder copies show up in folder content (old and new folder if it moved)
+        updated_document = response.data[0]
+        for document in (existing.data, updated_document):
+            if document.get("folder_id") and not document.get("is_template"):
+                invalidate_folder_snapshot(document["folder_id"])
+        invalidate_provisioning_templates()
+        return updated_document
     except HTTPException:
         raise
     except Exception as e:
@@ -271,6 +293,8 @@ async def delete_document(document_id: str, user = Depends(get_current_user)):
         
         # Delete document (cascade will handle signatures) - use service role client
         supabase_storage.table("esignature_documents").delete().eq("id", document_id).execute()
+        invalidate_folder_snapshot(existing.data.get("folder_id"))
+        invalidate_provisioning_templates()
         
         return {"message": "Document deleted successfully"}
     except HTTPException:
@@ -345,16 +369,8 @@ async def get_document_preview(document_id: str, user = Depends(get_current_user
         
         # Get signed URL - handle both dict and string responses
         try:
-            signed_url_result = supabase_storage.storage.from_("project-files").create_signed_url(storage_path, 3600)
-            
-            # Extract URL from response (can be dict or string depending on client version)
-            if isinstance(signed_url_result, dict):
-                signed_url = signed_url_result.get("signedURL") or signed_url_result.get("signed_url") or signed_url_result.get("url")
-            elif isinstance(signed_url_result, str):
-                signed_url = signed_url_result
-            else:
-                # Try to get URL from response object if it has attributes
-                signed_url = getattr(signed_url_result, "signedURL", None) or getattr(signed_url_result, "signed_url", None) or getattr(signed_url_result, "url", None) or str(signed_url_result)
+            # Cached signed URL (re-signed shortly before it expires)
+            signed_url = get_signed_url(storage_path)
             
             if not signed_url:
                 raise HTTPException(status_code=500, detail="Failed to generate signed URL")
@@ -373,157 +389,6 @@ async def get_document_preview(document_id: str, user = Depends(get_current_user
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to get preview: {str(e)}")
 
-def embed_signature_in_pdf(pdf_bytes: bytes, signature_image_bytes: bytes, signature_type: str = "draw") -> bytes:
-    """
-    Embed signature into PDF (simple mode - bottom of last page).
-    
-    Args:
-        pdf_bytes: Original PDF file bytes
-        signature_image_bytes: Signature image bytes (PNG/JPEG) or text for typed signatures
-        signature_type: "draw", "type", or "upload"
-    
-    Returns:
-        bytes: PDF with embedded signature
-    """
-    if not PDF_LIBRARIES_AVAILABLE:
-        raise HTTPException(status_code=500, detail="PDF libraries not available")
-    
-    try:
-        # Read original PDF
-        pdf_reader = PdfReader(io.BytesIO(pdf_bytes))
-        pdf_writer = PdfWriter()
-        
-        # Copy all pages except the last one
-        for page_num in range(len(pdf_reader.pages) - 1):
-            pdf_writer.add_page(pdf_reader.pages[page_num])
-        
-        # Get last page
-        last_page = pdf_reader.pages[-1]
-        page_width = float(last_page.mediabox.width)
-        page_height = float(last_page.mediabox.height)
-        
-        # Create a new page with signature overlay
-        packet = io.BytesIO()
-        can = canvas.Canvas(packet, pagesize=(page_width, page_height))
-        
-        # Signature dimensions
-        sig_width = min(200, page_width * 0.4)
-        sig_height = 60
-        
-        # Position at bottom center
-        x = (page_width - sig_width) / 2
-        y = 50  # 50 points from bottom
-        
-        if signature_type == "draw" or signature_type == "upload":
-            # Embed image signature
-            try:
-                # Decode base64 if needed
-                if isinstance(signature_image_bytes, str):
-                    signature_image_bytes = base64.b64decode(signature_image_bytes)
-                
-                # Load image
-                img = Image.open(io.BytesIO(signature_image_bytes))
-                # Resize to fit while maintaining aspect ratio
-                img.thumbnail((int(sig_width), int(sig_height)), Image.Resampling.LANCZOS)
-                
-                # Save to temporary file for ReportLab (ReportLab needs a file path or PIL Image)
-                import tempfile
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_file:
-                    img.save(tmp_file.name, format='PNG')
-                    tmp_path = tmp_file.name
-                
-                try:
-                    # Draw image on canvas using file path
-                    can.drawImage(tmp_path, x, y, width=sig_width, height=sig_height, preserveAspectRatio=True, mask='auto')
-                finally:
-                    # Clean up temp file
-                    import os
-                    try:
-                        os.unlink(tmp_path)
-                    except:
-                        pass
-            except Exception as img_error:
-                print(f"Error embedding image signature: {str(img_error)}")
-                import traceback
-                traceback.print_exc()
-                # Fallback: draw text
-                can.setFont("Helvetica-Bold", 12)
-                can.drawString(x, y + 20, "Signature")
-        elif signature_type == "type":
-            # Draw text signature
-            can.setFont("Helvetica-Bold", 14)
-            # Decode signature text - handle both base64 encoded and plain text
-            if isinstance(signature_image_bytes, bytes):
-                try:
-                    # Try to decode as UTF-8 first
-                    signature_text = signature_image_bytes.decode('utf-8')
-                    # If it looks like base64, try decoding it
-                    if len(signature_text) > 0 and not signature_text.isprintable():
-                        try:
-                            signature_text = base64.b64decode(signature_text).decode('utf-8')
-                        except:
-                            pass  # Use original if base64 decode fails
-                except:
-                    signature_text = str(signature_image_bytes)
-            else:
-                # String input
-                signature_text = str(signature_image_bytes)
-                # Check if it's base64 encoded (common pattern: alphanumeric with = padding)
-                if len(signature_text) > 10 and (signature_text.endswith('=') or not signature_text.isprintable()):
-                    try:
-                        signature_text = base64.b64decode(signature_text).decode('utf-8')
-                    except:
-                        pass  # Use original if base64 decode fails
-            
-            # Wrap text if needed
-            text_width = can.stringWidth(signature_text, "Helvetica-Bold", 14)
-            if text_width > sig_width:
-                # Simple text wrapping (split by spaces)
-                words = signature_text.split()
-                lines = []
-                current_line = []
-                current_width = 0
-                for word in words:
-                    word_width = can.stringWidth(word + " ", "Helvetica-Bold", 14)
-                    if current_width + word_width > sig_width and current_line:
-                        lines.append(" ".join(current_line))
-                        current_line = [word]
-                        current_width = word_width
-                    else:
-                        current_line.append(word)
-                        current_width += word_width
-                if current_line:
-                    lines.append(" ".join(current_line))
-                
-                # Draw lines
-                line_height = 18
-                for i, line in enumerate(lines):
-                    can.drawString(x, y + sig_height - (i + 1) * line_height, line)
-            else:
-                can.drawString(x, y + 20, signature_text)
-        
-        # Add signature label
-        can.setFont("Helvetica", 10)
-        can.drawString(x, y - 15, "Signed Electronically")
-        
-        can.save()
-        packet.seek(0)
-        signature_pdf = PdfReader(packet)
-        
-        # Merge signature overlay with last page
-        last_page.merge_page(signature_pdf.pages[0])
-        pdf_writer.add_page(last_page)
-        
-        # Write final PDF
-        output = io.BytesIO()
-        pdf_writer.write(output)
-        output.seek(0)
-        
-        return output.read()
-    except Exception as e:
-        print(f"Error embedding signature in PDF: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to embed signature: {str(e)}")
-
 @router.post("/documents/{document_id}/sign", response_model=ESignatureSignature)
 async def sign_document(
     document_id: str,
@@ -533,14 +398,6 @@ async def sign_document(
 ):
     """Sign an e-signature document (simple mode)."""
     try:
-        # Check if user is admin
-        is_admin = False
-        try:
-            user_role_response = supabase_storage.table("user_roles").select("role").eq("user_id", user["id"]).single().execute()
-            is_admin = user_role_response.data and user_role_response.data.get("role") == "admin"
-        except Exception:
-            is_admin = False
-        
         # Get document - use service role client to bypass RLS
         doc_response = supabase_storage.table("esignature_documents").select("*, files(*)").eq("id", document_id).single().execute()
         if not doc_response.data:
@@ -548,36 +405,10 @@ async def sign_document(
         
         document = doc_response.data
         
-        # Check access if not admin
-        if not is_admin:
-            # Customers can sign documents they created or documents in folders they have access to
-            if document.get("created_by") != user["id"]:
-                # Check folder access
-                folder_id = document.get("folder_id")
-                if folder_id:
-                    try:
-                        # Check if user has access to the folder
-                        folder_assignment = supabase_storage.table("folder_assignments").select("folder_id").eq("folder_id", folder_id).eq("user_id", user["id"]).execute()
-                        if not folder_assignment.data:
-                            # Also check if user is the client for this folder
-                            folder_response = supabase_storage.table("folders").select("client_id").eq("id", folder_id).single().execute()
-                            if folder_response.data:
-                                client_id = folder_response.data.get("client_id")
-                                if client_id:
-                                    # Check if user is linked to this client
-                                    client_response = supabase_storage.table("clients").select("user_id").eq("id", client_id).single().execute()
-                                    if not client_response.data or client_response.data.get("user_id") != user["id"]:
-                                        raise HTTPException(status_code=403, detail="Access denied")
-                            else:
-                                raise HTTPException(status_code=403, detail="Access denied")
-                    except HTTPException:
-                        raise
-                    except Exception:
-                        # If folder_assignments doesn't exist or other error, deny access
-                        raise HTTPException(status_code=403, detail="Access denied")
-                else:
-                    # Document not in a folder and user didn't create it
-                    raise HTTPException(status_code=403, detail="Access denied")
+        # Customers can sign documents they created or documents in folders they are
+        # assigned to or whose client is linked to their account
+        if not get_access_control().can_sign_document(user, document):
+            raise HTTPException(status_code=403, detail="Access denied")
         
         # Check if already signed
         if document.get("status") == "signed":
@@ -610,9 +441,9 @@ async def sign_document(
         if not storage_path:
             raise HTTPException(status_code=500, detail="File storage path not found")
         
-        # Download original PDF
+        # Download original PDF (cached: storage objects are never overwritten)
         try:
-            pdf_bytes = supabase_storage.storage.from_("project-files").download(storage_path)
+            pdf_bytes = _download_source_pdf(storage_path)
         except Exception as download_error:
             raise HTTPException(status_code=500, detail=f"Failed to download PDF: {str(download_error)}")
         
@@ -648,7 +479,12 @@ async def sign_document(
         
         # Embed signature in PDF
         try:
-            signed_pdf_bytes = embed_signature_in_pdf(pdf_bytes, signature_image_bytes, signature.signature_type)
+            signed_pdf_bytes = await get_pdf_render_service().render(
+                embed_signature_in_pdf, pdf_bytes, signature_image_bytes, signature.signature_type,
+                template_key=storage_path
+            )
+        except HTTPException:
+            raise
         except Exception as embed_error:
             raise HTTPException(status_code=500, detail=f"Failed to embed signature: {str(embed_error)}")
         
@@ -671,7 +507,7 @@ async def sign_document(
         
         # Get signed URL
         try:
-            signed_url = supabase_storage.storage.from_("project-files").create_signed_url(signed_filename, 3600 * 24 * 365)  # 1 year
+            signed_url = get_signed_url(signed_filename, expires_in=3600 * 24 * 365)  # 1 year
         except Exception:
             signed_url = None
         
@@ -738,6 +574,7 @@ async def sign_document(
         supabase_storage.table("esignature_documents").update(update_data).eq("id", document_id).execute()
 
         # Best-effort folder event for timeline (only if doc is in a folder)
+        invalidate_folder_snapshot(signature_data_record.get("folder_id"))
         try:
             folder_id = signature_data_record.get("folder_id")
             if folder_id:
@@ -850,16 +687,8 @@ async def get_signed_pdf(document_id: str, user = Depends(get_current_user)):
         
         # Get signed URL - handle both dict and string responses
         try:
-            signed_url_result = supabase_storage.storage.from_("project-files").create_signed_url(storage_path, 3600)
-            
-            # Extract URL from response (can be dict or string depending on client version)
-            if isinstance(signed_url_result, dict):
-                signed_url = signed_url_result.get("signedURL") or signed_url_result.get("signed_url") or signed_url_result.get("url")
-            elif isinstance(signed_url_result, str):
-                signed_url = signed_url_result
-            else:
-                # Try to get URL from response object if it has attributes
-                signed_url = getattr(signed_url_result, "signedURL", None) or getattr(signed_url_result, "signed_url", None) or getattr(signed_url_result, "url", None) or str(signed_url_result)
+            # Cached signed URL (re-signed shortly before it expires)
+            signed_url = get_signed_url(storage_path)
             
             if not signed_url:
                 raise HTTPException(status_code=500, detail="Failed to generate signed URL")
@@ -1,17 +1,23 @@
 from fastapi import APIRouter, HTTPException, Query, Depends, UploadFile, File as FastAPIFile, Request
 from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 import sys
 import os
 import uuid
-import hashlib
 import zipfile
-import io
 from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models import File, FileCreate, FileUpdate, FileFolderAssignment, FileFolderAssignmentCreate
 from database import supabase, supabase_storage, supabase_url, supabase_service_role_key
 from auth import get_current_user, get_current_admin
+from folder_snapshots import invalidate_folder_snapshot
+from access_control import get_access_control
+from upload_utils import SpooledUpload, FileTooLargeError, spool_upload
+from file_blobs import store_blob, release_blob, release_file_storage
+from zip_ingest import ingest_zip
+from signed_urls import get_signed_url, get_signed_url_service, with_signed_urls
+from thumbnail_service import THUMBNAIL_SIZES, get_thumbnail_path, get_thumbnail_service, remove_thumbnails, schedule_thumbnails
 
 router = APIRouter(prefix="/api/files", tags=["files"])
 
@@ -123,24 +129,25 @@ async def list_files(
                 query = query.in_("id", list(accessible_file_ids))
         
         response = query.order("created_at", desc=True).execute()
-        return response.data if response.data else []
+        return with_signed_urls(response.data) if response.data else []
     except Exception as e:
         print(f"Error listing files: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
 
+@router.get("/signed-urls/stats")
+async def get_signed_url_stats(current_admin: dict = Depends(get_current_admin)):
+    """Signed URL cache counters (admin only)"""
+    return get_signed_url_service().stats()
+
+@router.get("/thumbnails/stats")
+async def get_thumbnail_stats(current_admin: dict = Depends(get_current_admin)):
+    """Thumbnail generation counters (admin only)"""
+    return get_thumbnail_service().stats()
+
 @router.get("/{file_id}", response_model=File)
 async def get_file(file_id: str, user = Depends(get_current_user)):
     """Get file details by ID."""
     try:
-        # Check if user is admin
-        is_admin = False
-        try:
-            user_role_response = supabase_storage.table("user_roles").select("role").eq("user_id", user["id"]).single().execute()
-            is_admin = user_role_response.data and user_role_response.data.get("role") == "admin"
-        except Exception:
-            # User doesn't have a role record, default to customer
-            is_admin = False
-        
         # Use service role client to bypass RLS (user is already authenticated)
         response = supabase_storage.table("files").select("*").eq("id", file_id).single().execute()
         
@@ -149,32 +156,9 @@ async def get_file(file_id: str, user = Depends(get_current_user)):
         
         file_data = response.data
         
-        # Check access if not admin
-        if not is_admin:
-            # Check if user uploaded it
-            if file_data.get("uploaded_by") != user["id"]:
-                # Check if file is in accessible folder
-                folder_id = file_data.get("folder_id")
-                if folder_id:
-                    try:
-                        folder_assignment = supabase_storage.table("folder_assignments").select("folder_id").eq("folder_id", folder_id).eq("user_id", user["id"]).execute()
-                        if not folder_assignment.data:
-                            # Check many-to-many assignments
-                            try:
-                                file_assignment = supabase_storage.table("file_folder_assignments").select("folder_id").eq("file_id", file_id).execute()
-                                if file_assignment.data:
-                                    accessible_folder_ids = [fa["folder_id"] for fa in file_assignment.data]
-                                    user_folders = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", user["id"]).in_("folder_id", accessible_folder_ids).execute()
-                                    if not user_folders.data:
-                                        raise HTTPException(status_code=403, detail="Access denied")
-                                else:
-                                    raise HTTPException(status_code=403, detail="Access denied")
-                            except Exception:
-                                # Tables might not exist yet, deny access if user didn't upload
-                                raise HTTPException(status_code=403, detail="Access denied")
-                    except Exception:
-                        # folder_assignments table doesn't exist yet, deny access if user didn't upload
-                        raise HTTPException(status_code=403, detail="Access denied")
+        # Admins, the uploader, or a user with access to the file's folder
+        if not get_access_control().can_access_file(user, file_data):
+            raise HTTPException(status_code=403, detail="Access denied")
         
         # Track file view (idempotent - uses UNIQUE constraint)
         try:
@@ -186,11 +170,13 @@ async def get_file(file_id: str, user = Depends(get_current_user)):
             }
             # Use INSERT ... ON CONFLICT DO NOTHING to make it idempotent
             supabase_storage.table("file_views").insert(view_data).execute()
+            # Only a first view gets here (repeat views hit the UNIQUE constraint)
+            invalidate_folder_snapshot(file_data.get("folder_id"))
         except Exception as view_error:
             # Log but don't fail the request if view tracking fails
             print(f"Warning: Failed to track file view: {str(view_error)}")
         
-        return file_data
+        return with_signed_urls([file_data])[0]
     except HTTPException:
         raise
     except Exception as e:
@@ -198,7 +184,7 @@ async def get_file(file_id: str, user = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Failed to get file: {str(e)}")
 
 async def _upload_single_file(
-    file_content: bytes,
+    upload: SpooledUpload,
     filename: str,
     content_type: Optional[str],
     folder_id: Optional[str],
@@ -209,23 +195,16 @@ async def _upload_single_file(
     user_id: str
 ) -> dict:
     """Helper function to upload a single file to storage and database."""
-    # Generate unique filename
-    file_hash = hashlib.md5(file_content).hexdigest()[:8]
-    file_extension = filename.split('.')[-1] if '.' in filename else ''
     file_id = str(uuid.uuid4())
-    unique_filename = f"{file_id}/{file_hash}_{uuid.uuid4().hex[:8]}.{file_extension}" if file_extension else f"{file_id}/{file_hash}_{uuid.uuid4().hex[:8]}"
     
-    # Upload to Supabase Storage (bucket: project-files)
+    # Store content once per SHA-256 (computed while the upload was streamed in);
+    # identical content already in storage only gains a reference
     try:
-        upload_result = supabase_storage.storage.from_("project-files").upload(
-            unique_filename,
-            file_content,
-            file_options={
-                "content-type": content_type or "application/octet-stream",
-                "upsert": "false"
-            }
-        )
-        print(f"File uploaded successfully: {unique_filename}")
+        content_sha256, unique_filename, uploaded = store_blob(upload, filename, content_type)
+        if uploaded:
+            print(f"File uploaded successfully: {unique_filename}")
+        else:
+            print(f"File content already stored, reusing: {unique_filename}")
     except Exception as storage_error:
         error_msg = str(storage_error)
         error_type = type(storage_error).__name__
@@ -248,21 +227,12 @@ async def _upload_single_file(
         )
     
     # Get signed URL (temporary, expires in 1 hour)
-    # Note: We store this in the database but it will expire. The preview endpoint generates fresh URLs.
+    # Note: We store this in the database but it will expire. Responses replace it with a fresh
+    # URL from the signed URL cache, which this call also primes.
     try:
-        signed_url_result = supabase_storage.storage.from_("project-files").create_signed_url(unique_filename, 3600)
-        if isinstance(signed_url_result, dict):
-            signed_url = signed_url_result.get("signedURL") or signed_url_result.get("signed_url") or signed_url_result.get("url")
-        elif isinstance(signed_url_result, str):
-            signed_url = signed_url_result
-        else:
-            signed_url = getattr(signed_url_result, "signedURL", None) or getattr(signed_url_result, "signed_url", None) or getattr(signed_url_result, "url", None)
-        
+        signed_url = get_signed_url(unique_filename)
         if not signed_url:
-            print(f"Warning: create_signed_url returned unexpected format: {type(signed_url_result)}")
-            signed_url = None
-        else:
-            print(f"Generated signed URL for file: {unique_filename}")
+            print(f"Warning: No signed URL returned for file: {unique_filename}")
     except Exception as url_error:
         print(f"Warning: Could not get signed URL: {str(url_error)}")
         import traceback
@@ -275,9 +245,10 @@ async def _upload_single_file(
         "name": filename or "Untitled",
         "original_filename": filename or "Untitled",
         "file_type": content_type or "application/octet-stream",
-        "file_size": len(file_content),
+        "file_size": upload.size,
         "storage_path": unique_filename,
         "storage_url": signed_url,
+        "content_sha256": content_sha256,
         "folder_id": folder_id,
         "quote_id": quote_id,
         "form_id": form_id,
@@ -294,9 +265,9 @@ async def _upload_single_file(
         print(f"Database insert error: {error_msg}")
         import traceback
         traceback.print_exc()
-        # Try to delete uploaded file if database insert fails
+        # Release the blob reference (removing the object if unused) if database insert fails
         try:
-            supabase_storage.storage.from_("project-files").remove([unique_filename])
+            release_blob(content_sha256)
             print(f"Cleaned up uploaded file after database error: {unique_filename}")
         except Exception as cleanup_error:
             print(f"Warning: Failed to cleanup file after database error: {str(cleanup_error)}")
@@ -306,9 +277,9 @@ async def _upload_single_file(
         )
     
     if not response.data:
-        # Try to delete uploaded file if database insert fails
+        # Release the blob reference (removing the object if unused) if database insert fails
         try:
-            supabase_storage.storage.from_("project-files").remove([unique_filename])
+            release_blob(content_sha256)
             print(f"Cleaned up uploaded file after empty response: {unique_filename}")
         except Exception as cleanup_error:
             print(f"Warning: Failed to cleanup file after empty response: {str(cleanup_error)}")
@@ -318,6 +289,10 @@ async def _upload_single_file(
         )
     
     created_file = response.data[0]
+    invalidate_folder_snapshot(created_file.get("folder_id"))
+    if uploaded:
+        # New content: precompute thumbnails in the background
+        schedule_thumbnails(created_file)
     print(f"File record created successfully: id={created_file.get('id')}, folder_id={created_file.get('folder_id')}, is_reusable={created_file.get('is_reusable')}, name={created_file.get('name')}")
     
     return created_file
@@ -348,6 +323,7 @@ async def upload_file(
     - File is a template (is_reusable=True by default)
     - Only admins can upload templates
     """
+    upload = None
     try:
         # Check if user is admin
         is_admin = False
@@ -381,9 +357,10 @@ async def upload_file(
             if is_reusable is None:
                 is_reusable = True
         
-        # Read file content
-        file_content = await file.read()
-        if len(file_content) > MAX_FILE_SIZE:
+        # Stream file content into a spooled temp file; the size limit is enforced while reading
+        try:
+            upload = await spool_upload(file, MAX_FILE_SIZE, hash_names=("sha256",))
+        except FileTooLargeError:
             raise HTTPException(status_code=400, detail=f"File size exceeds {MAX_FILE_SIZE / (1024*1024)}MB limit")
         
         # Check if file is a ZIP file
@@ -392,118 +369,68 @@ async def upload_file(
         
         if is_zip:
             print(f"Detected ZIP file: {file.filename}, extracting and uploading all files...")
-            # Extract and upload all files from ZIP
+            # Extract and upload all files from ZIP (concurrent uploads, batched inserts)
             try:
-                zip_file = zipfile.ZipFile(io.BytesIO(file_content))
-                extracted_files = []
-                errors = []
-                
-                for zip_info in zip_file.namelist():
-                    # Skip directories
-                    if zip_info.endswith('/'):
-                        print(f"Skipping directory in ZIP: {zip_info}")
-                        continue
-                    
-                    try:
-                        # Read file from ZIP
-                        extracted_content = zip_file.read(zip_info)
-                        
-                        # Skip empty files
-                        if len(extracted_content) == 0:
-                            print(f"Skipping empty file in ZIP: {zip_info}")
-                            continue
-                        
-                        # Validate extracted file size
-                        if len(extracted_content) > MAX_FILE_SIZE:
-                            error_msg = f"{zip_info}: File size exceeds {MAX_FILE_SIZE / (1024*1024)}MB limit"
-                            errors.append(error_msg)
-                            print(f"Error: {error_msg}")
-                            continue
-                        
-                        # Determine content type from extension
-                        ext = zip_info.split('.')[-1] if '.' in zip_info else ''
-                        content_type_map = {
-                            'jpg': 'image/jpeg',
-                            'jpeg': 'image/jpeg',
-                            'png': 'image/png',
-                            'gif': 'image/gif',
-                            'webp': 'image/webp',
-                            'bmp': 'image/bmp',
-                            'svg': 'image/svg+xml',
-                            'pdf': 'application/pdf',
-                            'txt': 'text/plain',
-                            'doc': 'application/msword',
-                            'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                        }
-                        extracted_content_type = content_type_map.get(ext.lower(), 'application/octet-stream')
-                        
-                        # Get just the filename, not the path
-                        filename = zip_info.split('/')[-1]
-                        print(f"Extracting file from ZIP: {filename} (type: {extracted_content_type}, size: {len(extracted_content)} bytes)")
-                        
-                        # Upload extracted file
-                        uploaded_file = await _upload_single_file(
-                            file_content=extracted_content,
-                            filename=filename,
-                            content_type=extracted_content_type,
-                            folder_id=folder_id,
-                            quote_id=quote_id,
-                            form_id=form_id,
-                            description=description,
-                            is_reusable=is_reusable,
-                            user_id=user["id"]
-                        )
-                        extracted_files.append(uploaded_file)
-                        print(f"Successfully uploaded extracted file: {filename} (id: {uploaded_file.get('id')})")
-                        
-                        # Create folder event for each extracted file
-                        if folder_id:
-                            try:
-                                supabase_storage.table("folder_events").insert({
-                                    "id": str(uuid.uuid4()),
-                                    "folder_id": folder_id,
-                                    "event_type": "file_uploaded",
-                                    "title": f"File uploaded: {uploaded_file.get('name') or 'File'}",
-                                    "details": {"file_id": uploaded_file.get("id"), "name": uploaded_file.get("name"), "storage_path": uploaded_file.get("storage_path")},
-                                    "created_by": user.get("id"),
-                                    "created_at": datetime.now().isoformat(),
-                                }).execute()
-                            except Exception:
-                                pass
-                    except Exception as e:
-                        errors.append(f"{zip_info}: {str(e)}")
-                        continue
-                
-                zip_file.close()
-                
+                result = await run_in_threadpool(
+                    ingest_zip,
+                    upload.file,
+                    folder_id=folder_id,
+                    quote_id=quote_id,
+                    form_id=form_id,
+                    description=description,
+                    is_reusable=is_reusable,
+                    user_id=user["id"],
+                    max_member_size=MAX_FILE_SIZE
+                )
+            except zipfile.BadZipFile:
+                # Not a valid ZIP file, treat as regular file
+                upload.file.seek(0)
+                result = None
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to extract ZIP file: {str(e)}")
+            
+            if result is not None:
+                extracted_files = result["files"]
+                errors = result["errors"]
                 if not extracted_files:
                     raise HTTPException(
                         status_code=400,
                         detail="ZIP file is empty or contains no valid files" + (f". Errors: {'; '.join(errors)}" if errors else "")
                     )
-                
-                # Log extraction results
-                print(f"Successfully extracted and uploaded {len(extracted_files)} files from ZIP")
                 if errors:
                     print(f"Warnings during extraction: {len(errors)} files had errors")
+                if result["duplicates"]:
+                    print(f"Skipped {len(result['duplicates'])} duplicate files in ZIP")
+                
+                # Folder events for the extracted files, in one insert
+                if folder_id:
+                    invalidate_folder_snapshot(folder_id)
+                    try:
+                        now = datetime.now().isoformat()
+                        supabase_storage.table("folder_events").insert([
+                            {
+                                "id": str(uuid.uuid4()),
+                                "folder_id": folder_id,
+                                "event_type": "file_uploaded",
+                                "title": f"File uploaded: {uploaded_file.get('name') or 'File'}",
+                                "details": {"file_id": uploaded_file.get("id"), "name": uploaded_file.get("name"), "storage_path": uploaded_file.get("storage_path")},
+                                "created_by": user.get("id"),
+                                "created_at": now,
+                            }
+                            for uploaded_file in extracted_files
+                        ]).execute()
+                    except Exception:
+                        pass
                 
                 # Return the first uploaded file to maintain API compatibility
                 # All files are already in the database and will appear after reload
-                result = extracted_files[0]
                 if len(extracted_files) > 1:
                     print(f"ZIP contained {len(extracted_files)} files. All uploaded. Returning first file for API response.")
-                
-                return result
-                
-            except zipfile.BadZipFile:
-                # Not a valid ZIP file, treat as regular file
-                pass
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Failed to extract ZIP file: {str(e)}")
+                return extracted_files[0]
         
         # Regular file upload (not a ZIP or ZIP extraction failed)
         uploaded_file = await _upload_single_file(
-            file_content=file_content,
+            upload=upload,
             filename=file.filename or "Untitled",
             content_type=file.content_type,
             folder_id=folder_id,
@@ -545,6 +472,9 @@ async def upload_file(
         else:
             detail = f"Failed to upload file: {error_msg}"
         raise HTTPException(status_code=500, detail=detail)
+    finally:
+        if upload is not None:
+            upload.close()
 
 @router.put("/{file_id}", response_model=File)
 async def update_file(
@@ -581,6 +511,7 @@ async def update_file(
         
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to update file")
+        invalidate_folder_snapshot(file_data.get("folder_id"), response.data[0].get("folder_id"))
         
         return response.data[0]
     except HTTPException:
@@ -637,17 +568,17 @@ async def delete_file(file_id: str, user = Depends(get_current_user)):
                 detail=f"Cannot delete file: This file is associated with an e-signature document ({doc_name}). Please remove the e-signature document first."
             )
         
-        # Delete from storage
-        storage_path = file_data.get("storage_path")
-        if storage_path:
-            try:
-                supabase_storage.storage.from_("project-files").remove([storage_path])
-            except Exception as storage_error:
-                print(f"Warning: Failed to delete file from storage: {str(storage_error)}")
-                # Continue with database deletion even if storage deletion fails
-        
         # Delete from database (cascade will handle assignments) - use service role client
         supabase_storage.table("files").delete().eq("id", file_id).execute()
+        invalidate_folder_snapshot(file_data.get("folder_id"))
+        
+        # Release storage: drops the blob reference (the object goes with the last
+        # reference) or, for files without a content hash, deletes the object
+        try:
+            if release_file_storage(file_data):
+                remove_thumbnails(file_data)
+        except Exception as storage_error:
+            print(f"Warning: Failed to delete file from storage: {str(storage_error)}")
         
         return {"message": "File deleted successfully"}
     except HTTPException:
@@ -675,34 +606,8 @@ async def download_file(file_id: str, user = Depends(get_current_user)):
         file_data = file_response.data
         
         # Check access (same logic as get_file)
-        is_admin = False
-        try:
-            user_role_response = supabase_storage.table("user_roles").select("role").eq("user_id", user["id"]).single().execute()
-            is_admin = user_role_response.data and user_role_response.data.get("role") == "admin"
-        except Exception:
-            # User doesn't have a role record, default to customer
-            is_admin = False
-        
-        if not is_admin:
-            if file_data.get("uploaded_by") != user["id"]:
-                folder_id = file_data.get("folder_id")
-                if folder_id:
-                    try:
-                        folder_assignment = supabase_storage.table("folder_assignments").select("folder_id").eq("folder_id", folder_id).eq("user_id", user["id"]).execute()
-                        if not folder_assignment.data:
-                            try:
-                                file_assignment = supabase_storage.table("file_folder_assignments").select("folder_id").eq("file_id", file_id).execute()
-                                if file_assignment.data:
-                                    accessible_folder_ids = [fa["folder_id"] for fa in file_assignment.data]
-                                    user_folders = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", user["id"]).in_("folder_id", accessible_folder_ids).execute()
-                                    if not user_folders.data:
-                                        raise HTTPException(status_code=403, detail="Access denied")
-                                else:
-                                    raise HTTPException(status_code=403, detail="Access denied")
-                            except Exception:
-                                raise HTTPException(status_code=403, detail="Access denied")
-                    except Exception:
-                        raise HTTPException(status_code=403, detail="Access denied")
+        if not get_access_control().can_access_file(user, file_data):
+            raise HTTPException(status_code=403, detail="Access denied")
         
         # Track file view (idempotent - uses UNIQUE constraint)
         try:
@@ -714,6 +619,8 @@ async def download_file(file_id: str, user = Depends(get_current_user)):
             }
             # Use INSERT ... ON CONFLICT DO NOTHING to make it idempotent
             supabase_storage.table("file_views").insert(view_data).execute()
+            # Only a first view gets here (repeat views hit the UNIQUE constraint)
+            invalidate_folder_snapshot(file_data.get("folder_id"))
         except Exception as view_error:
             # Log but don't fail the request if view tracking fails
             print(f"Warning: Failed to track file view: {str(view_error)}")
@@ -724,20 +631,11 @@ async def download_file(file_id: str, user = Depends(get_current_user)):
             raise HTTPException(status_code=500, detail="File storage path not found")
         
         try:
-            # Create signed URL - Supabase Python client returns dict with "signedURL" key
-            signed_url_result = supabase_storage.storage.from_("project-files").create_signed_url(storage_path, 3600)
-            
-            # Extract URL from response (can be dict or string depending on client version)
-            if isinstance(signed_url_result, dict):
-                signed_url = signed_url_result.get("signedURL") or signed_url_result.get("signed_url") or signed_url_result.get("url")
-            elif isinstance(signed_url_result, str):
-                signed_url = signed_url_result
-            else:
-                # Try to get URL from response object if it has attributes
-                signed_url = getattr(signed_url_result, "signedURL", None) or getattr(signed_url_result, "signed_url", None) or getattr(signed_url_result, "url", None) or str(signed_url_result)
+            # Cached signed URL (re-signed shortly before it expires)
+            signed_url = get_signed_url(storage_path)
             
             if not signed_url:
-                print(f"Error: create_signed_url returned unexpected format: {type(signed_url_result)} - {signed_url_result}")
+                print(f"Error: No signed URL returned for path '{storage_path}'")
                 raise Exception("Signed URL is empty or invalid format")
             
             # Return redirect to signed URL
@@ -763,8 +661,18 @@ async def download_file(file_id: str, user = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Failed to download file: {str(e)}")
 
 @router.get("/{file_id}/preview")
-async def get_file_preview(file_id: str, user = Depends(get_current_user)):
-    """Get preview URL for a file (signed URL that expires)."""
+async def get_file_preview(
+    file_id: str,
+    size: Optional[str] = Query(None, description="Thumbnail size for images and PDFs: small, medium or large (omit for the original)"),
+    user = Depends(get_current_user)
+):
+    """Get preview URL for a file (signed URL that expires).
+    
+    With size, images and PDFs (first page) are served as a downscaled WebP
+    thumbnail, generated on first request if it was not precomputed at upload.
+    Other files, or files that cannot be thumbnailed, return the original."""
+    if size is not None and size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Invalid size. Must be one of: {', '.join(THUMBNAIL_SIZES)}")
     try:
         # Get file record - use service role client to bypass RLS
         file_response = supabase_storage.table("files").select("*").eq("id", file_id).single().execute()
@@ -774,34 +682,8 @@ async def get_file_preview(file_id: str, user = Depends(get_current_user)):
         file_data = file_response.data
         
         # Check access (same logic as get_file)
-        is_admin = False
-        try:
-            user_role_response = supabase_storage.table("user_roles").select("role").eq("user_id", user["id"]).single().execute()
-            is_admin = user_role_response.data and user_role_response.data.get("role") == "admin"
-        except Exception:
-            # User doesn't have a role record, default to customer
-            is_admin = False
-        
-        if not is_admin:
-            if file_data.get("uploaded_by") != user["id"]:
-                folder_id = file_data.get("folder_id")
-                if folder_id:
-                    try:
-                        folder_assignment = supabase_storage.table("folder_assignments").select("folder_id").eq("folder_id", folder_id).eq("user_id", user["id"]).execute()
-                        if not folder_assignment.data:
-                            try:
-                                file_assignment = supabase_storage.table("file_folder_assignments").select("folder_id").eq("file_id", file_id).execute()
-                                if file_assignment.data:
-                                    accessible_folder_ids = [fa["folder_id"] for fa in file_assignment.data]
-                                    user_folders = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", user["id"]).in_("folder_id", accessible_folder_ids).execute()
-                                    if not user_folders.data:
-                                        raise HTTPException(status_code=403, detail="Access denied")
-                                else:
-                                    raise HTTPException(status_code=403, detail="Access denied")
-                            except Exception:
-                                raise HTTPException(status_code=403, detail="Access denied")
-                    except Exception:
-                        raise HTTPException(status_code=403, detail="Access denied")
+        if not get_access_control().can_access_file(user, file_data):
+            raise HTTPException(status_code=403, detail="Access denied")
         
         # Track file view (idempotent - uses UNIQUE constraint)
         try:
@@ -813,6 +695,8 @@ async def get_file_preview(file_id: str, user = Depends(get_current_user)):
             }
             # Use INSERT ... ON CONFLICT DO NOTHING to make it idempotent
             supabase_storage.table("file_views").insert(view_data).execute()
+            # Only a first view gets here (repeat views hit the UNIQUE constraint)
+            invalidate_folder_snapshot(file_data.get("folder_id"))
         except Exception as view_error:
             # Log but don't fail the request if view tracking fails
             print(f"Warning: Failed to track file view: {str(view_error)}")
@@ -822,24 +706,19 @@ async def get_file_preview(file_id: str, user = Depends(get_current_user)):
         if not storage_path:
             raise HTTPException(status_code=500, detail="File storage path not found")
         
+        preview_path = storage_path
+        if size:
+            preview_path = await run_in_threadpool(get_thumbnail_path, file_data, size) or storage_path
+        
         try:
-            # Create signed URL - Supabase Python client returns dict with "signedURL" key
-            signed_url_result = supabase_storage.storage.from_("project-files").create_signed_url(storage_path, 3600)
-            
-            # Extract URL from response (can be dict or string depending on client version)
-            if isinstance(signed_url_result, dict):
-                signed_url = signed_url_result.get("signedURL") or signed_url_result.get("signed_url") or signed_url_result.get("url")
-            elif isinstance(signed_url_result, str):
-                signed_url = signed_url_result
-            else:
-                # Try to get URL from response object if it has attributes
-                signed_url = getattr(signed_url_result, "signedURL", None) or getattr(signed_url_result, "signed_url", None) or getattr(signed_url_result, "url", None) or str(signed_url_result)
+            # Cached signed URL (re-signed shortly before it expires)
+            signed_url = get_signed_url(preview_path)
             
             if not signed_url:
-                print(f"Error: create_signed_url returned unexpected format: {type(signed_url_result)} - {signed_url_result}")
+                print(f"Error: No signed URL returned for path '{preview_path}'")
                 raise HTTPException(status_code=500, detail="Failed to generate signed URL: unexpected response format")
             
-            return {"preview_url": signed_url}
+            return {"preview_url": signed_url, "is_thumbnail": preview_path != storage_path}
         except HTTPException:
             raise
         except Exception as url_error:
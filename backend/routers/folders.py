@@ -8,13 +8,17 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models import (
-    Folder, FolderCreate, FolderUpdate,
+    Folder, FolderListItem, FolderCreate, FolderUpdate,
     FolderAssignment, FolderAssignmentCreate,
     FormFolderAssignment, FormFolderAssignmentCreate
 )
 from database import supabase, supabase_storage
 from auth import get_current_user, get_current_admin
-from folder_tasks import build_customer_tasks, compute_stage_and_next_step
+from folder_snapshots import get_folder_snapshot, get_folder_snapshot_store, invalidate_folder_snapshot
+from signed_urls import with_signed_urls
+from access_control import get_access_control, invalidate_user_access, invalidate_all_access
+from rag_service import invalidate_form_context
+from template_provisioning_service import get_template_provisioning_service, provision_folder, provision_folders
 
 router = APIRouter(prefix="/api/folders", tags=["folders"])
 
@@ -36,75 +40,9 @@ def _safe_now_iso() -> str:
     return datetime.now().isoformat()
 
 
-def _compute_shipping_summary(folder_id: str) -> Dict[str, Any]:
-    """Compute shipping summary from shipments + latest tracking event."""
-    try:
-        shipments = (
-            supabase_storage
-            .table("shipments")
-            .select("*")
-            .eq("folder_id", folder_id)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        ).data or []
-        shipment = shipments[0] if shipments else None
-    except Exception:
-        shipment = None
-
-    latest_event = None
-    if shipment and shipment.get("id"):
-        try:
-            ev = (
-                supabase_storage
-                .table("shipment_tracking_events")
-                .select("*")
-                .eq("shipment_id", shipment.get("id"))
-                .order("timestamp", desc=True)
-                .limit(1)
-                .execute()
-            )
-            if ev.data:
-                latest_event = ev.data[0]
-        except Exception:
-            latest_event = None
-
-    if not shipment:
-        return {"has_shipment": False}
-
-    status = shipment.get("status") or (latest_event or {}).get("status")
-    return {
-        "has_shipment": True,
-        "status": status,
-        "carrier_name": shipment.get("carrier_name") or shipment.get("carrier"),
-        "tracking_number": shipment.get("tracking_number"),
-        "estimated_delivery_date": shipment.get("estimated_delivery_date"),
-        "actual_delivery_date": shipment.get("actual_delivery_date"),
-        "latest_event": latest_event,
-    }
-
-
-def _compute_progress(files: List[Dict[str, Any]], forms: List[Dict[str, Any]], esignatures: List[Dict[str, Any]]) -> Dict[str, Any]:
-    forms_total = len(forms or [])
-    esigs_total = len(esignatures or [])
-    forms_completed = len([f for f in (forms or []) if f.get("is_completed")])
-    esigs_completed = len([e for e in (esignatures or []) if e.get("is_completed")])
-    files_total = len(files or [])
-    files_viewed = len([f for f in (files or []) if f.get("is_completed")])
-    return {
-        # NOTE: tasks_total/tasks_completed are now derived from summary.tasks
-        # so the progress bar and task list always match.
-        "forms_total": forms_total,
-        "forms_completed": forms_completed,
-        "esignatures_total": esigs_total,
-        "esignatures_completed": esigs_completed,
-        "files_total": files_total,
-        "files_viewed": files_viewed,
-    }
-
-
 def _emit_folder_event(folder_id: str, event_type: str, title: str, details: Optional[Dict[str, Any]] = None, created_by: Optional[str] = None) -> None:
-    """Best-effort folder event insert (non-fatal)."""
+    """Best-effort folder event insert (non-fatal). Also drops the folder's cached snapshot."""
+    invalidate_folder_snapshot(folder_id)
     try:
         supabase_storage.table("folder_events").insert({
             "id": str(uuid.uuid4()),
@@ -135,29 +73,13 @@ def _get_folder_client_email(folder_id: str) -> Optional[str]:
 
 def _assert_folder_access(folder_id: str, user: Dict[str, Any]) -> Dict[str, Any]:
     """Fetch folder and assert current user can access it."""
-    is_admin = user.get("role") == "admin"
     folder_resp = supabase_storage.table("folders").select("id, created_by").eq("id", folder_id).single().execute()
     if not folder_resp.data:
         raise HTTPException(status_code=404, detail="Folder not found")
     folder = folder_resp.data
 
-    if not is_admin:
-        try:
-            assignment = (
-                supabase_storage
-                .table("folder_assignments")
-                .select("folder_id")
-                .eq("folder_id", folder_id)
-                .eq("user_id", user["id"])
-                .execute()
-            )
-            if not assignment.data and folder.get("created_by") != user["id"]:
-                raise HTTPException(status_code=403, detail="Access denied")
-        except HTTPException:
-            raise
-        except Exception:
-            if folder.get("created_by") != user["id"]:
-                raise HTTPException(status_code=403, detail="Access denied")
+    if not get_access_control().can_access_folder(user, folder):
+        raise HTTPException(status_code=403, detail="Access denied")
 
     return folder
 
@@ -166,11 +88,15 @@ class FolderNoteCreate(BaseModel):
     title: str
     body: str
 
-@router.get("", response_model=List[Folder])
+class FolderProvisionRequest(BaseModel):
+    folder_ids: List[str]
+
+@router.get("", response_model=List[FolderListItem])
 async def list_folders(
     client_id: Optional[str] = Query(None, description="Filter by client ID"),
     quote_id: Optional[str] = Query(None, description="Filter by quote ID"),
     status: Optional[str] = Query(None, description="Filter by status"),
+    include_summary: bool = Query(False, description="Attach each folder's status summary (stage, next step, progress)"),
     user = Depends(get_current_user)
 ):
     """List folders. Admins see all folders, users see folders assigned to them."""
@@ -192,60 +118,77 @@ async def list_folders(
         if status:
             query = query.eq("status", status)
         
-        # If not admin, filter by folder assignments
+        # If not admin, filter by folder assignments (cached per user, see access_control.py)
         if not is_admin:
-            # Get folders assigned to user - use service role client to bypass RLS
-            try:
-                folder_assignments = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", user["id"]).execute()
-                accessible_folder_ids = [fa["folder_id"] for fa in folder_assignments.data] if folder_assignments.data else []
-                
-                if accessible_folder_ids:
-                    # Filter by accessible folder IDs AND verify folders still exist
-                    # This ensures deleted folders don't appear even if assignments weren't cascade deleted
-                    query = query.in_("id", accessible_folder_ids)
-                else:
-                    # User has no assigned folders, return empty list
-                    return []
-            except Exception as e:
-                print(f"Error checking folder assignments: {str(e)}")
-                # If folder_assignments table doesn't exist yet, return empty
+            accessible_folder_ids = get_access_control().folder_ids(user["id"])
+            if not accessible_folder_ids:
+                # User has no assigned folders (or they could not be resolved)
                 return []
+            # Filter by accessible folder IDs AND verify folders still exist
+            # This ensures deleted folders don't appear even if assignments weren't cascade deleted
+            query = query.in_("id", sorted(accessible_folder_ids))
         
         response = query.order("created_at", desc=True).execute()
         folders = response.data if response.data else []
-        
-        # Additional safety check: Filter out any folders that don't have active assignments
-        # This catches edge cases where folder exists but assignment was deleted
-        if not is_admin and folders:
-            try:
-                # Get current assignments again to verify
-                current_assignments = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", user["id"]).execute()
-                valid_folder_ids = {fa["folder_id"] for fa in (current_assignments.data or [])}
-                # Filter to only include folders with valid assignments
-                folders = [f for f in folders if f["id"] in valid_folder_ids]
-            except Exception as e:
-                print(f"Error verifying folder assignments: {str(e)}")
-                # If verification fails, return empty to be safe
-                return []
+
+        if include_summary:
+            for folder in folders:
+                try:
+                    folder["summary"] = get_folder_snapshot(folder, user)["summary"]
+                except Exception as e:
+                    print(f"Error loading summary for folder {folder.get('id')}: {str(e)}")
         
         return folders
     except Exception as e:
         print(f"Error listing folders: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to list folders: {str(e)}")
 
+@router.get("/snapshots/stats")
+async def get_folder_snapshot_stats(current_admin: dict = Depends(get_current_admin)):
+    """Folder snapshot cache counters (admin only)"""
+    return get_folder_snapshot_store().stats()
+
+@router.get("/access/stats")
+async def get_access_cache_stats(current_admin: dict = Depends(get_current_admin)):
+    """Folder access cache counters (admin only)"""
+    return get_access_control().stats()
+
+@router.get("/provisioning/stats")
+async def get_provisioning_stats(current_admin: dict = Depends(get_current_admin)):
+    """Default template provisioning counters (admin only)"""
+    return get_template_provisioning_service().stats()
+
+@router.post("/provision")
+async def provision_default_templates(
+    request: FolderProvisionRequest,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Provision default e-signature copies and form assignments for many folders (admin only)
+
+    All folders are provisioned in one transactional call; artifacts a folder
+    already has are skipped, so this is safe to re-run (e.g. after adding a default).
+    """
+    try:
+        if not request.folder_ids:
+            raise HTTPException(status_code=400, detail="No folder IDs provided")
+        
+        created = provision_folders(request.folder_ids, current_admin["id"])
+        provisioned = {artifact["folder_id"] for artifact in created}
+        return {
+            "message": f"Provisioned {len(provisioned)} folder(s)",
+            "provisioned_count": len(provisioned),
+            "artifacts": created
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error provisioning folders: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to provision folders: {str(e)}")
+
 @router.get("/{folder_id}", response_model=Folder)
 async def get_folder(folder_id: str, user = Depends(get_current_user)):
     """Get folder by ID."""
     try:
-        # Check if user is admin - use service role client to bypass RLS
-        is_admin = False
-        try:
-            user_role_response = supabase_storage.table("user_roles").select("role").eq("user_id", user["id"]).single().execute()
-            is_admin = user_role_response.data and user_role_response.data.get("role") == "admin"
-        except Exception as e:
-            print(f"Error checking admin status: {str(e)}")
-            is_admin = False
-        
         # Use service role client to bypass RLS for all authenticated users
         response = supabase_storage.table("folders").select("*").eq("id", folder_id).single().execute()
         
@@ -254,19 +197,9 @@ async def get_folder(folder_id: str, user = Depends(get_current_user)):
         
         folder = response.data
         
-        # Check access if not admin
-        if not is_admin:
-            # Check if folder is assigned to user - use service role client to bypass RLS
-            try:
-                assignment = supabase_storage.table("folder_assignments").select("folder_id").eq("folder_id", folder_id).eq("user_id", user["id"]).execute()
-                if not assignment.data:
-                    # Check if user created it
-                    if folder.get("created_by") != user["id"]:
-                        raise HTTPException(status_code=403, detail="Access denied")
-            except Exception:
-                # If folder_assignments doesn't exist, check creator
-                if folder.get("created_by") != user["id"]:
-                    raise HTTPException(status_code=403, detail="Access denied")
+        # Admins, assigned users and the creator
+        if not get_access_control().can_access_folder(user, folder):
+            raise HTTPException(status_code=403, detail="Access denied")
         
         return folder
     except HTTPException:
@@ -275,84 +208,6 @@ async def get_folder(folder_id: str, user = Depends(get_current_user)):
         print(f"Error getting folder: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get folder: {str(e)}")
 
-def _auto_assign_purchase_agreement(folder_id: str, assigned_by: str):
-    """Helper function to auto-assign 'Reel48 Purchase Agreement' e-signature template to a folder"""
-    try:
-        import uuid
-        from datetime import datetime
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        # Find the "Reel48 Purchase Agreement" template by name
-        template_response = supabase_storage.table("esignature_documents").select("*").eq("name", "Reel48 Purchase Agreement").eq("is_template", True).single().execute()
-        
-        if not template_response.data:
-            logger.warning("Reel48 Purchase Agreement e-signature template not found")
-            return
-        
-        template_doc = template_response.data
-        template_id = template_doc["id"]
-        template_name = template_doc.get("name", "Reel48 Purchase Agreement")
-        
-        # Get folder name
-        folder_response = supabase_storage.table("folders").select("name").eq("id", folder_id).single().execute()
-        folder_name = folder_response.data.get("name", "Folder") if folder_response.data else "Folder"
-        
-        # Generate the copy name: "Folder Name - E-Signature Name"
-        copy_name = f"{folder_name} - {template_name}"
-        
-        # Check if a copy already exists for this template in this folder
-        existing_copy = supabase_storage.table("esignature_documents").select("id").eq("folder_id", folder_id).eq("is_template", False).eq("name", copy_name).execute()
-        if existing_copy.data:
-            # Copy already exists, skip
-            return
-        
-        # Create a copy of the template document for this folder
-        copy_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        
-        copy_data = {
-            "id": copy_id,
-            "name": copy_name,
-            "description": template_doc.get("description"),
-            "file_id": template_doc.get("file_id"),
-            "document_type": template_doc.get("document_type", "agreement"),
-            "signature_mode": template_doc.get("signature_mode", "simple"),
-            "require_signature": template_doc.get("require_signature", True),
-            "signature_fields": template_doc.get("signature_fields"),
-            "is_template": False,
-            "folder_id": folder_id,
-            "quote_id": template_doc.get("quote_id"),
-            "expires_at": template_doc.get("expires_at"),
-            "created_by": assigned_by,
-            "status": "pending",
-            "created_at": now,
-            "updated_at": now
-        }
-        
-        # Create the copy
-        copy_response = supabase_storage.table("esignature_documents").insert(copy_data).execute()
-        
-        # Also create an assignment record linking the template to the folder
-        assignment_data = {
-            "document_id": template_id,
-            "folder_id": folder_id,
-            "assigned_by": assigned_by,
-            "status": "pending"
-        }
-        
-        try:
-            supabase_storage.table("esignature_document_folder_assignments").insert(assignment_data).execute()
-        except Exception as e:
-            logger.warning(f"Could not create assignment record: {str(e)}")
-        
-        logger.info(f"Auto-assigned Reel48 Purchase Agreement to folder {folder_id}")
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Error auto-assigning Purchase Agreement: {str(e)}", exc_info=True)
-        # Don't raise - this is a non-critical operation
-
 @router.post("", response_model=Folder)
 async def create_folder(
     folder: FolderCreate,
@@ -395,6 +250,7 @@ async def create_folder(
                     "assigned_by": user["id"]
                 }
                 supabase_storage.table("folder_assignments").insert(assignment_data).execute()
+                invalidate_user_access(folder.assign_to_user_id)
             except Exception as assign_error:
                 print(f"Warning: Could not create folder assignment: {str(assign_error)}")
         
@@ -405,15 +261,11 @@ async def create_folder(
             except Exception as quote_error:
                 print(f"Warning: Could not update quote: {str(quote_error)}")
         
-        # Auto-assign "Reel48 Purchase Agreement" e-signature template to the folder
+        # Default artifacts ("Reel48 Purchase Agreement" e-signature copy, default forms)
         try:
-            import logging
-            logger = logging.getLogger(__name__)
-            _auto_assign_purchase_agreement(folder_id, user["id"])
+            provision_folder(folder_id, user["id"])
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Could not auto-assign Purchase Agreement e-signature: {str(e)}")
+            logger.warning(f"Could not provision default templates for folder {folder_id}: {str(e)}")
         
         return created_folder
     except HTTPException:
@@ -498,6 +350,7 @@ async def delete_folder(folder_id: str, user = Depends(get_current_user)):
             # (CASCADE should handle this, but being explicit ensures it works)
             try:
                 supabase_storage.table("folder_assignments").delete().eq("folder_id", folder_id).execute()
+                invalidate_all_access()
                 logger.info(f"Deleted folder_assignments for folder {folder_id}")
             except Exception as e:
                 logger.warning(f"Could not delete folder_assignments (may already be deleted): {str(e)}")
@@ -563,6 +416,7 @@ async def assign_folder_to_user(
         
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to create assignment")
+        invalidate_user_access(response.data[0].get("user_id"))
         
         return response.data[0]
     except HTTPException:
@@ -594,6 +448,7 @@ async def remove_folder_assignment(
         
         # Delete assignment - use service role client to bypass RLS
         supabase_storage.table("folder_assignments").delete().eq("folder_id", folder_id).eq("user_id", user_id).execute()
+        invalidate_user_access(user_id)
         
         return {"message": "Assignment removed successfully"}
     except HTTPException:
@@ -606,29 +461,7 @@ async def remove_folder_assignment(
 async def get_folder_assignments(folder_id: str, user = Depends(get_current_user)):
     """Get all assignments for a folder."""
     try:
-        # Check if user is admin - use service role client to bypass RLS
-        is_admin = False
-        try:
-            user_role_response = supabase_storage.table("user_roles").select("role").eq("user_id", user["id"]).single().execute()
-            is_admin = user_role_response.data and user_role_response.data.get("role") == "admin"
-        except Exception as e:
-            print(f"Error checking admin status: {str(e)}")
-            is_admin = False
-        
-        # Check folder access - use service role client to bypass RLS
-        folder_response = supabase_storage.table("folders").select("*").eq("id", folder_id).single().execute()
-        if not folder_response.data:
-            raise HTTPException(status_code=404, detail="Folder not found")
-        
-        if not is_admin:
-            # Check if user has access to folder - use service role client to bypass RLS
-            try:
-                assignment = supabase_storage.table("folder_assignments").select("folder_id").eq("folder_id", folder_id).eq("user_id", user["id"]).execute()
-                if not assignment.data and folder_response.data.get("created_by") != user["id"]:
-                    raise HTTPException(status_code=403, detail="Access denied")
-            except Exception:
-                if folder_response.data.get("created_by") != user["id"]:
-                    raise HTTPException(status_code=403, detail="Access denied")
+        _assert_folder_access(folder_id, user)
         
         # Get assignments - use service role client to bypass RLS
         response = supabase_storage.table("folder_assignments").select("*").eq("folder_id", folder_id).execute()
@@ -692,6 +525,7 @@ async def assign_form_to_folder(
         try:
             # Use service role client to bypass RLS
             response = supabase_storage.table("form_folder_assignments").insert(assignment_data).execute()
+            invalidate_form_context()
             
             if not response.data:
                 raise HTTPException(status_code=500, detail="Failed to create assignment")
@@ -765,6 +599,8 @@ async def remove_form_from_folder(
         # Get the assignment ID first, then delete by ID (more reliable)
         assignment_id = assignment_check.data[0]["id"]
         delete_response = supabase_storage.table("form_folder_assignments").delete().eq("id", assignment_id).execute()
+        invalidate_form_context()
+        invalidate_folder_snapshot(folder_id)
         
         # Verify deletion - check if assignment still exists
         verify_check = supabase_storage.table("form_folder_assignments").select("id").eq("folder_id", folder_id).eq("form_id", form_id).execute()
@@ -911,6 +747,7 @@ async def remove_file_from_folder(
         # Get the assignment ID first, then delete by ID (more reliable)
         assignment_id = assignment_check.data[0]["id"]
         delete_response = supabase_storage.table("file_folder_assignments").delete().eq("id", assignment_id).execute()
+        invalidate_folder_snapshot(folder_id)
         
         # Verify deletion - check if assignment still exists
         verify_check = supabase_storage.table("file_folder_assignments").select("id").eq("folder_id", folder_id).eq("file_id", file_id).execute()
@@ -1132,6 +969,7 @@ async def remove_esignature_from_folder(
         
         # Delete the instance (copy) - this is safe because it's a copy, not the template
         delete_response = supabase_storage.table("esignature_documents").delete().eq("id", document_id).execute()
+        invalidate_folder_snapshot(folder_id)
         
         # Also try to remove any assignment records (for reference)
         try:
@@ -1155,292 +993,26 @@ async def get_folder_content(folder_id: str, user = Depends(get_current_user)):
         import logging
         logger = logging.getLogger(__name__)
         
-        # Check if user is admin - use the role from the user dict
-        is_admin = user.get("role") == "admin"
-        
         # Use service role client for all authenticated users to bypass RLS
-        # We'll filter by folder assignments for non-admins to ensure proper access control
-        client = supabase_storage
-        
-        # Check folder access - use service role client to bypass RLS
+        # Access is checked below against the user's cached folder set
         try:
-            folder_response = client.table("folders").select("*").eq("id", folder_id).single().execute()
+            folder_response = supabase_storage.table("folders").select("*").eq("id", folder_id).single().execute()
             if not folder_response.data:
                 raise HTTPException(status_code=404, detail="Folder not found")
         except Exception as e:
             logger.error(f"Error fetching folder: {str(e)}")
             raise HTTPException(status_code=404, detail="Folder not found")
         
-        if not is_admin:
-            # Check if user has access to folder - use service role client to bypass RLS
-            try:
-                assignment = supabase_storage.table("folder_assignments").select("folder_id").eq("folder_id", folder_id).eq("user_id", user["id"]).execute()
-                if not assignment.data and folder_response.data.get("created_by") != user["id"]:
-                    raise HTTPException(status_code=403, detail="Access denied")
-            except HTTPException:
-                raise
-            except Exception:
-                if folder_response.data.get("created_by") != user["id"]:
-                    raise HTTPException(status_code=403, detail="Access denied")
-        
         folder = folder_response.data
+        if not get_access_control().can_access_folder(user, folder):
+            raise HTTPException(status_code=403, detail="Access denied")
         
-        # Get quote
-        quote = None
-        if folder.get("quote_id"):
-            try:
-                quote_response = client.table("quotes").select("*, clients(*), line_items(*)").eq("id", folder["quote_id"]).single().execute()
-                quote = quote_response.data if quote_response.data else None
-            except Exception as e:
-                logger.warning(f"Error fetching quote: {str(e)}")
-                pass
-        
-        # Get folder-specific files only (not reusable templates)
-        # Files uploaded directly to this folder with is_reusable=False
-        files = []
-        try:
-            # Get only folder-specific files (directly assigned, not reusable)
-            # Order by created_at descending to show newest first
-            # Use explicit False comparison to handle None values
-            files_response = supabase_storage.table("files").select("*").eq("folder_id", folder_id).eq("is_reusable", False).order("created_at", desc=True).execute()
-            files = files_response.data if files_response.data else []
-            logger.info(f"Found {len(files)} files for folder {folder_id} (query: folder_id={folder_id}, is_reusable=False)")
-            
-            # Debug: Log file details if any found
-            if files:
-                for f in files[:3]:  # Log first 3 files
-                    logger.info(f"  - File: {f.get('name')} (id={f.get('id')}, folder_id={f.get('folder_id')}, is_reusable={f.get('is_reusable')})")
-            
-            # Check completion status for each file
-            # For admins: check if ANY user has viewed it
-            # For customers: check if the current user has viewed it
-            for file in files:
-                file["item_type"] = "file"
-                try:
-                    if is_admin:
-                        # Admin: check if any user has viewed this file
-                        view_check = supabase_storage.table("file_views").select("id").eq("file_id", file["id"]).limit(1).execute()
-                        file["is_completed"] = len(view_check.data or []) > 0
-                    else:
-                        # Customer: check if current user has viewed this file
-                        view_check = supabase_storage.table("file_views").select("id").eq("file_id", file["id"]).eq("user_id", user["id"]).limit(1).execute()
-                        file["is_completed"] = len(view_check.data or []) > 0
-                except Exception:
-                    file["is_completed"] = False
-        except Exception as e:
-            logger.warning(f"Error fetching files: {str(e)}")
-            pass
-        
-        # Get forms assigned to folder
-        # Include both: templates (via many-to-many) and instances (via direct assignment)
-        forms = []
-        try:
-            # Get templates assigned via many-to-many relationship
-            form_assignments = supabase_storage.table("form_folder_assignments").select("form_id").eq("folder_id", folder_id).execute()
-            template_form_ids = [fa["form_id"] for fa in (form_assignments.data or [])]
-            logger.info(f"Folder {folder_id}: Found {len(template_form_ids)} form assignments")
-            
-            # Get templates
-            if template_form_ids:
-                templates_response = supabase_storage.table("forms").select("*, form_fields(*)").in_("id", template_form_ids).eq("is_template", True).execute()
-                templates = templates_response.data if templates_response.data else []
-                logger.info(f"Folder {folder_id}: Found {len(templates)} form templates")
-            else:
-                templates = []
-                logger.info(f"Folder {folder_id}: No form templates found")
-            
-            # Check completion status and submission count for each form
-            # IMPORTANT: ALL forms assigned to the folder must be included, regardless of:
-            # - Completion status (completed items should ALWAYS be shown)
-            # - Whether they have fields or not (empty forms may be filtered elsewhere, but completed ones should show)
-            # - Any other status
-            # For admins: check if ANY user has submitted it and count all submissions
-            # For customers: check if the current user has submitted it and count their submissions
-            # Note: Forms use submitter_email instead of user_id, so we'll check by email
-            processed_forms = []
-            for form in templates:
-                # Always include the form - never filter out completed items
-                form["item_type"] = "form"
-                try:
-                    if is_admin:
-                        # Admin: check if any user has submitted this form and count all submissions
-                        submission_check = (
-                            supabase_storage
-                            .table("form_submissions")
-                            .select("id")
-                            .eq("form_id", form["id"])
-                            .eq("folder_id", folder_id)
-                            .eq("status", "completed")
-                            .limit(1)
-                            .execute()
-                        )
-                        form["is_completed"] = len(submission_check.data or []) > 0
-                        # Count all completed submissions for admin
-                        count_response = (
-                            supabase_storage
-                            .table("form_submissions")
-                            .select("id", count="exact")
-                            .eq("form_id", form["id"])
-                            .eq("folder_id", folder_id)
-                            .eq("status", "completed")
-                            .execute()
-                        )
-                        form["submissions_count"] = count_response.count if hasattr(count_response, 'count') else len(count_response.data or [])
-                    else:
-                        # Customer: prefer matching submissions by authenticated user_id (more reliable than email),
-                        # fall back to submitter_email for legacy/unauthenticated submissions.
-                        user_id = user.get("id")
-                        user_email = user.get("email")
-                        try:
-                            matched = []
-
-                            # 1) Try by user_id (fast + exact)
-                            if user_id:
-                                by_user = (
-                                    supabase_storage
-                                    .table("form_submissions")
-                                    .select("id, status")
-                                    .eq("form_id", form["id"])
-                                    .eq("folder_id", folder_id)
-                                    .eq("user_id", user_id)
-                                    .execute()
-                                )
-                                matched = (by_user.data or [])
-
-                            # 2) Fallback by email (case-insensitive match done in Python)
-                            if (not matched) and user_email:
-                                user_email_lower = user_email.lower().strip()
-                                all_submissions = (
-                                    supabase_storage
-                                    .table("form_submissions")
-                                    .select("id, submitter_email, status")
-                                    .eq("form_id", form["id"])
-                                    .eq("folder_id", folder_id)
-                                    .execute()
-                                )
-                                for s in (all_submissions.data or []):
-                                    submission_email = s.get("submitter_email", "")
-                                    if submission_email and submission_email.lower().strip() == user_email_lower:
-                                        matched.append(s)
-                                
-                            completed = [s for s in matched if str(s.get("status") or "").lower() == "completed"]
-                            form["is_completed"] = len(completed) > 0
-                            form["submissions_count"] = len(completed)
-                        except Exception as e:
-                            logger.error(f"Error checking form completion for user {user_id}: {str(e)}", exc_info=True)
-                            form["is_completed"] = False
-                            form["submissions_count"] = 0
-                except Exception:
-                    form["is_completed"] = False
-                    form["submissions_count"] = 0
-                
-                # Always add the form to the list - never filter out completed items
-                processed_forms.append(form)
-            
-            # IMPORTANT: Use processed_forms to ensure all forms are included
-            # Do NOT filter out completed forms - they must always be shown to customers
-            forms = processed_forms
-            logger.info(f"Folder {folder_id}: Returning {len(forms)} forms (completed: {len([f for f in forms if f.get('is_completed')])}, incomplete: {len([f for f in forms if not f.get('is_completed')])})")
-        except Exception as e:
-            logger.warning(f"Error fetching forms: {str(e)}")
-            forms = []  # Ensure forms is always a list
-            pass
-        
-        # Get e-signature documents assigned to folder
-        # Show only instances (copies) that were created when templates were assigned to the folder
-        # Templates remain in the template library and are not shown in folder content
-        esignatures = []
-        try:
-            # Get instances (copies) directly assigned to folder
-            # These are copies created when templates were assigned, with is_template=False
-            instances_response = supabase_storage.table("esignature_documents").select("*").eq("folder_id", folder_id).eq("is_template", False).execute()
-            instances = instances_response.data if instances_response.data else []
-            logger.info(f"Folder {folder_id}: Found {len(instances)} e-signature instances")
-            
-            # Check completion status for each e-signature
-            # IMPORTANT: ALL e-signatures assigned to the folder must be included, regardless of:
-            # - Completion status (completed items should ALWAYS be shown)
-            # - Any other status
-            # For admins: check if ANY user has signed it
-            # For customers: check if the current user has signed it
-            processed_esignatures = []
-            for esig in instances:
-                # Always include the e-signature - never filter out completed items
-                esig["item_type"] = "esignature"
-                try:
-                    if is_admin:
-                        # Admin: check if any user has signed this document and get signed_file_id
-                        signature_check = supabase_storage.table("esignature_signatures").select("id, signed_file_id, signed_file_url").eq("document_id", esig["id"]).limit(1).execute()
-                        esig["is_completed"] = len(signature_check.data or []) > 0
-                        if signature_check.data and len(signature_check.data) > 0:
-                            esig["signed_file_id"] = signature_check.data[0].get("signed_file_id")
-                            esig["signed_file_url"] = signature_check.data[0].get("signed_file_url")
-                    else:
-                        # Customer: check if current user has signed this document and get signed_file_id
-                        signature_check = supabase_storage.table("esignature_signatures").select("id, signed_file_id, signed_file_url").eq("document_id", esig["id"]).eq("user_id", user["id"]).limit(1).execute()
-                        esig["is_completed"] = len(signature_check.data or []) > 0
-                        if signature_check.data and len(signature_check.data) > 0:
-                            esig["signed_file_id"] = signature_check.data[0].get("signed_file_id")
-                            esig["signed_file_url"] = signature_check.data[0].get("signed_file_url")
-                except Exception:
-                    esig["is_completed"] = False
-                
-                # Always add the e-signature to the list - never filter out completed items
-                processed_esignatures.append(esig)
-            
-            # IMPORTANT: Use processed_esignatures to ensure all e-signatures are included
-            # Do NOT filter out completed e-signatures - they must always be shown to customers
-            esignatures = processed_esignatures
-            logger.info(f"Folder {folder_id}: Returning {len(esignatures)} e-signatures (completed: {len([e for e in esignatures if e.get('is_completed')])}, incomplete: {len([e for e in esignatures if not e.get('is_completed')])})")
-        except Exception as e:
-            logger.warning(f"Error fetching e-signatures: {str(e)}")
-            esignatures = []  # Ensure esignatures is always a list
-            pass
-        
-        # Compute customer-friendly status summary
-        progress = _compute_progress(files, forms, esignatures)
-        shipping_summary = _compute_shipping_summary(folder_id)
-        tasks = build_customer_tasks(
-            folder_id=folder_id,
-            quote=quote,
-            forms=forms,
-            esignatures=esignatures,
-            files_total=int(progress.get("files_total") or 0),
-            files_viewed=int(progress.get("files_viewed") or 0),
-        )
-        stage_info = compute_stage_and_next_step(
-            folder=folder,
-            quote=quote,
-            shipping=shipping_summary,
-            tasks=tasks,
-        )
-        tasks_progress = (stage_info.get("tasks_progress") or {})
-        # Ensure progress reflects the tasks list (single source of truth for progress bar)
-        progress["tasks_total"] = tasks_progress.get("tasks_total", 0)
-        progress["tasks_completed"] = tasks_progress.get("tasks_completed", 0)
-
-        return {
-            "folder": folder,
-            "quote": quote,
-            "files": files,
-            "forms": forms,
-            "esignatures": esignatures,
-            "summary": {
-                "stage": stage_info.get("stage"),
-                "stage_label": stage_info.get("stage_label"),
-                "next_step": stage_info.get("next_step"),
-                "next_step_owner": stage_info.get("next_step_owner"),
-                "computed_stage": stage_info.get("computed_stage"),
-                "computed_stage_label": stage_info.get("computed_stage_label"),
-                "computed_next_step": stage_info.get("computed_next_step"),
-                "computed_next_step_owner": stage_info.get("computed_next_step_owner"),
-                "progress": progress,
-                "tasks": tasks,
-                "shipping": shipping_summary,
-                "stepper_steps": stage_info.get("stepper_steps", []),
-                "updated_at": folder.get("updated_at"),
-            }
-        }
+        # Served from the folder snapshot cache; children and their completion state
+        # are loaded with a constant number of set-based queries on a miss.
+        # File URLs are re-signed per response (one batched, cached call) since
+        # snapshots can outlive the URLs stored on the rows.
+        content = get_folder_snapshot(folder, user)
+        return {**content, "files": with_signed_urls(content.get("files") or [])}
     except HTTPException:
         raise
     except Exception as e:
@@ -1459,30 +1031,7 @@ async def get_folder_events(
 ):
     """Get activity timeline for a folder (order)."""
     try:
-        is_admin = user.get("role") == "admin"
-
-        folder_resp = supabase_storage.table("folders").select("id, created_by").eq("id", folder_id).single().execute()
-        if not folder_resp.data:
-            raise HTTPException(status_code=404, detail="Folder not found")
-        folder = folder_resp.data
-
-        if not is_admin:
-            try:
-                assignment = (
-                    supabase_storage
-                    .table("folder_assignments")
-                    .select("folder_id")
-                    .eq("folder_id", folder_id)
-                    .eq("user_id", user["id"])
-                    .execute()
-                )
-                if not assignment.data and folder.get("created_by") != user["id"]:
-                    raise HTTPException(status_code=403, detail="Access denied")
-            except HTTPException:
-                raise
-            except Exception:
-                if folder.get("created_by") != user["id"]:
-                    raise HTTPException(status_code=403, detail="Access denied")
+        _assert_folder_access(folder_id, user)
 
         events = (
             supabase_storage
@@ -2,10 +2,8 @@ from fastapi import APIRouter, HTTPException, Query, File, UploadFile, Depends,
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from decimal import Decimal
-from io import BytesIO
 import uuid
 import hmac
-import hashlib
 import base64
 import sys
 import os
@@ -17,10 +15,13 @@ from auth import get_current_user, get_current_admin, get_optional_user
 from email_service import email_service
 from email_utils import get_admin_emails
 from webhook_service import webhook_service
+from rag_service import invalidate_form_context
+from folder_snapshots import invalidate_folder_snapshot
+from access_control import get_access_control
+from upload_utils import FileTooLargeError, spool_upload
 from services.typeform_service import TypeformService
 import secrets
 import string
-import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -165,6 +166,7 @@ async def mark_form_complete(
                 logger.error("mark-complete REST fallback failed", exc_info=True)
                 raise HTTPException(status_code=500, detail=f"Failed to mark form as completed: {str(rest_err)}")
 
+        invalidate_folder_snapshot(folder_id)
         return {"success": True, "submission_id": submission_id, "already_completed": False}
 
     except HTTPException:
@@ -566,8 +568,7 @@ async def get_forms(
             else:
                 # For regular form list, only show forms in folders they have access to
                 # Get folders assigned to user
-                folder_assignments_response = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", current_user["id"]).execute()
-                accessible_folder_ids = [fa["folder_id"] for fa in (folder_assignments_response.data or [])]
+                accessible_folder_ids = sorted(get_access_control().folder_ids(current_user["id"]))
                 
                 if not accessible_folder_ids:
                     return []  # No accessible folders
@@ -638,17 +639,7 @@ async def get_form_by_slug(slug: str, current_user: Optional[dict] = Depends(get
         is_customer_with_access = False
         if current_user and current_user.get("role") == "customer":
             # Check if form is assigned to a folder that the customer has access to
-            try:
-                # Get folders assigned to user
-                folder_assignments_response = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", current_user["id"]).execute()
-                accessible_folder_ids = [fa["folder_id"] for fa in (folder_assignments_response.data or [])]
-                
-                if accessible_folder_ids:
-                    # Check if form is in any accessible folder
-                    form_assignments_response = supabase_storage.table("form_folder_assignments").select("id").eq("form_id", form.get("id")).in_("folder_id", accessible_folder_ids).execute()
-                    is_customer_with_access = bool(form_assignments_response.data)
-            except Exception as e:
-                logger.warning(f"Error checking customer form access: {str(e)}")
+            is_customer_with_access = get_access_control().can_access_form(current_user, form.get("id"))
         
         if form.get("status") != "published" and not is_customer_with_access:
             raise HTTPException(status_code=404, detail="Form not found")
@@ -736,18 +727,7 @@ async def get_form(form_id: str, current_user: Optional[dict] = Depends(get_opti
         
         # If customer, verify they have access through folder assignments
         if current_user and current_user.get("role") == "customer":
-            # Get folders assigned to user
-            folder_assignments_response = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", current_user["id"]).execute()
-            accessible_folder_ids = [fa["folder_id"] for fa in (folder_assignments_response.data or [])]
-            
-            if not accessible_folder_ids:
-                raise HTTPException(status_code=403, detail="You don't have access to this form")
-            
-            # Check if form is in any accessible folder
-            form_assignments_response = supabase_storage.table("form_folder_assignments").select("id").eq("form_id", form_id).in_("folder_id", accessible_folder_ids).execute()
-            has_access = bool(form_assignments_response.data)
-            
-            if not has_access:
+            if not get_access_control().can_access_form(current_user, form_id):
                 raise HTTPException(status_code=403, detail="You don't have access to this form")
         
         # Sort fields by order_index and map form_fields to fields for Pydantic model
@@ -976,6 +956,7 @@ async def update_form(form_id: str, form_update: FormUpdate, current_admin: dict
         
         # Update form
         supabase_storage.table("forms").update(update_data).eq("id", form_id).execute()
+        invalidate_form_context()
         
         # Return updated form
         # Pass current_admin as current_user since we're calling from within update_form
@@ -997,6 +978,7 @@ async def delete_form(form_id: str, current_admin: dict = Depends(get_current_ad
         
         # Delete form (cascade will delete fields, submissions, and answers)
         supabase_storage.table("forms").delete().eq("id", form_id).execute()
+        invalidate_form_context()
         
         return {"message": "Form deleted successfully"}
         
@@ -1439,11 +1421,8 @@ async def export_submissions_pdf(form_id: str, current_admin: dict = Depends(get
     """Export form submissions as PDF (admin only)"""
     try:
         from fastapi.responses import Response
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib import colors
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from pdf_renderers import render_submissions_pdf
+        from pdf_render_service import get_pdf_render_service
         
         # Get form and submissions
         form_response = supabase_storage.table("forms").select("*").eq("id", form_id).single().execute()
@@ -1458,128 +1437,14 @@ async def export_submissions_pdf(form_id: str, current_admin: dict = Depends(get
         if not submissions:
             raise HTTPException(status_code=400, detail="No submissions to export")
         
-        # Create PDF buffer
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            topMargin=0.75*inch,
-            bottomMargin=0.75*inch,
-            title=f"{form.get('name', 'Form')} - Submissions"
-        )
-        
-        elements = []
-        styles = getSampleStyleSheet()
+        # Form fields for answer labels (same for every submission)
+        fields_response = supabase_storage.table("form_fields").select("*").eq("form_id", form_id).order("order_index").execute()
+        fields = {f['id']: f for f in (fields_response.data or [])}
         
-        # Title
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#1a1a1a'),
-            spaceAfter=12,
-        )
-        elements.append(Paragraph(form.get('name', 'Form Submissions'), title_style))
-        elements.append(Paragraph(f"Total Submissions: {len(submissions)}", styles['Normal']))
-        elements.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Process each submission
-        for idx, submission in enumerate(submissions):
-            if idx > 0:
-                elements.append(PageBreak())
-            
-            # Submission header
-            header_style = ParagraphStyle(
-                'SubmissionHeader',
-                parent=styles['Heading2'],
-                fontSize=14,
-                textColor=colors.HexColor('#333333'),
-                spaceAfter=8,
-            )
-            elements.append(Paragraph(f"Submission #{idx + 1}", header_style))
-            
-            # Submission metadata
-            metadata_data = [
-                ['Field', 'Value'],
-                ['Submission ID', submission.get('id', 'N/A')],
-                ['Submitted At', submission.get('submitted_at', 'N/A')],
-                ['Started At', submission.get('started_at', 'N/A') or 'N/A'],
-                ['Submitter Name', submission.get('submitter_name', 'N/A') or 'N/A'],
-                ['Submitter Email', submission.get('submitter_email', 'N/A') or 'N/A'],
-                ['Time Spent', f"{submission.get('time_spent_seconds', 0) or 0} seconds"],
-                ['Status', submission.get('status', 'N/A')],
-                ['Review Status', submission.get('review_status', 'new') or 'new'],
-            ]
-            
-            metadata_table = Table(metadata_data, colWidths=[2*inch, 4*inch])
-            metadata_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ]))
-            elements.append(metadata_table)
-            elements.append(Spacer(1, 0.2*inch))
-            
-            # Get form fields for reference
-            fields_response = supabase_storage.table("form_fields").select("*").eq("form_id", form_id).order("order_index").execute()
-            fields = {f['id']: f for f in (fields_response.data or [])}
-            
-            # Answers
-            answers = submission.get('form_submission_answers', [])
-            if answers:
-                elements.append(Paragraph("Responses:", styles['Heading3']))
-                
-                answers_data = [['Field', 'Answer']]
-                for answer in answers:
-                    field_id = answer.get('field_id')
-                    field = fields.get(field_id, {})
-                    field_label = field.get('label', f"Field {field_id[:8]}...") if field_id else 'Unknown Field'
-                    
-                    answer_text = answer.get('answer_text', '')
-                    if not answer_text and answer.get('answer_value'):
-                        answer_value = answer.get('answer_value', {})
-                        if isinstance(answer_value, dict) and answer_value.get('value'):
-                            answer_text = str(answer_value['value'])
-                        else:
-                            answer_text = str(answer_value)
-                    
-                    if not answer_text:
-                        answer_text = 'N/A'
-                    
-                    # Truncate long answers for table display
-                    if len(answer_text) > 100:
-                        answer_text = answer_text[:100] + '...'
-                    
-                    answers_data.append([field_label, answer_text])
-                
-                answers_table = Table(answers_data, colWidths=[2.5*inch, 3.5*inch])
-                answers_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ]))
-                elements.append(answers_table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
+        pdf_bytes = await get_pdf_render_service().render(render_submissions_pdf, form, submissions, fields)
         
         return Response(
-            content=buffer.read(),
+            content=pdf_bytes,
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f'attachment; filename="{form.get("name", "submissions").replace(" ", "_")}_submissions_{datetime.now().strftime("%Y%m%d")}.pdf"'
@@ -2307,6 +2172,7 @@ async def restore_form_version(
         }
         
         supabase_storage.table("forms").update(update_data).eq("id", form_id).execute()
+        invalidate_form_context()
         
         # Restore fields
         fields_data = form_data.get("fields", [])
@@ -2549,6 +2415,7 @@ async def submit_form(form_id: str, submission: FormSubmissionCreate, request: R
             raise HTTPException(status_code=500, detail="Failed to create submission")
         
         created_submission = submission_response.data[0]
+        invalidate_folder_snapshot(submission_data.get("folder_id"))
         
         # Create answers
         if submission.answers:
@@ -2641,6 +2508,7 @@ async def submit_form(form_id: str, submission: FormSubmissionCreate, request: R
                             fid = a.get("folder_id")
                             if not fid:
                                 continue
+                            invalidate_folder_snapshot(fid)
                             try:
                                 supabase_storage.table("folder_events").insert({
                                     "id": str(uuid.uuid4()),
@@ -2672,13 +2540,14 @@ async def upload_file(form_id: str, file: UploadFile = File(...)):
         if not form_response.data:
             raise HTTPException(status_code=404, detail="Form not found")
         
-        # Validate file size (10MB max)
-        file_content = await file.read()
-        if len(file_content) > 10 * 1024 * 1024:
+        # Stream into a spooled temp file, validating size (10MB max) and hashing as it is read
+        try:
+            file_upload = await spool_upload(file, 10 * 1024 * 1024)
+        except FileTooLargeError:
             raise HTTPException(status_code=400, detail="File size exceeds 10MB limit")
         
         # Generate unique filename
-        file_hash = hashlib.md5(file_content).hexdigest()[:8]
+        file_hash = file_upload.hexdigest("md5")[:8]
         file_extension = file.filename.split('.')[-1] if '.' in file.filename else ''
         unique_filename = f"{form_id}/{file_hash}_{uuid.uuid4().hex[:8]}.{file_extension}" if file_extension else f"{form_id}/{file_hash}_{uuid.uuid4().hex[:8]}"
         
@@ -2687,14 +2556,15 @@ async def upload_file(form_id: str, file: UploadFile = File(...)):
         try:
             # Upload the file using storage client
             # Note: We use supabase_storage which uses service_role key if available
-            response = supabase_storage.storage.from_("form-uploads").upload(
-                unique_filename,
-                file_content,
-                file_options={
-                    "content-type": file.content_type or "application/octet-stream",
-                    "upsert": "false"
-                }
-            )
+            with file_upload, file_upload.storage_body() as body:
+                supabase_storage.storage.from_("form-uploads").upload(
+                    unique_filename,
+                    body,
+                    file_options={
+                        "content-type": file.content_type or "application/octet-stream",
+                        "upsert": "false"
+                    }
+                )
             print(f"File uploaded successfully: {unique_filename}")
         except HTTPException:
             raise
@@ -2731,7 +2601,7 @@ async def upload_file(form_id: str, file: UploadFile = File(...)):
         return {
             "file_url": public_url_data,
             "file_name": file.filename,
-            "file_size": len(file_content),
+            "file_size": file_upload.size,
             "file_type": file.content_type,
             "storage_path": unique_filename
         }
@@ -40,12 +40,28 @@ except Exception as e:
     get_chunking_service = None
 
 try:
-    from embeddings_service import get_embeddings_service
+    from embeddings_service import get_embeddings_service, format_embedding_text
     EMBEDDINGS_AVAILABLE = True
 except Exception as e:
     logger.warning(f"embeddings_service not available: {e}")
     EMBEDDINGS_AVAILABLE = False
     get_embeddings_service = None
+    format_embedding_text = None
+
+try:
+    from rag_service import get_rag_service, invalidate_knowledge_context
+    RAG_AVAILABLE = True
+except Exception as e:
+    logger.warning(f"rag_service not available: {e}")
+    RAG_AVAILABLE = False
+    get_rag_service = None
+    invalidate_knowledge_context = None
+
+try:
+    from knowledge_index import refresh_knowledge_index
+except Exception as e:
+    logger.warning(f"knowledge_index not available: {e}")
+    refresh_knowledge_index = None
 
 # Maximum file size: 50MB for knowledge base documents
 MAX_FILE_SIZE = 50 * 1024 * 1024
@@ -54,6 +70,17 @@ MAX_FILE_SIZE = 50 * 1024 * 1024
 ALLOWED_EXTENSIONS = {'.pdf', '.xlsx', '.xls', '.pptx', '.ppt', '.docx', '.txt'}
 
 
+def _knowledge_changed(entry_id: Optional[str] = None, document_id: Optional[str] = None):
+    """
+    Invalidate cached chat retrieval results after the knowledge base changes
+    and refresh the in-process vector index (one entry, one document, or everything)
+    """
+    if RAG_AVAILABLE and invalidate_knowledge_context:
+        invalidate_knowledge_context()
+    if refresh_knowledge_index:
+        refresh_knowledge_index(entry_id=entry_id, document_id=document_id)
+
+
 async def process_document_background(
     document_id: str,
     file_data: bytes,
@@ -126,7 +153,7 @@ async def process_document_background(
                     continue
                 
                 # Convert to string format for pgvector
-                embedding_str = '[' + ','.join([str(float(x)) for x in embedding]) + ']'
+                embedding_str = format_embedding_text(embedding)
                 
                 # Store in knowledge_embeddings
                 supabase_storage.table("knowledge_embeddings").insert({
@@ -155,6 +182,7 @@ async def process_document_background(
             }).eq("id", document_id).execute()
             
             logger.info(f"Successfully processed {filename}: {successful_chunks} chunks")
+            _knowledge_changed(document_id=document_id)
         else:
             raise Exception("No chunks were successfully processed")
             
@@ -326,6 +354,7 @@ async def delete_document(
         
         # Delete document (cascade will delete chunks)
         supabase_storage.table("knowledge_documents").delete().eq("id", document_id).execute()
+        _knowledge_changed(document_id=document_id)
         
         return {"message": "Document and all chunks deleted successfully"}
         
@@ -362,6 +391,7 @@ async def reprocess_document(
         logger.info(f"Deleting old chunks for document {document_id}...")
         chunks_deleted = supabase_storage.table("knowledge_embeddings").delete().eq("document_id", document_id).execute()
         logger.info(f"Deleted chunks for document {document_id}")
+        _knowledge_changed(document_id=document_id)
         
         # If file is provided, reprocess with new file
         if file:
@@ -461,6 +491,7 @@ async def reprocess_all_documents(
         # Delete all chunks from all documents
         logger.info(f"Deleting all chunks from {len(documents)} documents...")
         chunks_deleted = supabase_storage.table("knowledge_embeddings").delete().neq("document_id", "null").execute()
+        _knowledge_changed()
         
         # Reset all document statuses
         updated = supabase_storage.table("knowledge_documents").update({
@@ -613,35 +644,22 @@ async def find_similar_entries(
     Returns entries with similarity score above threshold
     """
     try:
-        # Get the entry
-        entry_response = supabase_storage.table("knowledge_embeddings").select("*").eq("id", entry_id).single().execute()
+        # Only check that the entry exists and has an embedding; the RPC looks the
+        # stored vector up by id, so it is never downloaded and re-sent
+        entry_response = supabase_storage.table("knowledge_embeddings").select("id").eq("id", entry_id).not_.is_("embedding", "null").execute()
         
         if not entry_response.data:
-            raise HTTPException(status_code=404, detail="Entry not found")
-        
-        entry = entry_response.data
-        embedding = entry.get("embedding")
-        
-        if not embedding:
+            exists_response = supabase_storage.table("knowledge_embeddings").select("id").eq("id", entry_id).execute()
+            if not exists_response.data:
+                raise HTTPException(status_code=404, detail="Entry not found")
             return {"similar_entries": [], "message": "Entry has no embedding - cannot find similar entries"}
         
-        # Convert embedding to string format for RPC call
-        # The embedding might be stored as a list, string, or already in vector format
-        if isinstance(embedding, list):
-            embedding_str = '[' + ','.join([str(float(x)) for x in embedding]) + ']'
-        elif isinstance(embedding, str):
-            # If it's already a string, use it directly
-            embedding_str = embedding
-        else:
-            # Try to convert to string
-            embedding_str = str(embedding)
-        
         # Use RPC function to find similar entries
         try:
             similar_response = supabase_storage.rpc(
                 "rag_search_knowledge_embeddings_vector",
                 {
-                    "query_embedding_text": embedding_str,
+                    "query_entry_id": entry_id,
                     "match_limit": limit + 1  # +1 to exclude the original entry
                 }
             ).execute()
@@ -727,11 +745,11 @@ async def update_knowledge_entry(
             if text_to_embed:
                 embedding = embeddings_service.generate_embedding(text_to_embed)
                 if embedding and len(embedding) > 0:
-                    embedding_str = '[' + ','.join([str(float(x)) for x in embedding]) + ']'
-                    update_data["embedding"] = embedding_str
+                    update_data["embedding"] = format_embedding_text(embedding)
         
         # Update entry
         supabase_storage.table("knowledge_embeddings").update(update_data).eq("id", entry_id).execute()
+        _knowledge_changed(entry_id=entry_id)
         
         # Get updated entry
         updated = supabase_storage.table("knowledge_embeddings").select("*").eq("id", entry_id).single().execute()
@@ -762,6 +780,7 @@ async def delete_knowledge_entry(
         
         # Delete entry
         supabase_storage.table("knowledge_embeddings").delete().eq("id", entry_id).execute()
+        _knowledge_changed(entry_id=entry_id)
         
         return {"message": "Entry deleted successfully"}
         
@@ -817,3 +836,35 @@ async def get_knowledge_stats(
         logger.error(f"Error getting stats: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
+
+@router.get("/cache/stats")
+async def get_retrieval_cache_stats(
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Get hit/miss metrics for the chat retrieval caches, per source
+    """
+    if not RAG_AVAILABLE or not get_rag_service:
+        raise HTTPException(status_code=503, detail="RAG service not available")
+    
+    return get_rag_service().cache_stats()
+
+
+@router.post("/cache/invalidate")
+async def invalidate_retrieval_cache(
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Invalidate cached chat retrieval results
+    
+    Use after editing pricing tables directly in the database
+    """
+    if not RAG_AVAILABLE or not get_rag_service:
+        raise HTTPException(status_code=503, detail="RAG service not available")
+    
+    rag_service = get_rag_service()
+    rag_service.invalidate_knowledge()
+    rag_service.invalidate_forms()
+    rag_service.invalidate_client()
+    
+    return {"message": "Retrieval cache invalidated"}
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Depends, Request
 from typing import List, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -6,14 +6,20 @@ import sys
 import os
 import logging
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from models import Quote, QuoteCreate, QuoteUpdate, LineItem, LineItemCreate
-from database import supabase, supabase_storage, supabase_url, supabase_service_role_key
+from models import Quote, QuoteCreate, QuoteUpdate, LineItem
+from database import supabase, supabase_storage
 from stripe_service import StripeService
 from auth import get_current_user, get_current_admin, get_optional_user
 from email_service import email_service
-from email_utils import get_admin_emails
+from email_utils import get_admin_emails, get_user_contacts, send_emails_bounded
+from rag_service import invalidate_client_context
+from pdf_cache import invalidate_quote_pdf
+from pricing_engine import calculate_line_total, quote_totals
+from autosave_buffer import get_autosave_buffer
+from quote_list_utils import list_quotes, quote_list_response, quote_select
+from folder_snapshots import invalidate_folder_snapshot
+from access_control import get_access_control, invalidate_user_access
 import uuid
-import requests
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -21,90 +27,19 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/quotes", tags=["quotes"])
 
-def calculate_line_item_total(item: LineItemCreate, use_line_tax: bool = True, quote_tax_rate: Decimal = Decimal("0")) -> Decimal:
-    """Calculate total for a line item with flexible tax calculation"""
-    subtotal = item.quantity * item.unit_price
-    discount_amount = subtotal * (item.discount_percent or Decimal("0")) / Decimal("100")
-    after_discount = subtotal - discount_amount
-    
-    # Use line-item specific tax rate if provided and use_line_tax is True, otherwise use quote-level tax
-    if use_line_tax and item.tax_rate:
-        line_tax_rate = item.tax_rate
-    else:
-        line_tax_rate = quote_tax_rate
-    
-    tax = after_discount * line_tax_rate / Decimal("100")
-    return after_discount + tax
+# Max ids per `id=in.(...)` request when loading quotes by id
+QUOTE_FETCH_CHUNK_SIZE = 200
 
-def calculate_quote_totals(line_items: List[dict], tax_rate: Decimal, tax_method: str = "after_discount") -> dict:
-    """
-    Calculate subtotal, tax, and total for a quote with flexible tax calculation.
-    
-    tax_method options:
-    - "after_discount": Tax applied to amount after discount (default)
-    - "before_discount": Tax applied to subtotal before discount
-    - "line_item": Use individual line item tax rates (ignores quote-level tax_rate)
-    """
-    subtotal = Decimal("0")
-    tax_amount = Decimal("0")
-    
-    for item in line_items:
-        qty = Decimal(item["quantity"])
-        price = Decimal(item["unit_price"])
-        discount_pct = Decimal(item.get("discount_percent", 0))
-        
-        line_subtotal = qty * price
-        discount_amount = line_subtotal * discount_pct / Decimal("100")
-        after_discount = line_subtotal - discount_amount
-        
-        subtotal += after_discount
-        
-        # Calculate tax based on method
-        if tax_method == "line_item":
-            # Use line item's own tax rate
-            line_tax_rate = Decimal(item.get("tax_rate", 0))
-            if tax_method == "before_discount":
-                taxable_amount = line_subtotal
-            else:
-                taxable_amount = after_discount
-            line_tax = taxable_amount * line_tax_rate / Decimal("100")
-            tax_amount += line_tax
-        else:
-            # Use quote-level tax rate
-            if tax_method == "before_discount":
-                taxable_amount = line_subtotal
-            else:  # after_discount
-                taxable_amount = after_discount
-            # Don't add here, we'll calculate total tax at the end
-    
-    # If not using line_item method, calculate tax on total subtotal
-    if tax_method != "line_item":
-        if tax_method == "before_discount":
-            # Recalculate subtotal before discount for tax calculation
-            subtotal_before_discount = sum(
-                Decimal(item["quantity"]) * Decimal(item["unit_price"])
-                for item in line_items
-            )
-            tax_amount = subtotal_before_discount * tax_rate / Decimal("100")
-            # Recalculate subtotal after discount for display
-            subtotal = sum(
-                Decimal(item["quantity"]) * Decimal(item["unit_price"]) 
-                - (Decimal(item["quantity"]) * Decimal(item["unit_price"]) * Decimal(item.get("discount_percent", 0)) / Decimal("100"))
-                for item in line_items
-            )
-        else:  # after_discount
-            tax_amount = subtotal * tax_rate / Decimal("100")
-    
-    total = subtotal + tax_amount
-    return {
-        "subtotal": str(subtotal),
-        "tax_amount": str(tax_amount),
-        "total": str(total)
-    }
+def _invalidate_quote_context(quotes: Optional[List[dict]]):
+    """Drop cached chat context for the clients owning these quotes, their cached PDFs and folder snapshots"""
+    for client_id in {q.get("client_id") for q in (quotes or []) if q.get("client_id")}:
+        invalidate_client_context(client_id)
+    invalidate_quote_pdf(*{q.get("id") for q in (quotes or []) if q.get("id")})
+    invalidate_folder_snapshot(*{q.get("folder_id") for q in (quotes or []) if q.get("folder_id")})
 
 @router.get("", response_model=List[Quote])
 async def get_quotes(
-    search: Optional[str] = Query(None, description="Search by title, quote number, or client name"),
+    search: Optional[str] = Query(None, description="Search by title, quote number, client, notes, terms, line items or totals"),
     status: Optional[str] = Query(None, description="Filter by quote status (draft, sent, viewed, accepted, declined)"),
     payment_status: Optional[str] = Query(None, description="Filter by payment status (unpaid, paid, partially_paid, refunded, failed, voided, uncollectible)"),
     client_id: Optional[str] = Query(None, description="Filter by client ID"),
@@ -116,10 +51,13 @@ async def get_quotes(
     sort_order: Optional[str] = Query("desc", description="Sort order (asc, desc)"),
     limit: Optional[int] = Query(None, description="Limit number of results"),
     offset: Optional[int] = Query(0, description="Offset for pagination"),
+    view: Optional[str] = Query("full", description="full (all fields, client and line items) or summary (list columns only)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (overrides view); clients and line_items embed related rows"),
     current_user: Optional[dict] = Depends(get_optional_user)
 ):
     """Get all quotes with optional filtering, sorting, and pagination.
     Admins see all quotes. Customers see only assigned quotes.
+    view=summary or fields=... return only the selected fields.
     """
     try:
         # Valid status values
@@ -153,154 +91,46 @@ async def get_quotes(
                 detail=f"Invalid sort_order. Must be one of: {', '.join(sorted(valid_sort_orders))}"
             )
         
-        # Start building query
-        query = supabase_storage.table("quotes").select("*, clients(*), line_items(*)")
-        
-        # If customer, only show quotes in folders they have access to
-        if current_user and current_user.get("role") == "customer":
-            # Get folders assigned to user
-            folder_assignments_response = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", current_user["id"]).execute()
-            accessible_folder_ids = [fa["folder_id"] for fa in (folder_assignments_response.data or [])]
-            
-            if not accessible_folder_ids:
-                return []  # No accessible folders
-            
-            # Get quotes assigned to these folders
-            quote_assignments_response = supabase_storage.table("quote_folder_assignments").select("quote_id").in_("folder_id", accessible_folder_ids).execute()
-            quote_ids_from_assignments = [qa["quote_id"] for qa in (quote_assignments_response.data or [])]
-            
-            # Also get quotes with folder_id directly set (for backward compatibility)
-            quotes_with_folder = supabase_storage.table("quotes").select("id").in_("folder_id", accessible_folder_ids).execute()
-            quote_ids_from_direct = [q["id"] for q in (quotes_with_folder.data or [])]
-            
-            # Combine and deduplicate
-            assigned_quote_ids = list(set(quote_ids_from_assignments + quote_ids_from_direct))
-            
-            if not assigned_quote_ids:
-                return []  # No assigned quotes
-            
-            query = query.in_("id", assigned_quote_ids)
-        
-        # Apply client filter
-        if client_id:
-            query = query.eq("client_id", client_id)
-        
-        # Apply status filter
-        if status:
-            query = query.eq("status", status)
-        
-        # Apply payment_status filter
-        # Note: For "unpaid", we need to include null values, so we'll filter in memory
-        # For other statuses, we can filter at the database level
-        if payment_status and payment_status != "unpaid":
-            query = query.eq("payment_status", payment_status)
-        
-        # Apply date range filters
-        if created_from:
-            try:
-                created_from_date = datetime.strptime(created_from, "%Y-%m-%d")
-                query = query.gte("created_at", created_from_date.isoformat())
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid created_from date format. Use YYYY-MM-DD")
-        
-        if created_to:
-            try:
-                created_to_date = datetime.strptime(created_to, "%Y-%m-%d")
-                # Add one day to include the entire day
-                created_to_date = created_to_date + timedelta(days=1)
-                query = query.lt("created_at", created_to_date.isoformat())
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid created_to date format. Use YYYY-MM-DD")
-        
-        if expiration_from:
-            try:
-                expiration_from_date = datetime.strptime(expiration_from, "%Y-%m-%d")
-                query = query.gte("expiration_date", expiration_from_date.isoformat())
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid expiration_from date format. Use YYYY-MM-DD")
+        try:
+            select = quote_select(view, fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Parse date range filters (upper bounds are exclusive: +1 day includes the entire day)
+        date_filters = {}
+        for name, value, column, days in (
+            ("created_from", created_from, "created_from", 0),
+            ("created_to", created_to, "created_before", 1),
+            ("expiration_from", expiration_from, "expiration_from", 0),
+            ("expiration_to", expiration_to, "expiration_before", 1),
+        ):
+            if value:
+                try:
+                    date_filters[column] = (datetime.strptime(value, "%Y-%m-%d") + timedelta(days=days)).isoformat()
+                except ValueError:
+                    raise HTTPException(status_code=400, detail=f"Invalid {name} date format. Use YYYY-MM-DD")
+        
+        # Search, filters, customer folder access, sorting and pagination all run in the
+        # database (list_quotes RPC, see database/quote_list_migration.sql); the page comes
+        # back projected with its client (and line items for the full view) in one request
+        quotes = list_quotes(
+            select,
+            sort_by=sort_by,
+            sort_desc=sort_order == "desc",
+            search_term=search.strip() if search and search.strip() else None,
+            status_filter=status,
+            payment_status_filter=payment_status,
+            client_id_filter=client_id,
+            accessible_to_user=current_user["id"] if current_user and current_user.get("role") == "customer" else None,
+            created_from=date_filters.get("created_from"),
+            created_before=date_filters.get("created_before"),
+            expiration_from=date_filters.get("expiration_from"),
+            expiration_before=date_filters.get("expiration_before"),
+            page_limit=limit or None,
+            page_offset=offset or 0
+        )
         
-        if expiration_to:
-            try:
-                expiration_to_date = datetime.strptime(expiration_to, "%Y-%m-%d")
-                expiration_to_date = expiration_to_date + timedelta(days=1)
-                query = query.lt("expiration_date", expiration_to_date.isoformat())
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid expiration_to date format. Use YYYY-MM-DD")
-        
-        # Apply text search - search across title and quote_number
-        # Note: We'll filter client name in memory after fetching since Supabase
-        # doesn't easily support filtering on joined table fields
-        if search and search.strip():
-            search_term = search.strip()
-            # Use ilike for case-insensitive search on title
-            # For quote_number, we'll also search in memory for better control
-            query = query.ilike("title", f"%{search_term}%")
-        
-        # Apply sorting
-        desc = sort_order == "desc"
-        query = query.order(sort_by, desc=desc)
-        
-        # Apply pagination
-        if limit:
-            query = query.limit(limit)
-        if offset:
-            query = query.offset(offset)
-        
-        # Execute query - include line_items for search
-        response = query.execute()
-        quotes = response.data
-        
-        # Load line items for each quote if we're searching
-        if search and search.strip():
-            quote_ids = [q["id"] for q in quotes]
-            if quote_ids:
-                line_items_response = supabase_storage.table("line_items").select("quote_id, description").in_("quote_id", quote_ids).execute()
-                line_items_map = {}
-                for item in line_items_response.data or []:
-                    if item["quote_id"] not in line_items_map:
-                        line_items_map[item["quote_id"]] = []
-                    line_items_map[item["quote_id"]].append(item.get("description", ""))
-                
-                # Attach line items to quotes
-                for quote in quotes:
-                    quote["_line_items_descriptions"] = " ".join(line_items_map.get(quote["id"], []))
-        
-        # Apply additional filters in memory for cases Supabase can't handle easily
-        # Enhanced search across all fields: title, quote_number, client name, notes, terms, line items
-        if search and search.strip():
-            search_term_lower = search.strip().lower()
-            quotes = [
-                quote for quote in quotes
-                if (
-                    search_term_lower in quote.get("title", "").lower() or
-                    search_term_lower in quote.get("quote_number", "").lower() or
-                    (quote.get("clients") and search_term_lower in quote.get("clients", {}).get("name", "").lower()) or
-                    (quote.get("clients") and search_term_lower in quote.get("clients", {}).get("email", "").lower()) or
-                    (quote.get("clients") and search_term_lower in quote.get("clients", {}).get("company", "").lower()) or
-                    search_term_lower in (quote.get("notes", "") or "").lower() or
-                    search_term_lower in (quote.get("terms", "") or "").lower() or
-                    search_term_lower in (quote.get("_line_items_descriptions", "") or "").lower() or
-                    search_term_lower in str(quote.get("total", "")).lower() or
-                    search_term_lower in str(quote.get("subtotal", "")).lower()
-                )
-            ]
-        
-        # Handle null payment_status: if filtering for "unpaid", include both "unpaid" and null values
-        # If filtering for other payment_status, ensure we only get exact matches
-        if payment_status:
-            if payment_status == "unpaid":
-                quotes = [
-                    quote for quote in quotes
-                    if quote.get("payment_status") is None or quote.get("payment_status") == "unpaid"
-                ]
-            else:
-                # For other statuses, ensure exact match (already filtered by DB, but double-check)
-                quotes = [
-                    quote for quote in quotes
-                    if quote.get("payment_status") == payment_status
-                ]
-        
-        return quotes
+        return quote_list_response(quotes, select)
     except HTTPException:
         raise
     except Exception as e:
@@ -318,26 +148,8 @@ async def get_quote(quote_id: str, current_user: Optional[dict] = Depends(get_op
         
         # If customer, verify they have access through folder assignments
         if current_user and current_user.get("role") == "customer":
-            # Get folders assigned to user
-            folder_assignments_response = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", current_user["id"]).execute()
-            accessible_folder_ids = [fa["folder_id"] for fa in (folder_assignments_response.data or [])]
-            
-            if not accessible_folder_ids:
-                raise HTTPException(status_code=403, detail="You don't have access to this quote")
-            
-            # Check if quote is in any accessible folder
-            quote = response.data[0]
-            quote_folder_id = quote.get("folder_id")
-            
-            # Check direct folder_id match
-            has_access = quote_folder_id in accessible_folder_ids if quote_folder_id else False
-            
-            # Also check quote_folder_assignments
-            if not has_access:
-                quote_assignments_response = supabase_storage.table("quote_folder_assignments").select("id").eq("quote_id", quote_id).in_("folder_id", accessible_folder_ids).execute()
-                has_access = bool(quote_assignments_response.data)
-            
-            if not has_access:
+            # Quote's own folder or a folder it is assigned to (quote_folder_assignments)
+            if not get_access_control().can_access_quote(current_user, response.data[0]):
                 raise HTTPException(status_code=403, detail="You don't have access to this quote")
         
         return response.data[0]
@@ -354,17 +166,7 @@ async def create_quote(quote: QuoteCreate, current_admin: dict = Depends(get_cur
         quote_number = f"QT-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:6].upper()}"
         
         # Calculate totals
-        # Convert line items to dict, ensuring Decimal fields are strings
-        line_items_data = []
-        for item in quote.line_items:
-            item_dict = item.model_dump() if hasattr(item, 'model_dump') else item.dict()
-            # Convert Decimal fields to strings
-            for key, value in item_dict.items():
-                if isinstance(value, Decimal):
-                    item_dict[key] = str(value)
-            line_items_data.append(item_dict)
-        
-        totals = calculate_quote_totals(line_items_data, quote.tax_rate, "after_discount")
+        totals = quote_totals(quote.line_items, quote.tax_rate, "after_discount")
         
         # Create quote - convert Decimal fields to strings for JSON serialization
         # Exclude line_items, create_folder, and assign_folder_to_user_id (not database columns)
@@ -388,12 +190,13 @@ async def create_quote(quote: QuoteCreate, current_admin: dict = Depends(get_cur
         
         quote_response = supabase_storage.table("quotes").insert(quote_data).execute()
         created_quote = quote_response.data[0]
+        _invalidate_quote_context([created_quote])
         
         # Create line items
         if quote.line_items:
             line_items_to_insert = []
             for item in quote.line_items:
-                line_total = calculate_line_item_total(item)
+                line_total = calculate_line_total(item)
                 line_items_to_insert.append({
                     "id": str(uuid.uuid4()),
                     "quote_id": created_quote["id"],
@@ -474,6 +277,7 @@ async def create_quote(quote: QuoteCreate, current_admin: dict = Depends(get_cur
                             }
                             # Use service role client to bypass RLS
                             supabase_storage.table("folder_assignments").insert(assignment_data).execute()
+                            invalidate_user_access(assign_user_id)
                             print(f"Folder assigned to user: {assign_user_id}")
                         except Exception as assign_error:
                             print(f"Warning: Could not assign folder to user: {str(assign_error)}")
@@ -501,6 +305,7 @@ async def create_quote(quote: QuoteCreate, current_admin: dict = Depends(get_cur
 
         # Best-effort folder event for customer timeline (only when a folder exists)
         if folder_id:
+            invalidate_folder_snapshot(folder_id)
             try:
                 supabase_storage.table("folder_events").insert({
                     "id": str(uuid.uuid4()),
@@ -538,27 +343,9 @@ async def accept_quote(quote_id: str, current_user: dict = Depends(get_current_u
     try:
         # If customer, verify they have access to this quote using service role client to bypass RLS
         if current_user.get("role") == "customer":
-            # Get folders assigned to user
-            folder_assignments_response = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", current_user["id"]).execute()
-            accessible_folder_ids = [fa["folder_id"] for fa in (folder_assignments_response.data or [])]
-            
-            if not accessible_folder_ids:
-                raise HTTPException(status_code=403, detail="You don't have access to this quote")
-            
-            # Check if quote is in any accessible folder
-            quote_response = supabase_storage.table("quotes").select("folder_id").eq("id", quote_id).single().execute()
-            quote = quote_response.data if quote_response.data else {}
-            quote_folder_id = quote.get("folder_id")
-            
-            # Check direct folder_id match
-            has_access = quote_folder_id in accessible_folder_ids if quote_folder_id else False
-            
-            # Also check quote_folder_assignments
-            if not has_access:
-                quote_assignments_response = supabase_storage.table("quote_folder_assignments").select("id").eq("quote_id", quote_id).in_("folder_id", accessible_folder_ids).execute()
-                has_access = bool(quote_assignments_response.data)
-            
-            if not has_access:
+            quote_response = supabase_storage.table("quotes").select("id, folder_id").eq("id", quote_id).single().execute()
+            quote = quote_response.data if quote_response.data else {"id": quote_id}
+            if not get_access_control().can_access_quote(current_user, quote):
                 raise HTTPException(status_code=403, detail="You don't have access to this quote")
         # Update quote status to accepted
         update_data = {
@@ -569,6 +356,7 @@ async def accept_quote(quote_id: str, current_user: dict = Depends(get_current_u
         response = supabase_storage.table("quotes").update(update_data).eq("id", quote_id).execute()
         if not response.data:
             raise HTTPException(status_code=404, detail="Quote not found")
+        _invalidate_quote_context(response.data)
         
         # Fetch complete quote with relations
         response = supabase_storage.table("quotes").select("*, clients(*), line_items(*)").eq("id", quote_id).execute()
@@ -677,6 +465,9 @@ async def update_quote(quote_id: str, quote_update: QuoteUpdate, current_admin:
     module_logger = logging.getLogger(__name__)
     
     try:
+        # Write any buffered auto-save draft before the explicit save
+        get_autosave_buffer().flush(quote_id, force=True)
+        
         module_logger.info(f"=== UPDATE QUOTE CALLED ===")
         module_logger.info(f"Quote ID: {quote_id}")
         module_logger.info(f"QuoteUpdate object: {quote_update}")
@@ -728,7 +519,7 @@ async def update_quote(quote_id: str, quote_update: QuoteUpdate, current_admin:
             
             # Recalculate totals
             tax_rate = Decimal(update_data.get("tax_rate", current_quote.get("tax_rate", 0)))
-            totals = calculate_quote_totals(line_items, tax_rate, "after_discount")
+            totals = quote_totals(line_items, tax_rate, "after_discount")
             update_data.update(totals)
         
         # Create version before updating
@@ -832,6 +623,7 @@ async def update_quote(quote_id: str, quote_update: QuoteUpdate, current_admin:
                                 "assigned_at": datetime.now().isoformat()
                             }
                             supabase_storage.table("folder_assignments").insert(assignment_data).execute()
+                            invalidate_user_access(current_quote.get("client_id"))
                             module_logger.info(f"Folder assigned to client: {current_quote.get('client_id')}")
                         except Exception as e:
                             module_logger.warning(f"Failed to assign folder to client: {str(e)}")
@@ -847,6 +639,8 @@ async def update_quote(quote_id: str, quote_update: QuoteUpdate, current_admin:
         response = supabase_storage.table("quotes").update(update_data).eq("id", quote_id).execute()
         if not response.data:
             raise HTTPException(status_code=404, detail="Quote not found")
+        # The client may have changed, so invalidate both the old and new owner
+        _invalidate_quote_context([current_quote] + response.data)
         
         # Log status change activity
         new_status = update_data.get("status")
@@ -897,6 +691,7 @@ async def update_quote(quote_id: str, quote_update: QuoteUpdate, current_admin:
         try:
             folder_id_for_event = updated_quote.get("folder_id") or folder_id
             if folder_id_for_event:
+                invalidate_folder_snapshot(folder_id_for_event)
                 supabase_storage.table("folder_events").insert({
                     "id": str(uuid.uuid4()),
                     "folder_id": folder_id_for_event,
@@ -936,6 +731,8 @@ async def delete_quote(quote_id: str, current_admin: dict = Depends(get_current_
         response = supabase_storage.table("quotes").delete().eq("id", quote_id).execute()
         if not response.data:
             raise HTTPException(status_code=404, detail="Quote not found")
+        _invalidate_quote_context(response.data)
+        get_autosave_buffer().discard(quote_id)
         
         return {"message": "Quote deleted successfully"}
     except HTTPException:
@@ -969,6 +766,10 @@ async def bulk_delete_quotes(request: BulkDeleteRequest, current_admin: dict = D
         
         # Delete quotes
         response = supabase_storage.table("quotes").delete().in_("id", request.quote_ids).execute()
+        _invalidate_quote_context(response.data)
+        autosave_buffer = get_autosave_buffer()
+        for quote_id in request.quote_ids:
+            autosave_buffer.discard(quote_id)
         
         return {"message": f"Deleted {len(response.data)} quote(s) successfully", "deleted_count": len(response.data)}
     except HTTPException:
@@ -993,6 +794,7 @@ async def bulk_update_status(request: BulkStatusUpdateRequest, current_admin: di
         }
         
         response = supabase_storage.table("quotes").update(update_data).in_("id", request.quote_ids).execute()
+        _invalidate_quote_context(response.data)
         
         return {"message": f"Updated {len(response.data)} quote(s) successfully", "updated_count": len(response.data)}
     except HTTPException:
@@ -1000,9 +802,58 @@ async def bulk_update_status(request: BulkStatusUpdateRequest, current_admin: di
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _notify_bulk_quote_assignments(created: List[dict], admin_name: str):
+    """Email one digest per folder member listing the quotes newly assigned to their folders"""
+    try:
+        quote_ids_by_folder = {}
+        for assignment in created:
+            quote_ids_by_folder.setdefault(assignment["folder_id"], []).append(assignment["quote_id"])
+        
+        members_response = supabase_storage.table("folder_assignments").select("folder_id, user_id").in_("folder_id", list(quote_ids_by_folder)).execute()
+        quote_ids_by_user = {}
+        for member in members_response.data or []:
+            quote_ids = quote_ids_by_user.setdefault(member["user_id"], [])
+            quote_ids.extend(q for q in quote_ids_by_folder.get(member["folder_id"], []) if q not in quote_ids)
+        if not quote_ids_by_user:
+            return
+        
+        quote_ids = list({assignment["quote_id"] for assignment in created})
+        quotes_by_id = {}
+        for i in range(0, len(quote_ids), QUOTE_FETCH_CHUNK_SIZE):
+            chunk = quote_ids[i:i + QUOTE_FETCH_CHUNK_SIZE]
+            quotes_response = supabase_storage.table("quotes").select("id, title, quote_number").in_("id", chunk).execute()
+            quotes_by_id.update({q["id"]: q for q in quotes_response.data or []})
+        
+        contacts = get_user_contacts(quote_ids_by_user.keys())
+        sends = []
+        for user_id, user_quote_ids in quote_ids_by_user.items():
+            contact = contacts.get(user_id)
+            user_quotes = [quotes_by_id[q] for q in user_quote_ids if q in quotes_by_id]
+            if not contact or not user_quotes:
+                continue
+            sends.append(lambda contact=contact, user_quotes=user_quotes: email_service.send_quote_assignment_digest(
+                to_email=contact["email"],
+                quotes=user_quotes,
+                user_name=contact.get("name"),
+                assigned_by=admin_name
+            ))
+        
+        sent = send_emails_bounded(sends)
+        logger.info(f"Bulk quote assignment: sent {sent}/{len(sends)} digest email(s)")
+    except Exception as e:
+        print(f"Warning: Failed to send bulk assignment notifications: {str(e)}")
+
 @router.post("/bulk/assign")
-async def bulk_assign_quotes(request: BulkAssignRequest, current_admin: dict = Depends(get_current_admin)):
-    """Bulk assign quotes to folders (admin only)"""
+async def bulk_assign_quotes(
+    request: BulkAssignRequest,
+    background_tasks: BackgroundTasks,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Bulk assign quotes to folders (admin only)
+
+    All pairs are inserted in one statement (existing pairs are skipped) and
+    folder members get one digest email each, sent after the response.
+    """
     try:
         if not request.quote_ids:
             raise HTTPException(status_code=400, detail="No quote IDs provided")
@@ -1012,87 +863,17 @@ async def bulk_assign_quotes(request: BulkAssignRequest, current_admin: dict = D
         # Get admin name for assignment tracking
         admin_name = current_admin.get("name") or current_admin.get("email", "Admin")
         
-        assignments_to_create = []
-        for quote_id in request.quote_ids:
-            for folder_id in request.folder_ids:
-                # Check if assignment already exists
-                existing = supabase_storage.table("quote_folder_assignments").select("id").eq("quote_id", quote_id).eq("folder_id", folder_id).execute()
-                if not existing.data:
-                    assignments_to_create.append({
-                        "quote_id": quote_id,
-                        "folder_id": folder_id,
-                        "assigned_by": current_admin["id"],
-                        "assigned_at": datetime.now().isoformat()
-                    })
-        
-        if assignments_to_create:
-            supabase_storage.table("quote_folder_assignments").insert(assignments_to_create).execute()
-        
-        # Get users assigned to these folders for email notifications
-        folder_ids = list(set([a["folder_id"] for a in assignments_to_create]))
-        users_to_notify = []
-        
-        if folder_ids and supabase_service_role_key:
-            # Get folder assignments
-            folder_assignments_response = supabase_storage.table("folder_assignments").select("folder_id, user_id").in_("folder_id", folder_ids).execute()
-            
-            if folder_assignments_response.data:
-                user_ids = list(set([fa["user_id"] for fa in folder_assignments_response.data]))
-                
-                # Get user emails
-                for user_id in user_ids:
-                    try:
-                        auth_url = f"{supabase_url}/auth/v1/admin/users/{user_id}"
-                        headers = {
-                            "apikey": supabase_service_role_key,
-                            "Authorization": f"Bearer {supabase_service_role_key}",
-                            "Content-Type": "application/json"
-                        }
-                        user_response = requests.get(auth_url, headers=headers, timeout=10)
-                        if user_response.status_code == 200:
-                            user_data = user_response.json()
-                            user_email = user_data.get("email")
-                            user_metadata = user_data.get("user_metadata", {})
-                            user_name = user_metadata.get("name")
-                            if user_email:
-                                users_to_notify.append({
-                                    "email": user_email,
-                                    "name": user_name,
-                                    "user_id": user_id
-                                })
-                    except Exception as e:
-                        print(f"Warning: Could not fetch user info for {user_id}: {str(e)}")
+        response = supabase_storage.rpc("assign_quotes_to_folders", {
+            "target_quote_ids": list(dict.fromkeys(request.quote_ids)),
+            "target_folder_ids": list(dict.fromkeys(request.folder_ids)),
+            "assigned_by_user": current_admin["id"]
+        }).execute()
+        created = response.data or []
         
-        # Send email notifications
-        for assignment in assignments_to_create:
-            try:
-                # Get quote info
-                quote_response = supabase_storage.table("quotes").select("title, quote_number").eq("id", assignment["quote_id"]).execute()
-                if quote_response.data:
-                    quote = quote_response.data[0]
-                    quote_title = quote.get("title", "Quote")
-                    quote_number = quote.get("quote_number", "")
-                    
-                    # Notify all users with access to the folder
-                    for user_info in users_to_notify:
-                        # Check if user has access to this folder
-                        user_folder_access = supabase_storage.table("folder_assignments").select("id").eq("folder_id", assignment["folder_id"]).eq("user_id", user_info["user_id"]).execute()
-                        if user_folder_access.data:
-                            try:
-                                email_service.send_quote_assignment_notification(
-                                    to_email=user_info["email"],
-                                    quote_title=quote_title,
-                                    quote_number=quote_number,
-                                    quote_id=assignment["quote_id"],
-                                    user_name=user_info["name"],
-                                    assigned_by=admin_name
-                                )
-                            except Exception as e:
-                                print(f"Warning: Failed to send notification to {user_info['email']}: {str(e)}")
-            except Exception as e:
-                print(f"Warning: Failed to process notification for quote {assignment['quote_id']}: {str(e)}")
+        if created:
+            background_tasks.add_task(_notify_bulk_quote_assignments, created, admin_name)
         
-        return {"message": f"Assigned {len(assignments_to_create)} quote(s) successfully", "assigned_count": len(assignments_to_create)}
+        return {"message": f"Assigned {len(created)} quote(s) successfully", "assigned_count": len(created)}
     except HTTPException:
         raise
     except Exception as e:
@@ -1382,20 +1163,26 @@ async def delete_reminder(
 class AutoSaveRequest(PydanticBaseModel):
     draft_data: dict
 
+@router.get("/auto-save/stats")
+async def get_auto_save_stats(current_admin: dict = Depends(get_current_admin)):
+    """Auto-save buffer counters (admin only)"""
+    return get_autosave_buffer().stats()
+
 @router.post("/{quote_id}/auto-save")
 async def auto_save_quote(
     quote_id: str,
     request: AutoSaveRequest,
     current_admin: dict = Depends(get_current_admin)
 ):
-    """Auto-save a quote draft (admin only)"""
+    """Auto-save a quote draft (admin only)
+
+    Buffered in memory and written to the database when the editor goes idle
+    (see autosave_buffer.py), so frequent calls cost few writes.
+    """
     try:
-        supabase_storage.table("quotes").update({
-            "draft_auto_save": request.draft_data,
-            "last_auto_saved_at": datetime.now().isoformat()
-        }).eq("id", quote_id).execute()
+        saved_at = get_autosave_buffer().put(quote_id, current_admin["id"], request.draft_data)
         
-        return {"message": "Draft auto-saved successfully"}
+        return {"message": "Draft auto-saved successfully", "last_auto_saved_at": saved_at}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1406,6 +1193,10 @@ async def get_auto_saved_draft(
 ):
     """Get auto-saved draft for a quote (admin only)"""
     try:
+        buffered = get_autosave_buffer().get(quote_id)
+        if buffered is not None:
+            return buffered
+        
         response = supabase_storage.table("quotes").select("draft_auto_save, last_auto_saved_at").eq("id", quote_id).execute()
         if not response.data:
             raise HTTPException(status_code=404, detail="Quote not found")
@@ -1423,39 +1214,26 @@ async def get_auto_saved_draft(
 @router.get("/client/{client_id}/history")
 async def get_client_quote_history(
     client_id: str,
+    view: Optional[str] = Query("full", description="full (all fields, client and line items) or summary (list columns only)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (overrides view); clients and line_items embed related rows"),
     current_user: Optional[dict] = Depends(get_optional_user)
 ):
     """Get quote history for a specific client"""
     try:
-        query = supabase_storage.table("quotes").select("*, clients(*), line_items(*)").eq("client_id", client_id)
-        
-        # If customer, only show assigned quotes
-        if current_user and current_user.get("role") == "customer":
-            # Get folders assigned to user
-            folder_assignments_response = supabase_storage.table("folder_assignments").select("folder_id").eq("user_id", current_user["id"]).execute()
-            accessible_folder_ids = [fa["folder_id"] for fa in (folder_assignments_response.data or [])]
-            
-            if not accessible_folder_ids:
-                return []
-            
-            # Get quotes assigned to these folders
-            quote_assignments_response = supabase_storage.table("quote_folder_assignments").select("quote_id").in_("folder_id", accessible_folder_ids).execute()
-            quote_ids_from_assignments = [qa["quote_id"] for qa in (quote_assignments_response.data or [])]
-            
-            # Also get quotes with folder_id directly set (for backward compatibility)
-            quotes_with_folder = supabase_storage.table("quotes").select("id").in_("folder_id", accessible_folder_ids).execute()
-            quote_ids_from_direct = [q["id"] for q in (quotes_with_folder.data or [])]
-            
-            # Combine and deduplicate
-            assigned_quote_ids = list(set(quote_ids_from_assignments + quote_ids_from_direct))
-            
-            if assigned_quote_ids:
-                query = query.in_("id", assigned_quote_ids)
-            else:
-                return []
-        
-        response = query.order("created_at", desc=True).execute()
-        return response.data or []
+        try:
+            select = quote_select(view, fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # If customer, only show assigned quotes (resolved inside list_quotes)
+        quotes = list_quotes(
+            select,
+            client_id_filter=client_id,
+            accessible_to_user=current_user["id"] if current_user and current_user.get("role") == "customer" else None
+        )
+        return quote_list_response(quotes, select)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1464,55 +1242,56 @@ async def get_client_quote_history(
 async def get_quote_analytics(
     current_admin: dict = Depends(get_current_admin),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    interval: Optional[str] = Query(None, description="Include a time series bucketed by day, week or month")
 ):
-    """Get quote analytics summary (admin only)"""
+    """Get quote analytics summary (admin only)
+
+    Served from the daily rollups maintained in the database (see
+    quote_analytics_migration.sql), so cost does not grow with the number of quotes.
+    """
     try:
-        query = supabase_storage.table("quotes").select("*")
+        params = {"start_day": None, "end_day": None, "series_interval": None}
         
         if start_date:
             try:
-                start = datetime.strptime(start_date, "%Y-%m-%d")
-                query = query.gte("created_at", start.isoformat())
+                params["start_day"] = datetime.strptime(start_date, "%Y-%m-%d").date().isoformat()
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid start_date format. Use YYYY-MM-DD")
         
         if end_date:
             try:
-                end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-                query = query.lt("created_at", end.isoformat())
+                params["end_day"] = datetime.strptime(end_date, "%Y-%m-%d").date().isoformat()
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid end_date format. Use YYYY-MM-DD")
         
-        response = query.execute()
-        quotes = response.data or []
+        if interval:
+            if interval not in ("day", "week", "month"):
+                raise HTTPException(status_code=400, detail="Invalid interval. Use day, week or month")
+            params["series_interval"] = interval
         
-        total_quotes = len(quotes)
-        total_value = sum(Decimal(q.get("total", "0")) for q in quotes)
-        accepted_quotes = [q for q in quotes if q.get("status") == "accepted"]
-        accepted_value = sum(Decimal(q.get("total", "0")) for q in accepted_quotes)
-        conversion_rate = (len(accepted_quotes) / total_quotes * 100) if total_quotes > 0 else 0
+        response = supabase_storage.rpc("quote_analytics_summary", params).execute()
+        summary = response.data or {}
         
-        status_counts = {}
-        for quote in quotes:
-            status = quote.get("status", "unknown")
-            status_counts[status] = status_counts.get(status, 0) + 1
+        total_quotes = int(summary.get("total_quotes") or 0)
+        total_value = Decimal(str(summary.get("total_value") or "0"))
+        accepted_quotes = int(summary.get("accepted_quotes") or 0)
+        accepted_value = Decimal(str(summary.get("accepted_value") or "0"))
+        conversion_rate = (accepted_quotes / total_quotes * 100) if total_quotes > 0 else 0
         
-        payment_status_counts = {}
-        for quote in quotes:
-            payment_status = quote.get("payment_status") or "unpaid"
-            payment_status_counts[payment_status] = payment_status_counts.get(payment_status, 0) + 1
-        
-        return {
+        result = {
             "total_quotes": total_quotes,
             "total_value": str(total_value),
-            "accepted_quotes": len(accepted_quotes),
+            "accepted_quotes": accepted_quotes,
             "accepted_value": str(accepted_value),
             "conversion_rate": round(conversion_rate, 2),
             "average_quote_value": str(total_value / total_quotes) if total_quotes > 0 else "0",
-            "status_counts": status_counts,
-            "payment_status_counts": payment_status_counts,
+            "status_counts": summary.get("status_counts") or {},
+            "payment_status_counts": summary.get("payment_status_counts") or {},
         }
+        if interval:
+            result["series"] = summary.get("series") or []
+        return result
     except HTTPException:
         raise
     except Exception as e:
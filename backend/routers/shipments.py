@@ -12,6 +12,7 @@ from database import supabase_storage
 from auth import get_current_user
 from shippo_service import ShippoService
 from email_service import email_service, FRONTEND_URL
+from folder_snapshots import invalidate_folder_snapshot
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/shipments", tags=["shipments"])
@@ -196,6 +197,9 @@ async def update_shipment_tracking(shipment_id: str):
             existing = supabase_storage.table("shipment_tracking_events").select("id").eq("shipment_id", shipment_id).eq("timestamp", event_timestamp).eq("status", event_status).execute()
             if not existing.data:
                 supabase_storage.table("shipment_tracking_events").insert(event_data).execute()
+
+        # Shipping status and the latest tracking event are part of the folder summary
+        invalidate_folder_snapshot(shipment.get("folder_id"))
         
     except Exception as e:
         logger.error(f"Error updating shipment tracking: {str(e)}")
@@ -250,6 +254,7 @@ async def create_shipment(
             raise HTTPException(status_code=500, detail="Failed to create shipment")
         
         created_shipment = response.data[0]
+        invalidate_folder_snapshot(created_shipment.get("folder_id"))
 
         # Best-effort folder event for timeline
         try:
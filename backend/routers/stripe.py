@@ -1,15 +1,18 @@
-from fastapi import APIRouter, HTTPException, Request, Header, Depends
+from fastapi import APIRouter, HTTPException, Request, Header, Depends, Query
 from typing import Optional, Dict, Any
 import sys
 import os
 import json
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from stripe_service import StripeService
 from email_service import email_service
 from email_utils import get_admin_emails
-from auth import get_current_user
+from auth import get_current_user, get_current_admin
+from rag_service import invalidate_client_context
+from folder_snapshots import invalidate_folder_snapshot
+from webhook_processor import WebhookEventProcessor
 import stripe
 from dotenv import load_dotenv
 import requests
@@ -36,6 +39,11 @@ except Exception as e:
 
 router = APIRouter(prefix="/api/stripe", tags=["stripe"])
 
+# Stored events this old that are still pending/processing get re-queued by the recovery job
+WEBHOOK_RECOVERY_AGE_SECONDS = int(os.getenv("WEBHOOK_RECOVERY_AGE_SECONDS", "300"))
+WEBHOOK_RECOVERY_BATCH_SIZE = int(os.getenv("WEBHOOK_RECOVERY_BATCH_SIZE", "500"))
+WEBHOOK_REPLAY_MAX = 1000
+
 # Verify imports are available
 try:
     if 'supabase_storage' not in globals() or supabase_storage is None:
@@ -47,64 +55,43 @@ def store_webhook_event(
     stripe_event_id: str,
     event_type: str,
     event_data: Dict[str, Any],
-    processing_status: str = "pending",
-    error_message: Optional[str] = None,
-    quote_id: Optional[str] = None,
     invoice_id: Optional[str] = None
-) -> str:
-    """Store webhook event in database for audit trail and idempotency"""
-    try:
-        event_record = {
-            "stripe_event_id": stripe_event_id,
-            "event_type": event_type,
-            "event_data": json.dumps(event_data),
-            "processing_status": processing_status,
-            "error_message": error_message,
-            "quote_id": quote_id,
-            "invoice_id": invoice_id,
-        }
-        
-        # Try to insert, but handle duplicate key error (idempotency)
-        try:
-            response = supabase_storage.table("webhook_events").insert(event_record).execute()
-            if response.data:
-                return response.data[0]["id"]
-        except Exception as e:
-            # If event already exists, update it
-            if "duplicate" in str(e).lower() or "unique" in str(e).lower():
-                logger.info(f"Event {stripe_event_id} already exists, updating status")
-                update_response = supabase_storage.table("webhook_events").update({
-                    "processing_status": processing_status,
-                    "error_message": error_message,
-                    "processed_at": datetime.now().isoformat() if processing_status in ["completed", "failed"] else None
-                }).eq("stripe_event_id", stripe_event_id).execute()
-                if update_response.data:
-                    return update_response.data[0]["id"]
-            raise
-        
-        return None
-    except Exception as e:
-        logger.error(f"Failed to store webhook event: {str(e)}")
-        # Don't fail the webhook if we can't store it
+) -> Optional[Dict[str, Any]]:
+    """
+    Store a webhook event for processing, audit trail and idempotency
+    
+    Inserts the event as pending unless an event with the same Stripe id already
+    exists (ON CONFLICT DO NOTHING), so redeliveries never create a second row.
+    
+    Returns:
+        None if the event was newly stored, otherwise the existing row
+        (stripe_event_id, processing_status)
+    
+    Raises:
+        Exception: The event could not be stored (the webhook must not be acknowledged)
+    """
+    event_record = {
+        "stripe_event_id": stripe_event_id,
+        "event_type": event_type,
+        "event_data": event_data,
+        "processing_status": "pending",
+        "invoice_id": invoice_id,
+    }
+    response = supabase_storage.table("webhook_events").upsert(
+        event_record, on_conflict="stripe_event_id", ignore_duplicates=True
+    ).execute()
+    if response.data:
         return None
-
-def check_event_processed(stripe_event_id: str) -> bool:
-    """Check if webhook event has already been processed (idempotency check)"""
-    try:
-        response = supabase_storage.table("webhook_events").select("processing_status").eq("stripe_event_id", stripe_event_id).execute()
-        if response.data:
-            status = response.data[0].get("processing_status")
-            return status == "completed"
-        return False
-    except Exception as e:
-        logger.error(f"Failed to check event processing status: {str(e)}")
-        return False
+    
+    existing = supabase_storage.table("webhook_events").select("stripe_event_id, processing_status").eq("stripe_event_id", stripe_event_id).execute()
+    return existing.data[0] if existing.data else {"stripe_event_id": stripe_event_id, "processing_status": None}
 
 def update_event_status(
     stripe_event_id: str,
     status: str,
     error_message: Optional[str] = None,
-    quote_id: Optional[str] = None
+    quote_id: Optional[str] = None,
+    retry_count: Optional[int] = None
 ):
     """Update webhook event processing status"""
     try:
@@ -116,12 +103,79 @@ def update_event_status(
             update_data["error_message"] = error_message
         if quote_id:
             update_data["quote_id"] = quote_id
+        if retry_count is not None:
+            update_data["retry_count"] = retry_count
         
         supabase_storage.table("webhook_events").update(update_data).eq("stripe_event_id", stripe_event_id).execute()
     except Exception as e:
         logger.error(f"Failed to update event status: {str(e)}")
 
-def handle_invoice_event(event_type: str, invoice_data: Dict[str, Any]) -> Optional[str]:
+def send_invoice_paid_notifications(quote_id: str, invoice_data: Dict[str, Any]):
+    """Send payment confirmation to the customer and payment notifications to admins"""
+    try:
+        # Get quote details with client info
+        quote_detail_response = supabase_storage.table("quotes").select("*, clients(*)").eq("id", quote_id).execute()
+        if quote_detail_response.data:
+            quote_data = quote_detail_response.data[0]
+            quote_title = quote_data.get("title", "Quote")
+            quote_number = quote_data.get("quote_number", "")
+            client = quote_data.get("clients")
+
+            customer_name = None
+            customer_email = None
+            if client:
+                customer_name = client.get("name")
+                customer_email = client.get("email")
+
+            # Get invoice details from Stripe
+            invoice_number = invoice_data.get("number")
+            amount_total = invoice_data.get("amount_paid") or invoice_data.get("total")
+            amount_formatted = None
+            if amount_total:
+                currency = invoice_data.get("currency", "usd").upper()
+                amount_decimal = amount_total / 100
+                amount_formatted = f"{currency} ${amount_decimal:,.2f}"
+
+            invoice_url = invoice_data.get("hosted_invoice_url")
+
+            # Send email to customer
+            if customer_email:
+                try:
+                    email_service.send_invoice_paid_customer_notification(
+                        to_email=customer_email,
+                        quote_title=quote_title,
+                        quote_number=quote_number,
+                        invoice_number=invoice_number,
+                        amount_paid=amount_formatted,
+                        invoice_url=invoice_url,
+                        customer_name=customer_name
+                    )
+                    logger.info(f"Sent payment confirmation email to customer: {customer_email}")
+                except Exception as e:
+                    logger.error(f"Failed to send customer payment email: {str(e)}")
+
+            # Send email to all admins
+            admin_emails = get_admin_emails()
+            for admin in admin_emails:
+                try:
+                    email_service.send_invoice_paid_admin_notification(
+                        to_email=admin["email"],
+                        quote_title=quote_title,
+                        quote_number=quote_number,
+                        invoice_number=invoice_number,
+                        amount_paid=amount_formatted,
+                        customer_name=customer_name,
+                        customer_email=customer_email,
+                        quote_id=quote_id
+                    )
+                    logger.info(f"Sent payment notification email to admin: {admin['email']}")
+                except Exception as e:
+                    logger.error(f"Failed to send admin payment email to {admin['email']}: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error sending payment notification emails: {str(e)}")
+        # Don't fail the webhook if email sending fails
+
+def handle_invoice_event(event_type: str, invoice_data: Dict[str, Any], notify: bool = True) -> Optional[str]:
     """Handle invoice-related webhook events and return quote_id if found"""
     invoice_id = invoice_data.get("id")
     quote_id = None
@@ -142,6 +196,7 @@ def handle_invoice_event(event_type: str, invoice_data: Dict[str, Any]) -> Optio
         current_payment_status = quote_response.data[0].get("payment_status")
         
         update_data = {"updated_at": datetime.now().isoformat()}
+        notify_paid = False
         
         # Handle different invoice event types
         if event_type == "invoice.paid":
@@ -151,69 +206,7 @@ def handle_invoice_event(event_type: str, invoice_data: Dict[str, Any]) -> Optio
             })
             logger.info(f"Invoice {invoice_id} paid for quote {quote_id}")
             
-            # Send email notifications for payment
-            try:
-                # Get quote details with client info
-                quote_detail_response = supabase_storage.table("quotes").select("*, clients(*)").eq("id", quote_id).execute()
-                if quote_detail_response.data:
-                    quote_data = quote_detail_response.data[0]
-                    quote_title = quote_data.get("title", "Quote")
-                    quote_number = quote_data.get("quote_number", "")
-                    client = quote_data.get("clients")
-                    
-                    customer_name = None
-                    customer_email = None
-                    if client:
-                        customer_name = client.get("name")
-                        customer_email = client.get("email")
-                    
-                    # Get invoice details from Stripe
-                    invoice_number = invoice_data.get("number")
-                    amount_total = invoice_data.get("amount_paid") or invoice_data.get("total")
-                    amount_formatted = None
-                    if amount_total:
-                        currency = invoice_data.get("currency", "usd").upper()
-                        amount_decimal = amount_total / 100
-                        amount_formatted = f"{currency} ${amount_decimal:,.2f}"
-                    
-                    invoice_url = invoice_data.get("hosted_invoice_url")
-                    
-                    # Send email to customer
-                    if customer_email:
-                        try:
-                            email_service.send_invoice_paid_customer_notification(
-                                to_email=customer_email,
-                                quote_title=quote_title,
-                                quote_number=quote_number,
-                                invoice_number=invoice_number,
-                                amount_paid=amount_formatted,
-                                invoice_url=invoice_url,
-                                customer_name=customer_name
-                            )
-                            logger.info(f"Sent payment confirmation email to customer: {customer_email}")
-                        except Exception as e:
-                            logger.error(f"Failed to send customer payment email: {str(e)}")
-                    
-                    # Send email to all admins
-                    admin_emails = get_admin_emails()
-                    for admin in admin_emails:
-                        try:
-                            email_service.send_invoice_paid_admin_notification(
-                                to_email=admin["email"],
-                                quote_title=quote_title,
-                                quote_number=quote_number,
-                                invoice_number=invoice_number,
-                                amount_paid=amount_formatted,
-                                customer_name=customer_name,
-                                customer_email=customer_email,
-                                quote_id=quote_id
-                            )
-                            logger.info(f"Sent payment notification email to admin: {admin['email']}")
-                        except Exception as e:
-                            logger.error(f"Failed to send admin payment email to {admin['email']}: {str(e)}")
-            except Exception as e:
-                logger.error(f"Error sending payment notification emails: {str(e)}")
-                # Don't fail the webhook if email sending fails
+            notify_paid = True
             
         elif event_type == "invoice.payment_failed":
             update_data["payment_status"] = "failed"
@@ -266,7 +259,14 @@ def handle_invoice_event(event_type: str, invoice_data: Dict[str, Any]) -> Optio
         
         # Update quote if we have changes
         if update_data:
-            supabase_storage.table("quotes").update(update_data).eq("id", quote_id).execute()
+            update_response = supabase_storage.table("quotes").update(update_data).eq("id", quote_id).execute()
+            for updated_quote in update_response.data or []:
+                invalidate_client_context(updated_quote.get("client_id"))
+                invalidate_folder_snapshot(updated_quote.get("folder_id"))
+        
+        # Emails go out after the quote update so a retried event does not notify twice
+        if notify_paid and notify:
+            send_invoice_paid_notifications(quote_id, invoice_data)
         
         return quote_id
         
@@ -332,11 +332,14 @@ async def create_invoice_from_quote(quote_id: str):
         )
         
         # Update quote with invoice information
-        supabase_storage.table("quotes").update({
+        update_response = supabase_storage.table("quotes").update({
             "stripe_invoice_id": invoice_data["invoice_id"],
             "payment_status": "unpaid",
             "status": "accepted"
         }).eq("id", quote_id).execute()
+        for updated_quote in update_response.data or []:
+            invalidate_client_context(updated_quote.get("client_id"))
+            invalidate_folder_snapshot(updated_quote.get("folder_id"))
         
         return invoice_data
         
@@ -358,6 +361,78 @@ async def get_invoice(invoice_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def process_webhook_event(event: Dict[str, Any]):
+    """Worker handler: apply a stored webhook event (raises to trigger a retry)"""
+    stripe_event_id = event["stripe_event_id"]
+    event_type = event["event_type"]
+    event_data = event.get("event_data") or {}
+    # Rows stored before event_data was written as a JSON object hold a JSON string
+    if isinstance(event_data, str):
+        event_data = json.loads(event_data)
+    
+    update_event_status(stripe_event_id, "processing")
+    
+    quote_id = None
+    if event_type.startswith("invoice."):
+        if event_data.get("object") == "invoice":
+            quote_id = handle_invoice_event(event_type, event_data, notify=event.get("notify", True))
+        else:
+            logger.warning(f"Event {event_type} does not contain invoice object")
+    
+    update_event_status(stripe_event_id, "completed", quote_id=quote_id)
+    logger.info(f"Successfully processed webhook event {event_type} (ID: {stripe_event_id})")
+
+def _webhook_event_failed(event: Dict[str, Any], error: Exception, attempt: int, final: bool):
+    """Worker error callback: record the failed attempt"""
+    logger.error(
+        f"Error processing webhook event {event.get('event_type')} (ID: {event['stripe_event_id']}), "
+        f"attempt {attempt}{' (giving up)' if final else ''}: {str(error)}"
+    )
+    update_event_status(
+        stripe_event_id=event["stripe_event_id"],
+        status="failed" if final else "pending",
+        error_message=str(error),
+        retry_count=attempt
+    )
+
+# Singleton worker pool
+_webhook_processor: Optional[WebhookEventProcessor] = None
+
+def get_webhook_processor() -> WebhookEventProcessor:
+    """Get or create the webhook worker pool"""
+    global _webhook_processor
+    if _webhook_processor is None:
+        _webhook_processor = WebhookEventProcessor(process_webhook_event, on_error=_webhook_event_failed)
+    return _webhook_processor
+
+def enqueue_webhook_event(event: Dict[str, Any], notify: bool = True) -> bool:
+    """Queue a stored webhook event, ordered by its invoice; False if already queued"""
+    payload = {key: event.get(key) for key in ("stripe_event_id", "event_type", "event_data", "invoice_id")}
+    payload["notify"] = notify
+    return get_webhook_processor().submit(
+        event["stripe_event_id"],
+        event.get("invoice_id") or event["stripe_event_id"],
+        payload
+    )
+
+def requeue_unfinished_webhook_events(older_than_seconds: int = WEBHOOK_RECOVERY_AGE_SECONDS) -> int:
+    """
+    Recovery job: queue events that were stored but never finished
+    (pending/processing and not in this process's queue, e.g. after a restart)
+    
+    Returns:
+        Number of events queued
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=older_than_seconds)).isoformat()
+    response = supabase_storage.table("webhook_events").select(
+        "stripe_event_id, event_type, event_data, invoice_id"
+    ).in_("processing_status", ["pending", "processing"]).lt("created_at", cutoff).order("created_at").limit(WEBHOOK_RECOVERY_BATCH_SIZE).execute()
+    
+    queued = sum(1 for event in (response.data or []) if enqueue_webhook_event(event))
+    if queued:
+        logger.info(f"Re-queued {queued} unfinished webhook event(s)")
+    return queued
+
 @router.post("/webhook")
 async def stripe_webhook(
     request: Request,
@@ -366,6 +441,10 @@ async def stripe_webhook(
     """
     Enhanced Stripe webhook handler with idempotency, comprehensive event handling, and audit trail
     
+    Verifies the signature, stores the event and acknowledges immediately; the event
+    is processed in the background by the webhook worker (ordered per invoice, with
+    retries - see webhook_processor.py).
+    
     Handles the following invoice events:
     - invoice.paid
     - invoice.payment_failed
@@ -412,70 +491,48 @@ async def stripe_webhook(
         
         logger.info(f"Received webhook event: {event_type} (ID: {stripe_event_id})")
         
-        # Extract invoice ID early for logging
+        if not stripe_event_id or not event_type:
+            raise HTTPException(status_code=400, detail="Event id and type are required")
+        
         invoice_id = event_data.get("id") if event_data.get("object") == "invoice" else None
-        if invoice_id:
-            logger.info(f"Processing webhook for invoice: {invoice_id}")
         
-        # Idempotency check - skip if already processed
-        if stripe_event_id and check_event_processed(stripe_event_id):
+        # Store first: once acknowledged, the stored row is what gets processed.
+        # If storing fails, return an error so Stripe redelivers.
+        try:
+            existing = store_webhook_event(
+                stripe_event_id=stripe_event_id,
+                event_type=event_type,
+                event_data=event_data,
+                invoice_id=invoice_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to store webhook event {stripe_event_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to store event")
+        
+        # Idempotency: a redelivered event is only queued again if it never completed
+        if existing and existing.get("processing_status") == "completed":
             logger.info(f"Event {stripe_event_id} already processed, skipping")
             return {"status": "success", "message": "Event already processed"}
         
-        # Store event in database (for audit trail and idempotency)
-        store_webhook_event(
-            stripe_event_id=stripe_event_id or "unknown",
-            event_type=event_type or "unknown",
-            event_data=event_data,
-            processing_status="processing",
-            invoice_id=invoice_id
-        )
-        
-        # Handle invoice-related events
-        quote_id = None
-        if event_type and event_type.startswith("invoice."):
-            if event_data.get("object") == "invoice":
-                quote_id = handle_invoice_event(event_type, event_data)
-            else:
-                logger.warning(f"Event {event_type} does not contain invoice object")
-        
-        # Update event status to completed
-        if stripe_event_id:
-            update_event_status(
-                stripe_event_id=stripe_event_id,
-                status="completed",
-                quote_id=quote_id
-            )
+        queued = enqueue_webhook_event({
+            "stripe_event_id": stripe_event_id,
+            "event_type": event_type,
+            "event_data": event_data,
+            "invoice_id": invoice_id
+        })
         
-        logger.info(f"Successfully processed webhook event {event_type} (ID: {stripe_event_id})")
         return {
-            "status": "success",
+            "status": "accepted",
             "event_id": stripe_event_id,
             "event_type": event_type,
-            "quote_id": quote_id
+            "queued": queued
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        error_message = str(e)
-        logger.error(f"Error processing webhook event {event_type} (ID: {stripe_event_id}): {error_message}")
-        
-        # Update event status to failed
-        if stripe_event_id:
-            update_event_status(
-                stripe_event_id=stripe_event_id,
-                status="failed",
-                error_message=error_message
-            )
-        
-        # Return 200 to Stripe to prevent retries for non-recoverable errors
-        # For recoverable errors, you might want to return 500
-        return {
-            "status": "error",
-            "message": error_message,
-            "event_id": stripe_event_id
-        }
+        logger.error(f"Error receiving webhook event {event_type} (ID: {stripe_event_id}): {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to receive event")
 
 @router.get("/webhook-events")
 async def get_webhook_events(
@@ -511,3 +568,71 @@ async def get_webhook_event(event_id: str):
     except Exception as e:
         logger.error(f"Error fetching webhook event: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/webhook-events/replay")
+async def replay_webhook_events(
+    status: Optional[str] = Query("failed", description="Replay events with this processing status (pending, processing, completed, failed)"),
+    event_type: Optional[str] = Query(None, description="Only this event type"),
+    invoice_id: Optional[str] = Query(None, description="Only events for this invoice"),
+    created_from: Optional[str] = Query(None, description="Only events stored at or after this ISO timestamp"),
+    limit: int = Query(100, ge=1, le=WEBHOOK_REPLAY_MAX),
+    notify: bool = Query(True, description="Send payment emails (disable for load testing)"),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Re-queue stored webhook events for processing (admin only)
+    
+    For recovery (e.g. replay failed events after an outage) and load testing.
+    Events are queued oldest first, so per-invoice order is preserved.
+    """
+    try:
+        query = supabase_storage.table("webhook_events").select("stripe_event_id, event_type, event_data, invoice_id")
+        if status:
+            query = query.eq("processing_status", status)
+        if event_type:
+            query = query.eq("event_type", event_type)
+        if invoice_id:
+            query = query.eq("invoice_id", invoice_id)
+        if created_from:
+            query = query.gte("created_at", created_from)
+        response = query.order("created_at").limit(limit).execute()
+        events = response.data or []
+        
+        if events:
+            supabase_storage.table("webhook_events").update({
+                "processing_status": "pending",
+                "processed_at": None
+            }).in_("stripe_event_id", [event["stripe_event_id"] for event in events]).execute()
+        
+        queued = sum(1 for event in events if enqueue_webhook_event(event, notify=notify))
+        logger.info(f"Admin {current_admin.get('id')} replayed {queued}/{len(events)} webhook event(s)")
+        return {"matched": len(events), "queued": queued}
+    except Exception as e:
+        logger.error(f"Error replaying webhook events: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/webhook-events/{event_id}/replay")
+async def replay_webhook_event(
+    event_id: str,
+    notify: bool = Query(True, description="Send payment emails (disable for load testing)"),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Re-queue a single stored webhook event by Stripe event ID (admin only)"""
+    try:
+        response = supabase_storage.table("webhook_events").select("stripe_event_id, event_type, event_data, invoice_id").eq("stripe_event_id", event_id).execute()
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Webhook event not found")
+        
+        update_event_status(event_id, "pending")
+        queued = enqueue_webhook_event(response.data[0], notify=notify)
+        return {"event_id": event_id, "queued": queued}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error replaying webhook event: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/webhook-queue/stats")
+async def get_webhook_queue_stats(current_admin: dict = Depends(get_current_admin)):
+    """Webhook worker queue depth and processing counters (admin only)"""
+    return get_webhook_processor().stats()
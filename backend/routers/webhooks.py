@@ -12,6 +12,7 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database import supabase_storage, supabase_url, supabase_service_role_key
+from folder_snapshots import invalidate_folder_snapshot
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -141,6 +142,7 @@ def _create_form_completion_record(
                     detail=f"Failed to mark form as completed: {str(rest_err)}"
                 )
         
+        invalidate_folder_snapshot(folder_id)
         return {
             "success": True,
             "submission_id": submission_id,
@@ -0,0 +1,144 @@
+"""
+Signed URL Service
+Signed storage URLs for file previews, downloads and listings.
+
+URLs are cached in memory per (bucket, path, expiry) until
+SIGNED_URL_REFRESH_MARGIN_SECONDS before they expire, so repeated previews and
+listings of the same files reuse one URL instead of signing again. Paths that
+are not cached are signed together in one create_signed_urls call: a folder view
+with 30 files costs at most one storage request.
+
+Cached URLs need no invalidation because a path never gets new content: legacy
+objects are unique per upload, and content-addressed blobs (file_blobs) hold
+fixed bytes under a path shared by files with the same content. A released blob's
+path is not reused (a re-upload gets a new path), so a URL for a deleted object
+simply stops resolving.
+
+The `files.storage_url` column holds whatever URL was issued at upload and goes
+stale; responses that include files replace it via with_signed_urls().
+"""
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from database import supabase_storage
+from cache_utils import TTLCache, MISSING
+
+SIGNED_URL_EXPIRES_IN = int(os.getenv("SIGNED_URL_EXPIRES_IN", "3600"))
+SIGNED_URL_REFRESH_MARGIN_SECONDS = int(os.getenv("SIGNED_URL_REFRESH_MARGIN_SECONDS", "300"))
+SIGNED_URL_CACHE_MAX_ENTRIES = int(os.getenv("SIGNED_URL_CACHE_MAX_ENTRIES", "20000"))
+
+DEFAULT_BUCKET = "project-files"
+
+
+def _extract_url(result: Any) -> Optional[str]:
+    """URL from a signing response (dict, string or object depending on client version)"""
+    if isinstance(result, dict):
+        return result.get("signedURL") or result.get("signedUrl") or result.get("signed_url") or result.get("url")
+    if isinstance(result, str):
+        return result or None
+    return getattr(result, "signedURL", None) or getattr(result, "signed_url", None) or getattr(result, "url", None)
+
+
+class SignedUrlService:
+    """Cached, batched creation of signed storage URLs"""
+
+    def __init__(self, maxsize: int = SIGNED_URL_CACHE_MAX_ENTRIES, refresh_margin: float = SIGNED_URL_REFRESH_MARGIN_SECONDS):
+        self._cache = TTLCache(maxsize=maxsize, ttl_seconds=SIGNED_URL_EXPIRES_IN)
+        self.refresh_margin = refresh_margin
+        self._counter_lock = threading.Lock()
+        self.sign_requests = 0
+        self.paths_signed = 0
+
+    def _sign(self, bucket: str, paths: List[str], expires_in: int) -> Dict[str, str]:
+        storage = supabase_storage.storage.from_(bucket)
+        with self._counter_lock:
+            self.sign_requests += 1
+            self.paths_signed += len(paths)
+        if len(paths) == 1:
+            url = _extract_url(storage.create_signed_url(paths[0], expires_in))
+            return {paths[0]: url} if url else {}
+        urls = {}
+        for item in storage.create_signed_urls(paths, expires_in) or []:
+            path = item.get("path") if isinstance(item, dict) else getattr(item, "path", None)
+            url = _extract_url(item)
+            if path and url and not (isinstance(item, dict) and item.get("error")):
+                urls[path] = url
+        return urls
+
+    def get_urls(self, paths: Iterable[Optional[str]], bucket: str = DEFAULT_BUCKET, expires_in: int = SIGNED_URL_EXPIRES_IN) -> Dict[str, str]:
+        """
+        Signed URLs for many paths, signing the uncached ones in one request
+
+        Returns:
+            {path: url}; paths the storage API could not sign are left out
+
+        Raises:
+            Exception: the signing request failed
+        """
+        urls: Dict[str, str] = {}
+        missing: List[str] = []
+        for path in dict.fromkeys(p for p in paths if p):
+            url = self._cache.get((bucket, path, expires_in))
+            if url is MISSING:
+                missing.append(path)
+            else:
+                urls[path] = url
+        if missing:
+            signed = self._sign(bucket, missing, expires_in)
+            ttl = expires_in - self.refresh_margin
+            if ttl > 0:
+                for path, url in signed.items():
+                    self._cache.set((bucket, path, expires_in), url, ttl_seconds=ttl)
+            urls.update(signed)
+        return urls
+
+    def get_url(self, path: str, bucket: str = DEFAULT_BUCKET, expires_in: int = SIGNED_URL_EXPIRES_IN) -> Optional[str]:
+        """Signed URL for one path (None if the storage API returned none)"""
+        return self.get_urls([path], bucket, expires_in).get(path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache and signing counters for metrics endpoints"""
+        stats = self._cache.stats()
+        stats.update({"sign_requests": self.sign_requests, "paths_signed": self.paths_signed})
+        return stats
+
+
+# Singleton instance
+_signed_url_service: Optional[SignedUrlService] = None
+
+
+def get_signed_url_service() -> SignedUrlService:
+    """Get singleton signed URL service"""
+    global _signed_url_service
+    if _signed_url_service is None:
+        _signed_url_service = SignedUrlService()
+    return _signed_url_service
+
+
+def get_signed_url(path: str, bucket: str = DEFAULT_BUCKET, expires_in: int = SIGNED_URL_EXPIRES_IN) -> Optional[str]:
+    return get_signed_url_service().get_url(path, bucket, expires_in)
+
+
+def get_signed_urls(paths: Iterable[Optional[str]], bucket: str = DEFAULT_BUCKET, expires_in: int = SIGNED_URL_EXPIRES_IN) -> Dict[str, str]:
+    return get_signed_url_service().get_urls(paths, bucket, expires_in)
+
+
+def with_signed_urls(files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Copies of file rows with storage_url replaced by a current signed URL
+
+    Rows are copied (not mutated) so cached rows such as folder snapshots stay
+    untouched. If signing fails the stored storage_url is kept.
+    """
+    if not files:
+        return files
+    try:
+        urls = get_signed_urls(file.get("storage_path") for file in files)
+    except Exception as e:
+        print(f"Warning: Could not sign file URLs: {str(e)}")
+        return files
+    return [
+        {**file, "storage_url": urls.get(file.get("storage_path"), file.get("storage_url"))}
+        for file in files
+    ]
@@ -0,0 +1,169 @@
+"""
+Template Provisioning Service
+Default artifacts every new folder gets (see database/folder_provisioning_migration.sql):
+- a copy of each default e-signature template, plus its folder assignment
+  (FOLDER_DEFAULT_ESIGNATURE_TEMPLATES, comma-separated template names)
+- an assignment of each default form (FOLDER_DEFAULT_FORM_SLUGS, comma-separated
+  public_url_slug values; none by default)
+
+Template and form rows are resolved by name/slug once and cached in memory
+(PROVISIONING_TEMPLATE_CACHE_TTL_SECONDS); e-signature document changes call
+invalidate_provisioning_templates(). The artifacts for any number of folders
+are then written by one provision_folders RPC, which either creates all of
+them or none.
+"""
+import os
+import logging
+from typing import Dict, List, Optional
+
+from database import supabase_storage
+from cache_utils import TTLCache, MISSING
+from folder_snapshots import invalidate_folder_snapshot
+from rag_service import invalidate_form_context
+
+logger = logging.getLogger(__name__)
+
+FOLDER_DEFAULT_ESIGNATURE_TEMPLATES = [
+    name.strip()
+    for name in os.getenv("FOLDER_DEFAULT_ESIGNATURE_TEMPLATES", "Reel48 Purchase Agreement").split(",")
+    if name.strip()
+]
+FOLDER_DEFAULT_FORM_SLUGS = [
+    slug.strip()
+    for slug in os.getenv("FOLDER_DEFAULT_FORM_SLUGS", "").split(",")
+    if slug.strip()
+]
+PROVISIONING_TEMPLATE_CACHE_TTL_SECONDS = int(os.getenv("PROVISIONING_TEMPLATE_CACHE_TTL_SECONDS", "300"))
+
+
+class TemplateProvisioningService:
+    """Resolves default templates (cached) and provisions folders in one RPC"""
+
+    def __init__(
+        self,
+        esignature_template_names: Optional[List[str]] = None,
+        form_slugs: Optional[List[str]] = None,
+        ttl_seconds: int = PROVISIONING_TEMPLATE_CACHE_TTL_SECONDS
+    ):
+        self.esignature_template_names = FOLDER_DEFAULT_ESIGNATURE_TEMPLATES if esignature_template_names is None else esignature_template_names
+        self.form_slugs = FOLDER_DEFAULT_FORM_SLUGS if form_slugs is None else form_slugs
+        self._templates = TTLCache(maxsize=2, ttl_seconds=ttl_seconds)
+        self.provision_calls = 0
+        self.folders_provisioned = 0
+
+    def _load_esignature_templates(self) -> List[Dict]:
+        if not self.esignature_template_names:
+            return []
+        response = (
+            supabase_storage
+            .table("esignature_documents")
+            .select("id, name")
+            .in_("name", self.esignature_template_names)
+            .eq("is_template", True)
+            .order("created_at")
+            .execute()
+        )
+        # Oldest template wins if a name is duplicated
+        by_name: Dict[str, Dict] = {}
+        for row in response.data or []:
+            by_name.setdefault(row["name"], row)
+        for name in self.esignature_template_names:
+            if name not in by_name:
+                logger.warning(f"{name} e-signature template not found")
+        return list(by_name.values())
+
+    def _load_forms(self) -> List[Dict]:
+        if not self.form_slugs:
+            return []
+        response = supabase_storage.table("forms").select("id, name, public_url_slug").in_("public_url_slug", self.form_slugs).execute()
+        rows = response.data or []
+        found = {row.get("public_url_slug") for row in rows}
+        for slug in self.form_slugs:
+            if slug not in found:
+                logger.warning(f"Default folder form '{slug}' not found")
+        return rows
+
+    def _cached(self, key: str, loader) -> List[Dict]:
+        rows = self._templates.get(key)
+        if rows is MISSING:
+            rows = loader()
+            self._templates.set(key, rows)
+        return rows
+
+    def esignature_templates(self) -> List[Dict]:
+        """Default e-signature template rows (id, name)"""
+        return self._cached("esignature", self._load_esignature_templates)
+
+    def default_forms(self) -> List[Dict]:
+        """Default form rows (id, name, public_url_slug)"""
+        return self._cached("forms", self._load_forms)
+
+    def provision(self, folder_ids: List[str], assigned_by: Optional[str]) -> List[Dict]:
+        """
+        Create the default artifacts for folders (already provisioned ones are skipped)
+
+        Args:
+            folder_ids: Folders to provision
+            assigned_by: User recorded as creator of copies and assignments
+
+        Returns:
+            Created artifacts: [{"folder_id", "artifact_type", "artifact_id"}, ...]
+            with artifact_type esignature_copy, esignature_assignment or form_assignment
+        """
+        folder_ids = list(dict.fromkeys(folder_id for folder_id in folder_ids if folder_id))
+        templates = self.esignature_templates()
+        forms = self.default_forms()
+        if not folder_ids or not (templates or forms):
+            return []
+
+        response = supabase_storage.rpc("provision_folders", {
+            "target_folder_ids": folder_ids,
+            "esignature_template_ids": [template["id"] for template in templates],
+            "default_form_ids": [form["id"] for form in forms],
+            "assigned_by_user": assigned_by
+        }).execute()
+        created = response.data or []
+        self.provision_calls += 1
+        self.folders_provisioned += len(folder_ids)
+
+        for folder_id in {artifact["folder_id"] for artifact in created}:
+            invalidate_folder_snapshot(folder_id)
+        if any(artifact["artifact_type"] == "form_assignment" for artifact in created):
+            invalidate_form_context()
+        return created
+
+    def invalidate(self):
+        self._templates.clear()
+
+    def stats(self) -> Dict:
+        """Counters for metrics endpoints"""
+        stats = self._templates.stats()
+        stats.update({"provision_calls": self.provision_calls, "folders_provisioned": self.folders_provisioned})
+        return stats
+
+
+# Singleton instance
+_template_provisioning_service: Optional[TemplateProvisioningService] = None
+
+
+def get_template_provisioning_service() -> TemplateProvisioningService:
+    """Get singleton template provisioning service"""
+    global _template_provisioning_service
+    if _template_provisioning_service is None:
+        _template_provisioning_service = TemplateProvisioningService()
+    return _template_provisioning_service
+
+
+def provision_folders(folder_ids: List[str], assigned_by: Optional[str]) -> List[Dict]:
+    return get_template_provisioning_service().provision(folder_ids, assigned_by)
+
+
+def provision_folder(folder_id: str, assigned_by: Optional[str]) -> List[Dict]:
+    """Call after creating a folder"""
+    return provision_folders([folder_id], assigned_by)
+
+
+def invalidate_provisioning_templates():
+    """Call after e-signature templates or forms are created, renamed or deleted"""
+    if _template_provisioning_service is not None:
+        _template_provisioning_service.invalidate()
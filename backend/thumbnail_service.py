@@ -0,0 +1,286 @@
+"""
+Thumbnail Service
+Downscaled previews of uploaded images and PDFs (first page), so file lists and
+previews do not download multi-MB originals.
+
+Derivatives are WebP images stored in project-files under deterministic keys:
+thumbnails/{content key}/{size}.webp, where the content key is the file's
+content_sha256 (files with the same content share thumbnails) or its id. Sizes
+are the named bounding boxes in THUMBNAIL_SIZES.
+
+Generation runs on a small worker pool (THUMBNAIL_WORKERS):
+- at upload time, schedule_thumbnails() queues every size for new content
+- lazily, get_thumbnail_path() generates a missing size on first request and
+  waits for it; concurrent requests for the same derivative share one job
+
+Keys known to exist are remembered in memory; otherwise storage is checked with
+one list call before generating. Images are decoded with Pillow. PDF first pages
+are rasterized with pypdfium2 when installed (one at a time: PDFium is not
+thread-safe); without it the largest image embedded in the first page (e.g. a
+scan) is used, and PDFs with neither get no thumbnail (callers fall back to the
+original).
+"""
+import io
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from database import supabase_storage
+from cache_utils import TTLCache, MISSING
+
+try:
+    from PIL import Image as PILImage
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    from pypdf import PdfReader
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels per named size
+THUMBNAIL_SIZES: Dict[str, int] = {
+    "small": 160,
+    "medium": 480,
+    "large": 1280,
+}
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+# Originals larger than this are not thumbnailed (decoding cost)
+THUMBNAIL_MAX_SOURCE_BYTES = int(os.getenv("THUMBNAIL_MAX_SOURCE_BYTES", str(25 * 1024 * 1024)))
+THUMBNAIL_KNOWN_MAX_ENTRIES = int(os.getenv("THUMBNAIL_KNOWN_MAX_ENTRIES", "20000"))
+
+STORAGE_BUCKET = "project-files"
+# Serializes all pypdfium2 calls across the worker pool
+_pdfium_lock = threading.Lock()
+# Pillow cannot decode SVG; it is small and scalable anyway
+UNSUPPORTED_IMAGE_TYPES = {"image/svg+xml"}
+
+
+def supports_thumbnail(file_data: Dict[str, Any]) -> bool:
+    file_type = (file_data.get("file_type") or "").lower()
+    if not PIL_AVAILABLE or not file_data.get("storage_path"):
+        return False
+    if file_type == "application/pdf":
+        return PDFIUM_AVAILABLE or PYPDF_AVAILABLE
+    return file_type.startswith("image/") and file_type not in UNSUPPORTED_IMAGE_TYPES
+
+
+def thumbnail_path(file_data: Dict[str, Any], size: str) -> str:
+    """Deterministic storage key of a file's derivative"""
+    content_key = file_data.get("content_sha256") or file_data["id"]
+    return f"thumbnails/{content_key}/{size}.webp"
+
+
+def _first_page_image(content: bytes, max_px: int) -> Optional["PILImage.Image"]:
+    """First PDF page as a PIL image (rasterized, or its largest embedded image)"""
+    if PDFIUM_AVAILABLE:
+        # PDFium is not thread-safe (even across documents): one render at a time
+        with _pdfium_lock:
+            document = pdfium.PdfDocument(content)
+            try:
+                page = document[0]
+                width, height = page.get_size()
+                # Render just large enough for the requested box
+                scale = max(max_px / max(width, height, 1), 0.1)
+                return page.render(scale=scale).to_pil()
+            finally:
+                document.close()
+
+    if PYPDF_AVAILABLE:
+        reader = PdfReader(io.BytesIO(content))
+        if not reader.pages:
+            return None
+        images = list(reader.pages[0].images)
+        if images:
+            largest = max(images, key=lambda image: len(image.data))
+            return PILImage.open(io.BytesIO(largest.data))
+    return None
+
+
+def render_thumbnail(content: bytes, file_type: str, max_px: int) -> Optional[bytes]:
+    """
+    Downscale an image or the first page of a PDF to fit in max_px x max_px
+
+    Returns:
+        WebP bytes, or None if the content has no renderable image
+    """
+    if (file_type or "").lower() == "application/pdf":
+        image = _first_page_image(content, max_px)
+        if image is None:
+            return None
+    else:
+        image = PILImage.open(io.BytesIO(content))
+        # Decode at reduced size where the format supports it (JPEG draft mode)
+        image.draft("RGB", (max_px, max_px))
+
+    # Multi-frame images (GIF, TIFF) use the first frame
+    image.seek(0)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "P") else "RGB")
+    image.thumbnail((max_px, max_px), PILImage.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    image.save(output, format="WEBP", quality=THUMBNAIL_QUALITY, method=4)
+    return output.getvalue()
+
+
+class ThumbnailService:
+    """Worker pool that generates, stores and locates file thumbnails"""
+
+    def __init__(self, workers: int = THUMBNAIL_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="thumbnail")
+        # Derivative keys known to exist in storage (True) or known to be impossible (False)
+        self._known = TTLCache(maxsize=THUMBNAIL_KNOWN_MAX_ENTRIES, ttl_seconds=24 * 3600)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.generated = 0
+        self.failures = 0
+
+    def _exists_in_storage(self, path: str) -> bool:
+        folder, name = path.rsplit("/", 1)
+        try:
+            entries = supabase_storage.storage.from_(STORAGE_BUCKET).list(folder) or []
+        except Exception:
+            return False
+        return any((entry.get("name") if isinstance(entry, dict) else None) == name for entry in entries)
+
+    def _generate(self, file_data: Dict[str, Any], sizes) -> Dict[str, Optional[str]]:
+        """Download the original once and store the requested sizes (runs on the pool)"""
+        paths = {size: thumbnail_path(file_data, size) for size in sizes}
+        if int(file_data.get("file_size") or 0) > THUMBNAIL_MAX_SOURCE_BYTES:
+            for path in paths.values():
+                self._known.set(path, False)
+            return {size: None for size in sizes}
+
+        content = supabase_storage.storage.from_(STORAGE_BUCKET).download(file_data["storage_path"])
+        results: Dict[str, Optional[str]] = {}
+        for size, path in paths.items():
+            try:
+                data = render_thumbnail(content, file_data.get("file_type"), THUMBNAIL_SIZES[size])
+            except Exception as e:
+                logger.warning(f"Could not render {size} thumbnail for file {file_data.get('id')}: {str(e)}")
+                data = None
+            if data is None:
+                self._known.set(path, False)
+                results[size] = None
+                continue
+            supabase_storage.storage.from_(STORAGE_BUCKET).upload(
+                path,
+                data,
+                file_options={"content-type": "image/webp", "upsert": "true"}
+            )
+            self._known.set(path, True)
+            results[size] = path
+            with self._lock:
+                self.generated += 1
+        return results
+
+    def _submit(self, file_data: Dict[str, Any], sizes) -> Future:
+        """One job per derivative set in flight; later callers share it"""
+        job_key = "|".join(thumbnail_path(file_data, size) for size in sizes)
+        with self._lock:
+            future = self._inflight.get(job_key)
+            if future is None:
+                future = self._executor.submit(self._generate, file_data, list(sizes))
+                self._inflight[job_key] = future
+                future.add_done_callback(lambda _, key=job_key: self._forget(key))
+        return future
+
+    def _forget(self, job_key: str):
+        with self._lock:
+            self._inflight.pop(job_key, None)
+
+    def schedule(self, file_data: Dict[str, Any]):
+        """Queue all sizes for a newly uploaded file (fire and forget)"""
+        if not supports_thumbnail(file_data):
+            return
+        future = self._submit(file_data, tuple(THUMBNAIL_SIZES))
+        future.add_done_callback(self._log_failure)
+
+    def _log_failure(self, future: Future):
+        error = future.exception()
+        if error is not None:
+            with self._lock:
+                self.failures += 1
+            logger.warning(f"Thumbnail generation failed: {str(error)}")
+
+    def get_path(self, file_data: Dict[str, Any], size: str, timeout: Optional[float] = 30) -> Optional[str]:
+        """
+        Storage path of a file's thumbnail, generating it if missing
+
+        Returns:
+            Path, or None if the file cannot be thumbnailed (callers serve the original)
+        """
+        if size not in THUMBNAIL_SIZES or not supports_thumbnail(file_data):
+            return None
+        path = thumbnail_path(file_data, size)
+        known = self._known.get(path)
+        if known is not MISSING:
+            return path if known else None
+        if self._exists_in_storage(path):
+            self._known.set(path, True)
+            return path
+        try:
+            return self._submit(file_data, (size,)).result(timeout=timeout).get(size)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            logger.warning(f"Could not generate {size} thumbnail for file {file_data.get('id')}: {str(e)}")
+            return None
+
+    def remove(self, file_data: Dict[str, Any]):
+        """Delete a file's derivatives (call when its content is removed from storage)"""
+        paths = [thumbnail_path(file_data, size) for size in THUMBNAIL_SIZES]
+        for path in paths:
+            self._known.pop(path)
+        supabase_storage.storage.from_(STORAGE_BUCKET).remove(paths)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for metrics endpoints"""
+        stats = self._known.stats()
+        stats.update({"generated": self.generated, "failures": self.failures, "in_flight": len(self._inflight)})
+        return stats
+
+
+# Singleton instance
+_thumbnail_service: Optional[ThumbnailService] = None
+
+
+def get_thumbnail_service() -> ThumbnailService:
+    """Get singleton thumbnail service"""
+    global _thumbnail_service
+    if _thumbnail_service is None:
+        _thumbnail_service = ThumbnailService()
+    return _thumbnail_service
+
+
+def schedule_thumbnails(file_data: Dict[str, Any]):
+    """Call after uploading new content to precompute its thumbnails"""
+    try:
+        get_thumbnail_service().schedule(file_data)
+    except Exception as e:
+        logger.warning(f"Could not schedule thumbnails for file {file_data.get('id')}: {str(e)}")
+
+
+def get_thumbnail_path(file_data: Dict[str, Any], size: str) -> Optional[str]:
+    return get_thumbnail_service().get_path(file_data, size)
+
+
+def remove_thumbnails(file_data: Dict[str, Any]):
+    try:
+        get_thumbnail_service().remove(file_data)
+    except Exception as e:
+        logger.warning(f"Could not remove thumbnails for file {file_data.get('id')}: {str(e)}")
@@ -0,0 +1,120 @@
+"""
+Upload Utilities
+Streaming intake of uploaded files.
+
+Uploads are copied in UPLOAD_CHUNK_SIZE chunks into a spooled temp file (kept in
+memory up to UPLOAD_SPOOL_MAX_BYTES, on disk beyond that), hashed as the chunks
+go by, and rejected as soon as they pass the caller's size limit instead of after
+the whole body has been read. Storage uploads get the spool as a file handle, so
+the storage client streams the multipart body from disk rather than building it
+from one bytes object. Memory per upload stays around one chunk plus the spool
+threshold whatever the file size.
+"""
+import os
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Sequence, Union
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(1024 * 1024)))
+
+
+class FileTooLargeError(ValueError):
+    """Raised while streaming an upload that exceeds its size limit"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"File size exceeds {max_size / (1024 * 1024)}MB limit")
+        self.max_size = max_size
+
+
+class SpooledUpload:
+    """Uploaded bytes in a spooled temp file, with their size and digests"""
+
+    def __init__(self, hash_names: Sequence[str] = ("md5",)):
+        self.file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_BYTES)
+        self.size = 0
+        self._hashes = {name: hashlib.new(name) for name in hash_names}
+
+    def write(self, chunk: bytes, max_size: int):
+        """Append a chunk, updating size and digests; raises FileTooLargeError past max_size"""
+        if self.size + len(chunk) > max_size:
+            raise FileTooLargeError(max_size)
+        self.file.write(chunk)
+        self.size += len(chunk)
+        for digest in self._hashes.values():
+            digest.update(chunk)
+
+    def copy_from(self, source: BinaryIO, max_size: int):
+        """Copy a readable binary stream (e.g. a ZIP member) in chunks"""
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.write(chunk, max_size)
+        self.file.seek(0)
+
+    def hexdigest(self, name: str = "md5") -> str:
+        return self._hashes[name].hexdigest()
+
+    @contextmanager
+    def storage_body(self) -> Iterator[Union[bytes, BinaryIO]]:
+        """
+        Body for supabase storage upload(): bytes while the spool is in memory,
+        otherwise a reader over the temp file (streamed by the storage client)
+        """
+        self.file.seek(0)
+        if self.size <= UPLOAD_SPOOL_MAX_BYTES:
+            yield self.file.read()
+            return
+        reader = os.fdopen(os.dup(self.file.fileno()), "rb")
+        try:
+            reader.seek(0)
+            yield reader
+        finally:
+            reader.close()
+
+    def read(self) -> bytes:
+        """Whole content in memory (only for consumers that need bytes, e.g. image decoding)"""
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def spool_upload(file: UploadFile, max_size: int, hash_names: Sequence[str] = ("md5",)) -> SpooledUpload:
+    """
+    Stream an UploadFile into a SpooledUpload
+
+    Args:
+        file: Incoming upload
+        max_size: Size limit in bytes, enforced while reading
+        hash_names: hashlib algorithms to compute incrementally
+
+    Returns:
+        SpooledUpload positioned at the start (caller closes it)
+
+    Raises:
+        FileTooLargeError: The upload exceeds max_size
+    """
+    upload = SpooledUpload(hash_names)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            upload.write(chunk, max_size)
+    except BaseException:
+        upload.close()
+        raise
+    upload.file.seek(0)
+    return upload
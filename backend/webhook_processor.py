@@ -0,0 +1,155 @@
+"""
+Webhook Event Processor
+Ordered, retrying background processing for stored webhook events.
+
+The webhook endpoint only verifies the request, stores the event (idempotently)
+and submits it here, so the provider gets its acknowledgment without waiting on
+quote updates or email sends. Events are partitioned by key (the invoice id) over
+WEBHOOK_WORKERS threads: events for one invoice run one at a time in arrival
+order, different invoices run in parallel. A failing event is retried with
+exponential backoff on its worker (later events for the same invoice wait behind
+it) and reported as final after WEBHOOK_MAX_ATTEMPTS.
+
+The queue is in memory; the stored event row is the durable copy. Events that
+were stored but never finished (e.g. the process restarted) are re-submitted by
+the recovery job, and any stored event can be replayed.
+"""
+import os
+import time
+import queue
+import zlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+WEBHOOK_RETRY_BASE_SECONDS = float(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", "2"))
+WEBHOOK_RETRY_MAX_SECONDS = float(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", "60"))
+
+EventHandler = Callable[[Dict[str, Any]], None]
+# (event, error, attempt, final)
+ErrorHandler = Callable[[Dict[str, Any], Exception, int, bool], None]
+
+
+class WebhookEventProcessor:
+    """Per-key ordered worker pool for webhook events"""
+
+    def __init__(
+        self,
+        handler: EventHandler,
+        on_error: Optional[ErrorHandler] = None,
+        workers: int = WEBHOOK_WORKERS,
+        max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+        retry_base_seconds: float = WEBHOOK_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = WEBHOOK_RETRY_MAX_SECONDS
+    ):
+        self.handler = handler
+        self.on_error = on_error
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._queues: List["queue.Queue[Dict[str, Any]]"] = [queue.Queue() for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+        # Event ids queued or in flight (a redelivered or replayed event is not queued twice)
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.duplicates = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, args=(index,), name=f"webhook-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, event_id: str, key: Optional[str], event: Dict[str, Any]) -> bool:
+        """
+        Queue an event for processing
+
+        Args:
+            event_id: Unique event id
+            key: Ordering key (events with the same key run in submission order)
+            event: Payload passed to the handler
+
+        Returns:
+            False if the event is already queued or in flight
+        """
+        self.start()
+        with self._lock:
+            if event_id in self._pending:
+                self.duplicates += 1
+                return False
+            self._pending.add(event_id)
+            self.submitted += 1
+        shard = zlib.crc32((key or event_id).encode("utf-8")) % self.workers
+        self._queues[shard].put({"event_id": event_id, "event": event})
+        return True
+
+    def is_pending(self, event_id: str) -> bool:
+        with self._lock:
+            return event_id in self._pending
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.retry_base_seconds * (2 ** (attempt - 1)), self.retry_max_seconds)
+
+    def _run(self, index: int):
+        work_queue = self._queues[index]
+        while True:
+            item = work_queue.get()
+            try:
+                self._process(item["event"])
+            finally:
+                with self._lock:
+                    self._pending.discard(item["event_id"])
+                work_queue.task_done()
+
+    def _process(self, event: Dict[str, Any]):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.handler(event)
+                with self._lock:
+                    self.completed += 1
+                return
+            except Exception as e:
+                final = attempt == self.max_attempts
+                with self._lock:
+                    if final:
+                        self.failed += 1
+                    else:
+                        self.retried += 1
+                if self.on_error is not None:
+                    try:
+                        self.on_error(event, e, attempt, final)
+                    except Exception as callback_error:
+                        logger.error(f"Webhook error callback failed: {str(callback_error)}")
+                else:
+                    logger.error(f"Webhook event failed (attempt {attempt}/{self.max_attempts}): {str(e)}")
+                if final:
+                    return
+                time.sleep(self._backoff(attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and processing counters"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": bool(self._threads),
+                "queued": sum(q.qsize() for q in self._queues),
+                "in_flight": len(self._pending),
+                "submitted": self.submitted,
+                "duplicates": self.duplicates,
+                "completed": self.completed,
+                "retried": self.retried,
+                "failed": self.failed
+            }
@@ -0,0 +1,212 @@
+"""
+ZIP Ingestion
+Upload every file inside a ZIP archive as a project file.
+
+Members are streamed out of the archive one at a time into spooled temp files
+(upload_utils.SpooledUpload) and handed to a bounded thread pool that stores
+them as content-addressed blobs (file_blobs; content already in storage is not
+uploaded again), so at most ZIP_UPLOAD_WORKERS uploads run and a few more
+members wait extracted at any time. Members whose content (SHA-256) repeats an
+earlier member are skipped. Once the uploads finish, the stored paths are
+signed in one storage call (through signed_urls, which also caches them) and
+the `files` rows are written with multi-row inserts of up to
+ZIP_INSERT_BATCH_SIZE rows.
+
+A failing member (too large, corrupt, upload error, insert error) is reported in
+the result's errors and does not stop the rest of the archive.
+"""
+import os
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from database import supabase_storage
+from upload_utils import SpooledUpload
+from file_blobs import store_blob, release_blob
+from signed_urls import get_signed_urls
+from thumbnail_service import schedule_thumbnails
+
+ZIP_UPLOAD_WORKERS = int(os.getenv("ZIP_UPLOAD_WORKERS", "8"))
+ZIP_INSERT_BATCH_SIZE = int(os.getenv("ZIP_INSERT_BATCH_SIZE", "200"))
+
+CONTENT_TYPES_BY_EXTENSION = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+    'bmp': 'image/bmp',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+    'txt': 'text/plain',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+
+def content_type_for(filename: str) -> str:
+    ext = filename.split('.')[-1] if '.' in filename else ''
+    return CONTENT_TYPES_BY_EXTENSION.get(ext.lower(), 'application/octet-stream')
+
+
+def _store_member(member_upload: SpooledUpload, filename: str, content_type: str) -> Tuple[str, str, bool]:
+    """Store one extracted member as a blob (runs on the pool); always releases its spool"""
+    try:
+        return store_blob(member_upload, filename, content_type)
+    finally:
+        member_upload.close()
+
+
+def _sign_paths(paths: List[str]) -> Dict[str, str]:
+    """Signed URLs for all paths in one storage call (unsigned paths are left out)"""
+    try:
+        return get_signed_urls(paths)
+    except Exception as e:
+        print(f"Warning: Could not get signed URLs for ZIP members: {str(e)}")
+        return {}
+
+
+def _release_blobs(hashes: List[str]):
+    for content_sha256 in hashes:
+        try:
+            release_blob(content_sha256)
+        except Exception as cleanup_error:
+            print(f"Warning: Failed to cleanup ZIP member upload: {str(cleanup_error)}")
+
+
+def ingest_zip(
+    archive: BinaryIO,
+    *,
+    folder_id: Optional[str],
+    quote_id: Optional[str],
+    form_id: Optional[str],
+    description: Optional[str],
+    is_reusable: bool,
+    user_id: str,
+    max_member_size: int,
+    workers: int = ZIP_UPLOAD_WORKERS
+) -> Dict[str, Any]:
+    """
+    Extract and upload all files in a ZIP archive
+
+    Args:
+        archive: Seekable binary file holding the archive
+        folder_id, quote_id, form_id, description, is_reusable: Copied to every file row
+        user_id: Uploader
+        max_member_size: Per-member size limit (declared and actual)
+        workers: Concurrent storage uploads
+
+    Returns:
+        {"files": created rows in archive order,
+         "errors": ["member: reason", ...],
+         "duplicates": [{"name": member, "duplicate_of": earlier member}, ...]}
+
+    Raises:
+        zipfile.BadZipFile: archive is not a ZIP file
+    """
+    zip_file = zipfile.ZipFile(archive)
+    errors: List[str] = []
+    duplicates: List[Dict[str, str]] = []
+    seen_hashes: Dict[str, str] = {}
+    # (member name, pending file row) in archive order; rows are dropped if their upload fails
+    members: List[Dict[str, Any]] = []
+    futures = {}
+
+    def collect(done):
+        for future in done:
+            member = futures.pop(future)
+            try:
+                member["row"]["content_sha256"], member["row"]["storage_path"], member["uploaded"] = future.result()
+            except Exception as e:
+                member["row"] = None
+                errors.append(f"{member['name']}: {str(e)}")
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="zip-upload")
+    try:
+        for member_info in zip_file.infolist():
+            name = member_info.filename
+            if member_info.is_dir():
+                continue
+            if member_info.file_size == 0:
+                print(f"Skipping empty file in ZIP: {name}")
+                continue
+            if member_info.file_size > max_member_size:
+                errors.append(f"{name}: File size exceeds {max_member_size / (1024*1024)}MB limit")
+                continue
+
+            # Bound the extracted-but-not-uploaded members held on disk/in memory
+            while len(futures) >= max(1, workers) * 2:
+                done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+                collect(done)
+
+            member_upload = SpooledUpload(hash_names=("sha256",))
+            try:
+                with zip_file.open(member_info) as source:
+                    member_upload.copy_from(source, max_member_size)
+            except Exception as e:
+                member_upload.close()
+                errors.append(f"{name}: {str(e)}")
+                continue
+
+            content_hash = member_upload.hexdigest("sha256")
+            if content_hash in seen_hashes:
+                member_upload.close()
+                duplicates.append({"name": name, "duplicate_of": seen_hashes[content_hash]})
+                continue
+            seen_hashes[content_hash] = name
+
+            filename = name.split('/')[-1]
+            content_type = content_type_for(filename)
+            member = {
+                "name": name,
+                "row": {
+                    "id": str(uuid.uuid4()),
+                    "name": filename or "Untitled",
+                    "original_filename": filename or "Untitled",
+                    "file_type": content_type,
+                    "file_size": member_upload.size,
+                    "folder_id": folder_id,
+                    "quote_id": quote_id,
+                    "form_id": form_id,
+                    "description": description,
+                    "is_reusable": is_reusable,
+                    "uploaded_by": user_id,
+                },
+            }
+            members.append(member)
+            futures[pool.submit(_store_member, member_upload, filename, content_type)] = member
+
+        collect(list(futures))
+    finally:
+        pool.shutdown(wait=True)
+        zip_file.close()
+
+    stored = [member for member in members if member["row"] is not None]
+    signed_urls = _sign_paths([member["row"]["storage_path"] for member in stored])
+
+    created: List[Dict[str, Any]] = []
+    for start in range(0, len(stored), max(1, ZIP_INSERT_BATCH_SIZE)):
+        batch = stored[start:start + ZIP_INSERT_BATCH_SIZE]
+        rows = []
+        for member in batch:
+            member["row"]["storage_url"] = signed_urls.get(member["row"]["storage_path"])
+            rows.append(member["row"])
+        try:
+            response = supabase_storage.table("files").insert(rows).execute()
+            if not response.data:
+                raise Exception("Database returned no data")
+            created.extend(response.data)
+        except Exception as e:
+            print(f"Database insert error for ZIP members: {str(e)}")
+            _release_blobs([row["content_sha256"] for row in rows])
+            errors.extend(f"{member['name']}: Failed to create file record: {str(e)}" for member in batch)
+
+    # New content: precompute thumbnails in the background
+    uploaded_ids = {member["row"]["id"] for member in stored if member.get("uploaded")}
+    for created_row in created:
+        if created_row.get("id") in uploaded_ids:
+            schedule_thumbnails(created_row)
+
+    print(f"ZIP ingest: {len(created)} uploaded, {len(duplicates)} duplicates skipped, {len(errors)} errors")
+    return {"files": created, "errors": errors, "duplicates": duplicates}
@@ -0,0 +1,58 @@
+-- Bulk Quote Assignment Migration
+-- Set-based bulk assignment of quotes to folders (POST /api/quotes/bulk/assign)
+--
+-- assign_quotes_to_folders() inserts every (quote, folder) pair in one statement
+-- and skips pairs that already exist (ON CONFLICT DO NOTHING), returning only the
+-- pairs it created. That needs a unique (quote_id, folder_id) index, so existing
+-- duplicate pairs are collapsed first (keeping the earliest assignment).
+--
+-- get_user_contacts() resolves emails/names for many users in one call instead
+-- of one Auth admin API request per user.
+
+-- Collapse duplicate pairs before adding the unique index
+DELETE FROM public.quote_folder_assignments a
+USING public.quote_folder_assignments b
+WHERE a.quote_id = b.quote_id
+  AND a.folder_id = b.folder_id
+  AND (coalesce(a.assigned_at, '-infinity'), a.id::text) > (coalesce(b.assigned_at, '-infinity'), b.id::text);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_quote_folder_assignments_quote_folder
+  ON public.quote_folder_assignments (quote_id, folder_id);
+
+-- Assign every quote to every folder; returns the newly created pairs
+CREATE OR REPLACE FUNCTION public.assign_quotes_to_folders(
+  target_quote_ids uuid[],
+  target_folder_ids uuid[],
+  assigned_by_user uuid
+)
+RETURNS TABLE (quote_id uuid, folder_id uuid)
+LANGUAGE sql
+SET search_path = public
+AS $$
+  INSERT INTO public.quote_folder_assignments (quote_id, folder_id, assigned_by, assigned_at)
+  SELECT q.id, f.id, assigned_by_user, NOW()
+  FROM public.quotes q
+  CROSS JOIN public.folders f
+  WHERE q.id = ANY(target_quote_ids)
+    AND f.id = ANY(target_folder_ids)
+  ON CONFLICT (quote_id, folder_id) DO NOTHING
+  RETURNING quote_folder_assignments.quote_id, quote_folder_assignments.folder_id;
+$$;
+
+-- Email and display name for a set of users
+-- SECURITY DEFINER: auth.users is not exposed through the API
+CREATE OR REPLACE FUNCTION public.get_user_contacts(target_user_ids uuid[])
+RETURNS TABLE (user_id uuid, email text, name text)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT u.id, u.email::text, u.raw_user_meta_data->>'name'
+  FROM auth.users u
+  WHERE u.id = ANY(target_user_ids);
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.get_user_contacts(uuid[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.assign_quotes_to_folders(uuid[], uuid[], uuid) TO service_role;
+GRANT EXECUTE ON FUNCTION public.get_user_contacts(uuid[]) TO service_role;
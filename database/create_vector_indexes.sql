@@ -1,6 +1,11 @@
 -- Vector Indexes for RAG Performance
 -- Run this AFTER populating embeddings (after running populate_embeddings.py)
 -- Creating indexes on empty tables can cause issues, so populate data first
+--
+-- These fixed ivfflat (lists = 100) indexes are only a starting point. Once the
+-- tables have data, use scripts/manage_vector_indexes.py to size HNSW/IVFFlat
+-- parameters from the row counts, rebuild concurrently and measure recall
+-- (requires vector_index_management.sql).
 
 -- Index for quote embeddings
 CREATE INDEX IF NOT EXISTS quote_embeddings_vector_idx 
@@ -0,0 +1,106 @@
+-- File Blobs Migration
+-- Content-addressed storage for the project-files bucket
+-- Run this SQL in your Supabase SQL Editor
+--
+-- Uploaded bytes are stored once per SHA-256 in file_blobs; every files row with
+-- the same content points at the same storage object (files.storage_path is the
+-- blob's path, files.content_sha256 its key). ref_count is the number of files
+-- rows using the blob: acquire_file_blob() adds a reference (registering the
+-- blob on first use), release_file_blob() drops one and returns the storage path
+-- once the last reference is gone so the caller can delete the object.
+--
+-- Existing files have no content_sha256 until scripts/backfill_file_blobs.py has
+-- hashed their objects (it registers each object as a blob and repoints
+-- duplicates at one copy). Rows without a hash keep working and are deleted the
+-- old way (their object is removed directly).
+
+CREATE TABLE IF NOT EXISTS file_blobs (
+  sha256 CHAR(64) PRIMARY KEY,
+  storage_path TEXT NOT NULL UNIQUE,
+  size_bytes BIGINT NOT NULL,
+  content_type VARCHAR(100),
+  ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE files ADD COLUMN IF NOT EXISTS content_sha256 CHAR(64);
+CREATE INDEX IF NOT EXISTS idx_files_content_sha256 ON files(content_sha256);
+
+-- Service-role access only (the backend manages blobs)
+ALTER TABLE file_blobs ENABLE ROW LEVEL SECURITY;
+
+-- Add a reference to a blob, registering it (with p_storage_path) if it is new.
+-- Returns the blob's storage path, which is the existing one if another upload
+-- registered the same content first. With p_storage_path NULL only an existing
+-- blob is referenced, and NULL is returned if there is none (content not stored yet).
+CREATE OR REPLACE FUNCTION public.acquire_file_blob(
+  p_sha256 text,
+  p_storage_path text DEFAULT NULL,
+  p_size_bytes bigint DEFAULT NULL,
+  p_content_type text DEFAULT NULL
+)
+RETURNS text
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  blob_path text;
+BEGIN
+  IF p_storage_path IS NULL THEN
+    UPDATE public.file_blobs
+    SET ref_count = ref_count + 1,
+        updated_at = NOW()
+    WHERE sha256 = p_sha256
+    RETURNING storage_path INTO blob_path;
+    RETURN blob_path;
+  END IF;
+
+  INSERT INTO public.file_blobs (sha256, storage_path, size_bytes, content_type, ref_count)
+  VALUES (p_sha256, p_storage_path, p_size_bytes, p_content_type, 1)
+  ON CONFLICT (sha256) DO UPDATE
+    SET ref_count = public.file_blobs.ref_count + 1,
+        updated_at = NOW()
+  RETURNING storage_path INTO blob_path;
+  RETURN blob_path;
+END;
+$$;
+
+-- Drop a reference to a blob. Returns the storage path when this was the last
+-- reference (the blob row is deleted and the caller removes the object), else NULL.
+-- The backend gives every new blob a fresh path (file_blobs.blob_storage_path), so
+-- content re-uploaded while the object is being removed gets its own object.
+CREATE OR REPLACE FUNCTION public.release_file_blob(p_sha256 text)
+RETURNS text
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  remaining integer;
+  released_path text;
+BEGIN
+  UPDATE public.file_blobs
+  SET ref_count = GREATEST(ref_count - 1, 0),
+      updated_at = NOW()
+  WHERE sha256 = p_sha256
+  RETURNING ref_count, storage_path INTO remaining, released_path;
+
+  IF remaining IS NULL OR remaining > 0 THEN
+    RETURN NULL;
+  END IF;
+
+  DELETE FROM public.file_blobs WHERE sha256 = p_sha256 AND ref_count = 0;
+  RETURN released_path;
+END;
+$$;
+
+-- Only the backend (service role) may change reference counts
+REVOKE EXECUTE ON FUNCTION public.acquire_file_blob(text, text, bigint, text) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.release_file_blob(text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.acquire_file_blob(text, text, bigint, text) TO service_role;
+GRANT EXECUTE ON FUNCTION public.release_file_blob(text) TO service_role;
+
+COMMENT ON TABLE file_blobs IS 'Content-addressed storage objects in project-files, shared by files rows with identical content';
+COMMENT ON COLUMN files.content_sha256 IS 'SHA-256 of the file content (file_blobs key); NULL for files not yet backfilled';
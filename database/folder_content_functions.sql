@@ -0,0 +1,47 @@
+-- Folder Content Functions
+-- Completion lookups for folder_content.py (GET /api/folders/{id}/content)
+--
+-- A folder's files and e-signatures can be viewed/signed by many users. Selecting
+-- the raw file_views / esignature_signatures rows for the whole folder would
+-- return one row per user, and PostgREST's max-rows cap silently truncates
+-- large results. These functions return at most one row per file / document,
+-- so the result is bounded by the folder's own item count.
+
+-- Files (of target_file_ids) viewed by viewer_id, or by anyone when it is NULL
+CREATE OR REPLACE FUNCTION public.viewed_file_ids(
+  target_file_ids uuid[],
+  viewer_id uuid DEFAULT NULL
+)
+RETURNS TABLE (file_id uuid)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT DISTINCT v.file_id
+  FROM public.file_views v
+  WHERE v.file_id = ANY(target_file_ids)
+    AND (viewer_id IS NULL OR v.user_id = viewer_id);
+$$;
+
+-- First signature of each document (of target_document_ids) by signer_id, or by
+-- anyone when it is NULL
+CREATE OR REPLACE FUNCTION public.first_document_signatures(
+  target_document_ids uuid[],
+  signer_id uuid DEFAULT NULL
+)
+RETURNS TABLE (document_id uuid, signed_file_id uuid, signed_file_url text)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT DISTINCT ON (s.document_id) s.document_id, s.signed_file_id, s.signed_file_url
+  FROM public.esignature_signatures s
+  WHERE s.document_id = ANY(target_document_ids)
+    AND (signer_id IS NULL OR s.user_id = signer_id)
+  ORDER BY s.document_id, s.signed_at, s.id;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.viewed_file_ids(uuid[], uuid) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.first_document_signatures(uuid[], uuid) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.viewed_file_ids(uuid[], uuid) TO service_role;
+GRANT EXECUTE ON FUNCTION public.first_document_signatures(uuid[], uuid) TO service_role;
@@ -0,0 +1,84 @@
+-- Folder Provisioning Migration
+-- Set-based provisioning of the default artifacts of new folders
+-- (template_provisioning_service.py, POST /api/folders/provision)
+--
+-- provision_folders() gives every target folder, in one statement (so all or
+-- nothing is written):
+--   - a copy of each e-signature template ("Folder Name - Template Name",
+--     is_template = false), unless the folder already has a copy with that name
+--   - an assignment of each template to the folder
+--   - an assignment of each default form to the folder
+-- Existing assignments are skipped (ON CONFLICT DO NOTHING), so provisioning a
+-- folder twice is harmless. Only the rows it created are returned.
+
+CREATE INDEX IF NOT EXISTS idx_esignature_documents_folder_name
+  ON public.esignature_documents (folder_id, name)
+  WHERE is_template = false;
+
+CREATE OR REPLACE FUNCTION public.provision_folders(
+  target_folder_ids uuid[],
+  esignature_template_ids uuid[],
+  default_form_ids uuid[],
+  assigned_by_user uuid
+)
+RETURNS TABLE (folder_id uuid, artifact_type text, artifact_id uuid)
+LANGUAGE sql
+SET search_path = public
+AS $$
+  WITH targets AS (
+    SELECT f.id, coalesce(f.name, 'Folder') AS name
+    FROM public.folders f
+    WHERE f.id = ANY(target_folder_ids)
+  ),
+  templates AS (
+    SELECT t.*
+    FROM public.esignature_documents t
+    WHERE t.id = ANY(coalesce(esignature_template_ids, '{}'))
+      AND t.is_template = true
+  ),
+  esignature_copies AS (
+    INSERT INTO public.esignature_documents (
+      name, description, file_id, document_type, signature_mode, require_signature,
+      signature_fields, is_template, folder_id, quote_id, expires_at, created_by,
+      status, created_at, updated_at
+    )
+    SELECT
+      f.name || ' - ' || t.name, t.description, t.file_id,
+      coalesce(t.document_type, 'agreement'), coalesce(t.signature_mode, 'simple'),
+      coalesce(t.require_signature, true), t.signature_fields, false, f.id, t.quote_id,
+      t.expires_at, assigned_by_user, 'pending', NOW(), NOW()
+    FROM targets f
+    CROSS JOIN templates t
+    WHERE NOT EXISTS (
+      SELECT 1 FROM public.esignature_documents d
+      WHERE d.folder_id = f.id
+        AND d.is_template = false
+        AND d.name = f.name || ' - ' || t.name
+    )
+    RETURNING esignature_documents.folder_id, esignature_documents.id
+  ),
+  esignature_assignments AS (
+    INSERT INTO public.esignature_document_folder_assignments (document_id, folder_id, assigned_by, status)
+    SELECT t.id, f.id, assigned_by_user, 'pending'
+    FROM targets f
+    CROSS JOIN templates t
+    ON CONFLICT (document_id, folder_id) DO NOTHING
+    RETURNING esignature_document_folder_assignments.folder_id, esignature_document_folder_assignments.document_id
+  ),
+  form_assignments AS (
+    INSERT INTO public.form_folder_assignments (form_id, folder_id, assigned_by, assigned_at)
+    SELECT fm.id, f.id, assigned_by_user, NOW()
+    FROM targets f
+    CROSS JOIN public.forms fm
+    WHERE fm.id = ANY(coalesce(default_form_ids, '{}'))
+    ON CONFLICT (form_id, folder_id) DO NOTHING
+    RETURNING form_folder_assignments.folder_id, form_folder_assignments.form_id
+  )
+  SELECT c.folder_id, 'esignature_copy', c.id FROM esignature_copies c
+  UNION ALL
+  SELECT a.folder_id, 'esignature_assignment', a.document_id FROM esignature_assignments a
+  UNION ALL
+  SELECT fa.folder_id, 'form_assignment', fa.form_id FROM form_assignments fa;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.provision_folders(uuid[], uuid[], uuid[], uuid) TO service_role;
@@ -0,0 +1,225 @@
+-- Quote Analytics Migration
+-- Incremental daily rollups for the quote analytics summary (GET /api/quotes/analytics/summary)
+--
+-- quote_daily_rollups keeps one row per (day, status, payment_status) with the
+-- quote count and summed total. Day is the UTC date of quotes.created_at and a
+-- NULL payment_status is stored as 'unpaid' (same as the summary reports it).
+-- Statement-level triggers apply deltas (subtract old rows, add new rows), so the
+-- rollup stays current on insert/update/delete without rescanning quotes.
+--
+-- quote_analytics_summary() answers a date range by combining the buckets in the
+-- range: cost depends on days x statuses, not on the number of quotes.
+
+CREATE TABLE IF NOT EXISTS public.quote_daily_rollups (
+  day DATE NOT NULL,
+  status VARCHAR(20) NOT NULL,
+  payment_status VARCHAR(50) NOT NULL,
+  quote_count BIGINT NOT NULL DEFAULT 0,
+  total_sum NUMERIC NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (day, status, payment_status)
+);
+
+-- Apply +1/-1 deltas for the given rows (signed: 1 = added, -1 = removed)
+-- SECURITY DEFINER: triggers fire for whichever role wrote the quote, and the
+-- rollup table is not writable through RLS
+CREATE OR REPLACE FUNCTION public.apply_quote_rollup_deltas(deltas jsonb)
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH changes AS (
+    SELECT
+      (d->>'day')::date AS day,
+      d->>'status' AS status,
+      d->>'payment_status' AS payment_status,
+      sum((d->>'sign')::int) AS count_delta,
+      sum((d->>'sign')::int * (d->>'total')::numeric) AS total_delta
+    FROM jsonb_array_elements(deltas) AS d
+    GROUP BY 1, 2, 3
+    HAVING sum((d->>'sign')::int) <> 0 OR sum((d->>'sign')::int * (d->>'total')::numeric) <> 0
+  )
+  INSERT INTO public.quote_daily_rollups (day, status, payment_status, quote_count, total_sum, updated_at)
+  SELECT day, status, payment_status, count_delta, total_delta, NOW()
+  FROM changes
+  ORDER BY day, status, payment_status
+  ON CONFLICT (day, status, payment_status) DO UPDATE
+    SET quote_count = public.quote_daily_rollups.quote_count + EXCLUDED.quote_count,
+        total_sum = public.quote_daily_rollups.total_sum + EXCLUDED.total_sum,
+        updated_at = EXCLUDED.updated_at;
+
+  -- Drop emptied buckets so range scans only touch live rows
+  DELETE FROM public.quote_daily_rollups r
+  USING jsonb_array_elements(deltas) AS d
+  WHERE r.quote_count = 0
+    AND r.day = (d->>'day')::date AND r.status = d->>'status' AND r.payment_status = d->>'payment_status';
+$$;
+
+-- Rebuild the rollup from scratch (backfill / repair; run while quotes are not being written)
+CREATE OR REPLACE FUNCTION public.rebuild_quote_daily_rollups()
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  DELETE FROM public.quote_daily_rollups WHERE true;
+  INSERT INTO public.quote_daily_rollups (day, status, payment_status, quote_count, total_sum, updated_at)
+  SELECT
+    (q.created_at AT TIME ZONE 'UTC')::date,
+    coalesce(q.status, 'unknown'),
+    coalesce(q.payment_status, 'unpaid'),
+    count(*),
+    coalesce(sum(q.total), 0),
+    NOW()
+  FROM public.quotes q
+  GROUP BY 1, 2, 3;
+$$;
+
+-- Trigger function: one call per statement, covering every affected row
+-- (SECURITY DEFINER so apply_quote_rollup_deltas() need not be callable by clients)
+CREATE OR REPLACE FUNCTION public.quote_rollup_from_quotes()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  deltas jsonb;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    SELECT jsonb_agg(jsonb_build_object(
+      'day', (n.created_at AT TIME ZONE 'UTC')::date, 'status', coalesce(n.status, 'unknown'),
+      'payment_status', coalesce(n.payment_status, 'unpaid'), 'total', coalesce(n.total, 0), 'sign', 1))
+    INTO deltas FROM new_rows n;
+  ELSIF TG_OP = 'DELETE' THEN
+    SELECT jsonb_agg(jsonb_build_object(
+      'day', (o.created_at AT TIME ZONE 'UTC')::date, 'status', coalesce(o.status, 'unknown'),
+      'payment_status', coalesce(o.payment_status, 'unpaid'), 'total', coalesce(o.total, 0), 'sign', -1))
+    INTO deltas FROM old_rows o;
+  ELSE
+    -- Only rows whose rollup key or total changed produce deltas
+    SELECT jsonb_agg(d) INTO deltas
+    FROM (
+      SELECT jsonb_build_object(
+        'day', (o.created_at AT TIME ZONE 'UTC')::date, 'status', coalesce(o.status, 'unknown'),
+        'payment_status', coalesce(o.payment_status, 'unpaid'), 'total', coalesce(o.total, 0), 'sign', -1) AS d
+      FROM old_rows o JOIN new_rows n ON n.id = o.id
+      WHERE (o.created_at, o.status, o.payment_status, o.total) IS DISTINCT FROM (n.created_at, n.status, n.payment_status, n.total)
+      UNION ALL
+      SELECT jsonb_build_object(
+        'day', (n.created_at AT TIME ZONE 'UTC')::date, 'status', coalesce(n.status, 'unknown'),
+        'payment_status', coalesce(n.payment_status, 'unpaid'), 'total', coalesce(n.total, 0), 'sign', 1)
+      FROM old_rows o JOIN new_rows n ON n.id = o.id
+      WHERE (o.created_at, o.status, o.payment_status, o.total) IS DISTINCT FROM (n.created_at, n.status, n.payment_status, n.total)
+    ) changed;
+  END IF;
+
+  IF deltas IS NOT NULL THEN
+    PERFORM public.apply_quote_rollup_deltas(deltas);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS quote_rollup_insert ON public.quotes;
+CREATE TRIGGER quote_rollup_insert
+  AFTER INSERT ON public.quotes
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.quote_rollup_from_quotes();
+
+DROP TRIGGER IF EXISTS quote_rollup_update ON public.quotes;
+CREATE TRIGGER quote_rollup_update
+  AFTER UPDATE ON public.quotes
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.quote_rollup_from_quotes();
+
+DROP TRIGGER IF EXISTS quote_rollup_delete ON public.quotes;
+CREATE TRIGGER quote_rollup_delete
+  AFTER DELETE ON public.quotes
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.quote_rollup_from_quotes();
+
+-- Summary for a date range (inclusive UTC days; NULL = open-ended), optionally
+-- with a time series bucketed by 'day', 'week' or 'month'
+CREATE OR REPLACE FUNCTION public.quote_analytics_summary(
+  start_day date DEFAULT NULL,
+  end_day date DEFAULT NULL,
+  series_interval text DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  result jsonb;
+  series jsonb;
+BEGIN
+  IF series_interval IS NOT NULL AND series_interval NOT IN ('day', 'week', 'month') THEN
+    RAISE EXCEPTION 'Invalid series_interval: %', series_interval;
+  END IF;
+
+  WITH buckets AS (
+    SELECT * FROM public.quote_daily_rollups r
+    WHERE (start_day IS NULL OR r.day >= start_day)
+      AND (end_day IS NULL OR r.day <= end_day)
+  )
+  SELECT jsonb_build_object(
+    'total_quotes', coalesce((SELECT sum(quote_count) FROM buckets), 0),
+    'total_value', coalesce((SELECT sum(total_sum) FROM buckets), 0)::text,
+    'accepted_quotes', coalesce((SELECT sum(quote_count) FROM buckets WHERE status = 'accepted'), 0),
+    'accepted_value', coalesce((SELECT sum(total_sum) FROM buckets WHERE status = 'accepted'), 0)::text,
+    'status_counts', coalesce((
+      SELECT jsonb_object_agg(status, n) FROM (SELECT status, sum(quote_count) AS n FROM buckets GROUP BY status) s
+    ), '{}'::jsonb),
+    'payment_status_counts', coalesce((
+      SELECT jsonb_object_agg(payment_status, n) FROM (SELECT payment_status, sum(quote_count) AS n FROM buckets GROUP BY payment_status) p
+    ), '{}'::jsonb)
+  ) INTO result;
+
+  IF series_interval IS NOT NULL THEN
+    SELECT coalesce(jsonb_agg(jsonb_build_object(
+      'period', period,
+      'total_quotes', total_quotes,
+      'total_value', total_value::text,
+      'accepted_quotes', accepted_quotes,
+      'accepted_value', accepted_value::text
+    ) ORDER BY period), '[]'::jsonb)
+    INTO series
+    FROM (
+      SELECT
+        date_trunc(series_interval, r.day)::date AS period,
+        sum(r.quote_count) AS total_quotes,
+        sum(r.total_sum) AS total_value,
+        coalesce(sum(r.quote_count) FILTER (WHERE r.status = 'accepted'), 0) AS accepted_quotes,
+        coalesce(sum(r.total_sum) FILTER (WHERE r.status = 'accepted'), 0) AS accepted_value
+      FROM public.quote_daily_rollups r
+      WHERE (start_day IS NULL OR r.day >= start_day)
+        AND (end_day IS NULL OR r.day <= end_day)
+      GROUP BY 1
+    ) s;
+    result := result || jsonb_build_object('series', series);
+  END IF;
+
+  RETURN result;
+END;
+$$;
+
+-- Backfill from existing quotes
+SELECT public.rebuild_quote_daily_rollups();
+
+-- RLS: rollups are only read through quote_analytics_summary() with the service role
+ALTER TABLE public.quote_daily_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Supabase grants EXECUTE to anon/authenticated directly, so revoking from PUBLIC is not enough
+REVOKE EXECUTE ON FUNCTION public.apply_quote_rollup_deltas(jsonb) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.rebuild_quote_daily_rollups() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.quote_analytics_summary(date, date, text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.apply_quote_rollup_deltas(jsonb) TO service_role;
+GRANT EXECUTE ON FUNCTION public.rebuild_quote_daily_rollups() TO service_role;
+GRANT EXECUTE ON FUNCTION public.quote_analytics_summary(date, date, text) TO service_role;
@@ -0,0 +1,82 @@
+-- Quote List Migration
+-- Single-query quote list pages (GET /api/quotes, GET /api/quotes/client/{id}/history,
+-- GET /api/assignments/customer/quotes)
+--
+-- customer_accessible_quote_ids() resolves which quotes a user can see through
+-- their folder assignments (quote_folder_assignments, plus quotes.folder_id for
+-- older quotes) in one query instead of three round trips.
+--
+-- list_quotes() takes the same arguments as search_quotes() plus an optional
+-- accessible_to_user and returns the quote rows of the page (not just ids), so
+-- PostgREST can project columns and embed clients/line items on the RPC result:
+-- a list page is one request. Rows come back unordered; callers order by the
+-- same sort key (plus id) they passed in.
+
+CREATE INDEX IF NOT EXISTS idx_quote_folder_assignments_folder_id
+  ON public.quote_folder_assignments (folder_id);
+
+-- Quotes a user can access through folder assignments
+CREATE OR REPLACE FUNCTION public.customer_accessible_quote_ids(target_user_id uuid)
+RETURNS TABLE (quote_id uuid)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT qfa.quote_id
+  FROM public.folder_assignments fa
+  JOIN public.quote_folder_assignments qfa ON qfa.folder_id = fa.folder_id
+  WHERE fa.user_id = target_user_id
+  UNION
+  SELECT q.id
+  FROM public.folder_assignments fa
+  JOIN public.quotes q ON q.folder_id = fa.folder_id
+  WHERE fa.user_id = target_user_id;
+$$;
+
+-- One page of quotes (search, filters, access, sorting, pagination)
+CREATE OR REPLACE FUNCTION public.list_quotes(
+  search_term text DEFAULT NULL,
+  status_filter text DEFAULT NULL,
+  payment_status_filter text DEFAULT NULL,
+  client_id_filter uuid DEFAULT NULL,
+  accessible_to_user uuid DEFAULT NULL,
+  created_from timestamptz DEFAULT NULL,
+  created_before timestamptz DEFAULT NULL,
+  expiration_from timestamptz DEFAULT NULL,
+  expiration_before timestamptz DEFAULT NULL,
+  sort_by text DEFAULT 'created_at',
+  sort_desc boolean DEFAULT true,
+  page_limit int DEFAULT NULL,
+  page_offset int DEFAULT 0
+)
+RETURNS SETOF public.quotes
+LANGUAGE plpgsql
+STABLE
+SET search_path = public
+AS $$
+DECLARE
+  accessible_ids uuid[];
+BEGIN
+  IF accessible_to_user IS NOT NULL THEN
+    accessible_ids := ARRAY(SELECT a.quote_id FROM public.customer_accessible_quote_ids(accessible_to_user) a);
+    IF cardinality(accessible_ids) = 0 THEN
+      RETURN;
+    END IF;
+  END IF;
+
+  RETURN QUERY
+  SELECT q.*
+  FROM public.quotes q
+  WHERE q.id IN (
+    SELECT s.quote_id
+    FROM public.search_quotes(
+      search_term, status_filter, payment_status_filter, client_id_filter, accessible_ids,
+      created_from, created_before, expiration_from, expiration_before,
+      sort_by, sort_desc, page_limit, page_offset
+    ) s
+  );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.customer_accessible_quote_ids(uuid) TO service_role;
+GRANT EXECUTE ON FUNCTION public.list_quotes(text, text, text, uuid, uuid, timestamptz, timestamptz, timestamptz, timestamptz, text, boolean, int, int) TO service_role;
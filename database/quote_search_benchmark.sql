@@ -0,0 +1,58 @@
+-- Quote Search Benchmark
+-- Run after quote_search_migration.sql (psql or the SQL editor). Generates 50k
+-- synthetic quotes (3 line items each, 2k clients) inside a transaction, times
+-- search_quotes() for typical list requests, then rolls everything back.
+
+BEGIN;
+
+INSERT INTO public.clients (id, name, email, company)
+SELECT
+  gen_random_uuid(),
+  'Bench Client ' || g,
+  'buyer' || g || '@bench-' || (g % 300) || '.example',
+  'Bench Company ' || (g % 500)
+FROM generate_series(1, 2000) AS g;
+
+INSERT INTO public.quotes (quote_number, title, client_id, notes, terms, status, payment_status, subtotal, total, created_at)
+SELECT
+  'QT-BENCH-' || lpad(g::text, 6, '0'),
+  (ARRAY['Team polos', 'Embroidered hats', 'Event tees', 'Staff jackets', 'Trade show kit'])[1 + g % 5] || ' #' || g,
+  c.id,
+  CASE WHEN g % 7 = 0 THEN 'Rush order - ship by Friday' END,
+  'Net 30',
+  (ARRAY['draft', 'sent', 'viewed', 'accepted', 'declined'])[1 + g % 5],
+  (ARRAY['unpaid', 'paid', NULL, 'partially_paid'])[1 + g % 4],
+  (g % 5000) + 0.50,
+  (g % 5000) + 41.75,
+  NOW() - (g || ' minutes')::interval
+FROM generate_series(1, 50000) AS g
+JOIN LATERAL (
+  SELECT id FROM public.clients WHERE name = 'Bench Client ' || (1 + g % 2000)
+) c ON true;
+
+INSERT INTO public.line_items (quote_id, description, quantity, unit_price)
+SELECT q.id, d.description || ' (' || q.quote_number || ')', 10, 12.50
+FROM public.quotes q
+CROSS JOIN (VALUES ('Left chest embroidery'), ('Screen print 2 colors'), ('Heather navy polo')) AS d(description)
+WHERE q.quote_number LIKE 'QT-BENCH-%';
+
+ANALYZE public.quotes;
+ANALYZE public.line_items;
+ANALYZE public.quote_search_documents;
+
+\timing on
+
+-- First page, no search
+SELECT count(*) FROM public.search_quotes(page_limit => 50);
+-- Selective search (quote number / line item / client email)
+SELECT count(*) FROM public.search_quotes('qt-bench-04213', page_limit => 50);
+SELECT count(*) FROM public.search_quotes('buyer1234@', page_limit => 50);
+-- Broad search + filters + sort
+SELECT count(*) FROM public.search_quotes('navy', status_filter => 'sent', payment_status_filter => 'unpaid', sort_by => 'total', page_limit => 50, page_offset => 100);
+-- Plan check: the trigram index should serve selective searches
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT d.quote_id FROM public.quote_search_documents d WHERE d.search_text LIKE '%qt-bench-04213%';
+
+\timing off
+
+ROLLBACK;
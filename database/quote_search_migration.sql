@@ -0,0 +1,220 @@
+-- Quote Search Migration
+-- Server-side search, filtering and pagination for the quotes list (GET /api/quotes)
+--
+-- quote_search_documents keeps one lowercased text document per quote covering
+-- title, quote number, client name/email/company, notes, terms, line item
+-- descriptions and totals. A trigram index makes substring search ('%term%')
+-- index-assisted, so results match the old in-memory substring filter.
+-- The documents live in their own table (not a quotes column) so refreshing them
+-- never fires the quotes updated_at trigger. Statement-level triggers keep them
+-- current when quotes, line items or clients change.
+--
+-- search_quotes() applies search, every list filter (including payment_status
+-- 'unpaid' = unpaid or NULL), sorting and pagination in one query and returns
+-- the page of quote ids in order.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS public.quote_search_documents (
+  quote_id UUID PRIMARY KEY REFERENCES public.quotes(id) ON DELETE CASCADE,
+  search_text TEXT NOT NULL DEFAULT '',
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_quote_search_documents_trgm
+  ON public.quote_search_documents USING gin (search_text gin_trgm_ops);
+
+-- Rebuild the search documents of the given quotes (set-based)
+-- SECURITY DEFINER: triggers fire for whichever role wrote the row, and the
+-- documents table is not writable through RLS
+CREATE OR REPLACE FUNCTION public.refresh_quote_search_documents(target_quote_ids uuid[])
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  INSERT INTO public.quote_search_documents (quote_id, search_text, updated_at)
+  SELECT
+    q.id,
+    lower(concat_ws(' ',
+      q.title,
+      q.quote_number,
+      c.name,
+      c.email,
+      c.company,
+      q.notes,
+      q.terms,
+      li.descriptions,
+      q.total::text,
+      q.subtotal::text
+    )),
+    NOW()
+  FROM public.quotes q
+  LEFT JOIN public.clients c ON c.id = q.client_id
+  LEFT JOIN LATERAL (
+    SELECT string_agg(l.description, ' ') AS descriptions
+    FROM public.line_items l
+    WHERE l.quote_id = q.id
+  ) li ON true
+  WHERE q.id = ANY(target_quote_ids)
+  ON CONFLICT (quote_id) DO UPDATE
+    SET search_text = EXCLUDED.search_text,
+        updated_at = EXCLUDED.updated_at;
+$$;
+
+-- Trigger functions (transition tables let one statement refresh all affected quotes at once)
+-- (SECURITY DEFINER so refresh_quote_search_documents() need not be callable by clients)
+CREATE OR REPLACE FUNCTION public.quote_search_refresh_from_quotes()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM public.refresh_quote_search_documents(ARRAY(SELECT DISTINCT id FROM changed_rows));
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.quote_search_refresh_from_line_items()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM public.refresh_quote_search_documents(ARRAY(SELECT DISTINCT quote_id FROM changed_rows));
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.quote_search_refresh_from_clients()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM public.refresh_quote_search_documents(ARRAY(
+    SELECT q.id FROM public.quotes q WHERE q.client_id IN (SELECT id FROM changed_rows)
+  ));
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS quote_search_quotes_insert ON public.quotes;
+CREATE TRIGGER quote_search_quotes_insert
+  AFTER INSERT ON public.quotes
+  REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.quote_search_refresh_from_quotes();
+
+DROP TRIGGER IF EXISTS quote_search_quotes_update ON public.quotes;
+CREATE TRIGGER quote_search_quotes_update
+  AFTER UPDATE ON public.quotes
+  REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.quote_search_refresh_from_quotes();
+
+DROP TRIGGER IF EXISTS quote_search_line_items_insert ON public.line_items;
+CREATE TRIGGER quote_search_line_items_insert
+  AFTER INSERT ON public.line_items
+  REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.quote_search_refresh_from_line_items();
+
+DROP TRIGGER IF EXISTS quote_search_line_items_update ON public.line_items;
+CREATE TRIGGER quote_search_line_items_update
+  AFTER UPDATE ON public.line_items
+  REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.quote_search_refresh_from_line_items();
+
+DROP TRIGGER IF EXISTS quote_search_line_items_delete ON public.line_items;
+CREATE TRIGGER quote_search_line_items_delete
+  AFTER DELETE ON public.line_items
+  REFERENCING OLD TABLE AS changed_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.quote_search_refresh_from_line_items();
+
+DROP TRIGGER IF EXISTS quote_search_clients_update ON public.clients;
+CREATE TRIGGER quote_search_clients_update
+  AFTER UPDATE ON public.clients
+  REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.quote_search_refresh_from_clients();
+
+-- Search, filter, sort and paginate quotes; returns the page of ids in order
+CREATE OR REPLACE FUNCTION public.search_quotes(
+  search_term text DEFAULT NULL,
+  status_filter text DEFAULT NULL,
+  payment_status_filter text DEFAULT NULL,
+  client_id_filter uuid DEFAULT NULL,
+  quote_ids_filter uuid[] DEFAULT NULL,
+  created_from timestamptz DEFAULT NULL,
+  created_before timestamptz DEFAULT NULL,
+  expiration_from timestamptz DEFAULT NULL,
+  expiration_before timestamptz DEFAULT NULL,
+  sort_by text DEFAULT 'created_at',
+  sort_desc boolean DEFAULT true,
+  page_limit int DEFAULT NULL,
+  page_offset int DEFAULT 0
+)
+RETURNS TABLE (quote_id uuid)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  search_pattern text;
+BEGIN
+  IF sort_by NOT IN ('created_at', 'total', 'status', 'quote_number', 'title') THEN
+    RAISE EXCEPTION 'Invalid sort_by: %', sort_by;
+  END IF;
+
+  IF search_term IS NOT NULL AND btrim(search_term) <> '' THEN
+    -- Substring match; escape LIKE wildcards in the user's term
+    search_pattern := '%' || replace(replace(replace(lower(btrim(search_term)), '\', '\\'), '%', '\%'), '_', '\_') || '%';
+  END IF;
+
+  -- Dynamic SQL so each call is planned with its actual filters (and can use the trigram index)
+  RETURN QUERY EXECUTE format(
+    $query$
+    SELECT q.id
+    FROM public.quotes q
+    LEFT JOIN public.quote_search_documents d ON d.quote_id = q.id
+    WHERE ($1::text IS NULL OR d.search_text LIKE $1)
+      AND ($2::text IS NULL OR q.status = $2)
+      AND ($3::text IS NULL OR (
+        CASE WHEN $3 = 'unpaid'
+          THEN q.payment_status IS NULL OR q.payment_status = 'unpaid'
+          ELSE q.payment_status = $3
+        END
+      ))
+      AND ($4::uuid IS NULL OR q.client_id = $4)
+      AND ($5::uuid[] IS NULL OR q.id = ANY($5))
+      AND ($6::timestamptz IS NULL OR q.created_at >= $6)
+      AND ($7::timestamptz IS NULL OR q.created_at < $7)
+      AND ($8::timestamptz IS NULL OR q.expiration_date >= $8)
+      AND ($9::timestamptz IS NULL OR q.expiration_date < $9)
+    ORDER BY q.%I %s, q.id
+    LIMIT $10 OFFSET $11
+    $query$,
+    sort_by,
+    CASE WHEN sort_desc THEN 'DESC' ELSE 'ASC' END
+  )
+  USING search_pattern, status_filter, payment_status_filter, client_id_filter, quote_ids_filter,
+        created_from, created_before, expiration_from, expiration_before,
+        page_limit, greatest(coalesce(page_offset, 0), 0);
+END;
+$$;
+
+-- Backfill documents for existing quotes
+SELECT public.refresh_quote_search_documents(ARRAY(SELECT id FROM public.quotes));
+
+-- RLS: documents are only read through search_quotes() with the service role
+ALTER TABLE public.quote_search_documents ENABLE ROW LEVEL SECURITY;
+
+-- Supabase grants EXECUTE to anon/authenticated directly, so revoke from them too
+REVOKE EXECUTE ON FUNCTION public.refresh_quote_search_documents(uuid[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_quote_search_documents(uuid[]) TO service_role;
+GRANT EXECUTE ON FUNCTION public.search_quotes(text, text, text, uuid, uuid[], timestamptz, timestamptz, timestamptz, timestamptz, text, boolean, int, int) TO service_role;
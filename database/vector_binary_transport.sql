@@ -0,0 +1,222 @@
+-- Compact query-vector transport for RAG vector search
+-- Run this after vector_index_management.sql
+--
+-- The rag_search_* RPCs used to receive the query embedding only as pgvector
+-- text ('[0.0123456789,...]', ~16KB for 768 dims). They now also accept:
+--   query_embedding_b64 -> base64 of little-endian float32 values (4KB for 768 dims),
+--                          decoded server-side by rag_decode_vector_b64()
+--   query_entry_id      -> (knowledge only) search with the stored embedding of an
+--                          existing entry, so the vector never leaves the database
+-- query_embedding_text is still accepted for older callers.
+--
+-- The query vector is also resolved once per call into a variable instead of
+-- casting the text parameter inside the ORDER BY / similarity expressions.
+
+-- Decode base64-packed little-endian IEEE 754 float32 values into a vector
+CREATE OR REPLACE FUNCTION public.rag_decode_vector_b64(encoded text)
+RETURNS vector
+LANGUAGE sql
+IMMUTABLE
+STRICT
+PARALLEL SAFE
+AS $$
+  WITH raw AS (
+    SELECT decode(encoded, 'base64') AS b
+  ),
+  words AS (
+    SELECT
+      i,
+      get_byte(b, 4 * i)::bigint
+        | (get_byte(b, 4 * i + 1)::bigint << 8)
+        | (get_byte(b, 4 * i + 2)::bigint << 16)
+        | (get_byte(b, 4 * i + 3)::bigint << 24) AS bits
+    FROM raw, generate_series(0, length(b) / 4 - 1) AS i
+  )
+  SELECT array_agg(
+    (CASE WHEN (bits >> 31) = 1 THEN -1 ELSE 1 END)
+    * CASE
+        WHEN ((bits >> 23) & 255) = 0
+          THEN (bits & 8388607)::float8 * power(2::float8, -149)
+        ELSE (1 + (bits & 8388607)::float8 / 8388608)
+          * power(2::float8, ((bits >> 23) & 255) - 127)
+      END
+    ORDER BY i
+  )::real[]::vector
+  FROM words;
+$$;
+
+-- Resolve whichever query-vector argument the caller supplied
+CREATE OR REPLACE FUNCTION public.rag_resolve_query_vector(
+  query_embedding_text text,
+  query_embedding_b64 text
+)
+RETURNS vector
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT coalesce(
+    public.rag_decode_vector_b64(query_embedding_b64),
+    query_embedding_text::vector
+  );
+$$;
+
+-- Drop the previous signatures so PostgREST does not see ambiguous overloads
+DROP FUNCTION IF EXISTS public.rag_search_quote_embeddings(text, int, uuid, int, int, boolean);
+DROP FUNCTION IF EXISTS public.rag_search_form_embeddings(text, int, uuid, int, int, boolean);
+DROP FUNCTION IF EXISTS public.rag_search_knowledge_embeddings_vector(text, int, int, int, boolean);
+
+-- Function to search quote embeddings by vector similarity
+CREATE OR REPLACE FUNCTION public.rag_search_quote_embeddings(
+  query_embedding_text text DEFAULT NULL,
+  match_limit int DEFAULT 5,
+  client_id_filter uuid DEFAULT NULL,
+  ivfflat_probes int DEFAULT NULL,
+  hnsw_ef_search int DEFAULT NULL,
+  exact_search boolean DEFAULT false,
+  query_embedding_b64 text DEFAULT NULL
+)
+RETURNS TABLE (
+  id uuid,
+  quote_id uuid,
+  content_type varchar,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  query_vector vector := public.rag_resolve_query_vector(query_embedding_text, query_embedding_b64);
+BEGIN
+  IF query_vector IS NULL THEN
+    RETURN;
+  END IF;
+
+  PERFORM public.rag_apply_vector_search_settings(ivfflat_probes, hnsw_ef_search, exact_search);
+
+  RETURN QUERY
+  SELECT
+    qe.id,
+    qe.quote_id,
+    qe.content_type,
+    qe.content,
+    qe.metadata,
+    1 - (qe.embedding <=> query_vector)::float as similarity
+  FROM public.quote_embeddings qe
+  WHERE qe.embedding IS NOT NULL
+  AND (client_id_filter IS NULL OR qe.quote_id IN (
+    SELECT q.id FROM public.quotes q WHERE q.client_id = client_id_filter
+  ))
+  ORDER BY qe.embedding <=> query_vector
+  LIMIT greatest(match_limit, 1);
+END;
+$$;
+
+-- Function to search form embeddings by vector similarity
+CREATE OR REPLACE FUNCTION public.rag_search_form_embeddings(
+  query_embedding_text text DEFAULT NULL,
+  match_limit int DEFAULT 5,
+  client_id_filter uuid DEFAULT NULL,
+  ivfflat_probes int DEFAULT NULL,
+  hnsw_ef_search int DEFAULT NULL,
+  exact_search boolean DEFAULT false,
+  query_embedding_b64 text DEFAULT NULL
+)
+RETURNS TABLE (
+  id uuid,
+  form_id uuid,
+  content_type varchar,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  query_vector vector := public.rag_resolve_query_vector(query_embedding_text, query_embedding_b64);
+BEGIN
+  IF query_vector IS NULL THEN
+    RETURN;
+  END IF;
+
+  PERFORM public.rag_apply_vector_search_settings(ivfflat_probes, hnsw_ef_search, exact_search);
+
+  RETURN QUERY
+  SELECT
+    fe.id,
+    fe.form_id,
+    fe.content_type,
+    fe.content,
+    fe.metadata,
+    1 - (fe.embedding <=> query_vector)::float as similarity
+  FROM public.form_embeddings fe
+  WHERE fe.embedding IS NOT NULL
+  AND (client_id_filter IS NULL OR fe.form_id IN (
+    SELECT ffa.form_id
+    FROM public.form_folder_assignments ffa
+    JOIN public.folders f ON f.id = ffa.folder_id
+    WHERE f.client_id = client_id_filter
+  ))
+  ORDER BY fe.embedding <=> query_vector
+  LIMIT greatest(match_limit, 1);
+END;
+$$;
+
+-- Function to search knowledge embeddings by vector similarity
+CREATE OR REPLACE FUNCTION public.rag_search_knowledge_embeddings_vector(
+  query_embedding_text text DEFAULT NULL,
+  match_limit int DEFAULT 5,
+  ivfflat_probes int DEFAULT NULL,
+  hnsw_ef_search int DEFAULT NULL,
+  exact_search boolean DEFAULT false,
+  query_embedding_b64 text DEFAULT NULL,
+  query_entry_id uuid DEFAULT NULL
+)
+RETURNS TABLE (
+  id uuid,
+  category varchar,
+  title varchar,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  query_vector vector;
+BEGIN
+  IF query_entry_id IS NOT NULL THEN
+    SELECT ke.embedding INTO query_vector
+    FROM public.knowledge_embeddings ke
+    WHERE ke.id = query_entry_id;
+  ELSE
+    query_vector := public.rag_resolve_query_vector(query_embedding_text, query_embedding_b64);
+  END IF;
+
+  IF query_vector IS NULL THEN
+    RETURN;
+  END IF;
+
+  PERFORM public.rag_apply_vector_search_settings(ivfflat_probes, hnsw_ef_search, exact_search);
+
+  RETURN QUERY
+  SELECT
+    ke.id,
+    ke.category,
+    ke.title,
+    ke.content,
+    ke.metadata,
+    1 - (ke.embedding <=> query_vector)::float as similarity
+  FROM public.knowledge_embeddings ke
+  WHERE ke.embedding IS NOT NULL
+  ORDER BY ke.embedding <=> query_vector
+  LIMIT greatest(match_limit, 1);
+END;
+$$;
+
+-- Grant execute permissions
+GRANT EXECUTE ON FUNCTION public.rag_decode_vector_b64(text) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.rag_resolve_query_vector(text, text) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.rag_search_quote_embeddings(text, int, uuid, int, int, boolean, text) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.rag_search_form_embeddings(text, int, uuid, int, int, boolean, text) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.rag_search_knowledge_embeddings_vector(text, int, int, int, boolean, text, uuid) TO anon, authenticated, service_role;
@@ -0,0 +1,210 @@
+-- Tunable ANN search for RAG vector tables
+-- Run this after rag_vector_search_functions.sql
+--
+-- Replaces the rag_search_* vector functions with versions that let callers
+-- tune the approximate index per query:
+--   ivfflat_probes  -> SET LOCAL ivfflat.probes   (IVFFlat indexes)
+--   hnsw_ef_search  -> SET LOCAL hnsw.ef_search   (HNSW indexes, pgvector >= 0.5.0)
+--   exact_search    -> disable index scans so the query is an exact (brute force) scan,
+--                      used by scripts/manage_vector_indexes.py to measure recall
+--
+-- Settings are applied with set_config(..., true) so they only last for the
+-- RPC's own transaction. All new parameters default to NULL/false, so existing
+-- callers keep working unchanged.
+--
+-- Index creation itself is handled by scripts/manage_vector_indexes.py, which
+-- picks HNSW or IVFFlat parameters from rag_vector_index_stats() and rebuilds
+-- indexes with CREATE INDEX CONCURRENTLY.
+
+-- Drop the previous signatures so PostgREST does not see ambiguous overloads
+DROP FUNCTION IF EXISTS public.rag_search_quote_embeddings(text, int, uuid);
+DROP FUNCTION IF EXISTS public.rag_search_form_embeddings(text, int, uuid);
+DROP FUNCTION IF EXISTS public.rag_search_knowledge_embeddings_vector(text, int);
+
+-- Applies per-query ANN tuning for the current transaction
+CREATE OR REPLACE FUNCTION public.rag_apply_vector_search_settings(
+  ivfflat_probes int DEFAULT NULL,
+  hnsw_ef_search int DEFAULT NULL,
+  exact_search boolean DEFAULT false
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF ivfflat_probes IS NOT NULL THEN
+    PERFORM set_config('ivfflat.probes', greatest(ivfflat_probes, 1)::text, true);
+  END IF;
+  IF hnsw_ef_search IS NOT NULL THEN
+    PERFORM set_config('hnsw.ef_search', greatest(hnsw_ef_search, 1)::text, true);
+  END IF;
+  IF exact_search THEN
+    PERFORM set_config('enable_indexscan', 'off', true);
+    PERFORM set_config('enable_bitmapscan', 'off', true);
+  END IF;
+END;
+$$;
+
+-- Function to search quote embeddings by vector similarity
+CREATE OR REPLACE FUNCTION public.rag_search_quote_embeddings(
+  query_embedding_text text,
+  match_limit int DEFAULT 5,
+  client_id_filter uuid DEFAULT NULL,
+  ivfflat_probes int DEFAULT NULL,
+  hnsw_ef_search int DEFAULT NULL,
+  exact_search boolean DEFAULT false
+)
+RETURNS TABLE (
+  id uuid,
+  quote_id uuid,
+  content_type varchar,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM public.rag_apply_vector_search_settings(ivfflat_probes, hnsw_ef_search, exact_search);
+
+  RETURN QUERY
+  SELECT
+    qe.id,
+    qe.quote_id,
+    qe.content_type,
+    qe.content,
+    qe.metadata,
+    1 - (qe.embedding <=> query_embedding_text::vector)::float as similarity
+  FROM public.quote_embeddings qe
+  WHERE qe.embedding IS NOT NULL
+  AND (client_id_filter IS NULL OR qe.quote_id IN (
+    SELECT q.id FROM public.quotes q WHERE q.client_id = client_id_filter
+  ))
+  ORDER BY qe.embedding <=> query_embedding_text::vector
+  LIMIT greatest(match_limit, 1);
+END;
+$$;
+
+-- Function to search form embeddings by vector similarity
+CREATE OR REPLACE FUNCTION public.rag_search_form_embeddings(
+  query_embedding_text text,
+  match_limit int DEFAULT 5,
+  client_id_filter uuid DEFAULT NULL,
+  ivfflat_probes int DEFAULT NULL,
+  hnsw_ef_search int DEFAULT NULL,
+  exact_search boolean DEFAULT false
+)
+RETURNS TABLE (
+  id uuid,
+  form_id uuid,
+  content_type varchar,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM public.rag_apply_vector_search_settings(ivfflat_probes, hnsw_ef_search, exact_search);
+
+  RETURN QUERY
+  SELECT
+    fe.id,
+    fe.form_id,
+    fe.content_type,
+    fe.content,
+    fe.metadata,
+    1 - (fe.embedding <=> query_embedding_text::vector)::float as similarity
+  FROM public.form_embeddings fe
+  WHERE fe.embedding IS NOT NULL
+  AND (client_id_filter IS NULL OR fe.form_id IN (
+    SELECT ffa.form_id
+    FROM public.form_folder_assignments ffa
+    JOIN public.folders f ON f.id = ffa.folder_id
+    WHERE f.client_id = client_id_filter
+  ))
+  ORDER BY fe.embedding <=> query_embedding_text::vector
+  LIMIT greatest(match_limit, 1);
+END;
+$$;
+
+-- Function to search knowledge embeddings by vector similarity
+CREATE OR REPLACE FUNCTION public.rag_search_knowledge_embeddings_vector(
+  query_embedding_text text,
+  match_limit int DEFAULT 5,
+  ivfflat_probes int DEFAULT NULL,
+  hnsw_ef_search int DEFAULT NULL,
+  exact_search boolean DEFAULT false
+)
+RETURNS TABLE (
+  id uuid,
+  category varchar,
+  title varchar,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM public.rag_apply_vector_search_settings(ivfflat_probes, hnsw_ef_search, exact_search);
+
+  RETURN QUERY
+  SELECT
+    ke.id,
+    ke.category,
+    ke.title,
+    ke.content,
+    ke.metadata,
+    1 - (ke.embedding <=> query_embedding_text::vector)::float as similarity
+  FROM public.knowledge_embeddings ke
+  WHERE ke.embedding IS NOT NULL
+  ORDER BY ke.embedding <=> query_embedding_text::vector
+  LIMIT greatest(match_limit, 1);
+END;
+$$;
+
+-- Row counts and current vector index definition for each RAG table
+CREATE OR REPLACE FUNCTION public.rag_vector_index_stats()
+RETURNS TABLE (
+  table_name text,
+  row_count bigint,
+  index_name text,
+  index_method text,
+  index_options text[]
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  t text;
+BEGIN
+  FOREACH t IN ARRAY ARRAY['quote_embeddings', 'form_embeddings', 'knowledge_embeddings'] LOOP
+    table_name := t;
+    EXECUTE format('SELECT count(*) FROM public.%I WHERE embedding IS NOT NULL', t) INTO row_count;
+
+    index_name := NULL;
+    index_method := NULL;
+    index_options := NULL;
+    SELECT ic.relname, am.amname, ic.reloptions
+      INTO index_name, index_method, index_options
+    FROM pg_index i
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    JOIN pg_class tc ON tc.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = tc.relnamespace
+    JOIN pg_am am ON am.oid = ic.relam
+    WHERE n.nspname = 'public'
+      AND tc.relname = t
+      AND am.amname IN ('ivfflat', 'hnsw')
+    LIMIT 1;
+
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
+
+-- Grant execute permissions
+GRANT EXECUTE ON FUNCTION public.rag_apply_vector_search_settings(int, int, boolean) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.rag_search_quote_embeddings(text, int, uuid, int, int, boolean) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.rag_search_form_embeddings(text, int, uuid, int, int, boolean) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.rag_search_knowledge_embeddings_vector(text, int, int, int, boolean) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.rag_vector_index_stats() TO service_role;
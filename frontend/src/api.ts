@@ -217,6 +217,8 @@ export interface QuoteFilters {
   sort_order?: 'asc' | 'desc';
   limit?: number;
   offset?: number;
+  view?: 'full' | 'summary';
+  fields?: string;
 }
 
 export interface FormField {
@@ -361,6 +363,8 @@ export const quotesAPI = {
     if (filters?.sort_order) params.append('sort_order', filters.sort_order);
     if (filters?.limit) params.append('limit', filters.limit.toString());
     if (filters?.offset) params.append('offset', filters.offset.toString());
+    if (filters?.view) params.append('view', filters.view);
+    if (filters?.fields) params.append('fields', filters.fields);
     const queryString = params.toString();
     return api.get<Quote[]>(`/api/quotes${queryString ? `?${queryString}` : ''}`);
   },
@@ -579,7 +583,8 @@ export const filesAPI = {
   update: (id: string, fileUpdate: FileUpdate) => api.put<FileItem>(`/api/files/${id}`, fileUpdate),
   delete: (id: string) => api.delete<{ message: string }>(`/api/files/${id}`),
   download: (id: string) => api.get(`/api/files/${id}/download`, { responseType: 'blob' }),
-  getPreview: (id: string) => api.get<{ preview_url: string }>(`/api/files/${id}/preview`),
+  getPreview: (id: string, size?: 'small' | 'medium' | 'large') =>
+    api.get<{ preview_url: string; is_thumbnail?: boolean }>(`/api/files/${id}/preview`, { params: size ? { size } : undefined }),
   assignToFolder: (fileId: string, folderId: string) => api.post<FileFolderAssignment>(`/api/files/${fileId}/assign-to-folder`, { folder_id: folderId }),
   removeFromFolder: (fileId: string, folderId: string) => api.delete<{ message: string }>(`/api/files/${fileId}/assign-to-folder/${folderId}`),
   getFolders: (fileId: string) => api.get<FileFolderAssignment[]>(`/api/files/${fileId}/folders`),
@@ -697,6 +702,7 @@ export interface Folder {
   created_by?: string;
   created_at: string;
   updated_at: string;
+  summary?: FolderSummary; // Only with getAll({ include_summary: true })
 }
 
 export interface FolderCreate {
@@ -817,11 +823,12 @@ export interface FolderNote {
 
 // Folders API
 export const foldersAPI = {
-  getAll: (filters?: { client_id?: string; quote_id?: string; status?: string }) => {
+  getAll: (filters?: { client_id?: string; quote_id?: string; status?: string; include_summary?: boolean }) => {
     const params = new URLSearchParams();
     if (filters?.client_id) params.append('client_id', filters.client_id);
     if (filters?.quote_id) params.append('quote_id', filters.quote_id);
     if (filters?.status) params.append('status', filters.status);
+    if (filters?.include_summary) params.append('include_summary', 'true');
     const queryString = params.toString();
     return api.get<Folder[]>(`/api/folders${queryString ? `?${queryString}` : ''}`);
   },
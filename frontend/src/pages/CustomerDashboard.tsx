@@ -71,45 +71,22 @@ function CustomerDashboard() {
   const loadData = async () => {
     try {
       setLoading(true);
-      // Load folders (main organizing structure)
-      const foldersResponse = await foldersAPI.getAll();
+      // Load folders (main organizing structure) with their status summaries
+      const foldersResponse = await foldersAPI.getAll({ include_summary: true });
       const foldersData = foldersResponse.data || [];
       setFolders(foldersData);
-      
-      // Load folder summaries in parallel
-      if (foldersData.length > 0) {
-        loadFolderSummaries(foldersData);
-      }
-    } catch (error) {
-      console.error('Failed to load data:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
-
-  const loadFolderSummaries = async (folders: Folder[]) => {
-    try {
-      const results = await Promise.allSettled(
-        folders.map(async (folder) => {
-          try {
-            const response = await foldersAPI.getContent(folder.id);
-            return { id: folder.id, summary: response.data.summary };
-          } catch (error) {
-            console.error(`Failed to load summary for folder ${folder.id}:`, error);
-            return { id: folder.id, summary: undefined };
-          }
-        })
-      );
 
       const summaries: Record<string, FolderSummary> = {};
-      results.forEach((result) => {
-        if (result.status === 'fulfilled' && result.value.summary) {
-          summaries[result.value.id] = result.value.summary;
+      foldersData.forEach((folder) => {
+        if (folder.summary) {
+          summaries[folder.id] = folder.summary;
         }
       });
       setFolderSummaries(summaries);
     } catch (error) {
-      console.error('Failed to load folder summaries:', error);
+      console.error('Failed to load data:', error);
+    } finally {
+      setLoading(false);
     }
   };
 
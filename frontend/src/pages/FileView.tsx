@@ -42,7 +42,9 @@ function FileView() {
       // Get preview URL
       try {
         console.log('Getting preview URL for file:', id);
-        const previewResponse = await filesAPI.getPreview(id!);
+        // Images are shown downscaled; PDFs keep the original for the inline viewer
+        const previewSize = response.data.file_type?.startsWith('image/') ? 'large' : undefined;
+        const previewResponse = await filesAPI.getPreview(id!, previewSize);
         console.log('Preview URL received:', previewResponse.data.preview_url);
         setPreviewUrl(previewResponse.data.preview_url);
       } catch (previewError: any) {
@@ -32,28 +32,21 @@ const FoldersList: React.FC = () => {
       if (clientFilter !== 'all') {
         filters.client_id = clientFilter;
       }
+      // Customer-first: per-folder summaries come back with the list
+      if (role !== 'admin') {
+        filters.include_summary = true;
+      }
       const response = await foldersAPI.getAll(filters);
       const data = response.data || [];
       setFolders(data);
 
-      // Customer-first: fetch per-folder summary from folder content endpoint
-      if (role !== 'admin' && data.length > 0) {
-        const results = await Promise.allSettled(
-          data.map(async (f) => {
-            const c = await foldersAPI.getContent(f.id);
-            return { id: f.id, summary: c.data.summary };
-          })
-        );
-        const next: Record<string, FolderSummary> = {};
-        for (const r of results) {
-          if (r.status === 'fulfilled' && r.value?.id && r.value?.summary) {
-            next[r.value.id] = r.value.summary;
-          }
+      const next: Record<string, FolderSummary> = {};
+      for (const f of data) {
+        if (f.summary) {
+          next[f.id] = f.summary;
         }
-        setSummariesByFolderId(next);
-      } else {
-        setSummariesByFolderId({});
       }
+      setSummariesByFolderId(next);
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Failed to load folders');
     } finally {
@@ -258,6 +258,8 @@ function QuotesList() {
       filters.sort_order = sortOrder;
       filters.limit = ITEMS_PER_PAGE;
       filters.offset = (currentPage - 1) * ITEMS_PER_PAGE;
+      // List columns only; line items are loaded with the quote when needed
+      filters.view = 'summary';
 
       const response = await quotesAPI.getAll(filters);
       setQuotes(response.data);
@@ -442,8 +444,8 @@ function QuotesList() {
   // Duplicate quote
   const handleDuplicateQuote = async (quoteId: string) => {
     try {
-      const quote = quotes.find(q => q.id === quoteId);
-      if (!quote) return;
+      if (!quotes.some(q => q.id === quoteId)) return;
+      const { data: quote } = await quotesAPI.getById(quoteId);
 
       const duplicateData = {
         title: `${quote.title} (Copy)`,
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Script to backfill content hashes for existing project files (content-addressed storage).
+Run after database/file_blobs_migration.sql.
+
+For every files row without content_sha256, the object is downloaded and hashed:
+- new content is registered as a blob at its current storage path
+- content already registered by another file is repointed at that blob and the
+  duplicate object is deleted (unless --keep-duplicates)
+
+Rows whose object cannot be downloaded are reported and left unchanged. The
+script can be re-run; it only visits rows that still have no hash.
+
+Usage:
+    python scripts/backfill_file_blobs.py [--batch-size 200] [--limit N] [--dry-run] [--keep-duplicates]
+
+Environment Variables Required:
+    - SUPABASE_URL
+    - SUPABASE_SERVICE_ROLE_KEY
+"""
+
+import os
+import sys
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+# Add backend directory to path
+backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, backend_path)
+
+from database import supabase_storage
+from file_blobs import STORAGE_BUCKET, acquire_blob
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def backfill_file(file_row: Dict[str, Any], dry_run: bool, keep_duplicates: bool) -> str:
+    """Hash one file's object and link it to its blob; returns the outcome"""
+    storage_path = file_row.get("storage_path")
+    if not storage_path:
+        return "missing"
+    try:
+        content = supabase_storage.storage.from_(STORAGE_BUCKET).download(storage_path)
+    except Exception as e:
+        logger.warning(f"Could not download {storage_path} (file {file_row['id']}): {str(e)}")
+        return "missing"
+
+    sha256 = hashlib.sha256(content).hexdigest()
+    if dry_run:
+        logger.info(f"{file_row['id']}: {sha256} ({len(content)} bytes)")
+        return "hashed"
+
+    blob_path = acquire_blob(sha256, storage_path, len(content), file_row.get("file_type"))
+    supabase_storage.table("files").update({
+        "content_sha256": sha256,
+        "storage_path": blob_path
+    }).eq("id", file_row["id"]).execute()
+
+    if blob_path == storage_path:
+        return "registered"
+    if not keep_duplicates:
+        try:
+            supabase_storage.storage.from_(STORAGE_BUCKET).remove([storage_path])
+        except Exception as e:
+            logger.warning(f"Could not delete duplicate object {storage_path}: {str(e)}")
+    return "deduplicated"
+
+
+def backfill(batch_size: int, limit: Optional[int], dry_run: bool, keep_duplicates: bool) -> Dict[str, int]:
+    """Visit files without content_sha256 in id order (rows that fail are skipped, not retried)"""
+    counts = {"registered": 0, "deduplicated": 0, "hashed": 0, "missing": 0}
+    last_id = None
+    visited = 0
+    while limit is None or visited < limit:
+        page_size = batch_size if limit is None else min(batch_size, limit - visited)
+        query = (
+            supabase_storage
+            .table("files")
+            .select("id, storage_path, file_type")
+            .is_("content_sha256", "null")
+            .order("id")
+            .limit(page_size)
+        )
+        if last_id:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        if not rows:
+            break
+        for file_row in rows:
+            counts[backfill_file(file_row, dry_run, keep_duplicates)] += 1
+        visited += len(rows)
+        last_id = rows[-1]["id"]
+        logger.info(f"Processed {visited} files: {counts}")
+    return counts
+
+
+def main():
+    """Main function to run the backfill"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill content hashes and blob references for existing project files")
+    parser.add_argument("--batch-size", type=int, default=200, help="Files fetched per page")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many files")
+    parser.add_argument("--dry-run", action="store_true", help="Hash objects without writing anything")
+    parser.add_argument("--keep-duplicates", action="store_true", help="Do not delete objects whose content is already stored")
+    args = parser.parse_args()
+
+    counts = backfill(args.batch_size, args.limit, args.dry_run, args.keep_duplicates)
+    logger.info(f"Done: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Script to check and benchmark the streaming document chunker.
+1. Golden equivalence: a fixed corpus of edge cases and randomized documents are
+   chunked by ChunkingService.chunk_document and by the previous list-based
+   implementation (condensed below; the sentence and word splitters are
+   unchanged and shared). Chunks (text, index, metadata) must be identical.
+   iter_chunks must give the same chunks (without total_chunks) when the text
+   arrives as random pieces - including cuts inside paragraph separators and
+   one character at a time - and as a file object.
+2. Throughput: chunks synthetic documents of 100k characters and larger with
+   both implementations and reports time, throughput and peak memory.
+
+Usage:
+    python scripts/benchmark_chunking.py [--cases 300] [--sizes 100000,1000000,5000000] [--repeat 3] [--seed 7]
+
+No environment variables are required.
+"""
+
+import io
+import os
+import sys
+import time
+import random
+import logging
+import tracemalloc
+from typing import Callable, List, Optional, Tuple
+
+# Add backend directory to path
+backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, backend_path)
+
+from chunking_service import Chunk, ChunkingService, PARAGRAPH_SEPARATOR
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+# --- Previous implementation (reference) -------------------------------------
+
+def _legacy_group(service: ChunkingService, sentences: List[str]) -> List[List[str]]:
+    groups, current_group, current_size = [], [], 0
+    for sent in sentences:
+        if current_size + len(sent) > service.chunk_size and current_group:
+            groups.append(current_group)
+            current_group, current_size = [sent], len(sent)
+        else:
+            current_group.append(sent)
+            current_size += len(sent) + 1
+    if current_group:
+        groups.append(current_group)
+    return groups
+
+
+def _legacy_merge(service: ChunkingService, chunks: List[str]) -> List[str]:
+    merged, i = [], 0
+    while i < len(chunks):
+        current = chunks[i]
+        if len(current) < service.min_chunk_size:
+            merged_chunk, j = current, i + 1
+            while j < len(chunks) and len(merged_chunk) < service.chunk_size:
+                potential_merge = merged_chunk + "\n\n" + chunks[j]
+                if len(potential_merge) <= service.chunk_size * 1.2:
+                    merged_chunk = potential_merge
+                    j += 1
+                else:
+                    break
+            merged.append(merged_chunk)
+            i = j
+        else:
+            merged.append(current)
+            i += 1
+    return merged
+
+
+def legacy_chunk_document(service: ChunkingService, text: str, metadata: Optional[dict] = None) -> List[Chunk]:
+    """chunk_document before the streaming rewrite"""
+    if not text or not text.strip():
+        return []
+    metadata = metadata or {}
+
+    paragraphs = [p.strip() for p in PARAGRAPH_SEPARATOR.split(text) if p.strip()]
+    processed_chunks = []
+    for para in paragraphs:
+        if len(para) <= service.chunk_size:
+            processed_chunks.append(para)
+        else:
+            processed_chunks.extend(' '.join(group) for group in _legacy_group(service, service._split_by_sentences(para)))
+
+    final_chunks = []
+    for chunk_text in _legacy_merge(service, processed_chunks):
+        if len(chunk_text) <= service.chunk_size:
+            final_chunks.append(chunk_text)
+            continue
+        groups = _legacy_group(service, service._split_by_sentences(chunk_text))
+        final_chunks.extend(' '.join(group) for group in groups[:-1])
+        if groups:
+            if len(' '.join(groups[-1])) > service.chunk_size:
+                final_chunks.extend(service._split_by_words(' '.join(groups[-1])))
+            else:
+                final_chunks.append(' '.join(groups[-1]))
+
+    chunks = []
+    for idx, chunk_text in enumerate(final_chunks):
+        cleaned_text = chunk_text.strip()
+        if cleaned_text:
+            chunks.append(Chunk(
+                text=cleaned_text,
+                chunk_index=idx,
+                metadata={**metadata, "chunk_index": idx, "total_chunks": len(final_chunks)}
+            ))
+    return chunks
+
+
+# --- Documents ---------------------------------------------------------------
+
+WORDS = [
+    "order", "embroidery", "logo", "polo", "navy", "quote", "delivery", "Inc.", "e.g.", "3.5",
+    "U.S.", "sizes", "proof", "thread", "stitch", "approved", "invoice", "shipping", "rush", "sample"
+]
+SEPARATORS = ["\n\n", "\n\n\n", "\n \n", "\n\t\n", " \n\n ", "\r\n\r\n", "\n  \n\n"]
+SINGLE_BREAKS = ["\n", " ", "  ", "\t"]
+
+
+def random_sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + rng.choice([".", ".", "!", "?", "...", "?!", ""])
+
+
+def random_paragraph(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.1:
+        # Run-on text without sentence endings (forces the word split)
+        return " ".join(rng.choice(WORDS).lower() for _ in range(rng.randint(50, 900)))
+    if kind < 0.2:
+        # One very long sentence
+        return random_sentence(rng, rng.randint(300, 700))
+    sentences = [random_sentence(rng, rng.randint(1, 40)) for _ in range(rng.randint(1, 60))]
+    return "".join(sentence + rng.choice(SINGLE_BREAKS) for sentence in sentences).rstrip()
+
+
+def random_document(rng: random.Random, paragraphs: int) -> str:
+    parts = [rng.choice(["", " ", "\n", "\n\n"])]
+    for _ in range(paragraphs):
+        parts.append(random_paragraph(rng))
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+def build_document(target_size: int, seed: int) -> str:
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < target_size:
+        part = random_paragraph(rng) + rng.choice(SEPARATORS)
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)[:target_size]
+
+
+FIXED_CORPUS = {
+    "empty": "",
+    "whitespace only": " \n\n \t\n ",
+    "single word": "Hello",
+    "single paragraph": "This is one short paragraph. It has two sentences.",
+    "many small paragraphs": "\n\n".join(f"Note {i}. Short." for i in range(200)),
+    "separator variants": "Alpha.\n \nBeta.\r\n\r\nGamma.\n\t\n\nDelta.\n\n\n\nEpsilon.",
+    "leading and trailing whitespace": "\n\n  First paragraph.  \n\n  Second paragraph.  \n\n",
+    "single newlines only": "Line one.\nLine two.\nLine three.\n" * 400,
+    "paragraph at chunk size": "A" * 3000 + "\n\n" + "B" * 3000,
+    "paragraph over chunk size": "C" * 3001 + "\n\nTail.",
+    "merge boundary": "\n\n".join(["x" * 499, "y" * 2000, "z" * 500, "w" * 1700, "v" * 100]),
+    "run-on words": " ".join(["word"] * 5000),
+    "long sentence": "Start " + " ".join(["clause"] * 1200) + ". End.",
+    "abbreviations and decimals": ("Send to Acme Inc. by 3.5 p.m. today. Use e.g. navy. " * 120).strip(),
+    "punctuation runs": ("Really?! Yes... Absolutely!!! Ok. " * 200).strip(),
+    "lowercase after period": ("ends here. next starts lowercase. And Upper. " * 150).strip(),
+    "unicode whitespace": "Para one. \n \nPara two.　\n\nPara three.",
+    "mixed": "Intro.\n\n" + "Body sentence number one. " * 300 + "\n\n" + "Short.\n\n" * 5 + "x" * 7000,
+}
+
+SERVICE_CONFIGS = [
+    {},  # production defaults (3000 / 500)
+    {"chunk_size": 200, "min_chunk_size": 50},
+    {"chunk_size": 60, "min_chunk_size": 30},
+]
+
+
+# --- Checks ------------------------------------------------------------------
+
+def random_pieces(rng: random.Random, text: str) -> List[str]:
+    """Cut text at random points, favouring cuts inside paragraph separators"""
+    cuts = {rng.randint(0, len(text)) for _ in range(rng.randint(0, 40))}
+    for index, char in enumerate(text):
+        if char in "\n \t\r" and rng.random() < 0.2:
+            cuts.add(index)
+            cuts.add(index + 1)
+    bounds = [0] + sorted(cut for cut in cuts if 0 < cut < len(text)) + [len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def streamed_variants(rng: random.Random, text: str) -> List[Tuple[str, object]]:
+    variants = [("str", text), ("pieces", random_pieces(rng, text)), ("file", io.StringIO(text))]
+    if len(text) <= 20000:
+        variants.append(("characters", list(text)))
+    return variants
+
+
+def compare(label: str, text: str, service: ChunkingService, rng: random.Random) -> int:
+    metadata = {"source": "benchmark"}
+    expected = legacy_chunk_document(service, text, metadata)
+    mismatches = 0
+    if service.chunk_document(text, metadata) != expected:
+        mismatches += 1
+        logger.error(f"chunk_document mismatch: {label}")
+
+    streamed_expected = [
+        (chunk.text, chunk.chunk_index, {k: v for k, v in chunk.metadata.items() if k != "total_chunks"})
+        for chunk in expected
+    ]
+    for variant, source in streamed_variants(rng, text):
+        actual = [(chunk.text, chunk.chunk_index, chunk.metadata) for chunk in service.iter_chunks(source, metadata)]
+        if actual != streamed_expected:
+            mismatches += 1
+            logger.error(f"iter_chunks mismatch ({variant}): {label}")
+    return mismatches
+
+
+def check_equivalence(cases: int, seed: int) -> Tuple[int, int]:
+    rng = random.Random(seed)
+    checked = mismatches = 0
+    for config in SERVICE_CONFIGS:
+        service = ChunkingService(**config)
+        for name, text in FIXED_CORPUS.items():
+            mismatches += compare(f"{name} {config}", text, service, rng)
+            checked += 1
+        for case in range(cases):
+            text = random_document(rng, rng.randint(0, 25))
+            mismatches += compare(f"random case {case} {config}", text, service, rng)
+            checked += 1
+    return checked, mismatches
+
+
+def measure(label: str, size: int, repeat: int, run: Callable[[], int]):
+    times = []
+    chunk_count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunk_count = run()
+        times.append(time.perf_counter() - started)
+    best = min(times)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"  {label:<22} {best * 1000:9.1f}ms  {size / best / 1e6:6.2f}M chars/s  "
+        f"peak={peak / 1e6:7.1f}MB  chunks={chunk_count}"
+    )
+    return best
+
+
+def benchmark(sizes: List[int], repeat: int, seed: int):
+    service = ChunkingService()
+    for size in sizes:
+        text = build_document(size, seed)
+        print(f"{size} characters:")
+        legacy = measure("previous (list)", size, repeat, lambda: len(legacy_chunk_document(service, text)))
+        current = measure("chunk_document", size, repeat, lambda: len(service.chunk_document(text)))
+        measure("iter_chunks (file)", size, repeat, lambda: sum(1 for _ in service.iter_chunks(io.StringIO(text))))
+        print(f"  speedup (chunk_document vs previous): {legacy / current:.2f}x")
+
+
+def main():
+    """Main function to run the equivalence check and throughput benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check the streaming chunker against the previous implementation and benchmark it")
+    parser.add_argument("--cases", type=int, default=300, help="Random documents per chunker configuration")
+    parser.add_argument("--sizes", default="100000,1000000,5000000", help="Comma-separated document sizes (characters)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size (best is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # chunk_document logs one line per document
+    logging.getLogger("chunking_service").setLevel(logging.WARNING)
+
+    print(f"golden equivalence: {len(FIXED_CORPUS)} fixed + {args.cases} random documents x {len(SERVICE_CONFIGS)} configurations")
+    checked, mismatches = check_equivalence(args.cases, args.seed)
+    print(f"  documents: {checked}, mismatches: {mismatches}")
+
+    print("throughput:")
+    benchmark([int(size) for size in args.sizes.split(",") if size.strip()], args.repeat, args.seed)
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
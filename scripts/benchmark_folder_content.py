@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Script to check and benchmark the batched folder content loader.
+1. Equivalence: random folders (files, forms, e-signatures, submissions by user id
+   and by email, views and signatures by several users) loaded for an admin and
+   for a customer by folder_content.load_folder_content and by the previous
+   per-item implementation (condensed below, same queries) must give identical
+   payloads.
+2. Row cap: with the store capping every response like PostgREST's max-rows,
+   a folder whose files/documents were viewed/signed by many users and whose
+   forms have many submissions must still load complete counts.
+3. Round trips: counts database requests per folder content load for growing
+   folder sizes and reports the modelled time at a given per-request latency.
+
+Usage:
+    python scripts/benchmark_folder_content.py [--sizes 5,20,50,100] [--cases 200] [--latency-ms 25] [--seed 7]
+
+No environment variables are required; requests go to an in-memory table store.
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+from typing import Any, Dict, List, Optional
+
+# Add backend directory to path
+backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, backend_path)
+
+# database.py only builds clients from these; nothing connects to them
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import folder_content
+from folder_content import build_folder_summary, compute_shipping_summary, load_folder_content
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+# --- In-memory table store ---------------------------------------------------
+
+class _Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Query:
+    EMBEDS = {
+        "form_fields(*)": ("form_fields", "form_id", True),
+        "clients(*)": ("clients", "client_id", False),
+        "line_items(*)": ("line_items", "quote_id", True),
+    }
+
+    def __init__(self, store: "TableStore", table: str):
+        self.store = store
+        self.table = table
+        self.filters = []
+        self.embeds = []
+        self.order_by = None
+        self.row_limit = None
+        self.row_range = None
+        self.is_single = False
+        self.count = None
+
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        self.embeds = [embed for embed in self.EMBEDS if embed in columns]
+        self.count = count
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def range(self, start, end):
+        self.row_range = (start, end)
+        return self
+
+    def single(self):
+        self.is_single = True
+        return self
+
+    def execute(self):
+        self.store.requests += 1
+        rows = [dict(row) for row in self.store.tables.get(self.table, []) if all(f(row) for f in self.filters)]
+        if self.order_by:
+            rows.sort(key=lambda row: row.get(self.order_by[0]) or "", reverse=self.order_by[1])
+        if self.row_range is not None:
+            rows = rows[self.row_range[0]:self.row_range[1] + 1]
+        if self.row_limit is not None:
+            rows = rows[:self.row_limit]
+        if self.store.max_rows is not None:
+            rows = rows[:self.store.max_rows]
+        for row in rows:
+            for embed in self.embeds:
+                table, key, many = self.EMBEDS[embed]
+                if many:
+                    row[table] = [dict(r) for r in self.store.tables.get(table, []) if r.get(key) == row.get("id")]
+                else:
+                    row[table] = next((dict(r) for r in self.store.tables.get(table, []) if r.get("id") == row.get(key)), None)
+        if self.is_single:
+            if len(rows) != 1:
+                raise Exception("JSON object requested, multiple (or no) rows returned")
+            return _Response(rows[0])
+        return _Response(rows, len(rows) if self.count else None)
+
+
+class _Rpc:
+    def __init__(self, store: "TableStore", rows: List[Dict[str, Any]]):
+        self.store = store
+        self.rows = rows
+
+    def execute(self):
+        self.store.requests += 1
+        rows = self.rows if self.store.max_rows is None else self.rows[:self.store.max_rows]
+        return _Response(rows)
+
+
+class TableStore:
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]], max_rows: Optional[int] = None):
+        self.tables = tables
+        self.requests = 0
+        # Responses are truncated to this many rows (PostgREST max-rows)
+        self.max_rows = max_rows
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> _Rpc:
+        """database/folder_content_functions.sql"""
+        if name == "viewed_file_ids":
+            file_ids, viewer = set(params["target_file_ids"]), params.get("viewer_id")
+            viewed = {
+                view["file_id"] for view in self.tables.get("file_views", [])
+                if view["file_id"] in file_ids and (viewer is None or view["user_id"] == viewer)
+            }
+            return _Rpc(self, [{"file_id": file_id} for file_id in sorted(viewed)])
+        if name == "first_document_signatures":
+            document_ids, signer = set(params["target_document_ids"]), params.get("signer_id")
+            first: Dict[str, Dict[str, Any]] = {}
+            for signature in self.tables.get("esignature_signatures", []):
+                if signature["document_id"] in document_ids and (signer is None or signature["user_id"] == signer):
+                    first.setdefault(signature["document_id"], {
+                        key: signature.get(key) for key in ("document_id", "signed_file_id", "signed_file_url")
+                    })
+            return _Rpc(self, list(first.values()))
+        raise ValueError(f"Unknown RPC {name}")
+
+
+# --- Previous implementation (reference) -------------------------------------
+
+def legacy_folder_content(db: TableStore, folder: Dict, user: Dict) -> Dict:
+    folder_id = folder["id"]
+    is_admin = user.get("role") == "admin"
+
+    quote = None
+    if folder.get("quote_id"):
+        try:
+            quote = db.table("quotes").select("*, clients(*), line_items(*)").eq("id", folder["quote_id"]).single().execute().data
+        except Exception:
+            pass
+
+    files = []
+    try:
+        files = db.table("files").select("*").eq("folder_id", folder_id).eq("is_reusable", False).order("created_at", desc=True).execute().data or []
+        for file in files:
+            file["item_type"] = "file"
+            query = db.table("file_views").select("id").eq("file_id", file["id"])
+            if not is_admin:
+                query = query.eq("user_id", user["id"])
+            file["is_completed"] = len(query.limit(1).execute().data or []) > 0
+    except Exception:
+        pass
+
+    forms = []
+    try:
+        template_form_ids = [fa["form_id"] for fa in (db.table("form_folder_assignments").select("form_id").eq("folder_id", folder_id).execute().data or [])]
+        templates = db.table("forms").select("*, form_fields(*)").in_("id", template_form_ids).eq("is_template", True).execute().data or [] if template_form_ids else []
+        for form in templates:
+            form["item_type"] = "form"
+            if is_admin:
+                check = db.table("form_submissions").select("id").eq("form_id", form["id"]).eq("folder_id", folder_id).eq("status", "completed").limit(1).execute()
+                form["is_completed"] = len(check.data or []) > 0
+                count_response = db.table("form_submissions").select("id", count="exact").eq("form_id", form["id"]).eq("folder_id", folder_id).eq("status", "completed").execute()
+                form["submissions_count"] = count_response.count
+            else:
+                matched = []
+                if user.get("id"):
+                    matched = db.table("form_submissions").select("id, status").eq("form_id", form["id"]).eq("folder_id", folder_id).eq("user_id", user["id"]).execute().data or []
+                if not matched and user.get("email"):
+                    email = user["email"].lower().strip()
+                    all_submissions = db.table("form_submissions").select("id, submitter_email, status").eq("form_id", form["id"]).eq("folder_id", folder_id).execute().data or []
+                    matched = [s for s in all_submissions if s.get("submitter_email") and s["submitter_email"].lower().strip() == email]
+                completed = [s for s in matched if str(s.get("status") or "").lower() == "completed"]
+                form["is_completed"] = len(completed) > 0
+                form["submissions_count"] = len(completed)
+            forms.append(form)
+    except Exception:
+        forms = []
+
+    esignatures = []
+    try:
+        esignatures = db.table("esignature_documents").select("*").eq("folder_id", folder_id).eq("is_template", False).execute().data or []
+        for esig in esignatures:
+            esig["item_type"] = "esignature"
+            query = db.table("esignature_signatures").select("id, signed_file_id, signed_file_url").eq("document_id", esig["id"])
+            if not is_admin:
+                query = query.eq("user_id", user["id"])
+            signature_check = query.limit(1).execute()
+            esig["is_completed"] = len(signature_check.data or []) > 0
+            if signature_check.data:
+                esig["signed_file_id"] = signature_check.data[0].get("signed_file_id")
+                esig["signed_file_url"] = signature_check.data[0].get("signed_file_url")
+    except Exception:
+        esignatures = []
+
+    shipping_summary = compute_shipping_summary(folder_id)
+    return {
+        "folder": folder,
+        "quote": quote,
+        "files": files,
+        "forms": forms,
+        "esignatures": esignatures,
+        "summary": build_folder_summary(folder, quote, files, forms, esignatures, shipping_summary)
+    }
+
+
+# --- Synthetic data ----------------------------------------------------------
+
+def build_store(rng: random.Random, item_count: int, customer: Dict) -> TableStore:
+    other_users = [{"id": f"user-{i}", "email": f"user{i}@example.com"} for i in range(3)]
+    everyone = [customer] + other_users
+    folder = {"id": "folder-1", "name": "Order", "quote_id": "quote-1", "client_id": "client-1", "created_by": "admin-1", "updated_at": "2024-01-01T00:00:00"}
+    tables: Dict[str, List[Dict[str, Any]]] = {
+        "folders": [folder],
+        "quotes": [{"id": "quote-1", "client_id": "client-1", "status": rng.choice(["sent", "accepted"]), "payment_status": rng.choice(["unpaid", "paid"]), "quote_number": "QT-1"}],
+        "clients": [{"id": "client-1", "name": "Client", "email": customer["email"]}],
+        "line_items": [{"id": f"li-{i}", "quote_id": "quote-1", "description": f"Item {i}"} for i in range(5)],
+        "files": [], "file_views": [], "forms": [], "form_fields": [], "form_folder_assignments": [],
+        "form_submissions": [], "esignature_documents": [], "esignature_signatures": [],
+        "shipments": [], "shipment_tracking_events": [],
+    }
+    for i in range(item_count):
+        kind = rng.choice(["file", "form", "esignature"])
+        if kind == "file":
+            tables["files"].append({"id": f"file-{i}", "name": f"File {i}", "folder_id": "folder-1", "is_reusable": False, "created_at": f"2024-01-{i % 28 + 1:02d}T{i % 24:02d}:00:00"})
+            for viewer in rng.sample(everyone, rng.randint(0, 2)):
+                tables["file_views"].append({"id": f"view-{i}-{viewer['id']}", "file_id": f"file-{i}", "user_id": viewer["id"]})
+        elif kind == "form":
+            tables["forms"].append({"id": f"form-{i}", "name": f"Form {i}", "is_template": True, "delivery_timing": rng.choice(["before_delivery", "after_delivery"])})
+            tables["form_fields"].append({"id": f"field-{i}", "form_id": f"form-{i}", "label": "Name"})
+            tables["form_folder_assignments"].append({"form_id": f"form-{i}", "folder_id": "folder-1"})
+            for j in range(rng.randint(0, 3)):
+                submitter = rng.choice(everyone)
+                by_email = rng.random() < 0.3
+                tables["form_submissions"].append({
+                    "id": f"sub-{i}-{j}", "form_id": f"form-{i}", "folder_id": "folder-1",
+                    "user_id": None if by_email else submitter["id"],
+                    "submitter_email": rng.choice([submitter["email"], submitter["email"].upper() + " "]),
+                    "status": rng.choice(["completed", "completed", "pending"])
+                })
+        else:
+            tables["esignature_documents"].append({"id": f"doc-{i}", "name": f"Agreement {i}", "folder_id": "folder-1", "is_template": False})
+            for signer in rng.sample(everyone, rng.randint(0, 2)):
+                tables["esignature_signatures"].append({"id": f"sig-{i}-{signer['id']}", "document_id": f"doc-{i}", "user_id": signer["id"], "signed_file_id": f"signed-{i}-{signer['id']}", "signed_file_url": None})
+    if rng.random() < 0.5:
+        tables["shipments"].append({"id": "ship-1", "folder_id": "folder-1", "status": "in_transit", "created_at": "2024-02-01"})
+    return TableStore(tables)
+
+
+# --- Checks ------------------------------------------------------------------
+
+def load_with(store: TableStore, loader, user: Dict) -> (Dict, int, float):
+    folder_content.supabase_storage = store
+    folder = store.tables["folders"][0]
+    store.requests = 0
+    started = time.perf_counter()
+    payload = loader(folder, user)
+    return payload, store.requests, time.perf_counter() - started
+
+
+def check_equivalence(cases: int, seed: int) -> int:
+    rng = random.Random(seed)
+    customer = {"id": "customer-1", "email": "Customer@Example.com", "role": "customer"}
+    admin = {"id": "admin-1", "email": "admin@example.com", "role": "admin"}
+    mismatches = 0
+    for case in range(cases):
+        store = build_store(rng, rng.randint(0, 30), customer)
+        for user in (admin, customer):
+            expected, _, _ = load_with(store, lambda f, u: legacy_folder_content(store, f, u), user)
+            actual, _, _ = load_with(store, load_folder_content, user)
+            if expected != actual:
+                mismatches += 1
+                logger.error(f"Mismatch for case {case} ({user['role']})")
+    return mismatches
+
+
+def check_row_cap(max_rows: int) -> int:
+    """Many viewers/signers/submissions per item, responses capped at max_rows"""
+    users = [{"id": f"user-{i}", "email": f"user{i}@example.com"} for i in range(max_rows)]
+    item_count = max(3, max_rows // 10)
+    folder = {"id": "folder-1", "name": "Order", "quote_id": None, "created_by": "admin-1", "updated_at": "2024-01-01T00:00:00"}
+    tables: Dict[str, List[Dict[str, Any]]] = {
+        "folders": [folder], "files": [], "file_views": [], "forms": [], "form_fields": [],
+        "form_folder_assignments": [], "form_submissions": [], "esignature_documents": [],
+        "esignature_signatures": [], "shipments": [], "shipment_tracking_events": [],
+    }
+    for i in range(item_count):
+        tables["files"].append({"id": f"file-{i}", "name": f"File {i}", "folder_id": "folder-1", "is_reusable": False, "created_at": f"2024-01-01T00:00:{i:02d}"})
+        tables["forms"].append({"id": f"form-{i}", "name": f"Form {i}", "is_template": True})
+        tables["form_folder_assignments"].append({"form_id": f"form-{i}", "folder_id": "folder-1"})
+        tables["esignature_documents"].append({"id": f"doc-{i}", "name": f"Agreement {i}", "folder_id": "folder-1", "is_template": False})
+        for user in users:
+            # Everything viewed/signed/submitted, but the last item only by the last user
+            if i == item_count - 1 and user is not users[-1]:
+                continue
+            tables["file_views"].append({"id": f"view-{i}-{user['id']}", "file_id": f"file-{i}", "user_id": user["id"]})
+            tables["esignature_signatures"].append({"id": f"sig-{i}-{user['id']}", "document_id": f"doc-{i}", "user_id": user["id"], "signed_file_id": f"signed-{i}", "signed_file_url": None})
+            tables["form_submissions"].append({"id": f"sub-{i}-{user['id']}", "form_id": f"form-{i}", "folder_id": "folder-1", "user_id": user["id"], "submitter_email": user["email"], "status": "completed"})
+
+    store = TableStore(tables, max_rows=max_rows)
+    folder_content.FOLDER_CONTENT_PAGE_SIZE = max_rows
+    try:
+        payload, requests, _ = load_with(store, load_folder_content, {"id": "admin-1", "role": "admin"})
+    finally:
+        folder_content.FOLDER_CONTENT_PAGE_SIZE = int(os.getenv("FOLDER_CONTENT_PAGE_SIZE", "1000"))
+
+    expected_counts = {f"form-{i}": (1 if i == item_count - 1 else max_rows) for i in range(item_count)}
+    problems = 0
+    problems += sum(1 for file in payload["files"] if not file["is_completed"])
+    problems += sum(1 for esig in payload["esignatures"] if not esig["is_completed"])
+    problems += sum(1 for form in payload["forms"] if form["submissions_count"] != expected_counts[form["id"]])
+    print(f"  {item_count} items x {max_rows} users, max-rows={max_rows}: {requests} requests, {problems} incomplete")
+    return problems
+
+
+def benchmark(sizes: List[int], latency_ms: float, seed: int):
+    customer = {"id": "customer-1", "email": "customer@example.com", "role": "customer"}
+    for size in sizes:
+        store = build_store(random.Random(seed), size, customer)
+        for user in ({"id": "admin-1", "role": "admin"}, customer):
+            _, legacy_requests, legacy_cpu = load_with(store, lambda f, u: legacy_folder_content(store, f, u), user)
+            _, requests, cpu = load_with(store, load_folder_content, user)
+            print(
+                f"  {size:>4} items {user['role']:<8} legacy={legacy_requests:>4} requests (~{legacy_requests * latency_ms + legacy_cpu * 1000:7.1f}ms)  "
+                f"batched={requests:>2} requests (~{requests * latency_ms + cpu * 1000:6.1f}ms)"
+            )
+    print(f"  (modelled time = requests x {latency_ms:g}ms + in-process time)")
+
+
+def main():
+    """Main function to run the equivalence check and round-trip benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check the batched folder content loader against the per-item queries and benchmark it")
+    parser.add_argument("--sizes", default="5,20,50,100", help="Comma-separated folder sizes (items)")
+    parser.add_argument("--cases", type=int, default=200, help="Random folders for the equivalence check")
+    parser.add_argument("--latency-ms", type=float, default=25.0, help="Modelled database round-trip latency")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-rows", type=int, default=50, help="Response row cap for the row-cap check")
+    args = parser.parse_args()
+
+    print(f"equivalence: {args.cases} random folders x admin/customer")
+    mismatches = check_equivalence(args.cases, args.seed)
+    print(f"  mismatches: {mismatches}")
+
+    print("row cap:")
+    mismatches += check_row_cap(args.max_rows)
+
+    print("round trips:")
+    benchmark([int(size) for size in args.sizes.split(",") if size.strip()], args.latency_ms, args.seed)
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
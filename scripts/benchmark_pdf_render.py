@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark per-render CPU time of the ReportLab renderers.
+Renders a synthetic quote repeatedly with a cold asset registry (styles, fonts and
+logo rebuilt for every render - the old behaviour) and with a warm one, and reports
+CPU and wall time per render. No database rows are read or written.
+
+Usage:
+    python scripts/benchmark_pdf_render.py [--renders 50] [--line-items 20] [--logo-url https://...]
+
+No environment variables are required.
+"""
+
+import os
+import sys
+import time
+import logging
+from datetime import datetime
+from statistics import median
+from typing import Callable, Dict, List
+
+# Add backend directory to path
+backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, backend_path)
+
+from render_assets import clear_render_assets, get_logo, logo_cache
+from pdf_renderers import render_quote_pdf, quote_pdf_options
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def build_sample_quote(line_item_count: int) -> Dict:
+    """Synthetic quote shaped like the quotes/clients/line_items select"""
+    line_items = [
+        {
+            "id": f"item-{i}",
+            "description": f"Custom embroidered polo - style {i} (navy, sizes S-XL)",
+            "quantity": 10 + i,
+            "unit_price": "24.50",
+            "discount_percent": "5.00" if i % 3 == 0 else "0.00",
+            "tax_rate": "8.25",
+            "line_total": "0.00",
+            "sort_order": i
+        }
+        for i in range(line_item_count)
+    ]
+    return {
+        "id": "benchmark-quote",
+        "quote_number": "QT-BENCH-0001",
+        "title": "Benchmark Quote",
+        "status": "draft",
+        "created_at": datetime.now().isoformat(),
+        "expiration_date": None,
+        "tax_rate": "8.25",
+        "tax_method": "after_discount",
+        "subtotal": "5000.00",
+        "tax_amount": "412.50",
+        "total": "5412.50",
+        "notes": "Artwork proofs are sent within 2 business days. See https://example.com/proofs",
+        "terms": "50% deposit required. Balance due on delivery.",
+        "clients": {
+            "name": "Benchmark Client",
+            "company": "Benchmark Co",
+            "email": "client@example.com",
+            "phone": "555-0100",
+            "address": "1 Main St, Springfield"
+        },
+        "line_items": line_items
+    }
+
+
+def measure(label: str, renders: int, render: Callable[[], bytes], before_each: Callable[[], None] = None):
+    cpu_times: List[float] = []
+    wall_times: List[float] = []
+    size = 0
+    for _ in range(renders):
+        if before_each:
+            before_each()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        size = len(render())
+        cpu_times.append((time.process_time() - cpu_start) * 1000)
+        wall_times.append((time.perf_counter() - wall_start) * 1000)
+
+    print(
+        f"  {label:<8} cpu median={median(cpu_times):.2f}ms mean={sum(cpu_times) / renders:.2f}ms  "
+        f"wall median={median(wall_times):.2f}ms  size={size}B"
+    )
+
+
+def main():
+    """Main function to run the render benchmarks"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark ReportLab render CPU with a cold vs. warm asset registry")
+    parser.add_argument("--renders", type=int, default=50, help="Renders per configuration")
+    parser.add_argument("--line-items", type=int, default=20, help="Line items in the synthetic quote")
+    parser.add_argument("--logo-url", default="", help="Logo URL to include (exercises the logo cache)")
+    args = parser.parse_args()
+
+    quote = build_sample_quote(args.line_items)
+    company_settings = {
+        "company_name": "Benchmark Company",
+        "email": "hello@example.com",
+        "phone": "555-0199",
+        "address": "99 Market St",
+        "website": "example.com",
+        "logo_url": args.logo_url or None
+    }
+    options = quote_pdf_options(True, True, True, True, True, "letter", 9, "default")
+
+    def render_quote():
+        # The endpoint resolves the logo before handing the job to the render pool
+        logo = get_logo(company_settings["logo_url"])
+        return render_quote_pdf(quote, company_settings, options, logo)
+
+    print(f"quote pdf: {args.line_items} line items, {args.renders} renders, logo={'yes' if args.logo_url else 'no'}")
+    measure("cold", args.renders, render_quote, before_each=clear_render_assets)
+    clear_render_assets()
+    render_quote()
+    measure("warm", args.renders, render_quote)
+    if args.logo_url:
+        print(f"  logo cache: {logo_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
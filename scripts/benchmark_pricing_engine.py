@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Script to check and benchmark the pricing engine.
+1. Equivalence: randomized quotes (mixed scales, discounts, per-line tax rates,
+   empty quotes) priced by pricing_engine and by the previous routers/quotes.py
+   helpers (copied below unchanged) must give identical strings for all three
+   tax methods, and identical line totals.
+2. Throughput: prices N synthetic quotes (default 10k) with both implementations.
+
+Usage:
+    python scripts/benchmark_pricing_engine.py [--quotes 10000] [--cases 5000] [--seed 7] [--repeat 3]
+
+No environment variables are required; nothing touches the database.
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+from decimal import Decimal
+from typing import Dict, List
+
+# Add backend directory to path
+backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, backend_path)
+
+from pricing_engine import TAX_METHODS, calculate_line_total, calculate_totals_bulk, quote_totals
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# --- Previous implementation (reference) -------------------------------------
+
+def legacy_line_item_total(item: Dict, use_line_tax: bool = True, quote_tax_rate: Decimal = Decimal("0")) -> Decimal:
+    subtotal = item["quantity"] * item["unit_price"]
+    discount_amount = subtotal * (item["discount_percent"] or Decimal("0")) / Decimal("100")
+    after_discount = subtotal - discount_amount
+    if use_line_tax and item["tax_rate"]:
+        line_tax_rate = item["tax_rate"]
+    else:
+        line_tax_rate = quote_tax_rate
+    tax = after_discount * line_tax_rate / Decimal("100")
+    return after_discount + tax
+
+
+def legacy_quote_totals(line_items: List[dict], tax_rate: Decimal, tax_method: str = "after_discount") -> dict:
+    subtotal = Decimal("0")
+    tax_amount = Decimal("0")
+    for item in line_items:
+        qty = Decimal(item["quantity"])
+        price = Decimal(item["unit_price"])
+        discount_pct = Decimal(item.get("discount_percent", 0))
+        line_subtotal = qty * price
+        discount_amount = line_subtotal * discount_pct / Decimal("100")
+        after_discount = line_subtotal - discount_amount
+        subtotal += after_discount
+        if tax_method == "line_item":
+            line_tax_rate = Decimal(item.get("tax_rate", 0))
+            line_tax = after_discount * line_tax_rate / Decimal("100")
+            tax_amount += line_tax
+    if tax_method != "line_item":
+        if tax_method == "before_discount":
+            subtotal_before_discount = sum(
+                Decimal(item["quantity"]) * Decimal(item["unit_price"])
+                for item in line_items
+            )
+            tax_amount = subtotal_before_discount * tax_rate / Decimal("100")
+            subtotal = sum(
+                Decimal(item["quantity"]) * Decimal(item["unit_price"])
+                - (Decimal(item["quantity"]) * Decimal(item["unit_price"]) * Decimal(item.get("discount_percent", 0)) / Decimal("100"))
+                for item in line_items
+            )
+        else:
+            tax_amount = subtotal * tax_rate / Decimal("100")
+    total = subtotal + tax_amount
+    return {"subtotal": str(subtotal), "tax_amount": str(tax_amount), "total": str(total)}
+
+
+# --- Synthetic data ----------------------------------------------------------
+
+def random_amount(rng: random.Random, whole_max: int, scales=(0, 1, 2, 3)) -> str:
+    scale = rng.choice(scales)
+    value = Decimal(rng.randint(0, whole_max * 10 ** scale)).scaleb(-scale)
+    return str(value)
+
+
+def random_line_item(rng: random.Random) -> Dict[str, str]:
+    item = {
+        "quantity": random_amount(rng, 500, (0, 0, 2)),
+        "unit_price": random_amount(rng, 2000),
+        "tax_rate": rng.choice(["0", "0.00", "8.25", "7.5", "10", random_amount(rng, 15)])
+    }
+    if rng.random() < 0.8:
+        item["discount_percent"] = rng.choice(["0", "0.00", "5", "12.5", "33.33", random_amount(rng, 100)])
+    return item
+
+
+def random_quote(rng: random.Random, index: int) -> Dict:
+    return {
+        "id": f"quote-{index}",
+        "tax_rate": rng.choice(["0", "8.25", "7.5", "10.00", random_amount(rng, 15)]),
+        "line_items": [random_line_item(rng) for _ in range(rng.choice([0, 1, 2, 3, 5, 8, 20]))]
+    }
+
+
+# --- Checks ------------------------------------------------------------------
+
+def check_equivalence(cases: int, seed: int) -> int:
+    rng = random.Random(seed)
+    mismatches = 0
+    for index in range(cases):
+        quote = random_quote(rng, index)
+        tax_rate = Decimal(quote["tax_rate"])
+        for tax_method in TAX_METHODS:
+            expected = legacy_quote_totals(quote["line_items"], tax_rate, tax_method)
+            actual = quote_totals(quote["line_items"], tax_rate, tax_method)
+            if expected != actual:
+                mismatches += 1
+                logger.error(f"Totals mismatch ({tax_method}) for {quote}: {expected} != {actual}")
+        for item in quote["line_items"]:
+            model_item = {
+                "quantity": Decimal(item["quantity"]),
+                "unit_price": Decimal(item["unit_price"]),
+                "discount_percent": Decimal(item.get("discount_percent", "0")),
+                "tax_rate": Decimal(item["tax_rate"])
+            }
+            expected = legacy_line_item_total(model_item, quote_tax_rate=tax_rate)
+            actual = calculate_line_total(item, quote_tax_rate=tax_rate)
+            if str(expected) != str(actual):
+                mismatches += 1
+                logger.error(f"Line total mismatch for {item}: {expected} != {actual}")
+    return mismatches
+
+
+def benchmark(quote_count: int, seed: int, repeat: int):
+    rng = random.Random(seed)
+    quotes = [random_quote(rng, index) for index in range(quote_count)]
+    line_count = sum(len(q["line_items"]) for q in quotes)
+
+    def best_of(run) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    for tax_method in TAX_METHODS:
+        legacy_elapsed = best_of(lambda: [
+            legacy_quote_totals(quote["line_items"], Decimal(quote["tax_rate"]), tax_method) for quote in quotes
+        ])
+        engine_elapsed = best_of(lambda: calculate_totals_bulk(quotes, tax_method))
+
+        print(
+            f"  {tax_method:<16} legacy={legacy_elapsed * 1000:8.1f}ms  engine={engine_elapsed * 1000:8.1f}ms  "
+            f"speedup={legacy_elapsed / engine_elapsed if engine_elapsed else 0:.2f}x"
+        )
+    print(f"  ({quote_count} quotes, {line_count} line items, best of {repeat})")
+
+
+def main():
+    """Main function to run the equivalence check and benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check the pricing engine against the previous helpers and benchmark it")
+    parser.add_argument("--quotes", type=int, default=10000, help="Quotes to price in the benchmark")
+    parser.add_argument("--cases", type=int, default=5000, help="Random quotes for the equivalence check")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3, help="Benchmark runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    print(f"equivalence: {args.cases} random quotes x {len(TAX_METHODS)} tax methods")
+    mismatches = check_equivalence(args.cases, args.seed)
+    print(f"  mismatches: {mismatches}")
+
+    print("benchmark:")
+    benchmark(args.quotes, args.seed, args.repeat)
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the query-vector transport of the rag_search_* RPCs
+(see database/vector_binary_transport.sql).
+1. Encode: the previous pgvector literal (str(float(x))), format_embedding_text
+   and encode_embedding_b64 - time per vector, string size and RPC body size.
+   Both new encodings are checked to round-trip float32 exactly, and the bit
+   arithmetic of rag_decode_vector_b64 is replayed in Python on random vectors
+   and on edge values (zeros, subnormals, extremes).
+2. SQL decode (with --sql): times rag_decode_vector_b64(b64) against the
+   text::vector cast inside the database with EXPLAIN ANALYZE, and checks both
+   give the same vector.
+
+Usage:
+    python scripts/benchmark_vector_transport.py [--dims 768] [--vectors 200] [--repeat 5]
+    python scripts/benchmark_vector_transport.py --sql [--sql-rows 1000]
+
+Environment Variables Required:
+    - None for the encode benchmark
+    - DATABASE_URL (only for --sql; queries are run through psql, and
+      database/vector_binary_transport.sql must be applied)
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import base64
+import random
+import struct
+import logging
+import subprocess
+from statistics import median
+from typing import Callable, List
+
+# Add backend directory to path
+backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, backend_path)
+
+from embeddings_service import encode_embedding_b64, format_embedding_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Values that exercise every branch of the float32 decode (sign, subnormal, extremes)
+EDGE_VALUES = [0.0, -0.0, 1.0, -1.0, 1e-45, -1e-45, 1.1754942e-38, 1.17549435e-38, 3.4028235e38, -3.4028235e38, 1e-7, 0.1]
+
+
+def legacy_embedding_text(embedding: List[float]) -> str:
+    """Literal sent before the binary transport"""
+    return '[' + ','.join([str(float(x)) for x in embedding]) + ']'
+
+
+def random_embedding(rng: random.Random, dims: int) -> List[float]:
+    """Unit-length vector, like text-embedding-004 output"""
+    values = [rng.gauss(0, 1) for _ in range(dims)]
+    norm = math.sqrt(sum(value * value for value in values)) or 1.0
+    return [value / norm for value in values]
+
+
+def to_float32(values: List[float]) -> List[float]:
+    """What pgvector stores (float4)"""
+    return list(struct.unpack(f"<{len(values)}f", struct.pack(f"<{len(values)}f", *values)))
+
+
+def sql_decode_b64(encoded: str) -> List[float]:
+    """Python replay of rag_decode_vector_b64's bit arithmetic"""
+    raw = base64.b64decode(encoded)
+    values = []
+    for i in range(len(raw) // 4):
+        bits = raw[4 * i] | (raw[4 * i + 1] << 8) | (raw[4 * i + 2] << 16) | (raw[4 * i + 3] << 24)
+        sign = -1 if (bits >> 31) == 1 else 1
+        exponent = (bits >> 23) & 255
+        if exponent == 0:
+            magnitude = (bits & 8388607) * 2.0 ** -149
+        else:
+            magnitude = (1 + (bits & 8388607) / 8388608) * 2.0 ** (exponent - 127)
+        values.append(sign * magnitude)
+    return values
+
+
+def check_round_trip(vectors: List[List[float]]) -> int:
+    """Count vectors whose encodings do not decode to the float32 values"""
+    mismatches = 0
+    for index, vector in enumerate(vectors):
+        expected = to_float32(vector)
+        from_text = to_float32(json.loads(format_embedding_text(vector)))
+        from_b64 = sql_decode_b64(encode_embedding_b64(vector))
+        if from_text != expected:
+            mismatches += 1
+            logger.error(f"vector {index}: format_embedding_text does not round-trip float32")
+        # -0.0 == 0.0, so also compare signs
+        if from_b64 != expected or [math.copysign(1, v) for v in from_b64] != [math.copysign(1, v) for v in expected]:
+            mismatches += 1
+            logger.error(f"vector {index}: rag_decode_vector_b64 replay does not match float32")
+    return mismatches
+
+
+def measure(label: str, vectors: List[List[float]], repeat: int, encode: Callable[[List[float]], str], rpc_key: str):
+    per_vector_us: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for vector in vectors:
+            encode(vector)
+        per_vector_us.append((time.perf_counter() - started) * 1e6 / len(vectors))
+
+    encoded = encode(vectors[0])
+    body = json.dumps({rpc_key: encoded, "match_limit": 5})
+    print(
+        f"  {label:<24} encode median={median(per_vector_us):8.1f}us  "
+        f"payload={len(encoded) / 1024:5.1f}KB  rpc body={len(body) / 1024:5.1f}KB"
+    )
+    return median(per_vector_us)
+
+
+def run_psql(sql: str) -> str:
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise Exception("DATABASE_URL must be set for --sql")
+    result = subprocess.run(
+        ["psql", database_url, "-X", "-q", "-A", "-t", "-v", "ON_ERROR_STOP=1", "-f", "-"],
+        input=sql, capture_output=True, text=True, check=True
+    )
+    return result.stdout
+
+
+def _execution_ms(explain_output: str) -> float:
+    match = re.search(r"Execution Time: ([\d.]+) ms", explain_output)
+    return float(match.group(1)) if match else float("nan")
+
+
+def benchmark_sql(vector: List[float], rows: int, repeat: int):
+    """Time the server-side decode of one query vector, repeated over rows"""
+    text_literal = format_embedding_text(vector)
+    b64 = encode_embedding_b64(vector)
+
+    equal = run_psql(f"SELECT public.rag_decode_vector_b64('{b64}') = '{text_literal}'::vector;").strip()
+    print(f"  decoded vector equals text cast: {equal == 't'}")
+
+    # "|| left('', g)" keeps the argument non-constant so the immutable function
+    # is evaluated per row instead of being folded once at plan time
+    queries = {
+        "text::vector": f"SELECT ('{text_literal}' || left('', g))::vector FROM generate_series(1, {rows}) g",
+        "rag_decode_vector_b64": f"SELECT public.rag_decode_vector_b64('{b64}' || left('', g)) FROM generate_series(1, {rows}) g",
+    }
+    for label, query in queries.items():
+        timings = [_execution_ms(run_psql(f"EXPLAIN (ANALYZE, TIMING OFF) {query};")) for _ in range(repeat)]
+        print(f"  {label:<24} decode median={median(timings) * 1000 / rows:8.1f}us per vector ({rows} rows)")
+    return equal == "t"
+
+
+def main():
+    """Main function to run the vector transport benchmarks"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark text vs. base64 float32 query-vector transport")
+    parser.add_argument("--dims", type=int, default=768, help="Vector dimensions")
+    parser.add_argument("--vectors", type=int, default=200, help="Random vectors to encode and check")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs (median is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--sql", action="store_true", help="Also time the decode in the database (needs DATABASE_URL)")
+    parser.add_argument("--sql-rows", type=int, default=1000, help="Decodes per EXPLAIN ANALYZE run")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vectors = [random_embedding(rng, args.dims) for _ in range(args.vectors)]
+
+    print(f"encode: {args.vectors} vectors x {args.dims} dims")
+    legacy = measure("previous text literal", vectors, args.repeat, legacy_embedding_text, "query_embedding_text")
+    measure("format_embedding_text", vectors, args.repeat, format_embedding_text, "query_embedding_text")
+    b64 = measure("encode_embedding_b64", vectors, args.repeat, encode_embedding_b64, "query_embedding_b64")
+    print(f"  speedup (base64 vs previous): {legacy / b64:.1f}x")
+
+    mismatches = check_round_trip(vectors + [EDGE_VALUES])
+    print(f"round trip: {len(vectors) + 1} vectors, mismatches: {mismatches}")
+
+    sql_ok = True
+    if args.sql:
+        print("sql decode:")
+        sql_ok = benchmark_sql(vectors[0], args.sql_rows, args.repeat)
+
+    if mismatches or not sql_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
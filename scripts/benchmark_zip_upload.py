@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Script to check and benchmark ZIP ingestion (zip_ingest.ingest_zip).
+1. Correctness: an archive with duplicates, an oversized member, empty members and
+   directories must upload each distinct member once, skip the duplicates and
+   report the oversized member without aborting the rest; uploading the archive
+   again must only add blob references.
+2. Throughput: an archive of N small files is ingested against an in-memory
+   storage/database with a modelled per-request latency, and compared with the
+   previous per-member sequence (upload, sign, insert for each member in turn).
+
+Usage:
+    python scripts/benchmark_zip_upload.py [--files 500] [--latency-ms 20] [--workers 8]
+
+No environment variables are required; requests go to an in-memory store.
+"""
+
+import io
+import os
+import sys
+import time
+import zipfile
+import threading
+from typing import Any, Dict, List
+
+# Add backend directory to path
+backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, backend_path)
+
+# database.py only builds clients from these; nothing connects to them
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import zip_ingest
+import file_blobs
+import signed_urls
+
+
+# --- In-memory storage and database ------------------------------------------
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeBackend:
+    """Storage bucket, `files` table and file blob RPCs; every request sleeps latency seconds"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.objects: Dict[str, bytes] = {}
+        self.rows: List[Dict[str, Any]] = []
+        self.blobs: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.storage = self
+
+    def _request(self):
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+    # storage
+    def from_(self, bucket: str):
+        return self
+
+    def upload(self, path, body, file_options=None):
+        self._request()
+        data = body if isinstance(body, bytes) else body.read()
+        with self.lock:
+            self.objects[path] = data
+
+    def create_signed_url(self, path, expires_in):
+        self._request()
+        return {"signedURL": f"https://storage.local/{path}?token=x"}
+
+    def create_signed_urls(self, paths, expires_in):
+        self._request()
+        return [{"path": path, "signedURL": f"https://storage.local/{path}?token=x"} for path in paths]
+
+    def remove(self, paths):
+        self._request()
+        with self.lock:
+            for path in paths:
+                self.objects.pop(path, None)
+
+    # database
+    def table(self, name: str):
+        backend = self
+
+        class _Insert:
+            def insert(self, rows):
+                self.rows = rows if isinstance(rows, list) else [rows]
+                return self
+
+            def execute(self):
+                backend._request()
+                with backend.lock:
+                    backend.rows.extend(dict(row) for row in self.rows)
+                return _Response([dict(row) for row in self.rows])
+
+        return _Insert()
+
+    def rpc(self, name: str, params: Dict[str, Any]):
+        backend = self
+
+        class _Rpc:
+            def execute(self):
+                backend._request()
+                with backend.lock:
+                    blob = backend.blobs.get(params["p_sha256"])
+                    if name == "acquire_file_blob":
+                        if blob is None and params["p_storage_path"] is None:
+                            return _Response(None)
+                        if blob is None:
+                            blob = backend.blobs[params["p_sha256"]] = {"storage_path": params["p_storage_path"], "ref_count": 0}
+                        blob["ref_count"] += 1
+                        return _Response(blob["storage_path"])
+                    blob["ref_count"] -= 1
+                    if blob["ref_count"] == 0:
+                        del backend.blobs[params["p_sha256"]]
+                        return _Response(blob["storage_path"])
+                    return _Response(None)
+
+        return _Rpc()
+
+
+def use_backend(backend: FakeBackend):
+    """Point ZIP ingestion and URL signing at backend, with an empty URL cache"""
+    zip_ingest.supabase_storage = backend
+    file_blobs.supabase_storage = backend
+    signed_urls.supabase_storage = backend
+    signed_urls._signed_url_service = None
+
+
+def build_archive(count: int, size: int = 2048, duplicates: int = 0, oversized: int = 0, max_size: int = 0) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("docs/", b"")
+        archive.writestr("docs/empty.txt", b"")
+        for i in range(count):
+            archive.writestr(f"docs/file_{i:04d}.txt", (f"file {i} ".encode() * size)[:size])
+        for i in range(duplicates):
+            archive.writestr(f"copies/copy_{i:04d}.txt", (f"file {i} ".encode() * size)[:size])
+        for i in range(oversized):
+            archive.writestr(f"big/big_{i}.bin", b"x" * (max_size + 1))
+    return buffer.getvalue()
+
+
+# --- Previous implementation (reference) -------------------------------------
+
+def legacy_ingest(backend: FakeBackend, data: bytes, max_size: int) -> int:
+    """Per-member upload, create_signed_url and insert, one member at a time"""
+    uploaded = 0
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    for name in archive.namelist():
+        if name.endswith('/'):
+            continue
+        content = archive.read(name)
+        if not content or len(content) > max_size:
+            continue
+        path = f"legacy/{uploaded}"
+        backend.upload(path, content)
+        backend.create_signed_url(path, 3600)
+        backend.table("files").insert({"storage_path": path, "file_size": len(content)}).execute()
+        uploaded += 1
+    return uploaded
+
+
+def _ingest(data: bytes, max_size: int, workers: int) -> Dict[str, Any]:
+    return zip_ingest.ingest_zip(
+        io.BytesIO(data),
+        folder_id="folder-1",
+        quote_id=None,
+        form_id=None,
+        description=None,
+        is_reusable=False,
+        user_id="user-1",
+        max_member_size=max_size,
+        workers=workers,
+    )
+
+
+def check_correctness(workers: int) -> int:
+    """Returns the number of failed checks"""
+    max_size = 64 * 1024
+    backend = FakeBackend(latency=0)
+    use_backend(backend)
+    archive = build_archive(20, duplicates=5, oversized=2, max_size=max_size)
+    result = _ingest(archive, max_size, workers)
+    objects_after_first = len(backend.objects)
+    again = _ingest(archive, max_size, workers)
+
+    failures = 0
+    checks = [
+        ("distinct members uploaded once", len(result["files"]) == 20 and len(backend.objects) == 20),
+        ("rows match objects", {row["storage_path"] for row in result["files"]} == set(backend.objects)),
+        ("archive order kept", [row["name"] for row in result["files"]] == [f"file_{i:04d}.txt" for i in range(20)]),
+        ("duplicates skipped", [d["duplicate_of"] for d in result["duplicates"]] == [f"docs/file_{i:04d}.txt" for i in range(5)]),
+        ("oversized members reported", len(result["errors"]) == 2 and all("big/" in error for error in result["errors"])),
+        ("rows signed", all(row.get("storage_url") for row in result["files"])),
+        ("re-upload reuses stored blobs", len(again["files"]) == 20 and len(backend.objects) == objects_after_first
+         and all(blob["ref_count"] == 2 for blob in backend.blobs.values())),
+    ]
+    for label, ok in checks:
+        print(f"  {'ok  ' if ok else 'FAIL'} {label}")
+        failures += 0 if ok else 1
+    return failures
+
+
+def benchmark(count: int, latency_ms: float, workers: int):
+    max_size = 10 * 1024 * 1024
+    data = build_archive(count)
+
+    backend = FakeBackend(latency=latency_ms / 1000.0)
+    started = time.perf_counter()
+    uploaded = legacy_ingest(backend, data, max_size)
+    legacy_seconds = time.perf_counter() - started
+    print(f"  per-member sequence: {uploaded} files, {backend.requests} requests, {legacy_seconds:.2f}s ({uploaded / legacy_seconds:.0f} files/s)")
+
+    backend = FakeBackend(latency=latency_ms / 1000.0)
+    use_backend(backend)
+    started = time.perf_counter()
+    result = _ingest(data, max_size, workers)
+    pipeline_seconds = time.perf_counter() - started
+    uploaded = len(result["files"])
+    print(f"  ingest_zip ({workers} workers): {uploaded} files, {backend.requests} requests, {pipeline_seconds:.2f}s ({uploaded / pipeline_seconds:.0f} files/s)")
+    print(f"  speedup: {legacy_seconds / pipeline_seconds:.1f}x")
+
+
+def main():
+    """Main function to run the correctness check and throughput benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check ZIP ingestion and benchmark it against per-member uploads")
+    parser.add_argument("--files", type=int, default=500, help="Small files in the benchmark archive")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Modelled storage/database request latency")
+    parser.add_argument("--workers", type=int, default=zip_ingest.ZIP_UPLOAD_WORKERS)
+    args = parser.parse_args()
+
+    print("correctness:")
+    failures = check_correctness(args.workers)
+
+    print(f"throughput: {args.files} files, {args.latency_ms:.0f}ms per request")
+    benchmark(args.files, args.latency_ms, args.workers)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Script to load test PDF rendering against a running API.
+Measures /health latency on its own, then again while many quote PDFs are being
+rendered concurrently. With rendering in the process pool the two should stay
+close; rejected renders (429) show backpressure working.
+
+Requests cycle through 96 option combinations (font_size/page_size/notes/terms), so
+unless --cached is set the first 96 requests miss the PDF cache and hit the render pool.
+
+Usage:
+    python scripts/load_test_pdf_render.py --quote-id <uuid> [--base-url http://localhost:8000]
+        [--concurrency 16] [--renders 64] [--cached]
+"""
+
+import sys
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+from typing import Dict, List
+
+import requests
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def sample_health(base_url: str, stop: threading.Event, interval: float = 0.05) -> List[float]:
+    """Poll /health until stop is set; returns latencies in ms"""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        requests.get(f"{base_url}/health", timeout=30)
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+    return latencies
+
+
+def report(label: str, latencies: List[float]):
+    print(
+        f"  {label:<22} n={len(latencies):<4} p50={median(latencies) if latencies else 0:.1f}ms "
+        f"p95={percentile(latencies, 0.95):.1f}ms max={max(latencies) if latencies else 0:.1f}ms"
+    )
+
+
+def main():
+    """Main function to run the load test"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test PDF rendering and watch API latency")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--quote-id", required=True, help="Existing quote to render")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent PDF requests")
+    parser.add_argument("--renders", type=int, default=64, help="Total PDF requests")
+    parser.add_argument("--cached", action="store_true", help="Reuse identical options (exercises the PDF cache)")
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip("/")
+
+    # Baseline: health latency with no rendering
+    stop = threading.Event()
+    timer = threading.Timer(3.0, stop.set)
+    timer.start()
+    baseline = sample_health(base_url, stop)
+
+    statuses: Dict[int, int] = {}
+    pdf_latencies: List[float] = []
+    lock = threading.Lock()
+
+    def render(index: int):
+        params = {} if args.cached else {
+            "font_size": 6 + index % 12,
+            "page_size": "a4" if (index // 12) % 2 else "letter",
+            "show_notes": (index // 24) % 2 == 0,
+            "show_terms": (index // 48) % 2 == 0
+        }
+        started = time.perf_counter()
+        response = requests.get(f"{base_url}/api/pdf/quote/{args.quote_id}", params=params, timeout=120)
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                pdf_latencies.append(elapsed)
+
+    # Under load: health latency while PDFs render
+    stop = threading.Event()
+    health_result: List[float] = []
+    health_thread = threading.Thread(target=lambda: health_result.extend(sample_health(base_url, stop)))
+    health_thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(render, range(args.renders)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    health_thread.join()
+
+    print(f"{args.renders} PDF requests, concurrency {args.concurrency}, {elapsed:.1f}s")
+    print(f"  statuses: {statuses}")
+    report("/health baseline", baseline)
+    report("/health during renders", health_result)
+    report("PDF (200 only)", pdf_latencies)
+
+    if statuses.get(500):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
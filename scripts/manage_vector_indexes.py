@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Script to manage the pgvector ANN indexes used by RAG search.
+Chooses HNSW or IVFFlat (and their parameters) from each table's size,
+rebuilds indexes concurrently, and reports recall vs. latency against exact search.
+
+Usage:
+    python scripts/manage_vector_indexes.py plan
+    python scripts/manage_vector_indexes.py rebuild [--table knowledge_embeddings] [--method hnsw] [--apply]
+    python scripts/manage_vector_indexes.py benchmark --table knowledge_embeddings --probes 1,5,10 --ef-search 40,100
+
+Requires database/vector_index_management.sql to be applied.
+
+Environment Variables Required:
+    - SUPABASE_URL
+    - SUPABASE_SERVICE_ROLE_KEY
+    - DATABASE_URL (only for rebuild --apply; statements are run one at a time through psql,
+      because CREATE INDEX CONCURRENTLY cannot run inside a transaction or an RPC)
+    - GEMINI_API_KEY is NOT needed - benchmarks reuse stored embeddings as queries
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import logging
+import subprocess
+from typing import List, Dict, Optional
+
+# Add backend directory to path
+backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, backend_path)
+
+from database import supabase_storage
+from embeddings_service import get_embeddings_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VECTOR_TABLES = ["quote_embeddings", "form_embeddings", "knowledge_embeddings"]
+
+# Below this many rows an exact scan is fast enough and always has perfect recall
+MIN_INDEX_ROWS = 1000
+# Above this many rows HNSW build time/memory gets expensive; fall back to IVFFlat
+HNSW_MAX_ROWS = 2_000_000
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+
+def index_name_for(table: str) -> str:
+    """Canonical vector index name for a table (matches create_vector_indexes.sql)"""
+    return f"{table}_vector_idx"
+
+
+def get_index_stats() -> List[Dict]:
+    """Row counts and current ANN index for each RAG table"""
+    response = supabase_storage.rpc("rag_vector_index_stats", {}).execute()
+    return response.data or []
+
+
+def recommend_index(row_count: int, method: str = "auto") -> Dict:
+    """
+    Choose an index method and build/search parameters for a table size.
+    Follows the pgvector guidance: IVFFlat lists = rows / 1000 up to 1M rows and
+    sqrt(rows) above that, probes ~ sqrt(lists); HNSW with m=16, ef_construction=64.
+    """
+    if method == "auto":
+        if row_count < MIN_INDEX_ROWS:
+            method = "none"
+        elif row_count <= HNSW_MAX_ROWS:
+            method = "hnsw"
+        else:
+            method = "ivfflat"
+
+    if method == "none":
+        return {"method": "none", "reason": f"fewer than {MIN_INDEX_ROWS} rows - exact scan is faster and exact"}
+
+    if method == "hnsw":
+        return {
+            "method": "hnsw",
+            "with": {"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION},
+            "search": {"ef_search": 40}
+        }
+
+    if row_count <= 1_000_000:
+        lists = max(row_count // 1000, 10)
+    else:
+        lists = int(math.sqrt(row_count))
+    return {
+        "method": "ivfflat",
+        "with": {"lists": lists},
+        "search": {"probes": max(int(math.sqrt(lists)), 1)}
+    }
+
+
+def build_rebuild_statements(table: str, recommendation: Dict, existing_index: Optional[str]) -> List[str]:
+    """
+    SQL statements that swap in a new index without blocking writes.
+    Each statement must run in its own transaction.
+    """
+    target = index_name_for(table)
+    statements = []
+
+    if recommendation["method"] == "none":
+        if existing_index:
+            statements.append(f"DROP INDEX CONCURRENTLY IF EXISTS public.{existing_index};")
+        return statements
+
+    temp_name = f"{target}_rebuild"
+    with_clause = ", ".join(f"{key} = {value}" for key, value in recommendation["with"].items())
+    statements.append(f"DROP INDEX CONCURRENTLY IF EXISTS public.{temp_name};")
+    statements.append(
+        f"CREATE INDEX CONCURRENTLY {temp_name} ON public.{table} "
+        f"USING {recommendation['method']} (embedding vector_cosine_ops) WITH ({with_clause});"
+    )
+    statements.append(f"DROP INDEX CONCURRENTLY IF EXISTS public.{existing_index or target};")
+    if existing_index and existing_index != target:
+        statements.append(f"DROP INDEX CONCURRENTLY IF EXISTS public.{target};")
+    statements.append(f"ALTER INDEX public.{temp_name} RENAME TO {target};")
+    statements.append(f"ANALYZE public.{table};")
+    return statements
+
+
+def run_statements(statements: List[str]):
+    """Run statements one at a time through psql (outside any transaction block)"""
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise Exception("DATABASE_URL must be set to apply index changes")
+
+    for statement in statements:
+        logger.info(f"Running: {statement}")
+        subprocess.run(
+            ["psql", database_url, "-v", "ON_ERROR_STOP=1", "-c", statement],
+            check=True
+        )
+
+
+def plan(method: str):
+    """Print current indexes and the recommended configuration for each table"""
+    for stats in get_index_stats():
+        recommendation = recommend_index(stats["row_count"], method)
+        print(f"{stats['table_name']}: {stats['row_count']} rows")
+        print(f"  current:     {stats.get('index_method') or 'none'} {stats.get('index_options') or ''}")
+        print(f"  recommended: {json.dumps(recommendation)}")
+
+
+def rebuild(tables: List[str], method: str, apply: bool):
+    """Print (or apply) the concurrent rebuild statements for the given tables"""
+    stats_by_table = {stats["table_name"]: stats for stats in get_index_stats()}
+
+    for table in tables:
+        stats = stats_by_table.get(table)
+        if not stats:
+            logger.warning(f"No stats for {table} - skipping")
+            continue
+
+        recommendation = recommend_index(stats["row_count"], method)
+        statements = build_rebuild_statements(table, recommendation, stats.get("index_name"))
+        if not statements:
+            logger.info(f"{table}: nothing to do")
+            continue
+
+        print(f"-- {table}: {json.dumps(recommendation)}")
+        for statement in statements:
+            print(statement)
+
+        if apply:
+            run_statements(statements)
+            logger.info(f"✓ Rebuilt index for {table}")
+
+
+def _parse_embedding(value) -> List[float]:
+    """Stored embeddings come back from PostgREST as '[x,y,...]' strings"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
+def benchmark(table: str, sample_size: int, k: int, probes_values: List[int], ef_search_values: List[int], local: bool = False):
+    """
+    Report recall@k and latency of ANN search vs. exact search.
+    Uses stored embeddings as queries; latency includes the RPC round trip.
+    With local=True (knowledge_embeddings only) the in-process index is measured too.
+    """
+    embeddings_service = get_embeddings_service()
+
+    rows = supabase_storage.table(table).select("id, embedding").not_.is_("embedding", "null").limit(sample_size).execute().data or []
+    queries = [_parse_embedding(row["embedding"]) for row in rows]
+    if not queries:
+        logger.error(f"No embeddings found in {table}")
+        return
+
+    def run(**search_kwargs):
+        result_ids = []
+        started = time.perf_counter()
+        for query in queries:
+            results = embeddings_service.search_similar_content(query, table, limit=k, **search_kwargs)
+            result_ids.append({result["id"] for result in results})
+        elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        return result_ids, elapsed_ms
+
+    exact_ids, exact_ms = run(exact=True)
+    print(f"{table}: {len(queries)} queries, k={k}")
+    print(f"  {'exact':<20} recall=1.000  avg={exact_ms:.1f}ms")
+
+    configs = [("probes", value) for value in probes_values] + [("ef_search", value) for value in ef_search_values]
+    for name, value in configs:
+        approx_ids, approx_ms = run(**{name: value})
+        hits = sum(len(approx & exact) for approx, exact in zip(approx_ids, exact_ids))
+        total = sum(len(exact) for exact in exact_ids) or 1
+        print(f"  {name + '=' + str(value):<20} recall={hits / total:.3f}  avg={approx_ms:.1f}ms")
+
+    if local and table == "knowledge_embeddings":
+        from knowledge_index import KnowledgeVectorIndex
+
+        for quantize in (False, True):
+            index = KnowledgeVectorIndex(quantize=quantize)
+            index.load()
+            result_ids = []
+            started = time.perf_counter()
+            for query in queries:
+                result_ids.append({result["id"] for result in index.search(query, k)})
+            local_ms = (time.perf_counter() - started) * 1000 / len(queries)
+            hits = sum(len(approx & exact) for approx, exact in zip(result_ids, exact_ids))
+            total = sum(len(exact) for exact in exact_ids) or 1
+            label = "local int8" if quantize else "local float32"
+            print(f"  {label:<20} recall={hits / total:.3f}  avg={local_ms:.3f}ms")
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main():
+    """Main function to plan, rebuild or benchmark vector indexes"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage pgvector ANN indexes for RAG")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="Show current and recommended indexes")
+    plan_parser.add_argument("--method", choices=["auto", "hnsw", "ivfflat", "none"], default="auto")
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="Rebuild indexes concurrently")
+    rebuild_parser.add_argument("--table", choices=VECTOR_TABLES, help="Only rebuild this table")
+    rebuild_parser.add_argument("--method", choices=["auto", "hnsw", "ivfflat", "none"], default="auto")
+    rebuild_parser.add_argument("--apply", action="store_true", help="Run the statements via psql (default: print only)")
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Report recall vs. latency against exact search")
+    benchmark_parser.add_argument("--table", choices=VECTOR_TABLES, default="knowledge_embeddings")
+    benchmark_parser.add_argument("--sample", type=int, default=50, help="Number of stored embeddings to use as queries")
+    benchmark_parser.add_argument("--k", type=int, default=5, help="Results per query")
+    benchmark_parser.add_argument("--probes", type=_int_list, default=[], help="Comma-separated ivfflat.probes values")
+    benchmark_parser.add_argument("--ef-search", type=_int_list, default=[], help="Comma-separated hnsw.ef_search values")
+    benchmark_parser.add_argument("--local", action="store_true", help="Also benchmark the in-process knowledge index (float32 and int8)")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "plan":
+            plan(args.method)
+        elif args.command == "rebuild":
+            rebuild([args.table] if args.table else VECTOR_TABLES, args.method, args.apply)
+        elif args.command == "benchmark":
+            benchmark(args.table, args.sample, args.k, args.probes, args.ef_search, args.local)
+    except Exception as e:
+        logger.error(f"Error in main: {str(e)}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
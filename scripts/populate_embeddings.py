@@ -23,7 +23,7 @@ backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__fi
 sys.path.insert(0, backend_path)
 
 from database import supabase_storage
-from embeddings_service import get_embeddings_service
+from embeddings_service import get_embeddings_service, format_embedding_text
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -72,7 +72,7 @@ def generate_embeddings_for_knowledge_base(limit: Optional[int] = None):
                 continue
             
             # Convert to string format for pgvector
-            embedding_str = '[' + ','.join([str(float(x)) for x in embedding]) + ']'
+            embedding_str = format_embedding_text(embedding)
             
             # Update entry with embedding
             supabase_storage.table("knowledge_embeddings").update({
@@ -150,7 +150,7 @@ def generate_embeddings_for_quotes(limit: Optional[int] = None):
                 continue
             
             # Convert to string format
-            embedding_str = '[' + ','.join([str(float(x)) for x in embedding]) + ']'
+            embedding_str = format_embedding_text(embedding)
             
             # Insert embedding
             supabase_storage.table("quote_embeddings").insert({
@@ -227,7 +227,7 @@ def generate_embeddings_for_forms(limit: Optional[int] = None):
                 continue
             
             # Convert to string format
-            embedding_str = '[' + ','.join([str(float(x)) for x in embedding]) + ']'
+            embedding_str = format_embedding_text(embedding)
             
             # Insert embedding
             supabase_storage.table("form_embeddings").insert({
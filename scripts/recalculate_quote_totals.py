@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Script to recalculate stored quote totals with the pricing engine.
+Walks every quote in id order in batches, recomputes subtotal/tax/total from its
+line items and writes back only the quotes whose stored values differ.
+
+Usage:
+    python scripts/recalculate_quote_totals.py [--batch-size 500] [--tax-method after_discount] [--dry-run]
+
+Environment Variables Required:
+    - SUPABASE_URL
+    - SUPABASE_SERVICE_ROLE_KEY
+"""
+
+import os
+import sys
+import logging
+
+# Add backend directory to path
+backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, backend_path)
+
+from pricing_engine import RECALCULATE_BATCH_SIZE, TAX_METHODS, recalculate_all_quotes
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main function to recalculate quote totals"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recalculate stored quote totals in batches")
+    parser.add_argument("--batch-size", type=int, default=RECALCULATE_BATCH_SIZE, help="Quotes per batch")
+    parser.add_argument("--tax-method", choices=TAX_METHODS, default="after_discount")
+    parser.add_argument("--dry-run", action="store_true", help="Report changed quotes without writing")
+    args = parser.parse_args()
+
+    stats = recalculate_all_quotes(args.batch_size, args.tax_method, args.dry_run)
+    logger.info(f"Done{' (dry run)' if args.dry_run else ''}: {stats}")
+
+    if stats["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()